@@ -0,0 +1,49 @@
+"""add storage object ledger
+
+Revision ID: 5d2b8e1f0c37
+Revises: 1a6e4c9b7d20
+Create Date: 2026-10-19 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2b8e1f0c37"
+down_revision: Union[str, Sequence[str], None] = "1a6e4c9b7d20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "storage_objects",
+        sa.Column("bucket", sa.String(length=255), nullable=False),
+        sa.Column("key", sa.String(length=1024), nullable=False),
+        sa.Column("folder", sa.String(length=255), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("content_type", sa.String(length=100), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("last_seen_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("bucket", "key"),
+    )
+    op.create_index("ix_storage_objects_bucket_created_at", "storage_objects", ["bucket", "created_at"], unique=False)
+
+    op.create_table(
+        "storage_usage_totals",
+        sa.Column("bucket", sa.String(length=255), nullable=False),
+        sa.Column("bytes", sa.BigInteger(), nullable=False),
+        sa.Column("files", sa.Integer(), nullable=False),
+        sa.Column("reconciled_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("bucket"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("storage_usage_totals")
+    op.drop_index("ix_storage_objects_bucket_created_at", table_name="storage_objects")
+    op.drop_table("storage_objects")
@@ -0,0 +1,40 @@
+"""add file registry
+
+Revision ID: 8e3f6a2c9b14
+Revises: 5d2b8e1f0c37
+Create Date: 2026-10-19 11:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8e3f6a2c9b14"
+down_revision: Union[str, Sequence[str], None] = "5d2b8e1f0c37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "file_registry",
+        sa.Column("path", sa.String(length=1024), nullable=False),
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=True),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("is_dir", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("path"),
+    )
+    op.create_index(op.f("ix_file_registry_job_id"), "file_registry", ["job_id"], unique=False)
+    op.create_index("ix_file_registry_expires_at", "file_registry", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_file_registry_expires_at", table_name="file_registry")
+    op.drop_index(op.f("ix_file_registry_job_id"), table_name="file_registry")
+    op.drop_table("file_registry")
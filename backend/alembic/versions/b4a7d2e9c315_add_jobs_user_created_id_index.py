@@ -0,0 +1,25 @@
+"""add jobs keyset pagination index
+
+Revision ID: b4a7d2e9c315
+Revises: 8e3f6a2c9b14
+Create Date: 2026-10-19 12:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b4a7d2e9c315"
+down_revision: Union[str, Sequence[str], None] = "8e3f6a2c9b14"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_jobs_user_id_created_at_id", "jobs", ["user_id", "created_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_user_id_created_at_id", table_name="jobs")
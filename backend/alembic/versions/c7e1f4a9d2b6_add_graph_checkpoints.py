@@ -0,0 +1,53 @@
+"""add graph checkpoints
+
+Revision ID: c7e1f4a9d2b6
+Revises: b4a7d2e9c315
+Create Date: 2026-10-19 14:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7e1f4a9d2b6"
+down_revision: Union[str, Sequence[str], None] = "b4a7d2e9c315"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "graph_checkpoints",
+        sa.Column("thread_id", sa.String(length=64), nullable=False),
+        sa.Column("checkpoint_ns", sa.String(length=255), nullable=False),
+        sa.Column("checkpoint_id", sa.String(length=64), nullable=False),
+        sa.Column("parent_id", sa.String(length=64), nullable=True),
+        sa.Column("step", sa.Integer(), nullable=False),
+        sa.Column("payload_type", sa.String(length=32), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column("metadata_type", sa.String(length=32), nullable=False),
+        sa.Column("metadata_payload", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("thread_id", "checkpoint_ns", "checkpoint_id"),
+    )
+    op.create_table(
+        "graph_checkpoint_writes",
+        sa.Column("thread_id", sa.String(length=64), nullable=False),
+        sa.Column("checkpoint_ns", sa.String(length=255), nullable=False),
+        sa.Column("checkpoint_id", sa.String(length=64), nullable=False),
+        sa.Column("task_id", sa.String(length=64), nullable=False),
+        sa.Column("idx", sa.Integer(), nullable=False),
+        sa.Column("channel", sa.String(length=255), nullable=False),
+        sa.Column("task_path", sa.String(length=255), nullable=False),
+        sa.Column("value_type", sa.String(length=32), nullable=False),
+        sa.Column("value", sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint("thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("graph_checkpoint_writes")
+    op.drop_table("graph_checkpoints")
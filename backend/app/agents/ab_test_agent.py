@@ -25,7 +25,9 @@ Return EXCLUSIVELY a JSON object following this exact structure.
       "type": "opening" | "title" | "thumbnail" | "hook",
       "content": {{
         "description": "What this variant does",
-        "implementation": "How to create it"
+        "implementation": "How to create it",
+        "start": 12.0,
+        "end": 15.0
       }},
       "predicted_performance": 0.85
     }}
@@ -35,6 +37,8 @@ Return EXCLUSIVELY a JSON object following this exact structure.
 }}
 
 Note: If "{variant_type}" is "hook", use "hook" or "opening" for the type.
+For hook/opening variants, "start" and "end" are the source timestamps (seconds)
+of the opening clip; it replaces that many seconds at the start of the edit.
 Predict performance as a probability (0.0 to 1.0).
 """
 
@@ -12,6 +12,7 @@ from openai import AsyncOpenAI
 from google import genai
 from groq import Groq
 from ..config import settings
+from ..services.concurrency import limits
 
 # Type variable for Pydantic model validation
 T = TypeVar("T", bound=BaseModel)
@@ -301,7 +302,8 @@ async def run_agent_prompt(
                         model=model,
                         agent=agent_name,
                     )
-                    result = await attempt_provider(selected_provider, model)
+                    async with limits.llm_budget.slot():
+                        result = await attempt_provider(selected_provider, model)
                     if result:
                         return result
                 except Exception as e:
@@ -345,7 +347,8 @@ async def run_agent_prompt(
                     model=model,
                     agent=agent_name,
                 )
-                result = await attempt_provider(provider_name, model)
+                async with limits.llm_budget.slot():
+                    result = await attempt_provider(provider_name, model)
                 if result:
                     return result
             except Exception as e:
@@ -34,6 +34,7 @@ class CutItem(BaseModel):
     reason: str
     audio_leadin: float = Field(0.0, description="Seconds of audio from previous clip to play over this video start (J-cut)")
     audio_leadout: float = Field(0.0, description="Seconds of audio from this clip to continue after video ends (L-cut)")
+    stock_url: Optional[str] = Field(None, description="URL of a scouted stock clip to use instead of the source; start/end are then clip times")
 
 
 class CutterOutput(BaseModel):
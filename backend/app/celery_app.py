@@ -8,6 +8,9 @@ from celery import Celery
 from app.config import settings
 
 REDIS_URL = settings.redis_url or "redis://localhost:6379/0"
+TASK_TIME_LIMIT = settings.celery_task_time_limit_seconds
+# Redelivery only after the hard limit has certainly killed the first run.
+VISIBILITY_TIMEOUT = TASK_TIME_LIMIT + 1800
 
 celery_app = Celery(
     "proedit",
@@ -28,7 +31,7 @@ if REDIS_URL.startswith("rediss://"):
             "socket_timeout": 10,
             "socket_connect_timeout": 10,
             "retry_on_timeout": True,
-            "visibility_timeout": 3600
+            "visibility_timeout": VISIBILITY_TIMEOUT
         },
         redis_backend_transport_options={
             "socket_timeout": 10,
@@ -44,11 +47,26 @@ celery_app.conf.update(
     enable_utc=True,
     broker_connection_retry_on_startup=True,
     broker_pool_limit=1,
-    # Standard queue visibility timeout (auto-release stuck tasks after 1 hour)
+    # Long-running tasks: acknowledge after completion (a crashed worker's job
+    # is redelivered) and reserve one message at a time so queued work stays
+    # in the broker, where tier priorities apply.
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    task_default_priority=4,
+    # Renders are killed at the hard limit (soft limit first, for cleanup), well
+    # before the visibility timeout would hand the message to a second worker.
+    task_time_limit=TASK_TIME_LIMIT,
+    task_soft_time_limit=max(60, TASK_TIME_LIMIT - 300),
     broker_transport_options={
-        "visibility_timeout": 3600,
+        **(celery_app.conf.broker_transport_options or {}),
+        "visibility_timeout": VISIBILITY_TIMEOUT,
         "socket_timeout": 15,
         "socket_connect_timeout": 15,
+        # One Redis list per priority (0 = highest); see services/job_scheduler.py.
+        "priority_steps": list(range(10)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
     },
 )
 
@@ -12,6 +12,9 @@ class Settings(BaseSettings):
     secret_key: str
     jwt_algorithm: str = "HS256"
     token_expiry_minutes: int = 60 * 24
+    # Decoded tokens and User rows are cached per process for this long;
+    # writes to a user in this process invalidate immediately.
+    auth_cache_ttl_seconds: float = 30.0
     database_url: str = "sqlite+aiosqlite:///./storage/edit_ai.db"
     storage_root: str = "storage"
     frontend_url: str = "http://localhost:3000"
@@ -22,6 +25,24 @@ class Settings(BaseSettings):
     sentry_dsn: str | None = None
     redis_url: str | None = None
     celery_video_queue: str = "video"
+    # Hard limit per video task; matches the stalled-job cutoff in tasks/cleanup.
+    # The broker's visibility timeout is kept above it so a long render is never
+    # redelivered while its first run is still going (acks_late).
+    celery_task_time_limit_seconds: int = 3 * 3600
+    # Video jobs dispatched to the broker but unfinished; the rest wait in the
+    # API's fair-share queue (services/job_scheduler.py).
+    job_scheduler_max_in_flight: int = 4
+    job_scheduler_interval_seconds: float = 5.0
+    # Load-driven resizing of the Celery pool and render/analysis slots
+    # (services/autoscaler.py). Dry run logs plans without applying them.
+    autoscaler_enabled: bool = False
+    autoscaler_dry_run: bool = True
+    autoscaler_interval_seconds: float = 15.0
+    autoscaler_min_pool: int = 1
+    autoscaler_max_pool: int = 4
+    # Buffered job progress messages are written to the DB at most this often
+    # (status transitions and results are always written immediately).
+    progress_flush_interval_seconds: float = 2.0
     
     # AI API Keys
     openai_api_key: str | None = None
@@ -34,6 +55,28 @@ class Settings(BaseSettings):
     llm_request_timeout_seconds: float = 90.0
     llm_total_timeout_seconds: float = 300.0
     ai_stage_timeout_seconds: float = 300.0
+    # "langgraph" runs the hand-wired graph with checkpoint resume; "dataflow"
+    # schedules the same nodes by declared state dependencies (no resume).
+    graph_scheduler: str = "langgraph"
+    # Long-term agent memory (services/memory). Without a pgvector DSN,
+    # recipes and style profiles live in this SQLite file ("" disables).
+    vector_database_url: str | None = None
+    vector_local_path: str = "storage/memory/vectors.db"
+    # pgvector ANN index: "hnsw", "ivfflat" or "none" (sequential scan),
+    # and how widely each query searches it.
+    vector_index_type: str = "hnsw"
+    vector_hnsw_ef_search: int = 64
+    vector_ivfflat_probes: int = 10
+    # Agent memory context: deadline per memory tier, and how long a tier
+    # that timed out or failed is left out of contexts.
+    memory_tier_timeout_seconds: float = 0.3
+    memory_tier_cooldown_seconds: float = 30.0
+    # Fold point-wise color filters (eq, curves, colorbalance, hue, lut3d)
+    # into one baked .cube per render, sampled on a size^3 lattice. Opt-in:
+    # against real FFmpeg output (eq works on limited-range YUV codes) the
+    # full grade lands around 34 dB PSNR, short of visually lossless.
+    color_lut_compiler: bool = False
+    color_lut_size: int = 33
 
     # Reliability monitoring thresholds
     reliability_recent_window_jobs: int = 25
@@ -67,6 +110,7 @@ class Settings(BaseSettings):
     r2_secret_access_key: str | None = None
     r2_bucket_name: str = "proedit-storage"
     r2_public_url: str | None = None  # e.g., https://pub-xxx.r2.dev
+    r2_reconcile_interval_hours: int = 24  # background bucket-vs-ledger diff
 
     # Stripe (Optional)
     stripe_secret_key: str | None = None
@@ -89,9 +133,45 @@ class Settings(BaseSettings):
     modal_token_id: str | None = None
     modal_token_secret: str | None = None
 
+    # Local scene renders use NVENC only when opted in (consumer GPUs cap
+    # concurrent sessions); the Modal worker always probes for it.
+    render_prefer_gpu: bool = False
+
+    # Overlay rendering: "ass" burns words/lower thirds/subtitles with one libass
+    # filter per scene; "drawtext" keeps the legacy per-word filter chain.
+    overlay_renderer: str = "ass"
+
+    # Uploads (legacy multipart and resumable chunked sessions)
+    upload_max_bytes: int = 100 * 1024 * 1024
+    upload_session_ttl_hours: int = 24
+
+    # Local artifact retention (file registry GC): unpinned artifacts after
+    # days, orphaned scene parts after hours.
+    local_retention_days: int = 7
+    local_part_ttl_hours: int = 12
+
+    # Delivery: finished renders are always faststart; HLS/CMAF ladder is opt-in.
+    hls_packaging_enabled: bool = False
+    hls_ladder_heights: str = "1080,720,480"
+
     # Stock Media APIs
     pexels_api_key: str | None = None
     pixabay_api_key: str | None = None
+    # Stock search fan-out and caches: query results expire after the TTL,
+    # clips are kept by content hash with renditions per render profile, and
+    # the least recently used are evicted past stock_cache_max_bytes (0 = no limit).
+    # Prefetch warms the top picks in the background while the job runs, at
+    # the job's render frame; the compiler waits up to stock_render_wait_seconds
+    # for the renditions its stock cuts use and drops the ones still missing.
+    # The fake provider serves deterministic assets for offline runs.
+    stock_cache_root: str = "storage/stock"
+    stock_search_concurrency: int = 4
+    stock_query_ttl_seconds: int = 86400
+    stock_transcode_concurrency: int = 2
+    stock_cache_max_bytes: int = 20 * 1024 ** 3
+    stock_prefetch_count: int = 2
+    stock_render_wait_seconds: float = 120.0
+    stock_fake_provider: bool = False
 
     # Idle Autonomy (Self-Heal + Self-Improve)
     autonomy_enabled: bool = True
@@ -1,28 +1,31 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-import jwt
-from .config import settings
 from .db import get_session
 from .models import User
 from .services.credits import ensure_monthly_credits
+from .services.principal_cache import principal_cache
 
 security = HTTPBearer()
 
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     session: AsyncSession = Depends(get_session),
 ) -> User:
-    try:
-        payload = jwt.decode(credentials.credentials, settings.secret_key, algorithms=[settings.jwt_algorithm])
-    except jwt.InvalidTokenError as exc:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from exc
+    # The request pipeline already resolved this header; only decode if it did not run.
+    principal = getattr(request.state, "principal", None) or principal_cache.principal(credentials.credentials)
+    if principal is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    user_id = int(payload["sub"])
-    user = await session.scalar(select(User).where(User.id == user_id))
+    cached = principal_cache.user(principal.user_id)
+    if cached is not None:
+        return cached
+    user = await session.scalar(select(User).where(User.id == principal.user_id))
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     await ensure_monthly_credits(user, session)
+    principal_cache.remember_user(user)
     return user
@@ -0,0 +1,211 @@
+"""
+Durable LangGraph checkpointer on the application database.
+
+Replaces the in-process MemorySaver so a job's graph survives worker
+crashes, redeploys and Celery redeliveries: checkpoints go to the same
+database as everything else (SQLite locally, Postgres in production), keyed
+by thread id = job id. A retried or restarted job resumes after the last
+completed super-step, and finished tasks of an interrupted step are kept as
+pending writes so only the unfinished nodes rerun.
+
+Storage stays compact: each checkpoint (including channel values) is one
+serde payload compressed with zlib, and only the newest checkpoint and its
+parent are kept per thread.
+"""
+from __future__ import annotations
+
+import zlib
+from collections.abc import AsyncIterator, Sequence
+from typing import Any, Optional, Tuple
+
+import structlog
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from sqlalchemy import delete, select
+
+from ..db import SessionLocal
+from ..models import GraphCheckpoint, GraphCheckpointWrite
+
+logger = structlog.get_logger()
+
+
+def _writes_sort_key(write: GraphCheckpointWrite) -> Tuple[str, str, int]:
+    # Live execution applies a super-step's writes in this order; replay must match it
+    # so order-sensitive reducers rebuild the same value.
+    return (write.task_path, write.task_id, write.idx)
+
+
+class SqlCheckpointSaver(BaseCheckpointSaver[int]):
+    def __init__(self, session_factory=SessionLocal, *, serde=None, compress_level: int = 6):
+        super().__init__(serde=serde)
+        self.session_factory = session_factory
+        self.compress_level = compress_level
+
+    # --- serialization ------------------------------------------------------
+
+    def _dump(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        return type_, zlib.compress(data, self.compress_level)
+
+    def _load(self, type_: str, blob: bytes) -> Any:
+        return self.serde.loads_typed((type_, zlib.decompress(blob)))
+
+    @staticmethod
+    def _keys(config: RunnableConfig) -> Tuple[str, str]:
+        configurable = config["configurable"]
+        return str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+
+    # --- reads --------------------------------------------------------------
+
+    async def _tuple(self, session, row: GraphCheckpoint) -> CheckpointTuple:
+        writes = (
+            await session.execute(
+                select(GraphCheckpointWrite).where(
+                    GraphCheckpointWrite.thread_id == row.thread_id,
+                    GraphCheckpointWrite.checkpoint_ns == row.checkpoint_ns,
+                    GraphCheckpointWrite.checkpoint_id == row.checkpoint_id,
+                )
+            )
+        ).scalars().all()
+        writes = sorted(writes, key=_writes_sort_key)
+
+        def _config(checkpoint_id: str) -> RunnableConfig:
+            return {"configurable": {
+                "thread_id": row.thread_id,
+                "checkpoint_ns": row.checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }}
+
+        return CheckpointTuple(
+            config=_config(row.checkpoint_id),
+            checkpoint=self._load(row.payload_type, row.payload),
+            metadata=self._load(row.metadata_type, row.metadata_payload),
+            parent_config=_config(row.parent_id) if row.parent_id else None,
+            pending_writes=[(w.task_id, w.channel, self._load(w.value_type, w.value)) for w in writes],
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, checkpoint_ns = self._keys(config)
+        stmt = select(GraphCheckpoint).where(
+            GraphCheckpoint.thread_id == thread_id,
+            GraphCheckpoint.checkpoint_ns == checkpoint_ns,
+        )
+        if checkpoint_id := get_checkpoint_id(config):
+            stmt = stmt.where(GraphCheckpoint.checkpoint_id == checkpoint_id)
+        else:
+            stmt = stmt.order_by(GraphCheckpoint.checkpoint_id.desc()).limit(1)
+        async with self.session_factory() as session:
+            row = (await session.execute(stmt)).scalars().first()
+            return await self._tuple(session, row) if row else None
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        stmt = select(GraphCheckpoint).order_by(GraphCheckpoint.checkpoint_id.desc())
+        if config:
+            thread_id, checkpoint_ns = self._keys(config)
+            stmt = stmt.where(GraphCheckpoint.thread_id == thread_id, GraphCheckpoint.checkpoint_ns == checkpoint_ns)
+        if before and (before_id := get_checkpoint_id(before)):
+            stmt = stmt.where(GraphCheckpoint.checkpoint_id < before_id)
+        async with self.session_factory() as session:
+            rows = (await session.execute(stmt)).scalars().all()
+            yielded = 0
+            for row in rows:
+                item = await self._tuple(session, row)
+                if filter and any(item.metadata.get(k) != v for k, v in filter.items()):
+                    continue
+                yield item
+                yielded += 1
+                if limit is not None and yielded >= limit:
+                    return
+
+    # --- writes -------------------------------------------------------------
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id, checkpoint_ns = self._keys(config)
+        parent_id = config["configurable"].get("checkpoint_id")
+        payload_type, payload = self._dump(checkpoint)
+        metadata = get_checkpoint_metadata(config, metadata)
+        metadata_type, metadata_payload = self._dump(metadata)
+        async with self.session_factory() as session:
+            await session.merge(GraphCheckpoint(
+                thread_id=thread_id,
+                checkpoint_ns=checkpoint_ns,
+                checkpoint_id=checkpoint["id"],
+                parent_id=parent_id,
+                step=int(metadata.get("step", 0) or 0),
+                payload_type=payload_type,
+                payload=payload,
+                metadata_type=metadata_type,
+                metadata_payload=metadata_payload,
+            ))
+            if parent_id:
+                # Checkpoint ids sort by creation: keep only this one and its parent.
+                for model in (GraphCheckpoint, GraphCheckpointWrite):
+                    await session.execute(delete(model).where(
+                        model.thread_id == thread_id,
+                        model.checkpoint_ns == checkpoint_ns,
+                        model.checkpoint_id < parent_id,
+                    ))
+            await session.commit()
+        return {"configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"],
+        }}
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id, checkpoint_ns = self._keys(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        async with self.session_factory() as session:
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                key = (thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx)
+                # Special writes (errors, interrupts) keep their first value.
+                if write_idx < 0 and await session.get(GraphCheckpointWrite, key):
+                    continue
+                value_type, blob = self._dump(value)
+                await session.merge(GraphCheckpointWrite(
+                    thread_id=thread_id,
+                    checkpoint_ns=checkpoint_ns,
+                    checkpoint_id=checkpoint_id,
+                    task_id=task_id,
+                    idx=write_idx,
+                    channel=channel,
+                    task_path=task_path,
+                    value_type=value_type,
+                    value=blob,
+                ))
+            await session.commit()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        async with self.session_factory() as session:
+            for model in (GraphCheckpointWrite, GraphCheckpoint):
+                await session.execute(delete(model).where(model.thread_id == str(thread_id)))
+            await session.commit()
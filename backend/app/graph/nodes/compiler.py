@@ -46,6 +46,10 @@ from ...services.post_production_depth import (
     build_lower_third_filter,
     build_kinetic_highlight_filters
 )
+from ...services.ass_overlays import build_overlay_track
+from ...services.color_compiler import color_compiler
+from ...services.deliverables import render_size
+from ...services.stock import ClipProfile, stock_asset_service
 
 async def compiler_node(state: GraphState) -> GraphState:
     """
@@ -63,13 +67,15 @@ async def compiler_node(state: GraphState) -> GraphState:
     audio_post_filter = state.get("audio_post_filter")
     word_timings = state.get("word_timings", [])
     highlight_color = state.get("highlight_color", "#FFFF00")
+    ratio = state.get("user_request", {}).get("ratio")
+    width, height = render_size(ratio, platform)
     
     # 0. Build FFmpeg filter chain
     vf_list = []
     
-    # Scale and Pad (Pro Default)
-    vf_list.append("scale=1280:720:force_original_aspect_ratio=decrease")
-    vf_list.append("pad=1280:720:(ow-iw)/2:(oh-ih)/2")
+    # Scale and Pad to the job's frame (Pro Default)
+    vf_list.append(f"scale={width}:{height}:force_original_aspect_ratio=decrease")
+    vf_list.append(f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2")
 
     # Add AI-generated effects
     for effect in visual_effects:
@@ -109,34 +115,60 @@ async def compiler_node(state: GraphState) -> GraphState:
             if val:
                 vf_list.append(val)
     
-    # Phase 8: Kinetic Highlight Pop-ups (Center screen retention)
-    if word_timings:
-        kinetic_filters = build_kinetic_highlight_filters(word_timings, highlight_color)
-        vf_list.extend(kinetic_filters)
-
-    # Subtitles (highest priority, added last)
-    if srt_path:
-        vf_list.append(build_subtitle_filter(srt_path, platform))
+    # The grade (everything after scale/pad) is kept with the job so later
+    # renders from the source, like deliverable hook openings, can match it.
+    color_qa = {"grade_filters": vf_list[2:]}
 
-    # Animated Lower Thirds (Phase 8)
     title = state.get("title") or (state.get("director_plan") or {}).get("headline")
     subtitle = state.get("subtitle") or (state.get("director_plan") or {}).get("subheadline")
-    lower_third_filters = build_lower_third_filter(title, subtitle)
-    if lower_third_filters:
-        vf_list.extend(lower_third_filters)
 
-    compiled_vf = ",".join(vf_list) if vf_list else None
+    # Phase 8 overlays (kinetic highlights, subtitles, lower thirds).
+    # Legacy drawtext chain: one filter per word, evaluated on every frame of every scene.
+    overlay_vf: list[str] = []
+    if word_timings:
+        overlay_vf.extend(build_kinetic_highlight_filters(word_timings, highlight_color))
+    if srt_path:
+        overlay_vf.append(build_subtitle_filter(srt_path, platform))
+    overlay_vf.extend(build_lower_third_filter(title, subtitle))
+
+    # Local renders burn the same overlays from a single generated ASS track instead.
+    overlay_track = None
+    if settings.overlay_renderer == "ass" and overlay_vf:
+        srt_text = None
+        if srt_path and os.path.exists(srt_path):
+            srt_text = Path(srt_path).read_text(encoding="utf-8", errors="ignore")
+        overlay_track = build_overlay_track(
+            word_timings=word_timings,
+            highlight_color=highlight_color,
+            title=title,
+            subtitle=subtitle,
+            srt_text=srt_text,
+            platform=platform,
+            play_res=(width, height),
+        )
+
+    compiled_vf = ",".join(vf_list + overlay_vf) if (vf_list or overlay_vf) else None
+    if not overlay_track:
+        overlay_track = None
+    # Local renders also fold the point-wise grades into one baked LUT; Modal
+    # keeps the original chain since the .cube file only exists on this host.
+    local_vf_list = color_compiler.compile_filters(vf_list)
+    if overlay_track is None:
+        local_vf_list = local_vf_list + overlay_vf
+    local_vf = ",".join(local_vf_list) if local_vf_list else None
     compiled_af = audio_post_filter or None
     print(f"--- [Graph] Compiler: Filter Chain -> {compiled_vf} ---")
     from ...services.modal_service import modal_service
     from ...services.workflow_engine import publish_progress
     
+    # Stock cuts render from renditions in this host's clip cache, so Modal only gets source cuts.
+    stock_cuts = any(cut.get("stock_url") for cut in cuts)
     if modal_service.enabled:
         publish_progress(job_id, "processing", "Offloading to GPU Cluster (Modal)...", 85, user_id=user_id)
         modal_output = await modal_service.render_video(
             job_id=job_id,
             source_path=source_path,
-            cuts=cuts,
+            cuts=[cut for cut in cuts if not cut.get("stock_url")] if stock_cuts else cuts,
             fps=24,
             crf=18 if tier == "pro" else 23,
             vf_filters=compiled_vf,
@@ -146,7 +178,8 @@ async def compiler_node(state: GraphState) -> GraphState:
             print(f"--- [Graph] Modal Rendering Success: {modal_output} ---")
             return {
                 "output_path": modal_output,
-                "visual_effects": []
+                "visual_effects": [],
+                "color_qa": color_qa,
             }
         print("--- [Graph] Modal Rendering Failed, falling back to local CPU ---")
 
@@ -170,25 +203,36 @@ async def compiler_node(state: GraphState) -> GraphState:
         
         from ...services.rendering_orchestrator import rendering_orchestrator
         
+        if stock_cuts:
+            # Picks up the scout's prefetch of the same renditions instead of redoing it.
+            cuts = await stock_asset_service.resolve_cuts(
+                cuts,
+                (state.get("scout_result") or {}).get("real_assets") or [],
+                ClipProfile.for_render(ratio, platform),
+                timeout=settings.stock_render_wait_seconds,
+            )
+
         try:
             success = await rendering_orchestrator.render_parallel(
                 job_id=job_id,
                 source_path=source_path,
                 cuts=cuts,
                 output_path=str(abs_output),
-                vf_filters=compiled_vf,
+                vf_filters=local_vf,
                 af_filters=compiled_af,
                 crf=18 if tier == "pro" else 23,
                 preset="medium",
                 transition_style=state.get("director_plan", {}).get("transition_style", "dissolve"),
                 transition_duration=float(state.get("director_plan", {}).get("transition_duration", 0.25)),
-                user_id=user_id
+                user_id=user_id,
+                overlay_track=overlay_track,
             )
             
             if success:
                 return {
                     "output_path": f"storage/outputs/{output_path}",
-                    "visual_effects": [] 
+                    "visual_effects": [],
+                    "color_qa": color_qa,
                 }
             else:
                 raise Exception("Parallel rendering failed.")
@@ -1,5 +1,6 @@
 from ..state import GraphState
 from ...agents import director_agent
+from ...services.memory.hybrid_memory import hybrid_memory
 import json
 from ._timeouts import run_with_stage_timeout
 
@@ -15,6 +16,11 @@ async def director_node(state: GraphState) -> GraphState:
         "user_request": state["user_request"],
         "keyframe_analysis": state.get("keyframe_data", {})
     }
+    if state.get("user_id") is not None:
+        # Memoized per job: QC revisions re-running the director reuse it.
+        payload["memory_context"] = await hybrid_memory.get_agent_context(
+            state["user_id"], job_id=state.get("job_id"), agent="director"
+        )
     
     try:
         plan = await run_with_stage_timeout(
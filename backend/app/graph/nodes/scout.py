@@ -2,7 +2,8 @@ import structlog
 from typing import Dict, Any
 from ..state import GraphState
 from ...agents import scout_agent
-from ...services.stock_scout_service import stock_scout_service
+from ...config import settings
+from ...services.stock import ClipProfile, stock_asset_service
 
 logger = structlog.get_logger()
 
@@ -24,7 +25,14 @@ async def scout_node(state: GraphState) -> Dict[str, Any]:
         queries = scout_data.get("search_queries", [])
         if queries:
             logger.info("scouting_stock_api", job_id=job_id, queries=queries)
-            real_assets = await stock_scout_service.search(queries)
+            real_assets = await stock_asset_service.search(queries)
+            # Warm the clip cache for the top picks without holding up the graph,
+            # transcoded to the frame this job's master is rendered at.
+            top = settings.stock_prefetch_count
+            if real_assets and top > 0:
+                request = state.get("user_request") or {}
+                profile = ClipProfile.for_render(request.get("ratio"), request.get("platform"))
+                stock_asset_service.prefetch(real_assets[:top], profile)
             # Add real results to the agent's logic
             scout_data["real_assets"] = real_assets
         
@@ -3,6 +3,7 @@ from pathlib import Path
 from typing import Any, Dict
 from ..state import GraphState
 from ...agents import subtitle_agent
+from ...services.file_registry import file_registry
 from ...services.post_production_depth import subtitle_qa_report
 from ._timeouts import run_with_stage_timeout
 
@@ -81,6 +82,7 @@ async def subtitle_node(state: GraphState) -> Dict[str, Any]:
         
         with open(srt_path, "w", encoding="utf-8") as f:
             f.write(srt_content)
+        await file_registry.track(srt_path, "srt", job_id=job_id)
             
         logger.info("subtitle_node_complete", job_id=job_id, srt_path=str(srt_path))
         
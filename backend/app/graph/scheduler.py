@@ -0,0 +1,263 @@
+"""
+Dataflow Scheduler - dependency-aware execution of the graph nodes.
+
+The LangGraph wiring orders nodes by hand (director -> platform -> cutter,
+scout after platform, ...), which serialises work that only partially
+depends on its predecessors. Here every node declares the exact GraphState
+keys it reads and writes, and the scheduler:
+
+- starts a node as soon as the producers of its inputs have committed,
+- starts speculative nodes (not yet known to be needed, e.g. scout and
+  ab_test, which only matter if QC lets the edit through) as soon as their
+  inputs exist, holding their results until a route confirms them,
+- versions every key and drops results computed from inputs that have since
+  been rewritten (e.g. after a QC revision re-runs the director),
+- records per-node timing and the critical path of the run.
+
+Routing after gate nodes (qc_gate, iteration_control) is expressed as a
+function returning the gated nodes the outcome makes necessary.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+@dataclass(frozen=True)
+class NodeSpec:
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    reads: Tuple[str, ...] = ()      # required: wait until their producers have committed
+    writes: Tuple[str, ...] = ()
+    optional: Tuple[str, ...] = ()   # read if present; a newer value still makes the result stale
+    gated: bool = False              # only needed once a route activates it
+    speculative: bool = False        # may run before it is needed / before inputs settle
+
+
+@dataclass
+class NodeTiming:
+    start: float
+    end: float
+    parent: Optional[str] = None
+
+
+@dataclass
+class _Result:
+    update: Dict[str, Any]
+    versions: Dict[str, int]
+    start: float
+    end: float
+
+
+@dataclass
+class ScheduleRun:
+    scheduler: "DataflowScheduler"
+    state: Dict[str, Any]
+    versions: Dict[str, int] = field(default_factory=dict)
+    committed: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    pending: Dict[str, _Result] = field(default_factory=dict)
+    running: Dict[str, Tuple[asyncio.Task, Dict[str, int], float]] = field(default_factory=dict)
+    activations: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    timings: Dict[str, NodeTiming] = field(default_factory=dict)
+    runs: Dict[str, int] = field(default_factory=dict)
+    dropped: Dict[str, int] = field(default_factory=dict)
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    # --- dependency bookkeeping ----------------------------------------------
+
+    def _tracked(self, spec: NodeSpec) -> Iterable[str]:
+        own = set(spec.writes)
+        return [k for k in (*spec.reads, *spec.optional) if k not in own]
+
+    def _snapshot(self, spec: NodeSpec) -> Dict[str, int]:
+        return {k: self.versions.get(k, 0) for k in self._tracked(spec)}
+
+    def _current(self, versions: Dict[str, int]) -> bool:
+        return all(self.versions.get(k, 0) == v for k, v in versions.items())
+
+    def fresh(self, name: str) -> bool:
+        return name in self.committed and self._current(self.committed[name])
+
+    def needed(self, name: str) -> bool:
+        if not self.scheduler.specs[name].gated:
+            return True
+        return any(name in targets for gate, targets in self.activations.items() if self.fresh(gate))
+
+    def settled(self, key: str) -> bool:
+        for producer in self.scheduler.producers.get(key, ()):
+            if not self.needed(producer):
+                continue
+            if producer in self.running or producer in self.pending or not self.fresh(producer):
+                return False
+        return True
+
+    def _ready(self, spec: NodeSpec) -> bool:
+        return all(self.settled(k) for k in spec.reads)
+
+    def _can_speculate(self, spec: NodeSpec) -> bool:
+        return spec.speculative and all(k in self.state for k in spec.reads)
+
+    # --- execution -----------------------------------------------------------
+
+    def _now(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    async def _call(self, spec: NodeSpec, state: Dict[str, Any]) -> Dict[str, Any]:
+        result = spec.fn(state)
+        if inspect.isawaitable(result):
+            result = await result
+        return result or {}
+
+    def _launch(self) -> None:
+        for name, spec in self.scheduler.specs.items():
+            if name in self.running or name in self.pending or self.fresh(name):
+                continue
+            if self.runs.get(name, 0) >= self.scheduler.max_runs:
+                continue
+            if (self.needed(name) and self._ready(spec)) or self._can_speculate(spec):
+                self.runs[name] = self.runs.get(name, 0) + 1
+                task = asyncio.create_task(self._call(spec, dict(self.state)), name=f"graph-node-{name}")
+                self.running[name] = (task, self._snapshot(spec), self._now())
+
+    def _commit(self, name: str, result: _Result) -> Dict[str, Any]:
+        spec = self.scheduler.specs[name]
+        applied = {}
+        for key, value in result.update.items():
+            if key in self.scheduler.reducers:
+                self.state[key] = list(self.state.get(key) or []) + list(value or [])
+            elif key in spec.writes:
+                self.state[key] = value
+                self.versions[key] = self.versions.get(key, 0) + 1
+            else:
+                logger.debug("graph_node_undeclared_write", node=name, key=key)
+                continue
+            applied[key] = value
+        self.committed[name] = result.versions
+        if name in self.scheduler.routes:
+            self.activations[name] = tuple(self.scheduler.routes[name](self.state))
+        self.timings[name] = NodeTiming(result.start, result.end, self._parent(spec, result.start))
+        return applied
+
+    def _parent(self, spec: NodeSpec, start: float) -> Optional[str]:
+        candidates = [p for k in spec.reads for p in self.scheduler.producers.get(k, ()) if p in self.timings]
+        if spec.gated:
+            candidates += [g for g, targets in self.activations.items() if spec.name in targets and g in self.timings]
+        candidates = [c for c in candidates if c != spec.name and self.timings[c].end <= start + 1e-6]
+        return max(candidates, key=lambda c: self.timings[c].end, default=None)
+
+    def _drop(self, name: str) -> None:
+        self.dropped[name] = self.dropped.get(name, 0) + 1
+
+    def _settle_pending(self) -> List[Tuple[str, Dict[str, Any]]]:
+        events = []
+        progressed = True
+        while progressed:
+            progressed = False
+            for name in list(self.pending):
+                result = self.pending[name]
+                if not self._current(result.versions):
+                    del self.pending[name]
+                    self._drop(name)
+                    logger.info("graph_node_stale", node=name)
+                    progressed = True
+                elif self.needed(name) and self._ready(self.scheduler.specs[name]):
+                    del self.pending[name]
+                    events.append((name, self._commit(name, result)))
+                    progressed = True
+        return events
+
+    def _cancel_stale(self) -> None:
+        for name, (task, versions, _) in list(self.running.items()):
+            if not self._current(versions):
+                task.cancel()
+
+    async def stream(self) -> AsyncIterator[Dict[str, Dict[str, Any]]]:
+        """Yield `{node: update}` for every committed node, like LangGraph's `astream`."""
+        self.started_at = time.perf_counter()
+        try:
+            while True:
+                for name, update in self._settle_pending():
+                    yield {name: update}
+                self._cancel_stale()
+                self._launch()
+                if not self.running:
+                    break
+                by_task = {task: name for name, (task, _, _) in self.running.items()}
+                done, _ = await asyncio.wait(by_task, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = by_task[task]
+                    _, versions, start = self.running.pop(name)
+                    if task.cancelled():
+                        self._drop(name)
+                        continue
+                    if task.exception() is not None:
+                        raise task.exception()
+                    self.pending[name] = _Result(task.result(), versions, start, self._now())
+        finally:
+            for task, _, _ in self.running.values():
+                task.cancel()
+            self.finished_at = self._now()
+            unused = [name for name in self.pending]
+            for name in unused:
+                self._drop(name)
+            self.pending.clear()
+            logger.info("graph_schedule_complete", **self.report())
+
+    def critical_path(self) -> List[str]:
+        if not self.timings:
+            return []
+        name = max(self.timings, key=lambda n: self.timings[n].end)
+        path = []
+        while name and name not in path:
+            path.append(name)
+            name = self.timings[name].parent
+        return list(reversed(path))
+
+    def report(self) -> Dict[str, Any]:
+        path = self.critical_path()
+        return {
+            "wall_ms": round(self.finished_at * 1000, 2),
+            "critical_path": path,
+            "critical_path_ms": round(sum((self.timings[n].end - self.timings[n].start) for n in path) * 1000, 2),
+            "nodes": {
+                name: {
+                    "start_ms": round(t.start * 1000, 2),
+                    "end_ms": round(t.end * 1000, 2),
+                    "duration_ms": round((t.end - t.start) * 1000, 2),
+                    "runs": self.runs.get(name, 0),
+                    "critical": name in path,
+                }
+                for name, t in sorted(self.timings.items(), key=lambda item: item[1].start)
+            },
+            "dropped": dict(self.dropped),
+        }
+
+
+class DataflowScheduler:
+    def __init__(
+        self,
+        specs: Iterable[NodeSpec],
+        routes: Optional[Dict[str, Callable[[Dict[str, Any]], Iterable[str]]]] = None,
+        reducers: Iterable[str] = ("errors",),
+        max_runs: int = 6,
+    ):
+        self.specs: Dict[str, NodeSpec] = {spec.name: spec for spec in specs}
+        self.routes = routes or {}
+        self.reducers = set(reducers)
+        self.max_runs = max_runs
+        self.producers: Dict[str, Tuple[str, ...]] = {}
+        for spec in self.specs.values():
+            for key in spec.writes:
+                if key not in self.reducers:
+                    self.producers[key] = self.producers.get(key, ()) + (spec.name,)
+
+    def start(self, state: Dict[str, Any]) -> ScheduleRun:
+        return ScheduleRun(self, dict(state))
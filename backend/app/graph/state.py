@@ -54,6 +54,7 @@ class GraphState(TypedDict):
     output_path: Optional[str]
     srt_path: Optional[str]
     subtitle_qa: Optional[Dict[str, Any]]
+    color_qa: Optional[Dict[str, Any]]  # {"grade_filters": [...]} applied to the output
     
     # Phase 8: Kinetic Branding
     word_timings: List[Dict[str, Any]]
@@ -21,6 +21,7 @@ from .nodes.scout import scout_node
 
 
 from .iteration_controller import create_iteration_node, should_revise
+from .scheduler import DataflowScheduler, NodeSpec, ScheduleRun
 
 
 def should_proceed_to_compile(state: GraphState) -> str:
@@ -115,10 +116,93 @@ workflow.add_conditional_edges(
 workflow.add_edge("compiler", "ab_test")
 workflow.add_edge("ab_test", END)
 
-from langgraph.checkpoint.memory import MemorySaver
+from .checkpointer import SqlCheckpointSaver
 
-# ... existing code ...
-
-# Compile
-checkpointer = MemorySaver()
+# Compile (checkpoints persist in the app database so jobs resume after restarts)
+checkpointer = SqlCheckpointSaver()
 app = workflow.compile(checkpointer=checkpointer)
+
+
+# --- Dataflow scheduling (settings.graph_scheduler == "dataflow") ---------
+# Same nodes, ordered by the GraphState keys each one actually reads and
+# writes instead of the hand-wired edges above. `reads` are waited on,
+# `optional` keys are used if present and make a result stale when rewritten.
+
+COMPILE_TARGETS = ("compiler", "scout", "ab_test")
+
+
+def _route_after_qc(state: GraphState) -> tuple:
+    decision = should_proceed_to_compile(state)
+    if decision == "compile":
+        return COMPILE_TARGETS
+    if decision == "check_iteration":
+        return ("iteration_control",)
+    return ()
+
+
+def _route_after_iteration(state: GraphState) -> tuple:
+    # "revise" rewrites revision_prompt, which re-runs the director and,
+    # through the new plan, everything downstream of it.
+    return COMPILE_TARGETS if should_revise(state) == "proceed" else ()
+
+
+def dataflow_specs() -> list:
+    return [
+        NodeSpec("media_intelligence", media_intelligence_node, writes=("media_intelligence",)),
+        NodeSpec("director", director_node, writes=("director_plan",), optional=("revision_prompt",)),
+        NodeSpec("platform", platform_node, reads=("director_plan",), writes=("platform_result",)),
+        NodeSpec("brand_safety", brand_safety_node, reads=("director_plan",), writes=("brand_safety_result",)),
+        NodeSpec("hook", hook_node, reads=("director_plan",), writes=("hook_result",)),
+        NodeSpec(
+            "subtitle", subtitle_node,
+            reads=("director_plan",),
+            writes=("srt_path", "subtitle_qa", "word_timings", "highlight_color", "subtitle_style"),
+        ),
+        NodeSpec(
+            "cutter", cutter_node,
+            reads=("director_plan", "media_intelligence"),
+            writes=("cuts", "shot_metadata"),
+            optional=("revision_prompt", "shot_metadata"),
+        ),
+        NodeSpec("visuals", visuals_node, reads=("director_plan", "media_intelligence"), writes=("visual_effects",)),
+        NodeSpec(
+            "audio", audio_node,
+            reads=("cuts", "director_plan"),
+            writes=("audio_tracks", "audio_intelligence", "audio_post_filter"),
+        ),
+        NodeSpec("validator", validator_node, reads=("cuts", "visual_effects", "audio_tracks"), writes=("validation_result",)),
+        NodeSpec(
+            "qc_gate", qc_gate_node,
+            reads=(
+                "validation_result", "hook_result", "platform_result", "cuts",
+                "visual_effects", "audio_tracks", "director_plan", "media_intelligence",
+            ),
+            writes=("qc_result",),
+        ),
+        NodeSpec(
+            "iteration_control", create_iteration_node(),
+            reads=("qc_result",),
+            writes=("retry_count", "revision_prompt", "iteration_summary", "should_revise"),
+            gated=True,
+        ),
+        NodeSpec(
+            "compiler", compiler_node,
+            reads=(
+                "cuts", "visual_effects", "audio_post_filter", "srt_path", "word_timings",
+                "highlight_color", "director_plan", "media_intelligence", "scout_result",
+            ),
+            writes=("output_path", "color_qa"),
+            gated=True,
+        ),
+        NodeSpec("scout", scout_node, reads=("director_plan",), writes=("scout_result",), gated=True, speculative=True),
+        NodeSpec("ab_test", ab_test_node, writes=("ab_test_result",), gated=True, speculative=True),
+    ]
+
+
+def start_dataflow(initial_state: dict) -> ScheduleRun:
+    """Start a dataflow run; a fresh spec list keeps the iteration controller per job."""
+    scheduler = DataflowScheduler(
+        dataflow_specs(),
+        routes={"qc_gate": _route_after_qc, "iteration_control": _route_after_iteration},
+    )
+    return scheduler.start(initial_state)
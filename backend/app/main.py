@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from starlette.types import ASGIApp, Scope, Receive, Send
@@ -7,7 +7,6 @@ from starlette.types import ASGIApp, Scope, Receive, Send
 from typing import Any
 from sqlalchemy import select, update
 import time
-import uuid
 import asyncio
 import structlog
 import os
@@ -103,6 +102,10 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error("startup_indices_failed", error=str(e))
 
+    # Open long-term agent memory now, not under the first job's per-tier deadline
+    from .services.memory import hybrid_memory
+    asyncio.create_task(hybrid_memory.warm())
+
     # Start Admin Cache (zero-wait dashboard)
     from .services.admin_cache import refresh_admin_data
     asyncio.create_task(refresh_admin_data())
@@ -118,13 +121,58 @@ async def lifespan(app: FastAPI):
                 logger.error("periodic_cleanup_failed", error=str(e))
             await asyncio.sleep(6 * 3600)
     asyncio.create_task(periodic_cleanup())
+
+    # Reconcile the R2 object ledger against the bucket (background diff)
+    from .services.storage_service import storage_service as r2_storage
+    async def periodic_storage_reconcile():
+        while True:
+            try:
+                await r2_storage.reconcile_ledger()
+            except Exception as e:
+                logger.error("storage_reconcile_failed", error=str(e))
+            await asyncio.sleep(max(1, settings.r2_reconcile_interval_hours) * 3600)
+    if r2_storage.use_r2:
+        asyncio.create_task(periodic_storage_reconcile())
     
+    # Fair-share admission of queued video jobs to the Celery broker
+    from .routers.jobs import USE_CELERY
+    from .services.job_scheduler import job_scheduler
+    async def periodic_job_admission():
+        try:
+            recovered = await job_scheduler.recover()
+            if recovered:
+                logger.info("job_admission_recovered", jobs=recovered)
+        except Exception as e:
+            logger.error("job_admission_recover_failed", error=str(e))
+        while True:
+            await asyncio.sleep(settings.job_scheduler_interval_seconds)
+            try:
+                await job_scheduler.tick()
+            except Exception as e:
+                logger.error("job_admission_failed", error=str(e))
+    if USE_CELERY:
+        asyncio.create_task(periodic_job_admission())
+
+    # Queue-depth-driven capacity (pool size, render/analysis slots)
+    async def periodic_autoscale():
+        from .services.autoscaler import autoscaler, collect_sample
+        while True:
+            try:
+                autoscaler.step(await collect_sample())
+            except Exception as e:
+                logger.error("autoscaler_tick_failed", error=str(e))
+            await asyncio.sleep(max(1.0, settings.autoscaler_interval_seconds))
+    if settings.autoscaler_enabled:
+        asyncio.create_task(periodic_autoscale())
+
     await autonomy_service.start()
     logger.info("startup_ready")
     try:
         yield
     finally:
         await autonomy_service.stop()
+        from .services.progress_hub import progress_hub
+        await progress_hub.close()
 
 
 async def bootstrap_admin() -> None:
@@ -292,14 +340,6 @@ async def api_health() -> dict[str, Any]:
 async def ready() -> dict[str, str]:
     return {"status": "ready"}
 
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    # Standard security headers + CORP to allow cross-origin media loading (ORB prevention)
-    response = await call_next(request)
-    response.headers["Cross-Origin-Resource-Policy"] = "cross-origin"
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    return response
-
 app.add_middleware(
     CORSMiddleware,
     # Explicitly include the Vercel frontend and Tailscale node to ensure reliable CORS mapping.
@@ -315,65 +355,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Access-Control-Allow-Private-Network"]
+    expose_headers=["Access-Control-Allow-Private-Network", "X-Next-Cursor"]
 )
 
 app.add_middleware(PrivateNetworkAccessMiddleware)
 
-# Rate limiting middleware
-from .middleware.rate_limit import rate_limit_middleware
-app.middleware("http")(rate_limit_middleware)
-
-# Security headers middleware  
-from .middleware.security_headers import security_headers_middleware
-app.middleware("http")(security_headers_middleware)
-
-@app.middleware("http")
-async def logging_middleware(request: Request, call_next):
-    request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
-    structlog.contextvars.clear_contextvars()
-    structlog.contextvars.bind_contextvars(request_id=request_id)
-    
-    start_time = time.time()
-    try:
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        process_time_ms = round(process_time * 1000, 2)
-        
-        # Log slow requests at WARNING level
-        if process_time > 5.0:
-            logger.warning(
-                "slow_request",
-                method=request.method,
-                path=request.url.path,
-                start_time=start_time,
-                origin=request.headers.get("origin"),
-                status_code=response.status_code,
-                duration_seconds=round(process_time, 2)
-            )
-        else:
-            logger.info(
-                "request_completed",
-                method=request.method,
-                path=request.url.path,
-                status_code=response.status_code,
-                duration=process_time
-            )
-        
-        response.headers["X-Request-ID"] = request_id
-        response.headers["X-Response-Time"] = f"{process_time_ms}ms"
-        return response
-    except Exception as e:
-        process_time = time.time() - start_time
-        logger.error(
-            "request_failed",
-            method=request.method,
-            path=request.url.path,
-            origin=request.headers.get("origin"),
-            duration=process_time,
-            error=str(e)
-        )
-        raise
+# Logging, auth principal, rate limiting and security headers in one
+# pure-ASGI pass (outermost, so it sees CORS/PNA responses too).
+from .middleware.pipeline import RequestPipelineMiddleware
+app.add_middleware(RequestPipelineMiddleware)
 
 
 @app.get("/")
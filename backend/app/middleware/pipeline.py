@@ -0,0 +1,118 @@
+"""
+Request pipeline: one pure-ASGI middleware for every HTTP request.
+
+Replaces the stacked `@app.middleware("http")` layers (request logging,
+security headers, rate limiting), each of which wrapped the app in its own
+task and body stream. In a single pass it binds the request id, resolves the
+bearer token once through the principal cache (stored on the request scope
+as `request.state.principal` for `get_current_user`), applies the rate
+limit, and adds headers when the response starts.
+"""
+from __future__ import annotations
+
+import time
+import uuid
+
+import structlog
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import settings
+from ..services.principal_cache import principal_cache
+from .rate_limit import check_rate_limit, rate_limit_headers, rate_limit_response
+from .security_headers import SECURITY_HEADERS
+
+logger = structlog.get_logger()
+
+SLOW_REQUEST_SECONDS = 5.0
+
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for key, value in scope.get("headers") or ():
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class RequestPipelineMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _header(scope, b"x-request-id") or str(uuid.uuid4())
+        structlog.contextvars.clear_contextvars()
+        structlog.contextvars.bind_contextvars(request_id=request_id)
+        start_time = time.time()
+        method = scope.get("method", "")
+        path = scope.get("path", "")
+        is_preflight = method == "OPTIONS"
+
+        principal = None
+        auth_header = _header(scope, b"authorization") or ""
+        if auth_header.startswith("Bearer "):
+            principal = principal_cache.principal(auth_header[7:].strip())
+        scope.setdefault("state", {})["principal"] = principal
+
+        limit_config = limit_result = None
+        if settings.rate_limit_enabled and not is_preflight:
+            client = scope.get("client")
+            identity = f"user:{principal.user_id}" if principal else f"ip:{client[0] if client else 'unknown'}"
+            limit_config, limit_result = await check_rate_limit(path, identity)
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                if not is_preflight:
+                    for name, value in SECURITY_HEADERS:
+                        headers[name] = value
+                if limit_config and not limit_result.limited:
+                    for name, value in rate_limit_headers(limit_config, limit_result):
+                        headers[name] = value
+                headers["X-Request-ID"] = request_id
+                headers["X-Response-Time"] = f"{round((time.time() - start_time) * 1000, 2)}ms"
+            await send(message)
+
+        try:
+            if limit_config and limit_result.limited:
+                await rate_limit_response(limit_config, limit_result)(scope, receive, send_wrapper)
+            else:
+                await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            logger.error(
+                "request_failed",
+                method=method,
+                path=path,
+                origin=_header(scope, b"origin"),
+                duration=time.time() - start_time,
+                error=str(e),
+            )
+            raise
+
+        process_time = time.time() - start_time
+        # Log slow requests at WARNING level
+        if process_time > SLOW_REQUEST_SECONDS:
+            logger.warning(
+                "slow_request",
+                method=method,
+                path=path,
+                start_time=start_time,
+                origin=_header(scope, b"origin"),
+                status_code=status_code,
+                duration_seconds=round(process_time, 2),
+            )
+        else:
+            logger.info(
+                "request_completed",
+                method=method,
+                path=path,
+                status_code=status_code,
+                duration=process_time,
+            )
@@ -1,63 +1,217 @@
 """
-Rate Limiting Middleware for FastAPI.
-Uses in-memory storage for MVP (replace with Redis for production).
+Rate limiting for the request pipeline.
+
+Limits are enforced with GCRA (generic cell rate algorithm) in an atomic Redis
+script when REDIS_URL is configured: one key per identity+path holding a
+"theoretical arrival time", O(1) per check and shared by every API replica.
+Without Redis (or while it is unreachable) an in-process sliding-window
+counter takes over: keys are spread over sharded locks, each key keeps only
+two counters, and idle keys are evicted.
 """
-from fastapi import Request, HTTPException, status
-from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import Dict, Tuple
+from __future__ import annotations
+
 import asyncio
-import jwt
+import math
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import structlog
+from fastapi import status
+from fastapi.responses import JSONResponse
 
 from ..config import settings
 from ..errors import ErrorCode
 
+logger = structlog.get_logger()
+
+SHARD_COUNT = 16
+MAX_KEYS_PER_SHARD = 10_000
+REDIS_RETRY_AFTER_SECONDS = 5.0
+KEY_PREFIX = "ratelimit:"
+
+
+@dataclass
+class RateLimitResult:
+    limited: bool
+    remaining: int
+    retry_after: float = 0.0
+    reset_after: float = 0.0
+
+
+# KEYS[1] = key; ARGV = max_requests, window_ms.
+# Uses the server clock so every replica agrees on "now".
+GCRA_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local emission = window / limit
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + emission
+local allow_at = new_tat - window
+if now < allow_at then
+  local remaining_ms = tat - now
+  return {1, 0, math.ceil(allow_at - now), math.ceil(remaining_ms)}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+local remaining = math.floor((window - (new_tat - now)) / emission)
+return {0, remaining, 0, math.ceil(new_tat - now)}
+"""
+
+
+class RedisRateLimiter:
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._client = None
+        self._script = None
+        self._loop = None
+
+    def _gcra(self):
+        # asyncio clients are loop-bound; the script object re-uses EVALSHA.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            import redis.asyncio as aioredis
+
+            self._client = aioredis.from_url(
+                self.redis_url, decode_responses=True, socket_timeout=1, socket_connect_timeout=1
+            )
+            self._script = self._client.register_script(GCRA_SCRIPT)
+            self._loop = loop
+        return self._script
+
+    async def check(self, key: str, max_requests: int, window_seconds: int) -> RateLimitResult:
+        limited, remaining, retry_ms, reset_ms = await self._gcra()(
+            keys=[KEY_PREFIX + key], args=[max_requests, window_seconds * 1000]
+        )
+        return RateLimitResult(bool(limited), int(remaining), int(retry_ms) / 1000, int(reset_ms) / 1000)
+
+    async def reset(self) -> None:
+        if self._client is None:
+            return
+        async for key in self._client.scan_iter(match=KEY_PREFIX + "*", count=500):
+            await self._client.delete(key)
+
+
+class _Shard:
+    __slots__ = ("lock", "entries")
 
-class RateLimiter:
-    """Simple in-memory rate limiter."""
-    
     def __init__(self):
-        # Format: {client_ip: [(timestamp, count), ...]}
-        self._requests: Dict[str, list] = defaultdict(list)
-        self._lock = asyncio.Lock()
-    
+        self.lock = threading.Lock()
+        # key -> [window index, current count, previous count, expires at]
+        self.entries: "OrderedDict[str, List[float]]" = OrderedDict()
+
+
+class LocalRateLimiter:
+    """
+    Approximate sliding window: the previous window's count is weighted by
+    how much of it still overlaps the sliding window. Two counters per key.
+    """
+
+    def __init__(self, shards: int = SHARD_COUNT, max_keys_per_shard: int = MAX_KEYS_PER_SHARD, clock=time.monotonic):
+        self._shards = [_Shard() for _ in range(shards)]
+        self.max_keys_per_shard = max_keys_per_shard
+        self.clock = clock
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+
+    def _evict(self, shard: _Shard, now: float) -> None:
+        entries = shard.entries
+        # Least recently used first: stop at the first live key.
+        while entries:
+            oldest = next(iter(entries.values()))
+            if oldest[3] > now and len(entries) <= self.max_keys_per_shard:
+                break
+            entries.popitem(last=False)
+
+    def check(self, key: str, max_requests: int, window_seconds: int) -> RateLimitResult:
+        now = self.clock()
+        window_index = int(now // window_seconds)
+        elapsed = (now % window_seconds) / window_seconds
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                entry = [window_index, 0, 0, 0.0]
+                shard.entries[key] = entry
+            else:
+                shard.entries.move_to_end(key)
+                if entry[0] != window_index:
+                    entry[2] = entry[1] if entry[0] == window_index - 1 else 0
+                    entry[0], entry[1] = window_index, 0
+            estimate = entry[2] * (1 - elapsed) + entry[1]
+            reset_after = (window_index + 1) * window_seconds - now
+            if estimate >= max_requests:
+                retry_after = reset_after
+                if entry[2]:
+                    # Time until the previous window's weight lets one more in.
+                    needed = (estimate - max_requests + 1) / entry[2] * window_seconds
+                    retry_after = min(reset_after, max(needed, 0.0))
+                result = RateLimitResult(True, 0, retry_after, reset_after)
+            else:
+                entry[1] += 1
+                result = RateLimitResult(False, max(0, math.floor(max_requests - estimate - 1)), 0.0, reset_after)
+            # Idle for two full windows means both counters are worthless.
+            entry[3] = (window_index + 2) * window_seconds
+            self._evict(shard, now)
+        return result
+
+    @property
+    def size(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def reset(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+
+
+class RateLimiter:
+    """Redis GCRA when configured, the local limiter otherwise or while Redis is down."""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis = RedisRateLimiter(redis_url) if redis_url else None
+        self.local = LocalRateLimiter()
+        self._redis_down_until = 0.0
+
+    async def check(self, key: str, max_requests: int, window_seconds: int) -> RateLimitResult:
+        if self.redis is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                return await self.redis.check(key, max_requests, window_seconds)
+            except Exception as exc:
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER_SECONDS
+                logger.warning("rate_limit_redis_unavailable", error=str(exc))
+        return self.local.check(key, max_requests, window_seconds)
+
     async def is_rate_limited(
-        self, 
-        key: str, 
-        max_requests: int, 
+        self,
+        key: str,
+        max_requests: int,
         window_seconds: int
     ) -> Tuple[bool, int]:
         """
         Check if the key has exceeded the rate limit.
         Returns (is_limited, remaining_requests).
         """
-        async with self._lock:
-            now = datetime.utcnow()
-            window_start = now - timedelta(seconds=window_seconds)
-            
-            # Clean old entries
-            self._requests[key] = [
-                ts for ts in self._requests[key] 
-                if ts > window_start
-            ]
-            
-            current_count = len(self._requests[key])
-            remaining = max(0, max_requests - current_count)
-            
-            if current_count >= max_requests:
-                return True, 0
-            
-            # Record this request
-            self._requests[key].append(now)
-            return False, remaining - 1
+        result = await self.check(key, max_requests, window_seconds)
+        return result.limited, result.remaining
 
     async def reset(self) -> None:
-        """Reset in-memory counters (primarily for tests)."""
-        async with self._lock:
-            self._requests.clear()
+        """Reset counters (primarily for tests)."""
+        self.local.reset()
+        if self.redis is not None:
+            try:
+                await self.redis.reset()
+            except Exception:
+                pass
 
 # Global rate limiter instance
-rate_limiter = RateLimiter()
+rate_limiter = RateLimiter(settings.redis_url)
 
 
 # Rate limit configurations per endpoint pattern
@@ -78,62 +232,36 @@ def get_rate_limit_config(path: str) -> dict | None:
     return None
 
 
-async def rate_limit_middleware(request: Request, call_next):
+async def check_rate_limit(path: str, identity: str) -> Tuple[Optional[dict], Optional[RateLimitResult]]:
     """
-    Rate limiting middleware.
-    Applies rate limits based on client IP and endpoint.
+    Apply the limit configured for `path` to an identity ("user:<id>" when
+    the request is authenticated, "ip:<addr>" otherwise).
+    Returns (config, result), or (None, None) for unlimited paths.
     """
-    if not settings.rate_limit_enabled or request.method == "OPTIONS":
-        return await call_next(request)
-    # Get client IP
-    client_ip = request.client.host if request.client else "unknown"
-    path = request.url.path
-    user_key = None
-
-    # Try to identify user from JWT (if present)
-    auth_header = request.headers.get("Authorization", "")
-    if auth_header.startswith("Bearer "):
-        token = auth_header.replace("Bearer ", "").strip()
-        try:
-            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm])
-            user_id = payload.get("sub")
-            if user_id:
-                user_key = f"user:{user_id}"
-        except Exception:
-            user_key = None
-    
-    # Check if this path has rate limiting
     config = get_rate_limit_config(path)
-    
-    if config:
-        # Create a unique key per user (if available) or IP
-        identity = user_key or f"ip:{client_ip}"
-        key = f"{identity}:{path}"
-        
-        is_limited, remaining = await rate_limiter.is_rate_limited(
-            key, 
-            config["max_requests"], 
-            config["window_seconds"]
-        )
-        
-        if is_limited:
-            retry_after = config["window_seconds"]
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail={
-                    "error_code": ErrorCode.RATE_LIMITED.value,
-                    "message": f"Rate limit exceeded. Try again in {retry_after} seconds.",
-                    "metadata": {"retry_after": retry_after, "limit": config["max_requests"]},
-                },
-                headers={"Retry-After": str(retry_after)},
-            )
-    
-    response = await call_next(request)
-    
-    # Add rate limit headers if applicable
-    if config:
-        response.headers["X-RateLimit-Limit"] = str(config["max_requests"])
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
-        response.headers["X-RateLimit-Reset"] = str(config["window_seconds"])
-    
-    return response
+    if not config:
+        return None, None
+    result = await rate_limiter.check(f"{identity}:{path}", config["max_requests"], config["window_seconds"])
+    return config, result
+
+
+def rate_limit_response(config: dict, result: RateLimitResult) -> JSONResponse:
+    """429 body in the shape FastAPI's HTTPException handler produces."""
+    retry_after = max(1, math.ceil(result.retry_after))
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": {
+            "error_code": ErrorCode.RATE_LIMITED.value,
+            "message": f"Rate limit exceeded. Try again in {retry_after} seconds.",
+            "metadata": {"retry_after": retry_after, "limit": config["max_requests"]},
+        }},
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def rate_limit_headers(config: dict, result: RateLimitResult) -> List[Tuple[str, str]]:
+    return [
+        ("X-RateLimit-Limit", str(config["max_requests"])),
+        ("X-RateLimit-Remaining", str(result.remaining)),
+        ("X-RateLimit-Reset", str(max(1, math.ceil(result.reset_after)))),
+    ]
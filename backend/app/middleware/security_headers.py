@@ -1,35 +1,20 @@
 """
-Security Headers Middleware for FastAPI.
-Adds standard security headers to all responses.
+Security headers added to every non-preflight response by the request pipeline.
 """
-from fastapi import Request
 
-
-async def security_headers_middleware(request: Request, call_next):
-    """
-    Add security headers to all responses.
-    """
-    if request.method == "OPTIONS":
-        return await call_next(request)
-    
-    response = await call_next(request)
-    
+SECURITY_HEADERS = (
+    # Allow cross-origin media loading (ORB prevention)
+    ("Cross-Origin-Resource-Policy", "cross-origin"),
     # Prevent MIME sniffing
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    
+    ("X-Content-Type-Options", "nosniff"),
     # Prevent clickjacking
-    response.headers["X-Frame-Options"] = "DENY"
-    
+    ("X-Frame-Options", "DENY"),
     # Enable XSS filter in older browsers
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    
+    ("X-XSS-Protection", "1; mode=block"),
     # Referrer policy
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    
+    ("Referrer-Policy", "strict-origin-when-cross-origin"),
     # Content Security Policy (relaxed for API)
-    response.headers["Content-Security-Policy"] = "default-src 'self'"
-    
+    ("Content-Security-Policy", "default-src 'self'"),
     # Permissions Policy (disable sensitive features)
-    response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-    
-    return response
+    ("Permissions-Policy", "geolocation=(), microphone=(), camera=()"),
+)
@@ -2,7 +2,7 @@ from __future__ import annotations
 import enum
 from typing import Optional, Union
 from datetime import datetime, date
-from sqlalchemy import String, DateTime, Date, Enum, ForeignKey, Text, Column, Integer, JSON, Boolean
+from sqlalchemy import String, DateTime, Date, Enum, ForeignKey, Text, Column, Integer, BigInteger, JSON, Boolean, UniqueConstraint, Index, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column
 from .db import Base
 
@@ -78,6 +78,9 @@ class Job(Base):
     # Relationships (if needed in future)
     # user: Mapped["User"] = relationship("User", back_populates="jobs")
 
+    # Keyset pagination for per-user job lists (newest first).
+    __table_args__ = (Index("ix_jobs_user_id_created_at_id", "user_id", "created_at", "id"),)
+
 
 class CreditLedger(Base):
     __tablename__ = "credit_ledger"
@@ -110,3 +113,116 @@ class AdminActionLog(Base):
     target_id: Mapped[str] = mapped_column(String(100), nullable=True)
     details: Mapped[dict] = mapped_column(JSON, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True, nullable=False)
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    content_type: Mapped[str] = mapped_column(String(100), nullable=False)
+    total_size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    chunk_size: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), default="open", nullable=False)  # open | complete | expired
+    source_path: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+
+class UploadChunk(Base):
+    __tablename__ = "upload_chunks"
+    __table_args__ = (UniqueConstraint("upload_id", "chunk_index", name="uq_upload_chunks_upload_index"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    upload_id: Mapped[str] = mapped_column(ForeignKey("upload_sessions.id", ondelete="CASCADE"), index=True, nullable=False)
+    chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class SourceAsset(Base):
+    """One stored source per content hash; caches its media analysis across jobs."""
+    __tablename__ = "source_assets"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    path: Mapped[str] = mapped_column(Text, nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_type: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    media_intelligence: Mapped[dict] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_used_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class StorageObject(Base):
+    """Ledger row per R2 object; kept in step with uploads/deletes and reconciled in the background."""
+    __tablename__ = "storage_objects"
+
+    bucket: Mapped[str] = mapped_column(String(255), primary_key=True)
+    key: Mapped[str] = mapped_column(String(1024), primary_key=True)
+    folder: Mapped[str] = mapped_column(String(255), default="", nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_type: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    last_seen_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index("ix_storage_objects_bucket_created_at", "bucket", "created_at"),)
+
+
+class StoredFile(Base):
+    """Registry row per local artifact; GC walks the expiry index instead of the filesystem."""
+    __tablename__ = "file_registry"
+
+    path: Mapped[str] = mapped_column(String(1024), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)  # upload, part, srt, take, thumbnail, output, artifact
+    job_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
+    size: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    is_dir: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # NULL = pinned
+
+    __table_args__ = (Index("ix_file_registry_expires_at", "expires_at"),)
+
+
+class StorageUsageTotal(Base):
+    """Running per-bucket totals so usage checks are a single row read."""
+    __tablename__ = "storage_usage_totals"
+
+    bucket: Mapped[str] = mapped_column(String(255), primary_key=True)
+    bytes: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    files: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    reconciled_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class GraphCheckpoint(Base):
+    """Latest LangGraph checkpoints per job thread (zlib-compressed serde payloads)."""
+    __tablename__ = "graph_checkpoints"
+
+    thread_id: Mapped[str] = mapped_column(String(64), primary_key=True)  # job id
+    checkpoint_ns: Mapped[str] = mapped_column(String(255), primary_key=True, default="")
+    checkpoint_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    parent_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    step: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    payload_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    metadata_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    metadata_payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class GraphCheckpointWrite(Base):
+    """Pending node writes against a checkpoint (finished tasks of an unfinished step)."""
+    __tablename__ = "graph_checkpoint_writes"
+
+    thread_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    checkpoint_ns: Mapped[str] = mapped_column(String(255), primary_key=True, default="")
+    checkpoint_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    task_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    idx: Mapped[int] = mapped_column(Integer, primary_key=True)
+    channel: Mapped[str] = mapped_column(String(255), nullable=False)
+    task_path: Mapped[str] = mapped_column(String(255), default="", nullable=False)
+    value_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    value: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 import asyncio
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,11 +7,13 @@ from pathlib import Path
 from ..db import get_session
 from ..deps import get_current_user
 from ..models import User, Job, CreditLedger, AdminActionLog
-from ..schemas import AdminUserResponse, CreditLedgerResponse, AdminActionLogResponse
+from ..schemas import AdminJobSummary, AdminUserResponse, CreditLedgerResponse, AdminActionLogResponse
 from ..services.integration_health import get_integration_health
 from ..config import settings
 from .jobs import _dispatch_job_background
 from ..services.cleanup_service import cleanup_service
+from ..services.file_registry import file_registry
+from ..services.job_listing import list_job_summaries
 from ..services.worker_heartbeat import get_worker_status
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -159,42 +161,43 @@ async def list_credit_ledger(
         for entry, user_email, created_by_email in rows
     ]
 
-@router.get("/jobs")
+@router.get("/jobs", response_model=list[AdminJobSummary])
 async def list_all_jobs(
+    response: Response,
     skip: int = 0,
     limit: int = 50,
     user_id: int | None = None,
+    cursor: str | None = None,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     if not current_user.is_admin:
         from fastapi import HTTPException
         raise HTTPException(status_code=403, detail="Admin permissions required")
-        
-    stmt = select(Job).order_by(Job.created_at.desc()).offset(skip).limit(limit)
-    if user_id is not None:
-        stmt = stmt.where(Job.user_id == user_id)
-    result = await session.execute(stmt)
-    jobs = result.scalars().all()
-    return jobs
+
+    items, next_cursor = await list_job_summaries(
+        session, user_id=user_id, limit=limit, cursor=cursor, skip=skip
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 
-@router.get("/users/{user_id}/jobs")
+@router.get("/users/{user_id}/jobs", response_model=list[AdminJobSummary])
 async def list_user_jobs(
     user_id: int,
+    response: Response,
     limit: int = 20,
+    cursor: str | None = None,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin permissions required")
-    result = await session.execute(
-        select(Job)
-        .where(Job.user_id == user_id)
-        .order_by(Job.created_at.desc())
-        .limit(limit)
-    )
-    return result.scalars().all()
+    items, next_cursor = await list_job_summaries(session, user_id=user_id, limit=limit, cursor=cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 
 @router.post("/jobs/{job_id}/cancel")
@@ -259,6 +262,7 @@ async def admin_retry_job(
     job.progress_message = "Retrying pipeline..."
     job.output_path = None
     job.thumbnail_path = None
+    await file_registry.release_job(session, job.id)
     session.add(job)
     await session.commit()
     # Avoid hanging admin endpoints on broker latency; detached dispatch handles persistence.
@@ -298,6 +302,7 @@ async def admin_force_retry_job(
     job.progress_message = "Force retry by admin."
     job.output_path = None
     job.thumbnail_path = None
+    await file_registry.release_job(session, job.id)
     session.add(job)
     await session.commit()
     # Avoid hanging admin endpoints on broker latency; detached dispatch handles persistence.
@@ -353,6 +358,31 @@ async def get_admin_worker_status(
     return get_worker_status()
 
 
+@router.get("/queue-metrics")
+async def get_queue_metrics(
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin permissions required")
+
+    from ..services.job_scheduler import job_scheduler
+    return {
+        **job_scheduler.metrics(),
+        "broker_depth": await asyncio.to_thread(job_scheduler.broker_depth),
+    }
+
+
+@router.get("/autoscaler")
+async def get_autoscaler_status(
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin permissions required")
+
+    from ..services.autoscaler import autoscaler
+    return {"enabled": settings.autoscaler_enabled, **autoscaler.status()}
+
+
 @router.get("/performance")
 async def get_performance_analytics(
     session: AsyncSession = Depends(get_session),
@@ -4,10 +4,9 @@ import time
 from pathlib import Path
 from urllib.parse import urlparse
 from typing import Any
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Form, Request
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Form, Request, Response
 import asyncio
 import structlog
-from fastapi.responses import FileResponse
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -15,10 +14,31 @@ from ..db import SessionLocal, get_session
 from ..errors import CreditError, NotFoundError
 from ..config import settings
 from ..deps import get_current_user
-from ..models import Job, User, CreditLedger
-from ..schemas import JobResponse, EditJobRequest
+from ..models import Job, JobStatus, User, CreditLedger, UploadSession
+from ..schemas import (
+    DeliverablesRequest,
+    EditJobRequest,
+    JobResponse,
+    JobSummary,
+    UploadSessionCreate,
+    UploadSessionResponse,
+)
 from ..services.storage import storage_service
+from ..services.file_registry import file_registry
+from ..services.job_listing import list_job_summaries, load_job_payloads
+from ..services.job_scheduler import WAITING_MESSAGE, QueuedJob, job_scheduler
+from ..services.workflow_engine import job_progress
+from ..services.upload_sessions import (
+    ALLOWED_UPLOAD_MIME_TYPES,
+    UploadSessionError,
+    total_chunks,
+    upload_session_service,
+)
 from ..services.storage_service import storage_service as r2_storage
+from ..services.thumbnail_engine import thumbnail_engine
+from ..services.media_delivery import file_response, is_faststart, media_delivery
+from ..services.color_compiler import color_compiler
+from ..services.deliverables import PLATFORM_SPECS, deliverable_renderer, plan_bundle
 
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
@@ -243,16 +263,16 @@ async def upload_video(
     session: AsyncSession = Depends(get_session),
 ):
     """Upload video and enqueue for processing."""
-    # Check file size (100MB limit)
+    # Check file size
     file.file.seek(0, 2)
     file_size = file.file.tell()
     file.file.seek(0)
     
-    if file_size > 100 * 1024 * 1024:
-        raise HTTPException(status_code=413, detail="File too large. Maximum size is 100MB.")
+    if file_size > settings.upload_max_bytes:
+        limit_mb = settings.upload_max_bytes // (1024 * 1024)
+        raise HTTPException(status_code=413, detail=f"File too large. Maximum size is {limit_mb}MB.")
 
-    ALLOWED_MIME_TYPES = {"video/mp4", "video/quicktime", "video/x-msvideo", "video/webm"}
-    if file.content_type not in ALLOWED_MIME_TYPES:
+    if file.content_type not in ALLOWED_UPLOAD_MIME_TYPES:
         raise HTTPException(status_code=400, detail="Invalid file type. Only video files are allowed.")
 
     idempotency_key = request.headers.get("Idempotency-Key")
@@ -267,7 +287,49 @@ async def upload_video(
             return JobResponse.model_validate(existing, from_attributes=True)
 
     source_path = await storage_service.save_upload(file)
+    await upload_session_service.register_source(session, source_path, file.content_type)
 
+    job = await _create_and_dispatch_upload_job(
+        session=session,
+        current_user=current_user,
+        source_path=source_path,
+        theme=theme,
+        tier=tier,
+        pacing=pacing,
+        mood=mood,
+        ratio=ratio,
+        platform=platform,
+        brand_safety=brand_safety,
+        post_settings=_normalize_post_settings(
+            transition_style=transition_style,
+            transition_duration=transition_duration,
+            speed_profile=speed_profile,
+            subtitle_preset=subtitle_preset,
+            color_profile=color_profile,
+            skin_protect_strength=skin_protect_strength,
+        ),
+        idempotency_key=idempotency_key,
+        media_intelligence=media_intelligence,
+    )
+    return JobResponse.model_validate(job, from_attributes=True)
+
+
+async def _create_and_dispatch_upload_job(
+    session: AsyncSession,
+    current_user: User,
+    source_path: str,
+    theme: str,
+    tier: str,
+    pacing: str,
+    mood: str,
+    ratio: str,
+    platform: str,
+    brand_safety: str,
+    post_settings: dict,
+    idempotency_key: str | None,
+    media_intelligence: str | None,
+) -> Job:
+    """Create the job for a stored upload and dispatch it (shared by both upload paths)."""
     # Parse media intelligence if provided
     parsed_intel = None
     if media_intelligence:
@@ -276,6 +338,9 @@ async def upload_video(
             parsed_intel = json.loads(media_intelligence)
         except:
             pass
+    if not parsed_intel:
+        # Same content analysed before: skip re-analysis in the pipeline.
+        parsed_intel = await upload_session_service.cached_analysis(session, source_path)
 
     job = await create_job(
         session=session,
@@ -288,6 +353,177 @@ async def upload_video(
         ratio=ratio,
         platform=platform,
         brand_safety=brand_safety,
+        post_settings=post_settings,
+        idempotency_key=idempotency_key,
+        media_intelligence=parsed_intel,
+    )
+    await session.refresh(job)
+    await file_registry.track(source_path, "upload", job_id=job.id, session=session)
+    await session.commit()
+
+    # Always start: uploads are created with start_immediately=True.
+    pacing = job.pacing or "medium"
+    mood = job.mood or "professional"
+    ratio = job.ratio or "16:9"
+    tier = job.tier or "standard"
+    platform = job.platform or "youtube"
+    brand_safety = job.brand_safety or "standard"
+
+    try:
+        await asyncio.wait_for(
+            enqueue_job(job, pacing, mood, ratio, tier, platform, brand_safety),
+            timeout=2.5,
+        )
+        # A job held by the fair-share queue must stay queued/waiting so it can be claimed.
+        if job.progress_message != WAITING_MESSAGE:
+            job.status = "processing"
+            job.progress_message = "Dispatching job to pipeline..."
+        session.add(job)
+        await session.commit()
+    except asyncio.TimeoutError:
+        logger.warning("job_dispatch_timeout_upload", job_id=job.id)
+        asyncio.create_task(_dispatch_job_background(job.id, pacing, mood, ratio, tier, platform, brand_safety))
+        # Optimistically update status to avoid UI lag
+        job.status = "processing"
+        job.progress_message = "Dispatching job to pipeline (background)..."
+        session.add(job)
+        await session.commit()
+    except HTTPException as exc:
+        logger.error("upload_video_dispatch_http_error", job_id=job.id, error=exc.detail)
+        job.status = "failed"
+        job.progress_message = f"Dispatch failed: {exc.detail}"
+        session.add(job)
+        await session.commit()
+    except Exception as e:
+        logger.error("upload_video_dispatch_unexpected_error", job_id=job.id, error=str(e))
+        # Don't fail the request, just log. The job stays queued.
+    return job
+
+
+def _upload_http_error(exc: UploadSessionError) -> HTTPException:
+    return HTTPException(status_code=exc.status_code, detail=exc.detail)
+
+
+async def _upload_session_response(session: AsyncSession, upload: UploadSession) -> UploadSessionResponse:
+    progress = await upload_session_service.progress(session, upload)
+    return UploadSessionResponse(
+        upload_id=upload.id,
+        status=upload.status,
+        filename=upload.filename,
+        total_size=upload.total_size,
+        chunk_size=upload.chunk_size,
+        total_chunks=total_chunks(upload.total_size, upload.chunk_size),
+        received_chunks=progress.received,
+        missing_chunks=progress.missing,
+        next_offset=progress.next_offset,
+        expires_at=upload.expires_at,
+        content_hash=upload.content_hash,
+    )
+
+
+@router.post("/uploads", response_model=UploadSessionResponse)
+async def create_upload_session(
+    payload: UploadSessionCreate,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Open a resumable upload. Chunks are `chunk_size` bytes except the last."""
+    try:
+        upload = await upload_session_service.create(
+            session,
+            user_id=current_user.id,
+            filename=payload.filename,
+            content_type=payload.content_type,
+            total_size=payload.total_size,
+        )
+    except UploadSessionError as exc:
+        raise _upload_http_error(exc) from exc
+    return await _upload_session_response(session, upload)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Offset query: which chunks arrived and where to resume."""
+    try:
+        upload = await upload_session_service.get(session, upload_id, current_user.id)
+    except UploadSessionError as exc:
+        raise _upload_http_error(exc) from exc
+    return await _upload_session_response(session, upload)
+
+
+@router.put("/uploads/{upload_id}/chunks/{index}")
+async def put_upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Raw chunk body; optional `X-Chunk-SHA256` is verified. Chunks may be sent in parallel."""
+    try:
+        upload = await upload_session_service.get(session, upload_id, current_user.id)
+        chunk = await upload_session_service.write_chunk(
+            session,
+            upload,
+            index,
+            request.stream(),
+            expected_sha256=request.headers.get("X-Chunk-SHA256"),
+        )
+    except UploadSessionError as exc:
+        raise _upload_http_error(exc) from exc
+    return {"upload_id": upload_id, "index": chunk.chunk_index, "size": chunk.size, "sha256": chunk.sha256}
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=JobResponse)
+async def complete_upload_session(
+    upload_id: str,
+    request: Request,
+    theme: str = Form("professional"),
+    pacing: str = Form("medium"),
+    mood: str = Form("professional"),
+    ratio: str = Form("16:9"),
+    platform: str = Form("youtube"),
+    tier: str = Form("pro"),
+    brand_safety: str = Form("standard"),
+    transition_style: str = Form("dissolve"),
+    transition_duration: float = Form(0.25),
+    speed_profile: str = Form("balanced"),
+    subtitle_preset: str = Form("platform_default"),
+    color_profile: str = Form("natural"),
+    skin_protect_strength: float = Form(0.5),
+    media_intelligence: str = Form(None),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Assemble a fully received upload into storage and enqueue it like /upload."""
+    idempotency_key = request.headers.get("Idempotency-Key") or f"upload:{upload_id}"
+    existing = await session.scalar(
+        select(Job).where(Job.user_id == current_user.id, Job.idempotency_key == idempotency_key)
+    )
+    if existing:
+        return JobResponse.model_validate(existing, from_attributes=True)
+
+    try:
+        upload = await upload_session_service.get(session, upload_id, current_user.id)
+        asset, _ = await upload_session_service.complete(session, upload)
+    except UploadSessionError as exc:
+        raise _upload_http_error(exc) from exc
+
+    job = await _create_and_dispatch_upload_job(
+        session=session,
+        current_user=current_user,
+        source_path=asset.path,
+        theme=theme,
+        tier=tier,
+        pacing=pacing,
+        mood=mood,
+        ratio=ratio,
+        platform=platform,
+        brand_safety=brand_safety,
         post_settings=_normalize_post_settings(
             transition_style=transition_style,
             transition_duration=transition_duration,
@@ -295,72 +531,39 @@ async def upload_video(
             subtitle_preset=subtitle_preset,
             color_profile=color_profile,
             skin_protect_strength=skin_protect_strength,
-
         ),
         idempotency_key=idempotency_key,
-        media_intelligence=parsed_intel,
+        media_intelligence=media_intelligence,
     )
-    await session.refresh(job)
-    
-    # Actually dispatch if requested
-    if media_intelligence or True:  # Simplify logic: always start if create_job was called with default start_immediately=True
-        # Re-use the start_job dispatch logic pattern
-        pacing = job.pacing or "medium"
-        mood = job.mood or "professional"
-        ratio = job.ratio or "16:9"
-        tier = job.tier or "standard"
-        platform = job.platform or "youtube"
-        brand_safety = job.brand_safety or "standard"
-
-        try:
-            await asyncio.wait_for(
-                enqueue_job(job, pacing, mood, ratio, tier, platform, brand_safety),
-                timeout=2.5,
-            )
-            job.status = "processing"
-            job.progress_message = "Dispatching job to pipeline..."
-            session.add(job)
-            await session.commit()
-        except asyncio.TimeoutError:
-            logger.warning("job_dispatch_timeout_upload", job_id=job.id)
-            asyncio.create_task(_dispatch_job_background(job.id, pacing, mood, ratio, tier, platform, brand_safety))
-            # Optimistically update status to avoid UI lag
-            job.status = "processing"
-            job.progress_message = "Dispatching job to pipeline (background)..."
-            session.add(job)
-            await session.commit()
-        except HTTPException as exc:
-            logger.error("upload_video_dispatch_http_error", job_id=job.id, error=exc.detail)
-            job.status = "failed"
-            job.progress_message = f"Dispatch failed: {exc.detail}"
-            session.add(job)
-            await session.commit()
-        except Exception as e:
-            logger.error("upload_video_dispatch_unexpected_error", job_id=job.id, error=str(e))
-            # Don't fail the request, just log. The job stays queued.
-            
     return JobResponse.model_validate(job, from_attributes=True)
 
 
-@router.get("", response_model=list[JobResponse])
+@router.get("", response_model=list[JobSummary])
 async def list_jobs(
+    response: Response,
     skip: int = 0,
     limit: int = 20,
+    cursor: str | None = None,
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
-    """List all jobs for current user."""
-    result = await session.execute(
-        select(Job).where(Job.user_id == current_user.id).order_by(Job.created_at.desc()).offset(skip).limit(limit)
+    """
+    List the current user's jobs, newest first, without JSON payloads.
+    Pass the `X-Next-Cursor` response header back as `cursor` for the next page.
+    """
+    items, next_cursor = await list_job_summaries(
+        session, user_id=current_user.id, limit=limit, cursor=cursor, skip=skip
     )
-    jobs = result.scalars().all()
-    return [JobResponse.model_validate(job, from_attributes=True) for job in jobs]
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [JobSummary.model_validate(item) for item in items]
 
 
 @router.get("/storage/usage")
 async def get_storage_usage(current_user: User = Depends(get_current_user)):
-    """Get current R2 storage usage."""
-    return r2_storage.get_storage_usage()
+    """Get current R2 storage usage and transfer throughput."""
+    usage = await r2_storage.get_storage_usage()
+    return {**usage, "transfers": r2_storage.get_transfer_metrics()}
 
 
 @router.get("/{job_id}", response_model=JobResponse)
@@ -368,7 +571,33 @@ async def get_job(job_id: int, current_user: User = Depends(get_current_user), s
     job = await session.scalar(select(Job).where(Job.id == job_id, Job.user_id == current_user.id))
     if not job:
         raise NotFoundError("Job not found")
-    return JobResponse.model_validate(job, from_attributes=True)
+    response = JobResponse.model_validate(job, from_attributes=True)
+    if job.status == JobStatus.processing:
+        # Progress chatter is coalesced before it reaches the DB; the live
+        # store has the latest message for the (already persisted) status.
+        live = await job_progress.latest(job.id)
+        if live and live.get("status") == job.status.value:
+            response.progress_message = live.get("message") or response.progress_message
+    return response
+
+
+@router.get("/{job_id}/details")
+async def get_job_details(
+    job_id: int,
+    fields: str | None = None,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """JSON payloads for one job; `fields` is a comma-separated subset (default: all)."""
+    payloads = await load_job_payloads(
+        session,
+        job_id,
+        user_id=current_user.id,
+        fields=[f.strip() for f in fields.split(",")] if fields else None,
+    )
+    if payloads is None:
+        raise NotFoundError("Job not found")
+    return payloads
 
 
 @router.post("/{job_id}/cancel")
@@ -421,6 +650,7 @@ async def retry_job(job_id: int, current_user: User = Depends(get_current_user),
     job.progress_message = "Retrying pipeline..."
     job.output_path = None
     job.thumbnail_path = None
+    await file_registry.release_job(session, job.id)
     session.add(job)
     await session.commit()
     pacing = job.pacing or "medium"
@@ -573,7 +803,13 @@ async def edit_job(
 
 
 @router.get("/{job_id}/download")
-async def download_output(job_id: int, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+async def download_output(
+    job_id: int,
+    request: Request,
+    inline: bool = False,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
     job = await session.scalar(select(Job).where(Job.id == job_id, Job.user_id == current_user.id))
     if not job or not job.output_path:
         raise NotFoundError("Rendered file unavailable")
@@ -583,11 +819,121 @@ async def download_output(job_id: int, current_user: User = Depends(get_current_
         from fastapi.responses import RedirectResponse
         return RedirectResponse(url=job.output_path)
     
-    # Local file
+    # Local file (byte ranges supported for seeking)
+    file_path = Path(job.output_path)
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="Rendered file missing")
+    return file_response(file_path, request, filename=file_path.name, inline=inline)
+
+
+@router.get("/{job_id}/playback")
+async def get_playback(job_id: int, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    """Preview sources: faststart MP4 plus the cached HLS ladder (packaged on first request when enabled)."""
+    job = await session.scalar(select(Job).where(Job.id == job_id, Job.user_id == current_user.id))
+    if not job or not job.output_path:
+        raise NotFoundError("Rendered file unavailable")
+
+    if job.output_path.startswith("http"):
+        return {"job_id": job_id, "mp4_url": job.output_path, "hls": {"status": "unavailable", "master_url": None}}
+
     file_path = Path(job.output_path)
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="Rendered file missing")
-    return FileResponse(path=file_path, filename=file_path.name, media_type="video/mp4")
+
+    hls: dict[str, Any] = {"status": "disabled", "master_url": None, "variants": []}
+    if settings.hls_packaging_enabled:
+        manifest = media_delivery.cached_hls(file_path)
+        if manifest:
+            master = media_delivery.hls_dir(file_path) / manifest["master"]
+            hls = {"status": "ready", "master_url": master.as_posix(), "variants": manifest.get("variants", [])}
+        else:
+            if not media_delivery.is_packaging(file_path):
+                asyncio.create_task(media_delivery.package_hls(file_path))
+            hls = {"status": "packaging", "master_url": None, "variants": []}
+
+    return {
+        "job_id": job_id,
+        "mp4_url": file_path.as_posix(),
+        "faststart": is_faststart(file_path),
+        "hls": hls,
+    }
+
+
+@router.get("/{job_id}/thumbnails")
+async def get_thumbnails(job_id: int, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    """Scored thumbnail candidates plus sprite sheets and WebVTT index for hover scrubbing."""
+    job = await session.scalar(select(Job).where(Job.id == job_id, Job.user_id == current_user.id))
+    if not job:
+        raise NotFoundError("Job not found")
+
+    manifest = thumbnail_engine.load_manifest(Path(settings.storage_root) / "outputs" / f"job-{job_id}-thumbs")
+    if not manifest:
+        raise NotFoundError("Thumbnails not generated yet")
+
+    def _public(path: str | None) -> str | None:
+        return Path(path).as_posix() if path else None
+
+    return {
+        "job_id": job_id,
+        "thumbnail_path": job.thumbnail_path,
+        "duration": manifest.get("duration"),
+        "candidates": [
+            {**c, "path": _public(c.get("path"))}
+            for c in sorted(manifest.get("candidates", []), key=lambda c: c.get("timestamp", 0))
+        ],
+        "sprites": [_public(p) for p in manifest.get("sprite_paths", [])],
+        "scrub_vtt_path": _public(manifest.get("vtt_path")),
+        "tile": manifest.get("tile", {}),
+    }
+
+
+@router.post("/{job_id}/deliverables", status_code=202)
+async def request_deliverables(
+    job_id: int,
+    payload: DeliverablesRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Render platform formats, the preview and hook variants from one decode of the output."""
+    job = await session.scalar(select(Job).where(Job.id == job_id, Job.user_id == current_user.id))
+    if not job or not job.output_path:
+        raise NotFoundError("Rendered file unavailable")
+    if job.output_path.startswith("http") or not Path(job.output_path).exists():
+        raise HTTPException(status_code=409, detail="Deliverables need the render on local storage.")
+
+    platforms = [p.strip().lower() for p in payload.platforms if p.strip()] or [job.platform]
+    unknown = sorted(set(platforms) - set(PLATFORM_SPECS))
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unsupported platforms: {', '.join(unknown)}")
+
+    deliverables = plan_bundle(
+        platforms,
+        job.source_path,
+        ab_test_result=job.ab_test_result,
+        preview=payload.preview,
+        hook_variants=payload.hook_variants,
+        aspect_ratios={job.platform: job.ratio},
+    )
+    if not deliverables:
+        raise HTTPException(status_code=422, detail="Nothing to render.")
+    # Hook openings come straight from the source: grade them like the master.
+    grade_filters = (job.color_qa or {}).get("grade_filters") or []
+    hook_vf = ",".join(color_compiler.compile_filters(grade_filters)) or None
+    deliverable_renderer.start(job_id, job.output_path, deliverables, hook_vf=hook_vf)
+    return {"job_id": job_id, "status": "rendering", "deliverables": [d.name for d in deliverables]}
+
+
+@router.get("/{job_id}/deliverables")
+async def get_deliverables(job_id: int, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    job = await session.scalar(select(Job).where(Job.id == job_id, Job.user_id == current_user.id))
+    if not job:
+        raise NotFoundError("Job not found")
+    if deliverable_renderer.is_rendering(job_id):
+        return {"job_id": job_id, "status": "rendering", "deliverables": []}
+    manifest = deliverable_renderer.load_manifest(job_id)
+    if not manifest:
+        raise NotFoundError("Deliverables not rendered yet")
+    return {"job_id": job_id, "status": "ready", "deliverables": manifest.get("deliverables", [])}
 
 
 async def enqueue_job(
@@ -624,18 +970,16 @@ async def enqueue_job(
 
     if USE_CELERY:
         try:
-            from ..tasks.video_tasks import process_video_task
-            
-            # Using asyncio.to_thread to prevent blocking the event loop
+            queued = QueuedJob(
+                job_id=job.id,
+                user_id=getattr(job, "user_id", None),
+                tier=tier,
+                args=[job.id, job.source_path, pacing, mood, ratio, tier, platform, brand_safety],
+            )
+            # Fair-share admission: dispatched now if a slot is free, otherwise held
+            # in the API's queue and admitted by the periodic pump.
             try:
-                task = await asyncio.wait_for(
-                    asyncio.to_thread(
-                        process_video_task.apply_async,
-                        args=[job.id, job.source_path, pacing, mood, ratio, tier, platform, brand_safety],
-                        queue=queue_name,
-                    ),
-                    timeout=5.0,
-                )
+                task_id = await job_scheduler.submit(queued)
             except asyncio.TimeoutError as e:
                 # In local/dev, fall back to in-process workflow rather than hanging the job forever.
                 logger.warning(
@@ -650,12 +994,13 @@ async def enqueue_job(
                         detail="Queue dispatch timed out. Check broker connectivity/latency.",
                     ) from e
                 # Fall through to workflow_engine fallback below.
-                task = None
-            
-            short_id = task.id[:8] if task and task.id else "unknown"
-            if task is not None:
-                job.progress_message = f"Queued for worker pickup (task {short_id})."
-                logger.info("job_enqueued", job_id=job.id, task_id=task.id, queue=queue_name)
+            else:
+                if task_id:
+                    job.progress_message = f"Queued for worker pickup (task {task_id[:8]})."
+                    logger.info("job_enqueued", job_id=job.id, task_id=task_id, queue=queue_name)
+                else:
+                    job.progress_message = WAITING_MESSAGE
+                    logger.info("job_waiting_for_slot", job_id=job.id, user_id=queued.user_id, tier=tier)
                 return
         except Exception as e:
             if settings.environment == "production":
@@ -1,16 +1,18 @@
 """
 WebSocket endpoint for real-time job progress streaming
 """
-import os
-import json
-import asyncio
-import time
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-import redis.asyncio as redis
+from fastapi import APIRouter, WebSocket
+
+from ..services.progress_hub import progress_hub
 
 router = APIRouter()
 
-REDIS_URL = os.getenv("REDIS_URL")
+
+async def _close(websocket: WebSocket) -> None:
+    try:
+        await websocket.close(code=1000)
+    except Exception:
+        pass
 
 
 @router.websocket("/ws/jobs/{job_id}")
@@ -20,106 +22,31 @@ async def job_progress_websocket(websocket: WebSocket, job_id: int):
     Clients connect and receive progress updates as they happen.
     """
     await websocket.accept()
-    
-    if not REDIS_URL:
+
+    if not progress_hub.enabled:
         await websocket.close(code=1000, reason="Redis not configured")
         return
 
-    r = None
-    pubsub = None
-    try:
-        # Connect to Redis
-        r = redis.from_url(REDIS_URL, decode_responses=True)
-        pubsub = r.pubsub()
-        await pubsub.subscribe(f"job:{job_id}:progress")
-        
-        # Send latest state if available
-        latest = await r.get(f"job:{job_id}:latest")
-        if latest:
-            await websocket.send_text(latest.decode() if isinstance(latest, bytes) else latest)
-        
-        # Listen for updates
-        last_ping = time.monotonic()
-        while True:
-            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-            if message and message.get("data"):
-                data = message["data"]
-                if isinstance(data, bytes):
-                    data = data.decode()
-                await websocket.send_text(data)
-                
-                # Check if job is complete/failed
-                try:
-                    parsed = json.loads(data)
-                    if parsed.get("status") in ["complete", "failed"]:
-                        break
-                except:
-                    pass
-            else:
-                # Send ping to keep connection alive every ~25s
-                if time.monotonic() - last_ping > 25:
-                    try:
-                        await websocket.send_json({"type": "ping"})
-                        last_ping = time.monotonic()
-                    except:
-                        break
-    except WebSocketDisconnect:
-        pass
-    except Exception as e:
-        print(f"[WebSocket] Error: {e}")
-    finally:
-        try:
-            if pubsub:
-                await pubsub.unsubscribe(f"job:{job_id}:progress")
-            if r:
-                await r.close()
-        except:
-            pass
+    # Subscribe before reading the snapshot so nothing published in between is missed.
+    sub = progress_hub.subscribe(f"job:{job_id}:progress", websocket.send_text, close_on_terminal=True)
+    latest = await progress_hub.latest(job_id)
+    if latest:
+        sub.push(latest)
+    await progress_hub.serve(websocket, sub)
+    await _close(websocket)
+
+
 @router.websocket("/ws/user/{user_id}")
 async def user_progress_websocket(websocket: WebSocket, user_id: int):
     """
     WebSocket endpoint for user-wide job updates.
     """
     await websocket.accept()
-    
-    if not REDIS_URL:
+
+    if not progress_hub.enabled:
         await websocket.close(code=1000, reason="Redis not configured")
         return
 
-    r = None
-    pubsub = None
-    try:
-        # Connect to Redis
-        r = redis.from_url(REDIS_URL, decode_responses=True)
-        pubsub = r.pubsub()
-        await pubsub.subscribe(f"user:{user_id}:jobs")
-        
-        # Listen for updates
-        last_ping = time.monotonic()
-        while True:
-            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-            if message and message.get("data"):
-                data = message["data"]
-                if isinstance(data, bytes):
-                    data = data.decode()
-                await websocket.send_text(data)
-            else:
-                # Send ping to keep connection alive every ~25s
-                if time.monotonic() - last_ping > 25:
-                    try:
-                        await websocket.send_json({"type": "ping"})
-                        last_ping = time.monotonic()
-                    except:
-                        break
-    except WebSocketDisconnect:
-        pass
-    except Exception as e:
-        print(f"[WebSocket] Error: {e}")
-    finally:
-        try:
-            if pubsub:
-                await pubsub.unsubscribe(f"user:{user_id}:jobs")
-            if r:
-                await r.close()
-        except:
-            pass
+    sub = progress_hub.subscribe(f"user:{user_id}:jobs", websocket.send_text)
+    await progress_hub.serve(websocket, sub)
+    await _close(websocket)
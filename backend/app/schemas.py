@@ -59,6 +59,12 @@ class EditJobRequest(BaseModel):
     skin_protect_strength: float = Field(default=0.5, ge=0.0, le=1.0)
 
 
+class DeliverablesRequest(BaseModel):
+    platforms: list[str] = Field(default_factory=list, description="Defaults to the job's platform")
+    preview: bool = True
+    hook_variants: bool = True
+
+
 class UserResponse(BaseModel):
     id: int
     email: EmailStr
@@ -81,7 +87,8 @@ class AdminUserResponse(BaseModel):
     created_at: datetime
 
 
-class JobResponse(BaseModel):
+class JobSummary(BaseModel):
+    """List-view projection: scalar columns only, no JSON payloads."""
     id: int
     status: JobStatus
     theme: str
@@ -98,7 +105,13 @@ class JobResponse(BaseModel):
     thumbnail_path: str | None
     created_at: datetime
     updated_at: datetime | None = None
-    
+
+
+class AdminJobSummary(JobSummary):
+    user_id: int
+
+
+class JobResponse(JobSummary):
     # Phase 5 Fields
     media_intelligence: dict | None = None
     qc_result: dict | None = None
@@ -112,6 +125,26 @@ class JobResponse(BaseModel):
     subtitle_qa: dict | None = None
 
 
+class UploadSessionCreate(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    content_type: str
+    total_size: int = Field(gt=0)
+
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    status: str
+    filename: str
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: list[int]
+    missing_chunks: list[int]
+    next_offset: int
+    expires_at: datetime
+    content_hash: str | None = None
+
+
 class N8NCallbackRequest(BaseModel):
     status: JobStatus
     progress_message: str
@@ -67,7 +67,7 @@ async def refresh_admin_data():
 
                 try:
                     usage = await asyncio.wait_for(
-                        asyncio.to_thread(storage_service.get_storage_usage),
+                        storage_service.get_storage_usage(),
                         timeout=15.0 # Give it more time since it's parallel
                     )
                     usage["_updated"] = time.time()
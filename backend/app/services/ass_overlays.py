@@ -0,0 +1,333 @@
+"""
+ASS Overlays - Renders kinetic word highlights, lower thirds and subtitles
+as one styled ASS track drawn by a single libass `subtitles` filter.
+
+Replaces the per-word `drawtext` chain, which FFmpeg evaluates on every frame
+of every scene. The track is clipped per scene so each part only carries the
+events that overlap it.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Literal
+
+from .post_production_depth import build_subtitle_style
+
+# libass resolves font sizes against PlayResY; SRT tracks default to 288.
+SRT_DEFAULT_PLAY_RES_Y = 288
+
+Timebase = Literal["source", "output"]
+
+STYLE_FORMAT = (
+    "Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+    "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, "
+    "Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding"
+)
+EVENT_FORMAT = "Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text"
+
+_SRT_TS = re.compile(
+    r"(\d+):(\d\d):(\d\d)[,.](\d{1,3})\s+-->\s+(\d+):(\d\d):(\d\d)[,.](\d{1,3})"
+)
+
+
+def ass_color(hex_color: str, alpha: float = 1.0) -> str:
+    """Convert #RRGGBB (or 0xRRGGBB) plus opacity to ASS &HAABBGGRR."""
+    raw = (hex_color or "#FFFFFF").strip().lstrip("#")
+    if raw.lower().startswith("0x"):
+        raw = raw[2:]
+    if not re.fullmatch(r"[0-9a-fA-F]{6}", raw):
+        raw = "FFFFFF"
+    rr, gg, bb = raw[0:2], raw[2:4], raw[4:6]
+    aa = round((1.0 - max(0.0, min(alpha, 1.0))) * 255)
+    return f"&H{aa:02X}{bb}{gg}{rr}".upper()
+
+
+def ass_timestamp(seconds: float) -> str:
+    """Format seconds as ASS H:MM:SS.cc."""
+    cs = int(round(max(0.0, seconds) * 100))
+    hours, cs = divmod(cs, 360000)
+    minutes, cs = divmod(cs, 6000)
+    secs, cs = divmod(cs, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{cs:02d}"
+
+
+def escape_ass_text(text: str) -> str:
+    """Neutralise override braces and keep explicit line breaks."""
+    return (
+        str(text)
+        .replace("{", "(")
+        .replace("}", ")")
+        .replace("\r\n", "\n")
+        .replace("\n", "\\N")
+    )
+
+
+@dataclass
+class AssStyle:
+    name: str
+    font: str = "Arial"
+    size: int = 48
+    primary: str = "&H00FFFFFF"
+    outline_color: str = "&H00000000"
+    back_color: str = "&H80000000"
+    bold: bool = False
+    outline: float = 2.0
+    shadow: float = 0.0
+    alignment: int = 2
+    margin_l: int = 40
+    margin_r: int = 40
+    margin_v: int = 40
+
+    def to_line(self) -> str:
+        return (
+            f"Style: {self.name},{self.font},{self.size},{self.primary},{self.primary},"
+            f"{self.outline_color},{self.back_color},{-1 if self.bold else 0},0,0,0,100,100,0,0,1,"
+            f"{self.outline:g},{self.shadow:g},{self.alignment},"
+            f"{self.margin_l},{self.margin_r},{self.margin_v},1"
+        )
+
+
+@dataclass
+class AssEvent:
+    """One dialogue line. `timebase` says whether times are source or output seconds."""
+    start: float
+    end: float
+    style: str
+    text: str
+    timebase: Timebase = "source"
+    layer: int = 0
+    # Override tags prefixed to the text. `{t0+N}` placeholders (ms from the
+    # event's original start) are resolved on clipping so animations stay anchored.
+    tags: str = ""
+
+    def to_line(self) -> str:
+        return (
+            f"Dialogue: {self.layer},{ass_timestamp(self.start)},{ass_timestamp(self.end)},"
+            f"{self.style},,0,0,0,,{self.tags}{escape_ass_text(self.text)}"
+        )
+
+
+@dataclass
+class AssTrack:
+    """A full overlay track; render with `for_scene(...).to_ass()` per part."""
+    play_res: tuple[int, int] = (1280, 720)
+    styles: list[AssStyle] = field(default_factory=list)
+    events: list[AssEvent] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.events)
+
+    def to_ass(self) -> str:
+        width, height = self.play_res
+        lines = [
+            "[Script Info]",
+            "ScriptType: v4.00+",
+            f"PlayResX: {width}",
+            f"PlayResY: {height}",
+            "WrapStyle: 0",
+            "ScaledBorderAndShadow: yes",
+            "",
+            "[V4+ Styles]",
+            f"Format: {STYLE_FORMAT}",
+            *(s.to_line() for s in self.styles),
+            "",
+            "[Events]",
+            f"Format: {EVENT_FORMAT}",
+            *(e.to_line() for e in sorted(self.events, key=lambda e: (e.start, e.layer))),
+            "",
+        ]
+        return "\n".join(lines)
+
+    def for_scene(
+        self,
+        source_start: float,
+        duration: float,
+        output_offset: float = 0.0,
+        speed: float = 1.0,
+    ) -> "AssTrack":
+        """
+        Clip the track to one rendered part.
+        Source-timed events (words, subtitles) are intersected with
+        [source_start, source_start + duration] and rescaled by `speed`;
+        output-timed events (lower thirds) are intersected with the part's
+        slot on the edited timeline.
+        """
+        speed = speed if speed and speed > 0 else 1.0
+        local_len = duration / speed
+        clipped: list[AssEvent] = []
+        for event in self.events:
+            if event.timebase == "source":
+                lo, hi = source_start, source_start + duration
+                scale = 1.0 / speed
+            else:
+                lo, hi = output_offset, output_offset + local_len
+                scale = 1.0
+            start, end = max(event.start, lo), min(event.end, hi)
+            if end - start < 0.01:
+                continue
+            shift = (event.start - start) * scale
+            tags = _resolve_relative_tags(event.tags, shift)
+            clipped.append(replace(
+                event,
+                start=(start - lo) * scale,
+                end=(end - lo) * scale,
+                tags=tags,
+            ))
+        return AssTrack(play_res=self.play_res, styles=list(self.styles), events=clipped)
+
+
+def _resolve_relative_tags(tags: str, shift_seconds: float) -> str:
+    """Rebase `{t0+N}` placeholders (milliseconds from original start) onto the clipped start."""
+    shift_ms = int(round(shift_seconds * 1000))
+
+    def _sub(match: re.Match[str]) -> str:
+        return str(int(match.group(1)) + shift_ms)
+
+    return re.sub(r"\{t0\+(-?\d+)\}", _sub, tags)
+
+
+def parse_srt_events(srt_text: str) -> list[tuple[float, float, str]]:
+    """Parse SRT blocks into (start, end, text) tuples, skipping malformed blocks."""
+    events: list[tuple[float, float, str]] = []
+    for block in re.split(r"\n\s*\n", (srt_text or "").replace("\r\n", "\n")):
+        lines = block.strip().splitlines()
+        ts_idx = next((i for i, ln in enumerate(lines) if _SRT_TS.search(ln)), None)
+        if ts_idx is None:
+            continue
+        m = _SRT_TS.search(lines[ts_idx])
+        assert m is not None
+        v = m.groups()
+        start = int(v[0]) * 3600 + int(v[1]) * 60 + int(v[2]) + int(v[3].ljust(3, "0")) / 1000
+        end = int(v[4]) * 3600 + int(v[5]) * 60 + int(v[6]) + int(v[7].ljust(3, "0")) / 1000
+        text = "\n".join(lines[ts_idx + 1:]).strip()
+        if text and end > start:
+            events.append((start, end, text))
+    return events
+
+
+def build_overlay_track(
+    word_timings: list[dict[str, Any]] | None = None,
+    highlight_color: str = "#FFFF00",
+    title: str | None = None,
+    subtitle: str | None = None,
+    srt_text: str | None = None,
+    platform: str = "youtube",
+    play_res: tuple[int, int] = (1280, 720),
+) -> AssTrack:
+    """
+    Build one ASS track equivalent to build_kinetic_highlight_filters,
+    build_lower_third_filter and build_subtitle_filter combined.
+    """
+    width, height = play_res
+    track = AssTrack(play_res=play_res)
+
+    # Subtitles: same platform style as the SRT force_style, rescaled to PlayResY.
+    sub_style = build_subtitle_style(platform)
+    scale = height / SRT_DEFAULT_PLAY_RES_Y
+    track.styles.append(AssStyle(
+        name="Subtitle",
+        size=round(sub_style["font_size"] * scale),
+        outline=sub_style["outline"],
+        alignment=sub_style["alignment"],
+        margin_v=round(sub_style["margin_v"] * scale),
+    ))
+    for start, end, text in parse_srt_events(srt_text or ""):
+        track.events.append(AssEvent(start=start, end=end, style="Subtitle", text=text))
+
+    # Kinetic highlights: centred pop-up with a 100ms fade-in.
+    track.styles.append(AssStyle(
+        name="Kinetic",
+        font="Montserrat ExtraBold",
+        size=70,
+        primary=ass_color(highlight_color),
+        bold=True,
+        alignment=5,
+    ))
+    for item in word_timings or []:
+        if not item.get("should_highlight"):
+            continue
+        try:
+            start, end = float(item["start"]), float(item["end"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if end <= start:
+            continue
+        track.events.append(AssEvent(
+            start=start,
+            end=end,
+            style="Kinetic",
+            text=str(item.get("word", "")),
+            layer=2,
+            tags=r"{\alpha&HFF&\t({t0+0},{t0+100},\alpha&H00&)}",
+        ))
+
+    # Lower thirds: slide in from the left during the first seconds of the edit.
+    if title:
+        track.styles.append(AssStyle(name="LowerTitle", font="Montserrat", size=42, bold=True, alignment=1))
+        track.styles.append(AssStyle(
+            name="LowerSub", font="Montserrat", size=28, primary=ass_color("#FFFFFF", 0.8), alignment=1
+        ))
+        title_y = height - 150 + 42
+        track.events.append(AssEvent(
+            start=0.0,
+            end=5.5,
+            style="LowerTitle",
+            text=str(title),
+            timebase="output",
+            layer=1,
+            tags=rf"{{\an1\move(-{width},{title_y},40,{title_y},{{t0+0}},{{t0+500}})}}",
+        ))
+        if subtitle:
+            sub_y = height - 100 + 28
+            track.events.append(AssEvent(
+                start=0.1,
+                end=5.5,
+                style="LowerSub",
+                text=str(subtitle),
+                timebase="output",
+                layer=1,
+                tags=rf"{{\an1\move(-{width},{sub_y},40,{sub_y},{{t0+0}},{{t0+500}})}}",
+            ))
+
+    return track
+
+
+def build_ass_filter(ass_path: str) -> str:
+    """Single libass filter for a generated track (escaped like build_subtitle_filter)."""
+    escaped = str(Path(ass_path).absolute()).replace("\\", "/").replace(":", "\\:")
+    return f"subtitles='{escaped}'"
+
+
+def write_scene_tracks(
+    track: AssTrack,
+    cuts: list[dict[str, Any]],
+    out_dir: Path,
+    transition_overlap: float = 0.0,
+) -> dict[int, str]:
+    """
+    Write one clipped .ass file per cut (keyed by cut index).
+    Cuts whose part has no overlapping events get no file and no filter.
+    With transitions every part after the first starts `transition_overlap`
+    seconds before the previous one ends, so output-timed events are placed
+    on that overlapped timeline.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths: dict[int, str] = {}
+    output_offset = 0.0
+    for i, cut in enumerate(cuts):
+        start = float(cut.get("start", 0))
+        duration = float(cut.get("end", 0)) - start
+        if duration <= 0:
+            continue
+        speed = float(cut.get("speed", 1.0) or 1.0)
+        speed = speed if speed > 0 else 1.0
+        scene = track.for_scene(start, duration, output_offset=output_offset, speed=speed)
+        output_offset += duration / speed - transition_overlap
+        if not scene:
+            continue
+        path = out_dir / f"part_{i:04d}.ass"
+        path.write_text(scene.to_ass(), encoding="utf-8")
+        paths[i] = str(path)
+    return paths
@@ -0,0 +1,355 @@
+"""
+Autoscaler - queue-depth-driven capacity control.
+
+Capacity used to be fixed at import time (one analysis slot, one render
+slot, MAX_SCENE_PARALLEL, a static Celery pool). The controller samples
+queue depth, in-flight job stages, CPU/memory headroom and recent per-stage
+durations, and derives a capacity plan:
+
+- Celery pool size: enough workers to drain the backlog within
+  `target_drain_seconds` at the recent job duration, held back when the host
+  has no CPU or memory headroom.
+- Render / analysis slots: as many as available memory allows.
+- Scene parallelism: idle cores per render slot.
+
+Changes are damped with hysteresis: growth needs `up_ticks` consecutive
+samples asking for more, shrinking needs `down_ticks` samples and a longer
+cooldown. In dry-run mode plans are recorded but not applied, and `replay`
+drives the same decisions from a recorded load trace.
+
+Semaphore resizes only reach the process running the controller (the API,
+which hosts in-process jobs when Celery is off). The pool size is the total
+concurrency across Celery workers: every sample reads each worker's actual
+pool size (`inspect().stats()`), and a resize spreads the target evenly and
+sends each worker its own `pool_grow` / `pool_shrink` delta.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field, fields, replace
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+import structlog
+from sqlalchemy import select
+
+from ..config import settings
+from ..db import SessionLocal
+from ..models import Job
+from .concurrency import limits
+from .metrics_service import metrics_service
+
+logger = structlog.get_logger()
+
+DIMENSIONS = ("pool_size", "render_slots", "analysis_slots", "scene_parallel")
+
+
+@dataclass
+class LoadSample:
+    timestamp: float
+    queue_depth: int = 0
+    in_flight: Dict[str, int] = field(default_factory=dict)        # stage -> jobs
+    cpu_percent: float = 0.0
+    memory_available_mb: float = 0.0
+    cpu_count: int = 1
+    stage_seconds: Dict[str, float] = field(default_factory=dict)  # recent median per stage
+    pool_size: Optional[int] = None                                # observed Celery concurrency
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LoadSample":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+@dataclass
+class CapacityPlan:
+    pool_size: int
+    render_slots: int
+    analysis_slots: int
+    scene_parallel: int
+
+
+@dataclass
+class AutoscalePolicy:
+    min_pool: int = 1
+    max_pool: int = 4
+    max_render_slots: int = 2
+    max_analysis_slots: int = 2
+    max_scene_parallel: int = 4
+    target_drain_seconds: float = 600.0
+    default_job_seconds: float = 180.0
+    cpu_high_percent: float = 85.0
+    render_memory_mb: float = 1500.0
+    analysis_memory_mb: float = 800.0
+    memory_reserve_mb: float = 512.0
+    up_ticks: int = 2
+    down_ticks: int = 5
+    up_cooldown_seconds: float = 30.0
+    down_cooldown_seconds: float = 300.0
+
+
+@dataclass
+class Decision:
+    timestamp: float
+    desired: CapacityPlan
+    plan: CapacityPlan
+    changed: List[str]
+    applied: bool
+
+
+class AutoscalerController:
+    def __init__(
+        self,
+        policy: Optional[AutoscalePolicy] = None,
+        initial: Optional[CapacityPlan] = None,
+        dry_run: bool = True,
+        actuators: Iterable[Callable[[CapacityPlan, CapacityPlan], None]] = (),
+    ):
+        self.policy = policy or AutoscalePolicy()
+        self.current = initial or CapacityPlan(
+            pool_size=self.policy.min_pool,
+            render_slots=limits.render_semaphore.limit,
+            analysis_slots=limits.analysis_semaphore.limit,
+            scene_parallel=limits.scene_render_semaphore.limit,
+        )
+        self.dry_run = dry_run
+        self.actuators = list(actuators)
+        window = max(self.policy.up_ticks, self.policy.down_ticks)
+        self._history: Dict[str, Deque[int]] = {d: deque(maxlen=window) for d in DIMENSIONS}
+        self._last_change: Dict[str, float] = {d: float("-inf") for d in DIMENSIONS}
+        self.decisions: Deque[Decision] = deque(maxlen=200)
+
+    # --- policy ---------------------------------------------------------------
+
+    def desired(self, sample: LoadSample) -> CapacityPlan:
+        p = self.policy
+        job_seconds = sum(sample.stage_seconds.values()) or p.default_job_seconds
+        in_flight = sum(sample.in_flight.values())
+        workers_for_backlog = math.ceil(sample.queue_depth * job_seconds / p.target_drain_seconds)
+        pool = max(p.min_pool, min(p.max_pool, max(in_flight, workers_for_backlog)))
+
+        headroom_mb = max(0.0, sample.memory_available_mb - p.memory_reserve_mb)
+        cpu_saturated = sample.cpu_percent >= p.cpu_high_percent
+        if cpu_saturated or headroom_mb < p.render_memory_mb:
+            # No room for another worker process: hold the pool where it is.
+            pool = min(pool, self.current.pool_size)
+
+        render = max(1, min(p.max_render_slots, int(headroom_mb // p.render_memory_mb)))
+        analysis = max(1, min(p.max_analysis_slots, int(headroom_mb // p.analysis_memory_mb)))
+        if cpu_saturated:
+            render, analysis = min(render, self.current.render_slots), min(analysis, self.current.analysis_slots)
+
+        idle_cores = sample.cpu_count * max(0.0, 1.0 - sample.cpu_percent / 100.0)
+        scene = max(1, min(p.max_scene_parallel, int(idle_cores // render)))
+        return CapacityPlan(pool_size=pool, render_slots=render, analysis_slots=analysis, scene_parallel=scene)
+
+    def _damp(self, dim: str, want: int, now: float) -> int:
+        history = self._history[dim]
+        history.append(want)
+        current = getattr(self.current, dim)
+        p = self.policy
+        recent_up = list(history)[-p.up_ticks:]
+        recent_down = list(history)[-p.down_ticks:]
+        since = now - self._last_change[dim]
+        if want > current and len(recent_up) == p.up_ticks and min(recent_up) > current:
+            if since >= p.up_cooldown_seconds:
+                return min(recent_up)
+        if want < current and len(recent_down) == p.down_ticks and max(recent_down) < current:
+            if since >= p.down_cooldown_seconds:
+                return max(recent_down)
+        return current
+
+    def step(self, sample: LoadSample) -> Decision:
+        if sample.pool_size and sample.pool_size != self.current.pool_size:
+            # Workers restarted or were resized elsewhere: plan from what is really running.
+            self.current = replace(self.current, pool_size=sample.pool_size)
+        desired = self.desired(sample)
+        plan = CapacityPlan(**{d: self._damp(d, getattr(desired, d), sample.timestamp) for d in DIMENSIONS})
+        changed = [d for d in DIMENSIONS if getattr(plan, d) != getattr(self.current, d)]
+        applied = False
+        if changed:
+            previous = self.current
+            for d in changed:
+                self._last_change[d] = sample.timestamp
+            self.current = plan
+            if not self.dry_run:
+                for actuator in self.actuators:
+                    try:
+                        actuator(previous, plan)
+                        applied = True
+                    except Exception as e:
+                        logger.warning("autoscaler_actuator_failed", actuator=getattr(actuator, "__name__", str(actuator)), error=str(e))
+            logger.info("autoscaler_plan_changed", changed=changed, plan=asdict(plan), dry_run=self.dry_run, queue_depth=sample.queue_depth)
+        decision = Decision(sample.timestamp, desired, plan, changed, applied)
+        self.decisions.append(decision)
+        return decision
+
+    def replay(self, samples: Iterable[LoadSample]) -> List[Decision]:
+        """Run the policy over a recorded trace (never applies)."""
+        dry_run, self.dry_run = self.dry_run, True
+        try:
+            return [self.step(sample) for sample in samples]
+        finally:
+            self.dry_run = dry_run
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "dry_run": self.dry_run,
+            "current": asdict(self.current),
+            "policy": asdict(self.policy),
+            "recent_decisions": [
+                {"timestamp": d.timestamp, "changed": d.changed, "plan": asdict(d.plan), "applied": d.applied}
+                for d in list(self.decisions)[-20:]
+                if d.changed
+            ],
+        }
+
+
+def load_trace(path: str | Path) -> List[LoadSample]:
+    """Read a JSON-lines load trace (one LoadSample dict per line)."""
+    with open(path, encoding="utf-8") as handle:
+        return [LoadSample.from_dict(json.loads(line)) for line in handle if line.strip()]
+
+
+# --- actuators ----------------------------------------------------------------
+
+def resize_semaphores(previous: CapacityPlan, plan: CapacityPlan) -> None:
+    limits.render_semaphore.resize(plan.render_slots)
+    limits.analysis_semaphore.resize(plan.analysis_slots)
+    limits.scene_render_semaphore.resize(plan.scene_parallel)
+
+
+def celery_pool_sizes(timeout: float = 1.0) -> Dict[str, int]:
+    """Worker name -> pool max-concurrency, for every worker that replied."""
+    from ..celery_app import celery_app
+
+    stats = celery_app.control.inspect(timeout=timeout).stats() or {}
+    sizes = {}
+    for worker, info in stats.items():
+        concurrency = (info.get("pool") or {}).get("max-concurrency")
+        if isinstance(concurrency, int):
+            sizes[worker] = concurrency
+    return sizes
+
+
+def pool_deltas(sizes: Dict[str, int], total: int) -> Dict[str, int]:
+    """Per-worker changes that spread `total` evenly (every worker keeps one process)."""
+    if not sizes:
+        return {}
+    workers = sorted(sizes)
+    base, extra = divmod(total, len(workers))
+    deltas = {}
+    for i, worker in enumerate(workers):
+        target = max(1, base + (1 if i < extra else 0))
+        if target != sizes[worker]:
+            deltas[worker] = target - sizes[worker]
+    return deltas
+
+
+def resize_celery_pool(previous: CapacityPlan, plan: CapacityPlan) -> None:
+    from ..celery_app import celery_app
+
+    # Broadcasting a delta would apply it to every worker; address each one instead.
+    for worker, delta in pool_deltas(celery_pool_sizes(), plan.pool_size).items():
+        if delta > 0:
+            celery_app.control.pool_grow(delta, destination=[worker])
+        else:
+            celery_app.control.pool_shrink(-delta, destination=[worker])
+
+
+# --- sampling -----------------------------------------------------------------
+
+def _in_flight_stages() -> Dict[str, int]:
+    """Current phase of every job tracked in this process."""
+    stages: Dict[str, int] = {}
+    for tracker in list(metrics_service.active_trackers.values()):
+        open_phases = [
+            key[: -len("_start")] for key in tracker.metadata
+            if key.endswith("_start") and key[: -len("_start")] not in tracker.phases
+            and key != "total_workflow_start"
+        ]
+        stage = open_phases[-1] if open_phases else "queued"
+        stages[stage] = stages.get(stage, 0) + 1
+    return stages
+
+
+async def _recent_stage_seconds(limit: int = 50) -> Dict[str, float]:
+    async with SessionLocal() as session:
+        rows = (await session.execute(
+            select(Job.performance_metrics)
+            .where(Job.performance_metrics != None)  # noqa: E711
+            .order_by(Job.updated_at.desc())
+            .limit(limit)
+        )).scalars().all()
+    samples: Dict[str, List[float]] = {}
+    for metrics in rows:
+        for phase, ms in ((metrics or {}).get("phase_durations") or {}).items():
+            if phase != "total_workflow":
+                samples.setdefault(phase, []).append(float(ms) / 1000.0)
+    return {phase: sorted(v)[len(v) // 2] for phase, v in samples.items()}
+
+
+def _host_load() -> tuple[float, float]:
+    """(cpu percent, available memory MB); psutil when installed, else POSIX counters."""
+    try:
+        import psutil
+
+        return psutil.cpu_percent(interval=0.2), psutil.virtual_memory().available / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        cpu = os.getloadavg()[0] / (os.cpu_count() or 1) * 100.0
+        available = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        return min(cpu, 100.0), available
+    except (AttributeError, OSError, ValueError):
+        # Unknown headroom: the policy then holds pool size and keeps one slot per stage.
+        return 100.0, 0.0
+
+
+async def collect_sample() -> LoadSample:
+    from .job_scheduler import job_scheduler
+
+    cpu, available_mb = await asyncio.to_thread(_host_load)
+    in_flight = _in_flight_stages()
+    dispatched = max(0, len(job_scheduler.in_flight) - sum(in_flight.values()))
+    if dispatched:
+        in_flight["dispatched"] = dispatched
+    try:
+        stage_seconds = await _recent_stage_seconds()
+    except Exception as e:
+        logger.warning("autoscaler_stage_history_failed", error=str(e))
+        stage_seconds = {}
+    broker = await asyncio.to_thread(job_scheduler.broker_depth) or {}
+    pool_size = None
+    if settings.redis_url:
+        try:
+            pool_size = sum((await asyncio.to_thread(celery_pool_sizes)).values()) or None
+        except Exception as e:
+            logger.warning("autoscaler_pool_inspect_failed", error=str(e))
+    return LoadSample(
+        timestamp=time.time(),
+        queue_depth=len(job_scheduler.waiting) + sum(broker.values()),
+        in_flight=in_flight,
+        cpu_percent=float(cpu),
+        memory_available_mb=available_mb,
+        cpu_count=os.cpu_count() or 1,
+        stage_seconds=stage_seconds,
+        pool_size=pool_size,
+    )
+
+
+def _build_controller() -> AutoscalerController:
+    policy = AutoscalePolicy(min_pool=settings.autoscaler_min_pool, max_pool=settings.autoscaler_max_pool)
+    actuators = [resize_semaphores]
+    if settings.redis_url:
+        actuators.append(resize_celery_pool)
+    return AutoscalerController(policy, dry_run=settings.autoscaler_dry_run, actuators=actuators)
+
+
+autoscaler = _build_controller()
+
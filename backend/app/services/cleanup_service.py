@@ -1,56 +1,81 @@
-import os
-import time
 import shutil
+import time
 import structlog
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Optional
+
+from ..config import settings
+from .file_registry import file_registry
 
 logger = structlog.get_logger()
 
+# Scratch kinds a manual/autonomous cleanup may expire early (scene parts).
+SCRATCH_KINDS = ("part",)
+
+
 class CleanupService:
-    def __init__(self, storage_root: str = "storage"):
-        self.storage_root = Path(storage_root)
-        self.temp_dir = self.storage_root / "temp"
-        self.outputs_dir = self.storage_root / "outputs"
+    """
+    Frees local disk through the file registry: scratch artifacts older than
+    `max_age_hours` are made due, then the GC deletes everything due in
+    bounded batches. Pinned sources/outputs are never touched.
+
+    Files on disk before the registry existed are imported once, and the
+    scratch locations (temp/ and outputs/job-*-parts) are still swept by
+    mtime so anything that was never tracked cannot pile up there.
+    """
+
+    def __init__(self, storage_root: Optional[str] = None):
+        self._storage_root = storage_root
+
+    @property
+    def storage_root(self) -> Path:
+        return Path(self._storage_root or settings.storage_root)
 
     async def run_cleanup(self, max_age_hours: int = 6):
         logger.info("cleanup_start", max_age_hours=max_age_hours)
-        total_freed = 0
-        now = time.time()
-        max_age_seconds = max_age_hours * 3600
-
-        # 1. Clean temp folder
-        if self.temp_dir.exists():
-            for item in self.temp_dir.iterdir():
-                if item.stat().st_mtime < (now - max_age_seconds):
-                    try:
-                        size = self._get_size(item)
-                        if item.is_file():
-                            item.unlink()
-                        else:
-                            shutil.rmtree(item)
-                        total_freed += size
-                        logger.info("cleanup_removed", path=str(item), size=size)
-                    except Exception as e:
-                        logger.error("cleanup_error", path=str(item), error=str(e))
-
-        # 2. Clean job parts in outputs
-        if self.outputs_dir.exists():
-            for item in self.outputs_dir.glob("job-*-parts"):
-                if item.is_dir() and item.stat().st_mtime < (now - max_age_seconds):
-                    try:
-                        size = self._get_size(item)
-                        shutil.rmtree(item)
-                        total_freed += size
-                        logger.info("cleanup_removed_parts", path=str(item), size=size)
-                    except Exception as e:
-                        logger.error("cleanup_error", path=str(item), error=str(e))
-
-        logger.info("cleanup_complete", total_freed_bytes=total_freed)
+        cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+        try:
+            await file_registry.ensure_backfilled(self.storage_root)
+            expired = await file_registry.expire_stale(SCRATCH_KINDS, cutoff)
+            result = await file_registry.collect()
+        except Exception as e:
+            logger.error("cleanup_error", error=str(e))
+            return 0
+        swept = self._sweep_scratch(time.time() - max_age_hours * 3600)
+        total_freed = result.freed_bytes + swept
+        logger.info("cleanup_complete", total_freed_bytes=total_freed, expired=expired, deleted=result.deleted)
         return total_freed
 
+    def _sweep_scratch(self, cutoff: float) -> int:
+        """Top-level mtime sweep of scratch dirs only; never walks uploads or delivered outputs."""
+        temp_dir = self.storage_root / "temp"
+        outputs_dir = self.storage_root / "outputs"
+        items = list(temp_dir.iterdir()) if temp_dir.exists() else []
+        if outputs_dir.exists():
+            items.extend(p for p in outputs_dir.glob("job-*-parts") if p.is_dir())
+        freed = 0
+        for item in items:
+            try:
+                if item.stat().st_mtime >= cutoff:
+                    continue
+                size = self._get_size(item)
+                if item.is_dir():
+                    shutil.rmtree(item)
+                else:
+                    item.unlink()
+                freed += size
+                logger.info("cleanup_removed", path=str(item), size=size)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.error("cleanup_error", path=str(item), error=str(e))
+        return freed
+
     def _get_size(self, path: Path) -> int:
         if path.is_file():
             return path.stat().st_size
-        return sum(f.stat().st_size for f in path.glob('**/*') if f.is_file())
+        return sum(f.stat().st_size for f in path.glob("**/*") if f.is_file())
+
 
 cleanup_service = CleanupService()
@@ -0,0 +1,539 @@
+"""
+Color Compiler - folds point-wise grading filters into one baked 3D LUT.
+
+Grades reach the render as several per-pixel filters in series: the
+baseline `eq` from build_color_pipeline_filters, the color agent's free-form
+`ffmpeg_color_filter`, palette `colorbalance` / `curves`, and `.cube` files
+via `lut3d`. Every one of them touches every pixel of every frame.
+
+The compiler parses the point-wise operations it understands (eq, curves,
+colorbalance, hue, colorchannelmixer, lut3d), evaluates the composed chain on
+a lattice of RGB values and writes it as a single `.cube` file, cached by
+the chain's hash. Each run of two or more foldable filters becomes one
+`lut3d`. Anything it cannot fold (scale, normalize, drawtext, expressions
+that vary per frame) stays in place and splits the runs around it, or raises
+ColorCompileError in strict mode.
+
+The math mirrors FFmpeg's filters on full-range BT.601 YUV/RGB. It matches
+closely but not bit-exactly (8-bit rounding inside FFmpeg filters is not
+modelled).
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import structlog
+
+from ..config import settings
+
+logger = structlog.get_logger()
+
+ColorOp = Callable[[np.ndarray], np.ndarray]
+
+COLOR_FILTERS = {"eq", "curves", "colorbalance", "hue", "colorchannelmixer", "lut3d"}
+
+# FFmpeg curves presets (vf_curves.c).
+CURVES_PRESETS: Dict[str, Dict[str, str]] = {
+    "none": {},
+    "color_negative": {
+        "r": "0.129/1 0.466/0.498 0.725/0",
+        "g": "0.109/1 0.301/0.498 0.517/0",
+        "b": "0.098/1 0.235/0.498 0.423/0",
+    },
+    "cross_process": {
+        "r": "0/0 0.25/0.156 0.501/0.501 0.686/0.745 1/1",
+        "g": "0/0 0.25/0.188 0.38/0.501 0.745/0.815 1/0.815",
+        "b": "0/0 0.231/0.094 0.709/0.874 1/1",
+    },
+    "darker": {"master": "0/0 0.5/0.4 1/1"},
+    "increase_contrast": {"master": "0/0 0.149/0.066 0.831/0.905 0.905/0.98 1/1"},
+    "lighter": {"master": "0/0 0.4/0.5 1/1"},
+    "linear_contrast": {"master": "0/0 0.305/0.286 0.694/0.713 1/1"},
+    "medium_contrast": {"master": "0/0 0.286/0.219 0.639/0.643 1/1"},
+    "negative": {"master": "0/1 1/0"},
+    "strong_contrast": {"master": "0/0 0.301/0.196 0.592/0.6 0.686/0.737 1/1"},
+    "vintage": {
+        "r": "0/0.11 0.42/0.51 1/0.95",
+        "g": "0/0 0.50/0.48 1/1",
+        "b": "0/0.22 0.49/0.44 1/0.8",
+    },
+}
+
+
+class ColorCompileError(ValueError):
+    """A color filter could not be folded (raised in strict mode only)."""
+
+
+# --- filtergraph parsing --------------------------------------------------------
+
+def _split_top_level(text: str, sep: str) -> List[str]:
+    """Split on `sep` outside quotes and brackets, honouring backslash escapes."""
+    parts, current, depth, quote, escaped = [], [], 0, False, False
+    for ch in text:
+        if escaped:
+            current.append(ch)
+            escaped = False
+        elif ch == "\\":
+            current.append(ch)
+            escaped = True
+        elif ch == "'":
+            quote = not quote
+            current.append(ch)
+        elif not quote and ch in "[(":
+            depth += 1
+            current.append(ch)
+        elif not quote and ch in "])":
+            depth = max(0, depth - 1)
+            current.append(ch)
+        elif ch == sep and not quote and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    parts.append("".join(current))
+    return parts
+
+
+def split_filters(chain: str) -> List[str]:
+    return [part.strip() for part in _split_top_level(chain or "", ",") if part.strip()]
+
+
+def _unquote(value: str) -> str:
+    out, quote, escaped = [], False, False
+    for ch in value.strip():
+        if escaped:
+            out.append(ch)
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif ch == "'":
+            quote = not quote
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def parse_filter(text: str) -> Tuple[str, List[str], Dict[str, str]]:
+    """`name=a:b:k=v` -> (name, positional args, keyword args)."""
+    name, _, args = text.partition("=")
+    positional: List[str] = []
+    options: Dict[str, str] = {}
+    if args:
+        for part in _split_top_level(args, ":"):
+            key, eq, value = part.partition("=")
+            if eq and re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", key.strip()):
+                options[key.strip()] = _unquote(value)
+            else:
+                positional.append(_unquote(part))
+    return name.strip(), positional, options
+
+
+def _options(positional: List[str], options: Dict[str, str], order: Tuple[str, ...], aliases: Dict[str, str] = None) -> Dict[str, str]:
+    if len(positional) > len(order):
+        raise ColorCompileError("too many positional arguments")
+    merged = dict(zip(order, positional))
+    for key, value in options.items():
+        merged[(aliases or {}).get(key, key)] = value
+    return merged
+
+
+def _number(options: Dict[str, str], key: str, default: float) -> float:
+    if key not in options:
+        return default
+    try:
+        return float(options[key])
+    except ValueError:
+        raise ColorCompileError(f"{key}={options[key]!r} is not a constant")
+
+
+def _only(options: Dict[str, str], allowed: Iterable[str]) -> None:
+    unknown = set(options) - set(allowed)
+    if unknown:
+        raise ColorCompileError(f"unsupported options: {', '.join(sorted(unknown))}")
+
+
+# --- colour math (full-range BT.601, values in [0, 1]) -----------------------------
+
+def _rgb_to_yuv(rgb: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    y = 0.299 * r + 0.587 * g + 0.114 * b
+    return y, (b - y) * 0.564, (r - y) * 0.713
+
+
+def _yuv_to_rgb(y: np.ndarray, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    r = y + 1.402 * v
+    g = y - 0.344136 * u - 0.714136 * v
+    b = y + 1.772 * u
+    return np.clip(np.stack([r, g, b], axis=-1), 0.0, 1.0)
+
+
+def _eq(positional: List[str], options: Dict[str, str]) -> ColorOp:
+    order = ("contrast", "brightness", "saturation", "gamma", "gamma_r", "gamma_g", "gamma_b", "gamma_weight", "eval")
+    opts = _options(positional, options, order)
+    _only(opts, order)
+    if opts.get("eval", "init") != "init":
+        # eval=frame only matters for expressions, which are rejected anyway.
+        opts.pop("eval")
+    contrast = _number(opts, "contrast", 1.0)
+    brightness = _number(opts, "brightness", 0.0)
+    saturation = _number(opts, "saturation", 1.0)
+    gamma = _number(opts, "gamma", 1.0) * _number(opts, "gamma_g", 1.0)
+    weight = _number(opts, "gamma_weight", 1.0)
+    if _number(opts, "gamma_r", 1.0) != 1.0 or _number(opts, "gamma_b", 1.0) != 1.0:
+        raise ColorCompileError("per-channel gamma_r/gamma_b is not foldable")
+
+    def op(rgb: np.ndarray) -> np.ndarray:
+        y, u, v = _rgb_to_yuv(rgb)
+        luma = contrast * (y - 0.5) + 0.5 + brightness
+        positive = np.clip(luma, 1e-9, None)
+        luma = np.where(luma <= 0.0, 0.0, luma * (1.0 - weight) + np.power(positive, 1.0 / gamma) * weight)
+        return _yuv_to_rgb(np.clip(luma, 0.0, 1.0), np.clip(u * saturation, -0.5, 0.5), np.clip(v * saturation, -0.5, 0.5))
+    return op
+
+
+def _natural_spline(points: List[Tuple[float, float]]) -> Callable[[np.ndarray], np.ndarray]:
+    """Natural cubic spline through the key points, flat outside them (FFmpeg curves)."""
+    points = sorted(points)
+    xs = np.array([p[0] for p in points])
+    ys = np.array([p[1] for p in points])
+    n = len(points)
+    if n == 1:
+        return lambda x: np.full_like(x, ys[0])
+    h = np.diff(xs)
+    if np.any(h <= 0):
+        raise ColorCompileError("curve key points must have distinct x values")
+    m = np.zeros(n)
+    if n > 2:
+        a = np.zeros((n - 2, n - 2))
+        rhs = np.zeros(n - 2)
+        for i in range(1, n - 1):
+            row = i - 1
+            a[row, row] = 2 * (h[i - 1] + h[i])
+            if row > 0:
+                a[row, row - 1] = h[i - 1]
+            if row < n - 3:
+                a[row, row + 1] = h[i]
+            rhs[row] = 6 * ((ys[i + 1] - ys[i]) / h[i] - (ys[i] - ys[i - 1]) / h[i - 1])
+        m[1:-1] = np.linalg.solve(a, rhs)
+
+    def curve(x: np.ndarray) -> np.ndarray:
+        xc = np.clip(x, xs[0], xs[-1])
+        i = np.clip(np.searchsorted(xs, xc, side="right") - 1, 0, n - 2)
+        dx = xc - xs[i]
+        hi = h[i]
+        b = (ys[i + 1] - ys[i]) / hi - hi * (2 * m[i] + m[i + 1]) / 6
+        y = ys[i] + b * dx + m[i] / 2 * dx ** 2 + (m[i + 1] - m[i]) / (6 * hi) * dx ** 3
+        return np.clip(y, 0.0, 1.0)
+    return curve
+
+
+def _curve_points(spec: str) -> List[Tuple[float, float]]:
+    points = []
+    for pair in spec.split():
+        x, _, y = pair.partition("/")
+        try:
+            points.append((float(x), float(y)))
+        except ValueError:
+            raise ColorCompileError(f"bad curve point {pair!r}")
+    return points
+
+
+def _curves(positional: List[str], options: Dict[str, str]) -> ColorOp:
+    aliases = {"m": "master", "r": "red", "g": "green", "b": "blue"}
+    opts = _options(positional, options, ("preset",), aliases)
+    _only(opts, ("preset", "master", "red", "green", "blue", "all", "interp"))
+    if opts.get("interp", "natural") != "natural":
+        raise ColorCompileError("only natural curve interpolation is foldable")
+    preset_name = opts.get("preset", "none")
+    if preset_name not in CURVES_PRESETS:
+        raise ColorCompileError(f"unknown curves preset {preset_name!r}")
+    specs = {aliases.get(k, k): v for k, v in CURVES_PRESETS[preset_name].items()}
+    specs.update({k: v for k, v in opts.items() if k in ("master", "red", "green", "blue", "all")})
+    for channel in ("red", "green", "blue"):
+        if channel not in specs and "all" in specs:
+            specs[channel] = specs["all"]
+    channels = [_natural_spline(_curve_points(specs[c])) if c in specs else None for c in ("red", "green", "blue")]
+    master = _natural_spline(_curve_points(specs["master"])) if "master" in specs else None
+
+    def op(rgb: np.ndarray) -> np.ndarray:
+        out = rgb.copy()
+        for idx, curve in enumerate(channels):
+            if curve is not None:
+                out[..., idx] = curve(out[..., idx])
+        if master is not None:
+            out = master(out)
+        return out
+    return op
+
+
+def _lightness(rgb: np.ndarray) -> np.ndarray:
+    return (rgb.max(axis=-1) + rgb.min(axis=-1)) / 2.0
+
+
+def _colorbalance(positional: List[str], options: Dict[str, str]) -> ColorOp:
+    order = ("rs", "gs", "bs", "rm", "gm", "bm", "rh", "gh", "bh", "pl")
+    opts = _options(positional, options, order)
+    _only(opts, order)
+    shifts = np.array([[_number(opts, f"{c}{zone}", 0.0) for c in "rgb"] for zone in "smh"])
+    preserve = _number(opts, "pl", 0.0) != 0.0
+
+    def op(rgb: np.ndarray) -> np.ndarray:
+        # Lightness-weighted shadows / midtones / highlights, as in vf_colorbalance.
+        a, b, scale = 4.0, 0.333, 0.7
+        l = _lightness(rgb)[..., None]
+        ws = np.clip((b - l) * a + 0.5, 0, 1) * scale
+        wm = np.clip((l - b) * a + 0.5, 0, 1) * np.clip((1 - l - b) * a + 0.5, 0, 1) * scale
+        wh = np.clip((l + b - 1) * a + 0.5, 0, 1) * scale
+        out = np.clip(rgb + ws * shifts[0] + wm * shifts[1] + wh * shifts[2], 0.0, 1.0)
+        if preserve:
+            out = _with_lightness(out, l[..., 0])
+        return out
+    return op
+
+
+def _with_lightness(rgb: np.ndarray, lightness: np.ndarray) -> np.ndarray:
+    """Shift/scale each pixel toward grey so its HSL lightness equals `lightness`."""
+    current = _lightness(rgb)
+    grey = lightness[..., None]
+    mid = current[..., None]
+    spread = rgb - mid
+    # Largest spread that keeps channels in range at the target lightness.
+    room = np.minimum(grey, 1 - grey)
+    extent = np.maximum(np.abs(spread).max(axis=-1, keepdims=True), 1e-9)
+    factor = np.minimum(1.0, room / extent)
+    return np.clip(grey + spread * factor, 0.0, 1.0)
+
+
+def _hue(positional: List[str], options: Dict[str, str]) -> ColorOp:
+    order = ("h", "s", "H", "b")
+    opts = _options(positional, options, order)
+    _only(opts, order)
+    if "h" in opts and "H" in opts:
+        raise ColorCompileError("h and H are exclusive")
+    angle = math.radians(_number(opts, "h", 0.0)) if "h" in opts else _number(opts, "H", 0.0)
+    saturation = _number(opts, "s", 1.0)
+    brightness = _number(opts, "b", 0.0)
+    cos_a, sin_a = math.cos(angle) * saturation, math.sin(angle) * saturation
+
+    def op(rgb: np.ndarray) -> np.ndarray:
+        y, u, v = _rgb_to_yuv(rgb)
+        y = np.clip(y + brightness * 0.1, 0.0, 1.0)
+        u2 = np.clip(u * cos_a - v * sin_a, -0.5, 0.5)
+        v2 = np.clip(u * sin_a + v * cos_a, -0.5, 0.5)
+        return _yuv_to_rgb(y, u2, v2)
+    return op
+
+
+def _colorchannelmixer(positional: List[str], options: Dict[str, str]) -> ColorOp:
+    order = ("rr", "rg", "rb", "ra", "gr", "gg", "gb", "ga", "br", "bg", "bb", "ba", "ar", "ag", "ab", "aa", "pc", "pa")
+    opts = _options(positional, options, order)
+    _only(opts, order)
+    if opts.get("pc", "none") != "none":
+        raise ColorCompileError("preserve-color modes are not foldable")
+    identity = {"rr": 1.0, "gg": 1.0, "bb": 1.0}
+    matrix = np.array([[_number(opts, f"{o}{i}", identity.get(f"{o}{i}", 0.0)) for i in "rgb"] for o in "rgb"])
+
+    def op(rgb: np.ndarray) -> np.ndarray:
+        return np.clip(rgb @ matrix.T, 0.0, 1.0)
+    return op
+
+
+# --- .cube files ----------------------------------------------------------------
+
+@dataclass
+class CubeLUT:
+    size: int
+    table: np.ndarray                    # [b][g][r] -> rgb, shape (n, n, n, 3)
+    domain_min: np.ndarray = field(default_factory=lambda: np.zeros(3))
+    domain_max: np.ndarray = field(default_factory=lambda: np.ones(3))
+
+    def apply(self, rgb: np.ndarray) -> np.ndarray:
+        """Trilinear lookup (FFmpeg lut3d interp=trilinear)."""
+        n = self.size
+        scaled = (rgb - self.domain_min) / (self.domain_max - self.domain_min)
+        pos = np.clip(scaled, 0.0, 1.0) * (n - 1)
+        lo = np.minimum(np.floor(pos).astype(np.int64), n - 2) if n > 1 else np.zeros_like(pos, dtype=np.int64)
+        frac = pos - lo
+        r0, g0, b0 = lo[..., 0], lo[..., 1], lo[..., 2]
+        fr, fg, fb = frac[..., 0:1], frac[..., 1:2], frac[..., 2:3]
+        t = self.table
+
+        def at(db, dg, dr):
+            return t[b0 + db, g0 + dg, r0 + dr]
+
+        c00 = at(0, 0, 0) * (1 - fr) + at(0, 0, 1) * fr
+        c01 = at(0, 1, 0) * (1 - fr) + at(0, 1, 1) * fr
+        c10 = at(1, 0, 0) * (1 - fr) + at(1, 0, 1) * fr
+        c11 = at(1, 1, 0) * (1 - fr) + at(1, 1, 1) * fr
+        c0 = c00 * (1 - fg) + c01 * fg
+        c1 = c10 * (1 - fg) + c11 * fg
+        return c0 * (1 - fb) + c1 * fb
+
+
+def read_cube(path: str | Path) -> CubeLUT:
+    size = None
+    domain_min, domain_max = np.zeros(3), np.ones(3)
+    rows: List[List[float]] = []
+    for raw in Path(path).read_text(encoding="utf-8", errors="ignore").splitlines():
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        key, *values = line.split()
+        if key == "LUT_3D_SIZE":
+            size = int(values[0])
+        elif key == "LUT_1D_SIZE":
+            raise ColorCompileError("1D .cube LUTs are not supported")
+        elif key == "DOMAIN_MIN":
+            domain_min = np.array([float(v) for v in values])
+        elif key == "DOMAIN_MAX":
+            domain_max = np.array([float(v) for v in values])
+        elif key in ("TITLE", "LUT_3D_INPUT_RANGE"):
+            continue
+        else:
+            rows.append([float(key), *map(float, values[:2])])
+    if not size or len(rows) != size ** 3:
+        raise ColorCompileError(f"{path}: expected {size}^3 entries, found {len(rows)}")
+    table = np.asarray(rows, dtype=np.float64).reshape(size, size, size, 3)
+    return CubeLUT(size, table, domain_min, domain_max)
+
+
+def write_cube(path: str | Path, lut: CubeLUT, title: str = "") -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = [f'TITLE "{title}"'] if title else []
+    lines.append(f"LUT_3D_SIZE {lut.size}")
+    lines.extend(f"{r:.6f} {g:.6f} {b:.6f}" for r, g, b in lut.table.reshape(-1, 3))
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def lattice(size: int) -> np.ndarray:
+    """All lattice RGB points in .cube order (red fastest), shape (n, n, n, 3)."""
+    axis = np.linspace(0.0, 1.0, size)
+    b, g, r = np.meshgrid(axis, axis, axis, indexing="ij")
+    return np.stack([r, g, b], axis=-1)
+
+
+def _lut3d(positional: List[str], options: Dict[str, str]) -> Tuple[ColorOp, str]:
+    opts = _options(positional, options, ("file", "clut", "interp"))
+    _only(opts, ("file", "clut", "interp"))
+    path = opts.get("file")
+    if not path or not os.path.exists(path):
+        raise ColorCompileError(f"LUT file not found: {path!r}")
+    lut = read_cube(path)
+    stat = os.stat(path)
+    return lut.apply, f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+PARSERS: Dict[str, Callable[[List[str], Dict[str, str]], ColorOp]] = {
+    "eq": _eq,
+    "curves": _curves,
+    "colorbalance": _colorbalance,
+    "hue": _hue,
+    "colorchannelmixer": _colorchannelmixer,
+}
+
+
+def parse_color_op(text: str) -> Tuple[ColorOp, str]:
+    """Parse one filter into a point-wise op plus a cache identity; raises ColorCompileError."""
+    name, positional, options = parse_filter(text)
+    if name == "lut3d":
+        return _lut3d(positional, options)
+    parser = PARSERS.get(name)
+    if parser is None:
+        raise ColorCompileError(f"{name} is not a point-wise color filter")
+    return parser(positional, options), text
+
+
+def compose(ops: Iterable[ColorOp]) -> ColorOp:
+    ops = list(ops)
+
+    def op(rgb: np.ndarray) -> np.ndarray:
+        for step in ops:
+            rgb = step(rgb)
+        return rgb
+    return op
+
+
+# --- compiler -------------------------------------------------------------------
+
+@dataclass
+class CompiledChain:
+    filters: List[str]
+    folded: int = 0                      # source filters replaced by baked LUTs
+    luts: List[str] = field(default_factory=list)
+    passthrough: List[str] = field(default_factory=list)
+
+
+class ColorCompiler:
+    def __init__(self, cache_dir: Optional[str | Path] = None, lut_size: Optional[int] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(settings.storage_root) / "luts"
+        self.lut_size = lut_size or settings.color_lut_size
+
+    def bake(self, ops: List[ColorOp], identity: List[str]) -> Path:
+        key = hashlib.sha256("\n".join([str(self.lut_size), *identity]).encode()).hexdigest()[:20]
+        path = self.cache_dir / f"chain-{key}.cube"
+        if not path.exists():
+            grid = lattice(self.lut_size)
+            table = compose(ops)(grid.reshape(-1, 3)).reshape(grid.shape)
+            write_cube(path, CubeLUT(self.lut_size, table), title=f"proedit {key}")
+            logger.info("color_lut_baked", path=str(path), filters=len(ops), size=self.lut_size)
+        return path
+
+    def compile(self, filters: Iterable[str], strict: bool = False) -> CompiledChain:
+        result = CompiledChain(filters=[])
+        run: List[Tuple[str, ColorOp, str]] = []
+
+        def flush() -> None:
+            if len(run) >= 2:
+                path = self.bake([op for _, op, _ in run], [ident for _, _, ident in run])
+                escaped = str(path.absolute()).replace("\\", "/").replace(":", "\\:")
+                result.filters.append(f"lut3d=file={escaped}:interp=trilinear")
+                result.folded += len(run)
+                result.luts.append(str(path))
+            else:
+                result.filters.extend(text for text, _, _ in run)
+            run.clear()
+
+        for chain in filters:
+            for text in split_filters(chain):
+                name = parse_filter(text)[0]
+                if name in COLOR_FILTERS:
+                    try:
+                        op, ident = parse_color_op(text)
+                        run.append((text, op, ident))
+                        continue
+                    except ColorCompileError as e:
+                        if strict:
+                            raise ColorCompileError(f"{text}: {e}") from e
+                        logger.info("color_filter_not_folded", filter=text, reason=str(e))
+                flush()
+                result.filters.append(text)
+                result.passthrough.append(text)
+        flush()
+        return result
+
+    def compile_filters(self, filters: Iterable[str]) -> List[str]:
+        """Render-path entry point: never fails, returns the input when disabled or on error."""
+        filters = list(filters)
+        if not settings.color_lut_compiler:
+            return filters
+        try:
+            compiled = self.compile(filters)
+        except Exception as e:
+            logger.warning("color_compile_failed", error=str(e))
+            return filters
+        if compiled.folded:
+            logger.info("color_chain_compiled", folded=compiled.folded, luts=len(compiled.luts))
+        return compiled.filters
+
+
+color_compiler = ColorCompiler()
@@ -1,5 +1,99 @@
 import asyncio
 import os
+import threading
+import weakref
+from collections import deque
+
+
+class ResizableSemaphore:
+    """
+    Async semaphore whose limit can change at runtime (see services/autoscaler.py).
+
+    Shrinking never interrupts holders; new acquirers wait until usage drops
+    below the new limit. Waiters may belong to any event loop (jobs run under
+    `asyncio.run` per Celery task), so wake-ups go through their own loop.
+    """
+    def __init__(self, limit: int):
+        self.limit = max(1, int(limit))
+        self.in_use = 0
+        self._lock = threading.Lock()
+        self._waiters: "deque[asyncio.Future]" = deque()
+
+    def locked(self) -> bool:
+        return self.in_use >= self.limit
+
+    async def acquire(self) -> bool:
+        while True:
+            with self._lock:
+                if self.in_use < self.limit:
+                    self.in_use += 1
+                    return True
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    woken = waiter not in self._waiters
+                    if not woken:
+                        self._waiters.remove(waiter)
+                # Pass on a wake-up this waiter received but can no longer use.
+                if woken:
+                    self._wake()
+                raise
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+        self._wake()
+
+    def resize(self, limit: int) -> None:
+        with self._lock:
+            self.limit = max(1, int(limit))
+        self._wake()
+
+    def _wake(self) -> None:
+        with self._lock:
+            free = self.limit - self.in_use
+            woken = [self._waiters.popleft() for _ in range(min(max(free, 0), len(self._waiters)))]
+        for waiter in woken:
+            loop = waiter.get_loop()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(lambda w=waiter: w.done() or w.set_result(None))
+
+    async def __aenter__(self) -> "ResizableSemaphore":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+
+class LLMBudget:
+    """
+    Caps in-flight LLM requests per event loop.
+
+    asyncio primitives are bound to one loop, so each loop (the API server,
+    the planning executor) gets its own semaphore of the same size.
+    """
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    def slot(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.limit)
+        return semaphore
+
+    def in_flight(self) -> int:
+        try:
+            semaphore = self._semaphores.get(asyncio.get_running_loop())
+        except RuntimeError:
+            return 0
+        return self.limit - semaphore._value if semaphore else 0
+
 
 class ConcurrencyLimits:
     """
@@ -9,22 +103,32 @@ class ConcurrencyLimits:
     def __init__(self):
         # Analysis semaphore: Used for backend-side decoding (scenes/loudness)
         # We keep this at 1 to prevent OOM during fallback decoding.
-        self.analysis_semaphore = asyncio.Semaphore(1)
+        self.analysis_semaphore = ResizableSemaphore(1)
         
         # Rendering semaphore: The heaviest RAM/CPU task.
         # MUST be 1 for global stability, but we allow intra-job parallelization
         # if the hardware supports it.
-        self.render_semaphore = asyncio.Semaphore(1)
+        self.render_semaphore = ResizableSemaphore(1)
         
         # Intra-job parallel rendering: How many scenes to render at once.
         # Dev: 4, Prod (Constrained): 1
         default_parallel = 4 if os.name == 'nt' else 1
-        self.scene_render_semaphore = asyncio.Semaphore(
+        self.scene_render_semaphore = ResizableSemaphore(
             int(os.getenv("MAX_SCENE_PARALLEL", str(default_parallel)))
         )
+        # The three semaphores above are the defaults; the autoscaler may
+        # resize them at runtime from load and memory headroom.
         
         # Limit for total concurrent tasks in Python (Planning/API)
         # Increasing this slightly since analysis is now often offloaded.
         self.max_concurrent_jobs = int(os.getenv("MAX_CONCURRENT_JOBS", "2"))
 
+        # LLM budget: concurrent provider requests per event loop. Planning
+        # work is I/O-bound on these calls, so this (not process count) is
+        # what bounds how many graphs a worker can plan at once.
+        self.llm_budget = LLMBudget(int(os.getenv("MAX_CONCURRENT_LLM_CALLS", "8")))
+
+        # Planning graphs admitted concurrently by the planning executor.
+        self.max_concurrent_plans = int(os.getenv("MAX_CONCURRENT_PLANS", "32"))
+
 limits = ConcurrencyLimits()
@@ -0,0 +1,360 @@
+"""
+Deliverables - every output format of a finished job from one decode.
+
+A job fans out into several files: one encode per target platform (aspect
+ratio and bitrate), the low-res preview, and one cut per A/B hook variant.
+Rendered separately, each of them decodes the whole edit again. The bundle
+renderer decodes the master once, `split`s it into every branch of a single
+filter_complex and writes all outputs from one FFmpeg process.
+
+Hook variants differ from the master only in their opening seconds: their
+branch trims those seconds off the shared master and concatenates the
+variant's opening clip, decoded from the source for just that window and
+graded with the job's color chain. A hook source without an audio stream
+gets silence so it still concatenates with the master's audio.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import shutil
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+import structlog
+
+from ..config import settings
+from .ffmpeg_runner import FFmpegRunner, ffmpeg_runner
+from .file_registry import file_registry
+from .media_analysis import media_analyzer
+from .render_plan import CPU_ENCODER, EncoderProfile
+
+logger = structlog.get_logger()
+
+BUNDLE_MANIFEST_NAME = "bundle.json"
+
+# Target aspect ratio and video bitrate (kbps) per platform.
+PLATFORM_SPECS: Dict[str, Tuple[str, int]] = {
+    "tiktok": ("9:16", 4000),
+    "reels": ("9:16", 3500),
+    "youtube_shorts": ("9:16", 4000),
+    "youtube": ("16:9", 5000),
+    "youtube_long": ("16:9", 5000),
+    "instagram": ("1:1", 3500),
+}
+# Deliverables share the master's 720p class: the short side is 720 pixels.
+DELIVERY_SHORT_SIDE = 720
+PREVIEW_HEIGHT = 360
+PREVIEW_CRF = 28
+PREVIEW_SECONDS = 30.0
+HOOK_MAX_SECONDS = 10.0
+AUDIO_FORMAT = "aformat=sample_rates=48000:channel_layouts=stereo"
+SILENCE = "anullsrc=channel_layout=stereo:sample_rate=48000"
+
+
+@dataclass
+class HookCut:
+    """Opening clip from the source that replaces the master's first `duration` seconds."""
+    source_path: str
+    start: float
+    duration: float
+    has_audio: bool = True
+
+
+@dataclass
+class Deliverable:
+    name: str
+    kind: str                            # "platform" | "preview" | "hook"
+    width: int                           # -2 keeps the master's aspect (preview)
+    height: int
+    fit: str = "crop"                    # "crop" fills the frame, "pad" letterboxes, "scale" keeps aspect
+    video_kbps: Optional[int] = None     # None encodes at constant quality (`crf`)
+    crf: int = 23
+    max_duration: Optional[float] = None
+    hook: Optional[HookCut] = None
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}.mp4"
+
+
+def aspect_size(aspect_ratio: str) -> Tuple[int, int]:
+    """Even frame size for "W:H" with the short side at DELIVERY_SHORT_SIDE."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*[:x/]\s*(\d+(?:\.\d+)?)\s*", aspect_ratio or "")
+    if not match or not float(match.group(1)) or not float(match.group(2)):
+        raise ValueError(f"invalid aspect ratio {aspect_ratio!r}")
+    w, h = float(match.group(1)), float(match.group(2))
+    scale = DELIVERY_SHORT_SIDE / min(w, h)
+    return int(round(w * scale / 2)) * 2, int(round(h * scale / 2)) * 2
+
+
+def platform_deliverable(platform: str, aspect_ratio: Optional[str] = None) -> Deliverable:
+    spec_ratio, kbps = PLATFORM_SPECS.get(platform, ("16:9", 5000))
+    width, height = aspect_size(aspect_ratio or spec_ratio)
+    return Deliverable(name=platform, kind="platform", width=width, height=height, video_kbps=kbps)
+
+
+def render_size(aspect_ratio: Optional[str] = None, platform: Optional[str] = None) -> Tuple[int, int]:
+    """Master frame for a job: its own aspect ratio, else its platform's, else 16:9."""
+    for candidate in (aspect_ratio, PLATFORM_SPECS.get(platform or "", (None, 0))[0]):
+        if candidate:
+            try:
+                return aspect_size(candidate)
+            except ValueError:
+                continue
+    return aspect_size("16:9")
+
+
+def preview_deliverable(max_duration: float = PREVIEW_SECONDS) -> Deliverable:
+    return Deliverable(
+        name="preview", kind="preview", width=-2, height=PREVIEW_HEIGHT,
+        fit="scale", crf=PREVIEW_CRF, max_duration=max_duration,
+    )
+
+
+def hook_cut(variant: Dict[str, Any], source_path: str) -> Optional[HookCut]:
+    """Source window of a hook/opening A/B variant, if the agent gave one."""
+    if variant.get("type") not in {"hook", "opening"}:
+        return None
+    content = variant.get("content") or {}
+    cuts = content.get("cuts") or content.get("opening_cuts")
+    segment = cuts[0] if isinstance(cuts, list) and cuts and isinstance(cuts[0], dict) else content
+    try:
+        start = float(segment["start"])
+        end = float(segment["end"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    duration = min(end - start, HOOK_MAX_SECONDS)
+    if start < 0 or duration <= 0:
+        return None
+    return HookCut(source_path=source_path, start=start, duration=duration)
+
+
+def plan_bundle(
+    platforms: Iterable[str],
+    source_path: str,
+    ab_test_result: Optional[Dict[str, Any]] = None,
+    preview: bool = True,
+    hook_variants: bool = True,
+    aspect_ratios: Optional[Dict[str, str]] = None,
+) -> List[Deliverable]:
+    """Deliverables for a job; hook variants are cut in the first platform's format."""
+    deliverables: List[Deliverable] = []
+    for platform in dict.fromkeys(platforms):
+        deliverables.append(platform_deliverable(platform, (aspect_ratios or {}).get(platform)))
+    if preview:
+        deliverables.append(preview_deliverable())
+    if hook_variants and deliverables and deliverables[0].kind == "platform":
+        base = deliverables[0]
+        for variant in (ab_test_result or {}).get("variants") or []:
+            hook = hook_cut(variant, source_path) if isinstance(variant, dict) else None
+            if hook:
+                deliverables.append(Deliverable(
+                    name=f"{base.name}-hook-{re.sub(r'[^A-Za-z0-9_-]', '', str(variant.get('id')))}",
+                    kind="hook", width=base.width, height=base.height, fit=base.fit,
+                    video_kbps=base.video_kbps, crf=base.crf, hook=hook,
+                ))
+    return deliverables
+
+
+def fit_filter(deliverable: Deliverable) -> str:
+    w, h = deliverable.width, deliverable.height
+    if deliverable.fit == "scale":
+        return f"scale={w}:{h}"
+    if deliverable.fit == "pad":
+        return f"scale={w}:{h}:force_original_aspect_ratio=decrease,pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1"
+    return f"scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h},setsar=1"
+
+
+def _video_args(deliverable: Deliverable, encoder: EncoderProfile) -> List[str]:
+    if deliverable.video_kbps is None:
+        return encoder.video_args(deliverable.crf, "veryfast")
+    kbps = deliverable.video_kbps
+    preset = ["-preset", "p4"] if encoder.gpu else ["-preset", "veryfast"]
+    return [
+        "-c:v", encoder.name, *preset,
+        "-b:v", f"{kbps}k", "-maxrate", f"{int(kbps * 1.07)}k", "-bufsize", f"{kbps * 2}k",
+    ]
+
+
+def build_bundle_command(
+    ffmpeg_bin: str,
+    master_path: str,
+    deliverables: List[Deliverable],
+    out_dir: Path,
+    has_audio: bool = True,
+    fps: Optional[float] = None,
+    hook_vf: Optional[str] = None,
+    encoder: EncoderProfile = CPU_ENCODER,
+) -> List[str]:
+    """One decode of the master, `split` into one branch per deliverable."""
+    n = len(deliverables)
+    cmd = [ffmpeg_bin, "-y", "-hide_banner", "-i", master_path]
+    graph = [f"[0:v]split={n}" + "".join(f"[s{i}]" for i in range(n))] if n > 1 else ["[0:v]null[s0]"]
+    if has_audio:
+        graph.append(f"[0:a]asplit={n}" + "".join(f"[as{i}]" for i in range(n)) if n > 1 else "[0:a]anull[as0]")
+    rate = f",fps={fps:g}" if fps else ""
+
+    next_input = 1
+    for i, d in enumerate(deliverables):
+        fit = fit_filter(d)
+        if d.hook is None:
+            graph.append(f"[s{i}]{fit}[v{i}]")
+            if has_audio:
+                graph.append(f"[as{i}]anull[a{i}]")
+            continue
+        # Only the hook window of the source is decoded (input seek + -t).
+        cmd += ["-ss", f"{d.hook.start:.3f}", "-t", f"{d.hook.duration:.3f}", "-i", os.path.abspath(d.hook.source_path)]
+        j, next_input = next_input, next_input + 1
+        skip = f"{d.hook.duration:.3f}"
+        grade = f"{hook_vf}," if hook_vf else ""
+        graph.append(f"[s{i}]trim=start={skip},setpts=PTS-STARTPTS,{fit}{rate}[b{i}]")
+        graph.append(f"[{j}:v]{grade}{fit}{rate}[h{i}]")
+        if has_audio:
+            graph.append(f"[as{i}]atrim=start={skip},asetpts=PTS-STARTPTS,{AUDIO_FORMAT}[ba{i}]")
+            if d.hook.has_audio:
+                graph.append(f"[{j}:a]{AUDIO_FORMAT}[ha{i}]")
+            else:
+                graph.append(f"{SILENCE},atrim=duration={skip},asetpts=PTS-STARTPTS[ha{i}]")
+            graph.append(f"[h{i}][ha{i}][b{i}][ba{i}]concat=n=2:v=1:a=1[v{i}][a{i}]")
+        else:
+            graph.append(f"[h{i}][b{i}]concat=n=2:v=1:a=0[v{i}]")
+
+    cmd += ["-filter_complex", ";".join(graph)]
+    for i, d in enumerate(deliverables):
+        cmd += ["-map", f"[v{i}]"]
+        if has_audio:
+            cmd += ["-map", f"[a{i}]", "-c:a", "aac", "-b:a", "128k"]
+        cmd += _video_args(d, encoder)
+        if d.max_duration:
+            cmd += ["-t", f"{d.max_duration:.3f}"]
+        cmd += ["-movflags", "+faststart", str(out_dir / d.filename)]
+    return cmd
+
+
+class DeliverableRenderer:
+    """Renders and caches deliverable bundles next to a job's output."""
+
+    def __init__(self, runner: Optional[FFmpegRunner] = None):
+        self.runner = runner or ffmpeg_runner
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Background renders started by `start`, held until they finish.
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    @staticmethod
+    def bundle_dir(job_id: int) -> Path:
+        return Path(settings.storage_root) / "outputs" / f"job-{job_id}-deliverables"
+
+    def load_manifest(self, job_id: int) -> Optional[Dict[str, Any]]:
+        path = self.bundle_dir(job_id) / BUNDLE_MANIFEST_NAME
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def is_rendering(self, job_id: int) -> bool:
+        task = self._tasks.get(job_id)
+        lock = self._locks.get(str(job_id))
+        return bool((task and not task.done()) or (lock and lock.locked()))
+
+    def start(
+        self,
+        job_id: int,
+        master_path: str | Path,
+        deliverables: List[Deliverable],
+        hook_vf: Optional[str] = None,
+    ) -> asyncio.Task:
+        """Render a bundle in the background; at most one render per job is in flight."""
+        running = self._tasks.get(job_id)
+        if running is not None and not running.done():
+            return running
+        task = asyncio.get_running_loop().create_task(
+            self.render_bundle(job_id, master_path, deliverables, hook_vf=hook_vf)
+        )
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda done: self._finished(job_id, done))
+        return task
+
+    def _finished(self, job_id: int, task: asyncio.Task) -> None:
+        if self._tasks.get(job_id) is task:
+            del self._tasks[job_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("deliverables_render_crashed", job_id=job_id, error=str(task.exception()))
+
+    async def _probe_hooks(self, deliverables: List[Deliverable], master_duration: float) -> List[Deliverable]:
+        """Hook deliverables whose source is usable, with its audio presence filled in."""
+        probes: Dict[str, Any] = {}
+        usable = []
+        for d in deliverables:
+            if d.hook is None:
+                usable.append(d)
+                continue
+            if d.hook.duration >= master_duration or not Path(d.hook.source_path).exists():
+                continue
+            if d.hook.source_path not in probes:
+                probes[d.hook.source_path] = await media_analyzer.get_metadata(d.hook.source_path)
+            source = probes[d.hook.source_path]
+            if source is None:
+                continue
+            usable.append(replace(d, hook=replace(d.hook, has_audio=bool(source.has_audio))))
+        return usable
+
+    async def render_bundle(
+        self,
+        job_id: int,
+        master_path: str | Path,
+        deliverables: List[Deliverable],
+        hook_vf: Optional[str] = None,
+        timeout: float = 1800.0,
+    ) -> Optional[Dict[str, Any]]:
+        """Render every deliverable in one FFmpeg process and swap the bundle in whole."""
+        master = Path(master_path)
+        if not master.exists() or not deliverables:
+            return None
+        lock = self._locks.setdefault(str(job_id), asyncio.Lock())
+        async with lock:
+            metadata = await media_analyzer.get_metadata(str(master))
+            if not metadata:
+                logger.warning("deliverables_no_metadata", job_id=job_id, path=str(master))
+                return None
+            usable = await self._probe_hooks(deliverables, metadata.duration)
+
+            final_dir = self.bundle_dir(job_id)
+            work_dir = final_dir.with_name(f"{final_dir.name}.tmp-{uuid4().hex[:8]}")
+            work_dir.mkdir(parents=True, exist_ok=True)
+            cmd = build_bundle_command(
+                media_analyzer.ffmpeg, str(master), usable, work_dir,
+                has_audio=metadata.has_audio, fps=metadata.fps, hook_vf=hook_vf,
+            )
+            run = await self.runner.run(cmd, duration=metadata.duration, timeout=timeout)
+            if not run.success or not all((work_dir / d.filename).exists() for d in usable):
+                shutil.rmtree(work_dir, ignore_errors=True)
+                logger.error("deliverables_render_failed", job_id=job_id, error=(run.error or "")[-500:])
+                return None
+
+            manifest = {
+                "job_id": job_id,
+                "master": str(master),
+                "elapsed_seconds": round(run.elapsed_seconds, 2),
+                "deliverables": [
+                    {**asdict(d), "path": (final_dir / d.filename).as_posix()} for d in usable
+                ],
+                "skipped": [d.name for d in deliverables if d.name not in {u.name for u in usable}],
+            }
+            (work_dir / BUNDLE_MANIFEST_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+            if final_dir.exists():
+                shutil.rmtree(final_dir, ignore_errors=True)
+            os.replace(work_dir, final_dir)
+            await file_registry.track(final_dir, "output", job_id=job_id)
+            logger.info(
+                "deliverables_rendered", job_id=job_id, outputs=len(usable), elapsed=run.elapsed_seconds,
+            )
+            return manifest
+
+
+# Global renderer instance
+deliverable_renderer = DeliverableRenderer()
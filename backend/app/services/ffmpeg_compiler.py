@@ -1,12 +1,13 @@
 """
 FFmpeg Compiler - Converts Timeline DSL to FFmpeg command graph.
 """
+import asyncio
 import structlog
-import subprocess
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 
 from .timeline_dsl import Timeline, Clip, Transition, Overlay, AudioTrack, TransitionType
+from .ffmpeg_runner import FFmpegRunner, ProgressCallback, ffmpeg_runner, run_blocking
 
 logger = structlog.get_logger()
 
@@ -16,8 +17,9 @@ class FFmpegCompiler:
     Compiles Timeline DSL to FFmpeg filter graphs and commands.
     """
     
-    def __init__(self, ffmpeg_path: str = "ffmpeg"):
+    def __init__(self, ffmpeg_path: str = "ffmpeg", runner: Optional[FFmpegRunner] = None):
         self.ffmpeg = ffmpeg_path
+        self.runner = runner or ffmpeg_runner
     
     def compile(self, timeline: Timeline, output_path: str) -> List[str]:
         """
@@ -198,9 +200,16 @@ class FFmpegCompiler:
         
         return None
     
-    async def execute(self, timeline: Timeline, output_path: str) -> Dict[str, Any]:
+    async def execute(
+        self,
+        timeline: Timeline,
+        output_path: str,
+        on_progress: Optional[ProgressCallback] = None,
+        cancel_event: Optional[asyncio.Event] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
         """
-        Compile and execute FFmpeg command.
+        Compile and execute FFmpeg command without blocking the event loop.
         Returns execution result.
         """
         cmd = self.compile(timeline, output_path)
@@ -208,39 +217,13 @@ class FFmpegCompiler:
         logger.info("ffmpeg_execute_start", timeline_id=timeline.id)
         
         try:
-            result = subprocess.run(
+            run = await self.runner.run(
                 cmd,
-                capture_output=True,
-                text=True,
-                timeout=600  # 10 minute timeout
+                duration=timeline.duration or None,
+                on_progress=on_progress,
+                cancel_event=cancel_event,
+                timeout=timeout,
             )
-            
-            if result.returncode == 0:
-                logger.info("ffmpeg_execute_success", timeline_id=timeline.id)
-                return {
-                    "success": True,
-                    "output_path": output_path,
-                    "cmd": " ".join(cmd)
-                }
-            else:
-                logger.error(
-                    "ffmpeg_execute_failed",
-                    timeline_id=timeline.id,
-                    stderr=result.stderr[:500]
-                )
-                return {
-                    "success": False,
-                    "error": result.stderr,
-                    "cmd": " ".join(cmd)
-                }
-                
-        except subprocess.TimeoutExpired:
-            logger.error("ffmpeg_timeout", timeline_id=timeline.id)
-            return {
-                "success": False,
-                "error": "FFmpeg execution timed out",
-                "cmd": " ".join(cmd)
-            }
         except Exception as e:
             logger.error("ffmpeg_exception", timeline_id=timeline.id, error=str(e))
             return {
@@ -248,6 +231,34 @@ class FFmpegCompiler:
                 "error": str(e),
                 "cmd": " ".join(cmd)
             }
+        
+        if run.success:
+            logger.info("ffmpeg_execute_success", timeline_id=timeline.id, elapsed=run.elapsed_seconds)
+            return {
+                "success": True,
+                "output_path": output_path,
+                "cmd": " ".join(cmd),
+                "elapsed_seconds": run.elapsed_seconds,
+            }
+        
+        logger.error(
+            "ffmpeg_execute_failed",
+            timeline_id=timeline.id,
+            timed_out=run.timed_out,
+            cancelled=run.cancelled,
+            stderr=run.stderr_tail[-500:]
+        )
+        return {
+            "success": False,
+            "error": run.error,
+            "timed_out": run.timed_out,
+            "cancelled": run.cancelled,
+            "cmd": " ".join(cmd)
+        }
+    
+    def execute_sync(self, timeline: Timeline, output_path: str, **kwargs: Any) -> Dict[str, Any]:
+        """Blocking variant of execute() for Celery workers."""
+        return run_blocking(self.execute(timeline, output_path, **kwargs))
 
 
 # Global compiler instance
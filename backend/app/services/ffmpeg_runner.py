@@ -0,0 +1,276 @@
+"""
+FFmpeg Runner - Non-blocking execution of compiled FFmpeg commands.
+Streams `-progress` output incrementally, keeps only a bounded stderr tail,
+and kills the whole process group on timeout or cancellation.
+"""
+import asyncio
+import concurrent.futures
+import inspect
+import os
+import signal
+import subprocess
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, TypeVar, Union
+
+import structlog
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+ProgressCallback = Callable[[Dict[str, Any]], Union[None, Awaitable[None]]]
+
+DEFAULT_TIMEOUT_SECONDS = 600.0
+DEFAULT_STDERR_TAIL_LINES = 200
+DEFAULT_KILL_GRACE_SECONDS = 5.0
+
+
+@dataclass
+class FFmpegRunResult:
+    """Outcome of a single FFmpeg process run."""
+    returncode: Optional[int]
+    elapsed_seconds: float
+    stderr_tail: str = ""
+    timed_out: bool = False
+    cancelled: bool = False
+    last_progress: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not self.timed_out and not self.cancelled
+
+    @property
+    def error(self) -> Optional[str]:
+        if self.success:
+            return None
+        if self.timed_out:
+            return "FFmpeg execution timed out"
+        if self.cancelled:
+            return "FFmpeg execution cancelled"
+        return self.stderr_tail or f"FFmpeg exited with code {self.returncode}"
+
+
+def parse_progress_block(block: Dict[str, str], duration: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Convert one `-progress` key=value block into a progress snapshot.
+    FFmpeg reports `out_time_ms` in microseconds (historical bug), so
+    `out_time_us` is preferred and both are treated as microseconds.
+    """
+    out_time = 0.0
+    for key in ("out_time_us", "out_time_ms"):
+        raw = block.get(key)
+        if raw and raw != "N/A":
+            try:
+                out_time = max(0.0, int(raw) / 1_000_000)
+                break
+            except ValueError:
+                continue
+
+    def _num(raw: Optional[str]) -> Optional[float]:
+        if not raw or raw == "N/A":
+            return None
+        try:
+            return float(raw.rstrip("x"))
+        except ValueError:
+            return None
+
+    done = block.get("progress") == "end"
+    percent: Optional[float] = None
+    if duration and duration > 0:
+        percent = 100.0 if done else round(min(out_time / duration, 1.0) * 100.0, 1)
+
+    return {
+        "out_time": round(out_time, 3),
+        "frame": int(_num(block.get("frame")) or 0),
+        "fps": _num(block.get("fps")),
+        "speed": _num(block.get("speed")),
+        "percent": percent,
+        "done": done,
+    }
+
+
+def with_progress_args(cmd: List[str]) -> List[str]:
+    """Inject `-progress pipe:1 -nostats` right after the ffmpeg binary."""
+    if not cmd or "-progress" in cmd:
+        return list(cmd)
+    if not Path(cmd[0]).stem.lower().startswith("ffmpeg"):
+        return list(cmd)
+    return [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+
+
+def run_blocking(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Drive a coroutine to completion from synchronous code.
+    Celery tasks get a fresh loop via asyncio.run; callers that are already
+    inside a running loop get a private loop on a helper thread instead of
+    nesting loops.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+class FFmpegRunner:
+    """
+    Runs FFmpeg without blocking the event loop.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        stderr_tail_lines: int = DEFAULT_STDERR_TAIL_LINES,
+        kill_grace_seconds: float = DEFAULT_KILL_GRACE_SECONDS,
+    ):
+        self.timeout = timeout
+        self.stderr_tail_lines = stderr_tail_lines
+        self.kill_grace_seconds = kill_grace_seconds
+
+    @staticmethod
+    def _spawn_kwargs() -> Dict[str, Any]:
+        """Start FFmpeg in its own process group so helpers die with it."""
+        if os.name == "nt":
+            return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        return {"start_new_session": True}
+
+    async def _terminate(self, proc: asyncio.subprocess.Process) -> None:
+        """SIGTERM the process group, escalating to SIGKILL after the grace period."""
+        if proc.returncode is not None:
+            return
+        try:
+            if os.name == "nt":
+                proc.terminate()
+            else:
+                os.killpg(proc.pid, signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            pass
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=self.kill_grace_seconds)
+            return
+        except asyncio.TimeoutError:
+            pass
+        try:
+            if os.name == "nt":
+                proc.kill()
+            else:
+                os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        await proc.wait()
+
+    async def run(
+        self,
+        cmd: List[str],
+        duration: Optional[float] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        cancel_event: Optional[asyncio.Event] = None,
+        timeout: Optional[float] = None,
+    ) -> FFmpegRunResult:
+        """
+        Execute `cmd` and stream its progress.
+        `on_progress` may be sync or async and receives parse_progress_block snapshots.
+        Setting `cancel_event` (or cancelling the awaiting task) kills the process group.
+        """
+        cmd = with_progress_args(cmd)
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            **self._spawn_kwargs(),
+        )
+
+        stderr_tail: deque[str] = deque(maxlen=self.stderr_tail_lines)
+        last_progress: Dict[str, Any] = {}
+
+        async def pump_stderr() -> None:
+            assert proc.stderr is not None
+            while True:
+                line = await proc.stderr.readline()
+                if not line:
+                    break
+                stderr_tail.append(line.decode(errors="replace").rstrip())
+
+        async def pump_progress() -> None:
+            assert proc.stdout is not None
+            block: Dict[str, str] = {}
+            while True:
+                line = await proc.stdout.readline()
+                if not line:
+                    break
+                key, sep, value = line.decode(errors="replace").strip().partition("=")
+                if not sep:
+                    continue
+                block[key] = value
+                if key != "progress":
+                    continue
+                snapshot = parse_progress_block(block, duration)
+                block = {}
+                last_progress.clear()
+                last_progress.update(snapshot)
+                if on_progress is None:
+                    continue
+                try:
+                    outcome = on_progress(snapshot)
+                    if inspect.isawaitable(outcome):
+                        await outcome
+                except Exception as e:
+                    logger.warning("ffmpeg_progress_callback_failed", error=str(e))
+
+        completion = asyncio.ensure_future(asyncio.gather(pump_stderr(), pump_progress(), proc.wait()))
+        waiters = {completion}
+        cancel_waiter = None
+        if cancel_event is not None:
+            cancel_waiter = asyncio.ensure_future(cancel_event.wait())
+            waiters.add(cancel_waiter)
+
+        timed_out = False
+        cancelled = False
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if completion not in done:
+                cancelled = cancel_waiter is not None and cancel_waiter in done
+                timed_out = not cancelled
+                await self._terminate(proc)
+                try:
+                    await asyncio.wait_for(completion, timeout=self.kill_grace_seconds)
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    completion.cancel()
+        except asyncio.CancelledError:
+            await asyncio.shield(self._terminate(proc))
+            completion.cancel()
+            raise
+        finally:
+            if cancel_waiter is not None:
+                cancel_waiter.cancel()
+
+        result = FFmpegRunResult(
+            returncode=proc.returncode,
+            elapsed_seconds=round(time.monotonic() - started, 3),
+            stderr_tail="\n".join(stderr_tail),
+            timed_out=timed_out,
+            cancelled=cancelled,
+            last_progress=dict(last_progress),
+        )
+        if timed_out:
+            logger.error("ffmpeg_timeout", timeout=timeout, pid=proc.pid)
+        elif cancelled:
+            logger.warning("ffmpeg_cancelled", pid=proc.pid)
+        return result
+
+    def run_sync(self, cmd: List[str], **kwargs: Any) -> FFmpegRunResult:
+        """Blocking front-end for Celery tasks and scripts."""
+        return run_blocking(self.run(cmd, **kwargs))
+
+
+# Global runner instance
+ffmpeg_runner = FFmpegRunner()
@@ -0,0 +1,293 @@
+"""
+File Registry - Index of every local artifact the pipeline writes.
+
+Uploads, scene parts, SRTs, takes, thumbnails, outputs and other job
+artifacts are recorded with their owning job and an expiry. Pinned files
+(sources, delivered outputs and thumbnails) carry no expiry until a retry
+releases them. Uploads are registered unpinned as soon as they land, so a
+source that never becomes a job still ages out. Garbage collection range-scans the expiry index and deletes
+only what is due, in bounded batches, so it never walks the storage tree.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import structlog
+from sqlalchemy import delete, select, update
+
+from ..config import settings
+from ..db import SessionLocal
+from ..models import Job, StoredFile
+
+logger = structlog.get_logger()
+
+PINNED_KINDS = {"upload", "output", "thumbnail"}
+BACKFILL_MARKER = ".file-registry-backfilled"
+GC_BATCH_SIZE = 500
+GC_MAX_BATCHES = 20
+
+
+def normalize_path(path: str | Path) -> str:
+    return str(Path(path).resolve())
+
+
+def default_ttl(kind: str) -> Optional[timedelta]:
+    if kind in PINNED_KINDS:
+        return None
+    if kind == "part":
+        return timedelta(hours=settings.local_part_ttl_hours)
+    return timedelta(days=settings.local_retention_days)
+
+
+def _remove(path: str) -> int:
+    """Delete a file or directory tree; returns bytes freed (0 if already gone)."""
+    target = Path(path)
+    try:
+        if target.is_dir():
+            freed = sum(f.stat().st_size for f in target.rglob("*") if f.is_file())
+            shutil.rmtree(target, ignore_errors=True)
+            return freed
+        freed = target.stat().st_size
+        target.unlink()
+        return freed
+    except FileNotFoundError:
+        return 0
+
+
+def _remove_batch(paths: Sequence[str]) -> Tuple[List[str], int]:
+    """Returns (paths whose rows can be dropped, bytes freed)."""
+    done: List[str] = []
+    freed = 0
+    for path in paths:
+        try:
+            freed += _remove(path)
+            done.append(path)
+        except OSError as exc:
+            logger.error("file_gc_remove_failed", path=path, error=str(exc))
+    return done, freed
+
+
+@dataclass
+class GcResult:
+    deleted: int = 0
+    freed_bytes: int = 0
+    batches: int = 0
+
+
+class FileRegistry:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    async def _apply(self, session, path: str, kind: str, job_id: Optional[int], expires_at: Optional[datetime]) -> None:
+        target = Path(path)
+        is_dir = target.is_dir()
+        size = 0 if is_dir or not target.exists() else target.stat().st_size
+        row = await session.get(StoredFile, path)
+        if row is None:
+            session.add(StoredFile(
+                path=path,
+                kind=kind,
+                job_id=job_id,
+                size=size,
+                is_dir=is_dir,
+                created_at=datetime.utcnow(),
+                expires_at=expires_at,
+            ))
+            return
+        # Re-registering refreshes size and expiry (writers re-pin on every delivery).
+        row.kind = kind
+        row.size = size
+        row.is_dir = is_dir
+        row.job_id = row.job_id or job_id
+        row.expires_at = expires_at
+
+    async def track(
+        self,
+        path: str | Path,
+        kind: str,
+        job_id: Optional[int] = None,
+        ttl: Optional[timedelta] = None,
+        pinned: Optional[bool] = None,
+        session=None,
+    ) -> None:
+        """
+        Record an artifact. Defaults come from the kind: sources, outputs and
+        thumbnails are pinned, parts expire after hours, the rest after days.
+        Pass `session` to join the caller's transaction; without one this is a
+        best-effort hook that logs instead of failing the writer.
+        """
+        if pinned is None:
+            pinned = kind in PINNED_KINDS
+        ttl = ttl or default_ttl(kind)
+        expires_at = None if pinned or ttl is None else datetime.utcnow() + ttl
+        key = normalize_path(path)
+        if session is not None:
+            await self._apply(session, key, kind, job_id, expires_at)
+            return
+        try:
+            async with self.session_factory() as own:
+                await self._apply(own, key, kind, job_id, expires_at)
+                await own.commit()
+        except Exception as exc:
+            logger.warning("file_registry_track_failed", path=key, kind=kind, error=str(exc))
+
+    async def track_unclaimed(self, session, path: str | Path, kind: str = "upload") -> None:
+        """
+        Record a file no job owns yet (a finished upload) in the caller's
+        transaction. It expires after the retention window unless a job pins
+        it; an entry that is already pinned keeps its pin.
+        """
+        key = normalize_path(path)
+        row = await session.get(StoredFile, key)
+        if row is not None and row.expires_at is None:
+            return
+        expires_at = datetime.utcnow() + timedelta(days=settings.local_retention_days)
+        await self._apply(session, key, kind, None, expires_at)
+
+    async def forget(self, path: str | Path) -> None:
+        """Drop the row for an artifact the writer already cleaned up itself."""
+        try:
+            async with self.session_factory() as session:
+                await session.execute(delete(StoredFile).where(StoredFile.path == normalize_path(path)))
+                await session.commit()
+        except Exception as exc:
+            logger.warning("file_registry_forget_failed", path=str(path), error=str(exc))
+
+    async def release_job(self, session, job_id: int, kinds: Iterable[str] = ("output", "thumbnail")) -> int:
+        """Unpin a job's delivered files (e.g. on retry) so they age out unless re-pinned."""
+        expires_at = datetime.utcnow() + timedelta(days=settings.local_retention_days)
+        result = await session.execute(
+            update(StoredFile)
+            .where(StoredFile.job_id == job_id, StoredFile.kind.in_(list(kinds)), StoredFile.expires_at.is_(None))
+            .values(expires_at=expires_at)
+        )
+        return result.rowcount or 0
+
+    async def expire_stale(self, kinds: Iterable[str], created_before: datetime) -> int:
+        """Make old entries of the given kinds due now (manual/aggressive cleanup)."""
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(StoredFile)
+                .where(
+                    StoredFile.kind.in_(list(kinds)),
+                    StoredFile.created_at < created_before,
+                    StoredFile.expires_at.is_not(None),
+                    StoredFile.expires_at > now,
+                )
+                .values(expires_at=now)
+            )
+            await session.commit()
+        return result.rowcount or 0
+
+    async def due(self, now: Optional[datetime] = None, limit: int = GC_BATCH_SIZE) -> List[str]:
+        """Oldest-due paths first (range scan on the expiry index)."""
+        async with self.session_factory() as session:
+            rows = await session.execute(
+                select(StoredFile.path)
+                .where(StoredFile.expires_at <= (now or datetime.utcnow()))
+                .order_by(StoredFile.expires_at)
+                .limit(limit)
+            )
+            return list(rows.scalars().all())
+
+    async def collect(self, batch_size: int = GC_BATCH_SIZE, max_batches: int = GC_MAX_BATCHES) -> GcResult:
+        """Delete due artifacts batch by batch; removal runs off the event loop."""
+        result = GcResult()
+        now = datetime.utcnow()
+        while result.batches < max_batches:
+            paths = await self.due(now, limit=batch_size)
+            if not paths:
+                break
+            done, freed = await asyncio.to_thread(_remove_batch, paths)
+            if done:
+                async with self.session_factory() as session:
+                    await session.execute(delete(StoredFile).where(StoredFile.path.in_(done)))
+                    await session.commit()
+            result.batches += 1
+            result.deleted += len(done)
+            result.freed_bytes += freed
+            if len(done) < len(paths):
+                # Failed removals stay due; stop instead of re-reading them forever.
+                break
+        logger.info("file_gc_complete", deleted=result.deleted, freed_bytes=result.freed_bytes, batches=result.batches)
+        return result
+
+    async def ensure_backfilled(self, root: str | Path) -> int:
+        """
+        Backfill `root` once per storage tree. A marker file records that the
+        import ran, so a registry that already holds new entries (or was
+        emptied by GC) is never mistaken for one that still needs it.
+        """
+        marker = Path(root) / BACKFILL_MARKER
+        if marker.exists():
+            return 0
+        imported = await self.backfill(root)
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.write_text(datetime.utcnow().isoformat(), encoding="utf-8")
+        return imported
+
+    async def backfill(self, root: str | Path) -> int:
+        """
+        One-off import of files written before the registry existed. This is
+        the only code path that walks the tree; job-referenced files are pinned.
+        Paths already tracked (and everything under a tracked directory) keep
+        their existing entries.
+        """
+        root = Path(root)
+        async with self.session_factory() as session:
+            rows = (await session.execute(select(Job.id, Job.source_path, Job.output_path, Job.thumbnail_path))).all()
+            tracked = set((await session.execute(select(StoredFile.path))).scalars().all())
+        owners = {}
+        for job_id, *paths in rows:
+            for path in paths:
+                if path and not str(path).startswith("http"):
+                    owners[normalize_path(path)] = job_id
+
+        def _scan() -> List[Tuple[str, int, datetime]]:
+            found = []
+            for folder in ("uploads", "outputs"):
+                base = root / folder
+                if not base.exists():
+                    continue
+                for dirpath, dirnames, filenames in os.walk(base):
+                    dirnames[:] = [d for d in dirnames if normalize_path(os.path.join(dirpath, d)) not in tracked]
+                    for name in filenames:
+                        full = os.path.join(dirpath, name)
+                        if normalize_path(full) in tracked:
+                            continue
+                        try:
+                            st = os.stat(full)
+                        except OSError:
+                            continue
+                        found.append((normalize_path(full), st.st_size, datetime.utcfromtimestamp(st.st_mtime)))
+            return found
+
+        found = await asyncio.to_thread(_scan)
+        retention = timedelta(days=settings.local_retention_days)
+        async with self.session_factory() as session:
+            for n, (path, size, mtime) in enumerate(found, start=1):
+                job_id = owners.get(path)
+                await session.merge(StoredFile(
+                    path=path,
+                    kind="upload" if "/uploads/" in path.replace("\\", "/") else "artifact",
+                    job_id=job_id,
+                    size=size,
+                    is_dir=False,
+                    created_at=mtime,
+                    expires_at=None if job_id else mtime + retention,
+                ))
+                if n % GC_BATCH_SIZE == 0:
+                    await session.commit()
+            await session.commit()
+        logger.info("file_registry_backfilled", files=len(found), pinned=sum(1 for p, _, _ in found if p in owners))
+        return len(found)
+
+
+file_registry = FileRegistry()
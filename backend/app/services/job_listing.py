@@ -0,0 +1,126 @@
+"""
+Job Listing - Lean list queries for jobs.
+
+List views select only the scalar columns they render (never the JSON
+payloads) and page with an opaque keyset cursor on (created_at, id), served
+by the (user_id, created_at, id) index. The JSON payloads are loaded per job
+on demand, and only the ones asked for.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Job
+
+MAX_PAGE_SIZE = 100
+
+SUMMARY_COLUMNS = (
+    Job.id,
+    Job.user_id,
+    Job.status,
+    Job.theme,
+    Job.tier,
+    Job.credits_cost,
+    Job.pacing,
+    Job.mood,
+    Job.ratio,
+    Job.platform,
+    Job.brand_safety,
+    Job.cancel_requested,
+    Job.progress_message,
+    Job.output_path,
+    Job.thumbnail_path,
+    Job.created_at,
+    Job.updated_at,
+)
+
+PAYLOAD_COLUMNS = {
+    name: getattr(Job, name)
+    for name in (
+        "media_intelligence",
+        "qc_result",
+        "director_plan",
+        "brand_safety_result",
+        "ab_test_result",
+        "performance_metrics",
+        "post_settings",
+        "audio_qa",
+        "color_qa",
+        "subtitle_qa",
+        "scout_result",
+    )
+}
+
+
+def encode_cursor(created_at: datetime, job_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{job_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_raw, id_raw = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_raw), int(id_raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def list_job_summaries(
+    session: AsyncSession,
+    user_id: Optional[int] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    extra_columns: Iterable[Any] = (),
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Newest-first page of job summaries plus the cursor for the next page
+    (None on the last page). `skip` is the legacy offset and is ignored when
+    a cursor is given.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    stmt = select(*SUMMARY_COLUMNS, *extra_columns).order_by(Job.created_at.desc(), Job.id.desc())
+    if user_id is not None:
+        stmt = stmt.where(Job.user_id == user_id)
+    if cursor:
+        created_at, job_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            or_(Job.created_at < created_at, and_(Job.created_at == created_at, Job.id < job_id))
+        )
+    elif skip:
+        stmt = stmt.offset(skip)
+
+    # One extra row tells us whether another page exists without a COUNT.
+    rows = (await session.execute(stmt.limit(limit + 1))).mappings().all()
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return items, next_cursor
+
+
+async def load_job_payloads(
+    session: AsyncSession,
+    job_id: int,
+    user_id: Optional[int] = None,
+    fields: Optional[Iterable[str]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Selected JSON payload columns for one job (all when `fields` is empty)."""
+    names = [f for f in (fields or []) if f] or list(PAYLOAD_COLUMNS)
+    unknown = [name for name in names if name not in PAYLOAD_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown job fields: {', '.join(sorted(unknown))}")
+    stmt = select(Job.id, *(PAYLOAD_COLUMNS[name] for name in names)).where(Job.id == job_id)
+    if user_id is not None:
+        stmt = stmt.where(Job.user_id == user_id)
+    row = (await session.execute(stmt)).mappings().first()
+    return dict(row) if row else None
@@ -0,0 +1,171 @@
+"""
+Job Progress - Coalesced status writes with a live hot path.
+
+Every status message lands in the live store first (Redis through the
+progress bus's pooled client when configured, an in-process map otherwise); that is what API readers overlay on the DB row.
+The DB only sees a write immediately on a state transition (new status,
+terminal status, or result payloads). Plain progress chatter is buffered
+per job, last message wins, and flushed every few seconds in one
+transaction across all jobs. DB writes are serialized, and a flushed update
+that a newer write for the same job already replaced is dropped, so a late
+flush can never overwrite a terminal status.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import count
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import structlog
+
+from .progress_bus import ProgressBus
+
+logger = structlog.get_logger()
+
+TERMINAL_STATUSES = {"complete", "failed", "cancelled"}
+LIVE_TTL_SECONDS = 3600
+MAX_TRACKED_JOBS = 10_000
+
+
+@dataclass
+class StatusUpdate:
+    job_id: int
+    status: str
+    message: str
+    fields: Dict[str, Any] = field(default_factory=dict)
+    at: datetime = field(default_factory=datetime.utcnow)
+    seq: int = 0  # recording order within the pipeline
+
+    def live(self) -> Dict[str, Any]:
+        return {"status": self.status, "message": self.message, "updated_at": self.at.isoformat()}
+
+
+PersistFn = Callable[[List[StatusUpdate]], Awaitable[None]]
+
+
+class JobProgressPipeline:
+    def __init__(self, persist: PersistFn, bus: Optional[ProgressBus] = None, flush_interval: float = 2.0):
+        self.persist = persist
+        self.bus = bus
+        self.flush_interval = flush_interval
+        self._pending: Dict[int, StatusUpdate] = {}
+        self._persisted_status: "OrderedDict[int, str]" = OrderedDict()
+        self._written_seq: "OrderedDict[int, int]" = OrderedDict()
+        self._seq = count(1)
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._live: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._flusher: Optional[asyncio.Task] = None
+        self.stats = {"recorded": 0, "written": 0, "coalesced": 0, "flushes": 0}
+
+    # --- live store ---------------------------------------------------------
+
+    @property
+    def _redis_enabled(self) -> bool:
+        return self.bus is not None and self.bus.enabled
+
+    @staticmethod
+    def _remember(store: "OrderedDict[int, Any]", job_id: int, value: Any) -> None:
+        store[job_id] = value
+        store.move_to_end(job_id)
+        while len(store) > MAX_TRACKED_JOBS:
+            store.popitem(last=False)
+
+    async def _publish_live(self, update: StatusUpdate) -> None:
+        state = update.live()
+        self._remember(self._live, update.job_id, state)
+        if not self._redis_enabled:
+            return
+        try:
+            await self.bus.async_client().set(f"job:{update.job_id}:live", json.dumps(state), ex=LIVE_TTL_SECONDS)
+        except Exception as exc:
+            logger.warning("job_progress_live_write_failed", job_id=update.job_id, error=str(exc))
+
+    async def latest(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Live status/message for a job (this process first, then Redis)."""
+        if job_id in self._live:
+            return self._live[job_id]
+        if not self._redis_enabled:
+            return None
+        try:
+            raw = await self.bus.async_client().get(f"job:{job_id}:live")
+        except Exception:
+            return None
+        return json.loads(raw) if raw else None
+
+    # --- DB write path ------------------------------------------------------
+
+    def _is_transition(self, update: StatusUpdate) -> bool:
+        return (
+            bool(update.fields)
+            or update.status in TERMINAL_STATUSES
+            or self._persisted_status.get(update.job_id) != update.status
+        )
+
+    async def record(self, job_id: int, status: str, message: str, fields: Optional[Dict[str, Any]] = None) -> None:
+        update = StatusUpdate(job_id, status, message, dict(fields or {}), seq=next(self._seq))
+        self.stats["recorded"] += 1
+        await self._publish_live(update)
+        if self._is_transition(update):
+            # Anything still buffered for this job is superseded by this write.
+            self._pending.pop(job_id, None)
+            await self._write([update])
+            return
+        if job_id in self._pending:
+            self.stats["coalesced"] += 1
+        self._pending[job_id] = update
+        self._ensure_flusher()
+
+    def _lock(self) -> asyncio.Lock:
+        # Bound to the running loop: each Celery job runs its own.
+        loop = asyncio.get_running_loop()
+        if self._write_lock is None or self._lock_loop is not loop:
+            self._write_lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._write_lock
+
+    async def _write(self, updates: List[StatusUpdate]) -> int:
+        async with self._lock():
+            # Updates recorded before the last write for their job are stale.
+            fresh = [u for u in updates if u.seq > self._written_seq.get(u.job_id, 0)]
+            if not fresh:
+                return 0
+            await self.persist(fresh)
+            self.stats["written"] += len(fresh)
+            for update in fresh:
+                self._remember(self._persisted_status, update.job_id, update.status)
+                self._remember(self._written_seq, update.job_id, update.seq)
+            return len(fresh)
+
+    async def flush(self) -> int:
+        """Write every buffered update in one batch. Returns the number written."""
+        if not self._pending:
+            return 0
+        batch = list(self._pending.values())
+        self._pending.clear()
+        try:
+            written = await self._write(batch)
+        except Exception as exc:
+            # Put back anything a newer record() has not replaced; retried next tick.
+            for update in batch:
+                self._pending.setdefault(update.job_id, update)
+            logger.warning("job_progress_flush_failed", jobs=len(batch), error=str(exc))
+            return 0
+        self.stats["flushes"] += 1
+        return written
+
+    def _ensure_flusher(self) -> None:
+        loop = asyncio.get_running_loop()
+        task = self._flusher
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return
+        self._flusher = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
@@ -0,0 +1,440 @@
+"""
+Job Scheduler - fair-share admission of video jobs to the Celery broker.
+
+Sending every upload straight to the `video` queue makes the broker a single
+FIFO: one user who uploads 50 videos occupies every worker until their batch
+drains. Jobs are now held here and admitted to the broker only while fewer
+than `job_scheduler_max_in_flight` are dispatched and unfinished:
+
+- Admission is deficit round-robin across users. Each user's quantum is
+  their tier weight, so a pro user gets three slots for every free-tier
+  slot, and a single user's backlog never blocks anyone else.
+- Admitted jobs carry a broker priority per tier. Celery's Redis transport
+  keeps one list per priority step and consumes lower numbers first.
+- Workers run with `acks_late` and a prefetch multiplier of 1 (celery_app),
+  so a long render never hoards queued messages.
+
+Waiting jobs stay `queued` in the database with WAITING_MESSAGE as their
+progress message, which lets a restarted API process recover them. Every
+API replica may hold the same waiting job in memory, so a job taken from
+the fair-share queue is first claimed with a conditional UPDATE (WAITING ->
+CLAIMED); only the replica whose update matched dispatches it.
+
+The in-flight cap is global: with claims enabled, free slots are counted
+from the database (claimed, dispatched or processing jobs), so a restarted
+API process or N replicas still admit at most `job_scheduler_max_in_flight`.
+`recover` seeds the local view from the same rows and runs again from
+`tick` every RECOVER_INTERVAL_SECONDS, which also returns claims orphaned by
+a cancelled pump to the waiting state.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import structlog
+from sqlalchemy import and_, func, or_, select, update
+
+from ..config import settings
+from ..db import SessionLocal
+from ..models import Job, JobStatus
+
+logger = structlog.get_logger()
+
+# Higher number = higher priority (RabbitMQ convention, used by the workers).
+TIER_PRIORITIES = {"enterprise": 9, "pro": 7, "standard": 5, "free": 3}
+# Deficit round-robin quantum per tier (jobs admitted per round).
+TIER_WEIGHTS = {"enterprise": 4, "pro": 3, "standard": 2, "free": 1}
+WAITING_MESSAGE = "Waiting for a worker slot (fair-share queue)."
+CLAIMED_MESSAGE = "Admitted by the fair-share queue; dispatching to a worker."
+DISPATCHED_PREFIX = "Queued for worker pickup"
+# A claim this old on a still-queued job belongs to a process that died mid-dispatch.
+STALE_CLAIM_SECONDS = 600
+RECOVER_INTERVAL_SECONDS = 60.0
+TERMINAL_STATUSES = {JobStatus.complete, JobStatus.failed}
+# Must match broker_transport_options["sep"] in celery_app.
+PRIORITY_SEP = ":"
+
+
+def _occupies_slot():
+    """Jobs holding a worker slot: claimed or dispatched but not started, or processing."""
+    return or_(
+        Job.status == JobStatus.processing,
+        and_(
+            Job.status == JobStatus.queued,
+            or_(Job.progress_message == CLAIMED_MESSAGE, Job.progress_message.startswith(DISPATCHED_PREFIX)),
+        ),
+    )
+
+
+def broker_priority(tier: str) -> int:
+    """Celery's Redis transport consumes lower numbers first (0 = highest)."""
+    return 9 - TIER_PRIORITIES.get(tier, 5)
+
+
+@dataclass
+class QueuedJob:
+    job_id: int
+    user_id: int
+    tier: str
+    args: List[Any] = field(default_factory=list)
+    cost: int = 1
+    enqueued_at: float = 0.0
+
+
+class FairShareQueue:
+    """Per-user FIFOs served by deficit round-robin weighted by tier."""
+
+    def __init__(self, weights: Optional[Dict[str, int]] = None):
+        self.weights = weights or TIER_WEIGHTS
+        self._queues: "OrderedDict[int, Deque[QueuedJob]]" = OrderedDict()
+        self._deficit: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def __contains__(self, job_id: int) -> bool:
+        return any(job.job_id == job_id for q in self._queues.values() for job in q)
+
+    def push(self, job: QueuedJob, front: bool = False) -> None:
+        queue = self._queues.get(job.user_id)
+        if queue is None:
+            queue = self._queues[job.user_id] = deque()
+            self._deficit[job.user_id] = 0
+        if front:
+            queue.appendleft(job)
+        else:
+            queue.append(job)
+
+    def pop(self) -> Optional[QueuedJob]:
+        while self._queues:
+            user_id, queue = next(iter(self._queues.items()))
+            head = queue[0]
+            if self._deficit[user_id] < head.cost:
+                self._deficit[user_id] += self.weights.get(head.tier, 1)
+                if self._deficit[user_id] < head.cost:
+                    self._queues.move_to_end(user_id)
+                    continue
+            job = queue.popleft()
+            self._deficit[user_id] -= job.cost
+            if not queue:
+                del self._queues[user_id]
+                del self._deficit[user_id]
+            elif self._deficit[user_id] < queue[0].cost:
+                self._queues.move_to_end(user_id)
+            return job
+        return None
+
+    def remove(self, job_id: int) -> bool:
+        for user_id, queue in list(self._queues.items()):
+            for job in queue:
+                if job.job_id == job_id:
+                    queue.remove(job)
+                    if not queue:
+                        del self._queues[user_id]
+                        del self._deficit[user_id]
+                    return True
+        return False
+
+    def jobs(self) -> List[QueuedJob]:
+        return [job for q in self._queues.values() for job in q]
+
+
+async def dispatch_to_celery(job: QueuedJob) -> str:
+    from ..tasks.video_tasks import process_video_task
+
+    queue_name = (settings.celery_video_queue or "video").strip() or "video"
+    task = await asyncio.wait_for(
+        asyncio.to_thread(
+            process_video_task.apply_async,
+            args=job.args,
+            queue=queue_name,
+            priority=broker_priority(job.tier),
+        ),
+        timeout=5.0,
+    )
+    return task.id
+
+
+class DatabaseClaims:
+    """Cross-process ownership of waiting jobs via conditional updates on `jobs`."""
+
+    async def claim(self, job_id: int) -> Optional[bool]:
+        """
+        True if this process now owns the job, False if another process
+        claimed it (or it is no longer waiting), None if its submitter has
+        not recorded it as waiting yet (try again later).
+        """
+        async with SessionLocal() as session:
+            result = await session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.queued, Job.progress_message == WAITING_MESSAGE)
+                .values(progress_message=CLAIMED_MESSAGE)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            if result.rowcount:
+                return True
+            row = (await session.execute(select(Job.status, Job.progress_message).where(Job.id == job_id))).first()
+        if row is None or row.status != JobStatus.queued:
+            return False
+        message = row.progress_message or ""
+        if message == CLAIMED_MESSAGE or message.startswith(DISPATCHED_PREFIX):
+            return False
+        return None
+
+    async def occupied(self) -> int:
+        """Worker slots held across every process."""
+        async with SessionLocal() as session:
+            return (await session.execute(select(func.count()).select_from(Job).where(_occupies_slot()))).scalar_one()
+
+    async def release(self, job_id: int) -> None:
+        """Hand a claimed job back (dispatch failed) so any process may admit it."""
+        async with SessionLocal() as session:
+            await session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.progress_message == CLAIMED_MESSAGE)
+                .values(progress_message=WAITING_MESSAGE)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+    async def reset_stale(self, older_than: timedelta) -> int:
+        """Return claims abandoned by a crashed process to the waiting state."""
+        async with SessionLocal() as session:
+            result = await session.execute(
+                update(Job)
+                .where(
+                    Job.status == JobStatus.queued,
+                    Job.progress_message == CLAIMED_MESSAGE,
+                    Job.updated_at < datetime.utcnow() - older_than,
+                )
+                .values(progress_message=WAITING_MESSAGE)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        return result.rowcount or 0
+
+
+class JobScheduler:
+    def __init__(
+        self,
+        dispatch: Callable[[QueuedJob], Awaitable[str]] = dispatch_to_celery,
+        max_in_flight: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        on_admit: Optional[Callable[[Dict[int, str]], Awaitable[None]]] = None,
+        claims: Optional[DatabaseClaims] = None,
+    ):
+        self.dispatch = dispatch
+        self.on_admit = on_admit
+        # None = single process (tests, local dev): no cross-process claiming.
+        self.claims = claims
+        self.max_in_flight = max(1, max_in_flight or settings.job_scheduler_max_in_flight)
+        self.clock = clock
+        self.waiting = FairShareQueue()
+        self.in_flight: Dict[int, QueuedJob] = {}
+        self.waits: Deque[float] = deque(maxlen=500)
+        self._lock = asyncio.Lock()
+        self._broker = None
+        self._recovered_at: Optional[float] = None
+
+    async def submit(self, job: QueuedJob) -> Optional[str]:
+        """
+        Queue a job and admit whatever fits. Returns the task id if this job
+        was dispatched right away, None if it is waiting for a slot; a
+        dispatch failure for this job is raised to the caller.
+        """
+        job.enqueued_at = job.enqueued_at or self.clock()
+        self.waiting.push(job)
+        admitted = await self.pump(raise_for=job.job_id)
+        return admitted.get(job.job_id)
+
+    async def pump(self, raise_for: Optional[int] = None) -> Dict[int, str]:
+        """Dispatch waiting jobs in fair-share order while slots are free."""
+        admitted: Dict[int, str] = {}
+        deferred: List[QueuedJob] = []
+        failure: Optional[Exception] = None
+        async with self._lock:
+            slots = await self._free_slots()
+            while len(admitted) < slots:
+                job = self.waiting.pop()
+                if job is None:
+                    break
+                # The submitting request's own job is not yet visible to other processes.
+                claimed = False
+                if self.claims is not None and job.job_id != raise_for:
+                    try:
+                        claimed = await self.claims.claim(job.job_id)
+                    except Exception as e:
+                        logger.warning("job_admission_claim_failed", job_id=job.job_id, error=str(e))
+                        self.waiting.push(job, front=True)
+                        break
+                    if claimed is None:
+                        deferred.append(job)
+                        continue
+                    if not claimed:
+                        logger.info("job_admission_claimed_elsewhere", job_id=job.job_id)
+                        continue
+                try:
+                    task_id = await self.dispatch(job)
+                except Exception as e:
+                    if job.job_id == raise_for:
+                        failure = e
+                        break
+                    logger.warning("job_admission_dispatch_failed", job_id=job.job_id, error=str(e))
+                    if claimed:
+                        try:
+                            await self.claims.release(job.job_id)
+                        except Exception as release_error:
+                            logger.warning("job_admission_release_failed", job_id=job.job_id, error=str(release_error))
+                    self.waiting.push(job, front=True)
+                    break
+                self.in_flight[job.job_id] = job
+                self.waits.append(self.clock() - job.enqueued_at)
+                admitted[job.job_id] = task_id
+                logger.info("job_admitted", job_id=job.job_id, user_id=job.user_id, tier=job.tier, task_id=task_id)
+            for job in deferred:
+                self.waiting.push(job)
+        # The submitting request records its own job's message.
+        others = {job_id: task_id for job_id, task_id in admitted.items() if job_id != raise_for}
+        if others and self.on_admit:
+            await self.on_admit(others)
+        if failure is not None:
+            raise failure
+        return admitted
+
+    async def _free_slots(self) -> int:
+        occupied = len(self.in_flight)
+        if self.claims is not None and self.waiting:
+            try:
+                occupied = max(occupied, await self.claims.occupied())
+            except Exception as e:
+                logger.warning("job_admission_count_failed", error=str(e))
+        return self.max_in_flight - occupied
+
+    def release(self, job_id: int) -> None:
+        self.in_flight.pop(job_id, None)
+
+    def discard(self, job_id: int) -> None:
+        self.waiting.remove(job_id)
+        self.in_flight.pop(job_id, None)
+
+    # --- database reconciliation ---------------------------------------------
+
+    async def reconcile(self) -> None:
+        """Release finished jobs and drop cancelled waiting ones."""
+        ids = list(self.in_flight) + [job.job_id for job in self.waiting.jobs()]
+        if not ids:
+            return
+        async with SessionLocal() as session:
+            rows = (await session.execute(
+                select(Job.id, Job.status, Job.cancel_requested).where(Job.id.in_(ids))
+            )).all()
+        state = {row.id: row for row in rows}
+        for job_id in ids:
+            row = state.get(job_id)
+            if row is None or row.status in TERMINAL_STATUSES or row.cancel_requested:
+                self.discard(job_id)
+
+    async def recover(self) -> int:
+        """
+        Re-queue jobs that were waiting when the API process last stopped and
+        count jobs already holding a slot as in flight. Other replicas may
+        recover the same jobs; the claim in `pump` makes sure each is
+        dispatched once. Returns the number of waiting jobs found.
+        """
+        self._recovered_at = self.clock()
+        if self.claims is not None:
+            reset = await self.claims.reset_stale(timedelta(seconds=STALE_CLAIM_SECONDS))
+            if reset:
+                logger.info("job_admission_stale_claims_reset", jobs=reset)
+        async with SessionLocal() as session:
+            jobs = (await session.execute(
+                select(Job)
+                .where(Job.status == JobStatus.queued, Job.progress_message == WAITING_MESSAGE)
+                .order_by(Job.created_at, Job.id)
+            )).scalars().all()
+            running = (await session.execute(select(Job).where(_occupies_slot()))).scalars().all()
+        for job in running:
+            if job.id not in self.in_flight:
+                self.waiting.remove(job.id)
+                self.in_flight[job.id] = queued_job_from_row(job, enqueued_at=self.clock())
+        for job in jobs:
+            if job.id not in self.in_flight and job.id not in self.waiting:
+                self.waiting.push(queued_job_from_row(job, enqueued_at=self.clock()))
+        return len(jobs)
+
+    async def tick(self) -> None:
+        if self._recovered_at is None or self.clock() - self._recovered_at >= RECOVER_INTERVAL_SECONDS:
+            await self.recover()
+        await self.reconcile()
+        await self.pump()
+
+    # --- metrics ----------------------------------------------------------------
+
+    def metrics(self) -> Dict[str, Any]:
+        waiting = self.waiting.jobs()
+        now = self.clock()
+        by_tier: Dict[str, int] = {}
+        by_user: Dict[int, int] = {}
+        for job in waiting:
+            by_tier[job.tier] = by_tier.get(job.tier, 0) + 1
+            by_user[job.user_id] = by_user.get(job.user_id, 0) + 1
+        waits = sorted(self.waits)
+        return {
+            "waiting": len(waiting),
+            "in_flight": len(self.in_flight),
+            "max_in_flight": self.max_in_flight,
+            "waiting_by_tier": by_tier,
+            "top_waiting_users": dict(sorted(by_user.items(), key=lambda item: -item[1])[:10]),
+            "oldest_wait_seconds": round(max((now - job.enqueued_at for job in waiting), default=0.0), 2),
+            "admission_wait_p95_seconds": round(waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+        }
+
+    def broker_depth(self) -> Optional[Dict[str, int]]:
+        """Messages waiting in the broker per priority list (Redis only)."""
+        if not settings.redis_url:
+            return None
+        try:
+            import redis
+
+            if self._broker is None:
+                self._broker = redis.Redis.from_url(settings.redis_url, socket_timeout=2)
+            queue_name = (settings.celery_video_queue or "video").strip() or "video"
+            keys = [queue_name] + [f"{queue_name}{PRIORITY_SEP}{step}" for step in range(1, 10)]
+            pipe = self._broker.pipeline()
+            for key in keys:
+                pipe.llen(key)
+            return {str(step): depth for step, depth in enumerate(pipe.execute())}
+        except Exception as e:
+            logger.warning("broker_depth_failed", error=str(e))
+            return None
+
+
+def queued_job_from_row(job: Job, enqueued_at: float = 0.0) -> QueuedJob:
+    return QueuedJob(
+        job_id=job.id,
+        user_id=job.user_id,
+        tier=job.tier,
+        args=[job.id, job.source_path, job.pacing, job.mood, job.ratio, job.tier, job.platform, job.brand_safety],
+        enqueued_at=enqueued_at,
+    )
+
+
+async def _mark_dispatched(admitted: Dict[int, str]) -> None:
+    try:
+        async with SessionLocal() as session:
+            for job_id, task_id in admitted.items():
+                job = await session.get(Job, job_id)
+                if job and job.progress_message in (WAITING_MESSAGE, CLAIMED_MESSAGE):
+                    job.progress_message = f"{DISPATCHED_PREFIX} (task {str(task_id)[:8]})."
+            await session.commit()
+    except Exception as e:
+        logger.warning("job_admission_mark_failed", error=str(e))
+
+
+job_scheduler = JobScheduler(on_admit=_mark_dispatched, claims=DatabaseClaims())
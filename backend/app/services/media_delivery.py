@@ -0,0 +1,358 @@
+"""
+Media Delivery - Makes rendered outputs streamable.
+
+- Guarantees MP4 outputs are faststart (moov before mdat) so playback can
+  begin from the first bytes, remuxing with stream copy only when needed.
+- Serves single byte ranges (206 Partial Content) for seeking.
+- Optionally packages a finished render into an HLS/CMAF (fMP4) ladder with
+  one decode pass; the package is built once per output and cached next to it.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import shutil
+import struct
+from dataclasses import dataclass
+from email.utils import formatdate
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+import structlog
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from ..config import settings
+from .ffmpeg_runner import FFmpegRunner, ffmpeg_runner
+from .file_registry import file_registry
+from .media_analysis import media_analyzer
+
+logger = structlog.get_logger()
+
+RANGE_READ_SIZE = 1024 * 1024
+HLS_MASTER_NAME = "master.m3u8"
+HLS_PACKAGE_NAME = "package.json"
+HLS_SEGMENT_SECONDS = 4
+
+# (height, video kbps); rungs above the source height are dropped.
+HLS_LADDER: List[Tuple[int, int]] = [(1080, 5000), (720, 2800), (480, 1200), (360, 700)]
+
+
+def is_faststart(path: str | Path) -> Optional[bool]:
+    """
+    Walk top-level MP4 boxes and report whether `moov` precedes `mdat`.
+    Returns None when the file is not a parsable ISO-BMFF file.
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as handle:
+            offset = 0
+            while offset + 8 <= size:
+                handle.seek(offset)
+                header = handle.read(8)
+                if len(header) < 8:
+                    return None
+                box_size, box_type = struct.unpack(">I4s", header)
+                if box_size == 1:
+                    box_size = struct.unpack(">Q", handle.read(8))[0]
+                elif box_size == 0:
+                    box_size = size - offset
+                if box_type == b"moov":
+                    return True
+                if box_type == b"mdat":
+                    return False
+                if box_size < 8:
+                    return None
+                offset += box_size
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into inclusive (start, end).
+    Returns None to serve the whole file (no header, multi-range, other units);
+    raises 416 when the range cannot be satisfied.
+    """
+    if not header or size <= 0:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                raise ValueError
+            start, end = max(0, size - suffix), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+
+def _iter_file_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    with path.open("rb") as handle:
+        handle.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = handle.read(min(RANGE_READ_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def file_response(
+    path: str | Path,
+    request: Request,
+    media_type: str = "video/mp4",
+    filename: Optional[str] = None,
+    inline: bool = False,
+) -> Response:
+    """Range-aware file response with validators for conditional/If-Range requests."""
+    file_path = Path(path)
+    stat = file_path.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": "private, max-age=3600",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    if_range = request.headers.get("if-range")
+    byte_range = None
+    if not if_range or if_range == etag:
+        byte_range = parse_range(request.headers.get("range"), stat.st_size)
+
+    if byte_range is None:
+        return FileResponse(
+            path=file_path,
+            media_type=media_type,
+            filename=filename,
+            headers=headers,
+            content_disposition_type="inline" if inline else "attachment",
+        )
+
+    start, end = byte_range
+    headers.update({
+        "Content-Range": f"bytes {start}-{end}/{stat.st_size}",
+        "Content-Length": str(end - start + 1),
+    })
+    if filename:
+        disposition = "inline" if inline else "attachment"
+        headers["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+    return StreamingResponse(
+        _iter_file_range(file_path, start, end),
+        status_code=206,
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+@dataclass
+class HlsVariant:
+    height: int
+    video_kbps: int
+
+
+def select_ladder(source_height: int, heights: Optional[List[int]] = None) -> List[HlsVariant]:
+    """Ladder rungs at or below the source height (always at least one rung)."""
+    allowed = set(heights) if heights else None
+    rungs = [(h, kbps) for h, kbps in HLS_LADDER if allowed is None or h in allowed]
+    if not rungs:
+        rungs = HLS_LADDER[-1:]
+    picked = [HlsVariant(h, kbps) for h, kbps in rungs if not source_height or h <= source_height]
+    if not picked:
+        h, kbps = min(rungs)
+        picked = [HlsVariant(min(h, source_height) if source_height else h, kbps)]
+    return picked
+
+
+def build_hls_command(
+    ffmpeg_bin: str,
+    video_path: str,
+    out_dir: Path,
+    variants: List[HlsVariant],
+    has_audio: bool,
+    fps: float = 30.0,
+) -> List[str]:
+    """One decode, `split` into every rung, packaged as fMP4 HLS with a master playlist."""
+    n = len(variants)
+    gop = max(1, int(round((fps or 30.0) * HLS_SEGMENT_SECONDS / 2)))
+    graph = [f"[0:v]split={n}" + "".join(f"[s{i}]" for i in range(n))] if n > 1 else ["[0:v]null[s0]"]
+    for i, variant in enumerate(variants):
+        graph.append(f"[s{i}]scale=-2:{variant.height}[v{i}]")
+
+    cmd = [ffmpeg_bin, "-y", "-hide_banner", "-i", video_path, "-filter_complex", ";".join(graph)]
+    for i, variant in enumerate(variants):
+        cmd += ["-map", f"[v{i}]"]
+        if has_audio:
+            cmd += ["-map", "0:a:0"]
+        cmd += [
+            f"-b:v:{i}", f"{variant.video_kbps}k",
+            f"-maxrate:v:{i}", f"{int(variant.video_kbps * 1.07)}k",
+            f"-bufsize:v:{i}", f"{variant.video_kbps * 2}k",
+        ]
+    cmd += [
+        "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "main",
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+    ]
+    if has_audio:
+        cmd += ["-c:a", "aac", "-b:a", "128k", "-ac", "2"]
+    stream_map = " ".join(f"v:{i},a:{i}" if has_audio else f"v:{i}" for i in range(n))
+    cmd += [
+        "-f", "hls",
+        "-hls_time", str(HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        "-hls_segment_type", "fmp4",
+        "-hls_flags", "independent_segments",
+        "-hls_fmp4_init_filename", "init.mp4",
+        "-hls_segment_filename", str(out_dir / "v%v" / "seg_%05d.m4s"),
+        "-master_pl_name", HLS_MASTER_NAME,
+        "-var_stream_map", stream_map,
+        str(out_dir / "v%v" / "index.m3u8"),
+    ]
+    return cmd
+
+
+class MediaDelivery:
+    """Faststart guarantee plus cached HLS packaging for rendered outputs."""
+
+    def __init__(self, runner: Optional[FFmpegRunner] = None):
+        self.runner = runner or ffmpeg_runner
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def ensure_faststart(self, video_path: str | Path, timeout: float = 300.0) -> bool:
+        """Remux (stream copy) so moov is at the front. True when the file is faststart afterwards."""
+        path = Path(video_path)
+        state = is_faststart(path)
+        if state is None:
+            return False
+        if state:
+            return True
+        tmp = path.with_name(f".{path.stem}.faststart{path.suffix}")
+        cmd = [
+            media_analyzer.ffmpeg, "-y", "-hide_banner",
+            "-i", str(path),
+            "-map", "0", "-c", "copy",
+            "-movflags", "+faststart",
+            str(tmp),
+        ]
+        run = await self.runner.run(cmd, timeout=timeout)
+        if not run.success or is_faststart(tmp) is not True:
+            tmp.unlink(missing_ok=True)
+            logger.warning("faststart_remux_failed", path=str(path), error=(run.error or "")[-300:])
+            return False
+        os.replace(tmp, path)
+        logger.info("faststart_remuxed", path=str(path), elapsed=run.elapsed_seconds)
+        return True
+
+    @staticmethod
+    def hls_dir(video_path: str | Path) -> Path:
+        path = Path(video_path)
+        return path.with_name(f"{path.stem}-hls")
+
+    @staticmethod
+    def _fingerprint(video_path: Path) -> Dict[str, Any]:
+        stat = video_path.stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def cached_hls(self, video_path: str | Path) -> Optional[Dict[str, Any]]:
+        """Package manifest if a complete HLS package exists for this exact output."""
+        path = Path(video_path)
+        out = self.hls_dir(path)
+        manifest_path = out / HLS_PACKAGE_NAME
+        if not path.exists() or not (out / HLS_MASTER_NAME).exists() or not manifest_path.exists():
+            return None
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if manifest.get("source") != self._fingerprint(path):
+            return None
+        return manifest
+
+    def is_packaging(self, video_path: str | Path) -> bool:
+        lock = self._locks.get(str(Path(video_path).absolute()))
+        return bool(lock and lock.locked())
+
+    async def package_hls(self, video_path: str | Path, timeout: float = 1800.0) -> Optional[Dict[str, Any]]:
+        """Build (or return the cached) HLS/CMAF ladder for a finished render."""
+        path = Path(video_path)
+        if not path.exists():
+            return None
+        lock = self._locks.setdefault(str(path.absolute()), asyncio.Lock())
+        async with lock:
+            cached = self.cached_hls(path)
+            if cached:
+                return cached
+
+            metadata = await media_analyzer.get_metadata(str(path))
+            if not metadata:
+                logger.warning("hls_package_no_metadata", path=str(path))
+                return None
+            heights = [int(h) for h in str(settings.hls_ladder_heights or "").split(",") if h.strip().isdigit()]
+            variants = select_ladder(metadata.height, heights)
+
+            # Build beside the target and swap in whole, so readers never see a half package.
+            final_dir = self.hls_dir(path)
+            work_dir = final_dir.with_name(f"{final_dir.name}.tmp-{uuid4().hex[:8]}")
+            for i in range(len(variants)):
+                (work_dir / f"v{i}").mkdir(parents=True, exist_ok=True)
+            cmd = build_hls_command(
+                media_analyzer.ffmpeg, str(path), work_dir, variants, metadata.has_audio, metadata.fps
+            )
+            run = await self.runner.run(cmd, duration=metadata.duration, timeout=timeout)
+            if not run.success or not (work_dir / HLS_MASTER_NAME).exists():
+                shutil.rmtree(work_dir, ignore_errors=True)
+                logger.error("hls_package_failed", path=str(path), error=(run.error or "")[-500:])
+                return None
+
+            manifest = {
+                "source": self._fingerprint(path),
+                "master": HLS_MASTER_NAME,
+                "segment_seconds": HLS_SEGMENT_SECONDS,
+                "variants": [
+                    {"height": v.height, "video_kbps": v.video_kbps, "playlist": f"v{i}/index.m3u8"}
+                    for i, v in enumerate(variants)
+                ],
+            }
+            (work_dir / HLS_PACKAGE_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+            if final_dir.exists():
+                shutil.rmtree(final_dir, ignore_errors=True)
+            os.replace(work_dir, final_dir)
+            await file_registry.track(final_dir, "output")
+            logger.info("hls_packaged", path=str(path), variants=len(variants), elapsed=run.elapsed_seconds)
+            return manifest
+
+    async def finalize_output(self, video_path: str | Path) -> None:
+        """Pre-completion hook: make the render faststart. Never raises."""
+        try:
+            await self.ensure_faststart(video_path)
+        except Exception as exc:
+            logger.warning("media_delivery_finalize_failed", path=str(video_path), error=str(exc))
+
+    async def package_if_enabled(self, video_path: str | Path) -> None:
+        """Post-completion hook: build the HLS ladder when enabled. Never raises."""
+        if not settings.hls_packaging_enabled:
+            return
+        try:
+            await self.package_hls(video_path)
+        except Exception as exc:
+            logger.warning("hls_package_error", path=str(video_path), error=str(exc))
+
+
+# Global delivery instance
+media_delivery = MediaDelivery()
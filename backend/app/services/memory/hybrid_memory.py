@@ -1,15 +1,29 @@
 """
 Hybrid Memory Service - Orchestrates Redis short-term and pgvector long-term memory.
 Provides unified interface for agent context retrieval.
+
+Agent context is assembled from independent tiers (style profile, recent
+feedback, top recipes) fetched concurrently, each under its own deadline, so
+memory costs at most one round trip. A tier that times out or fails is left
+out of the context and skipped for a cooldown. Assembled context is memoized
+per (job, agent) until the job finishes or the user records new feedback.
 """
+import asyncio
 import hashlib
+import time
 import structlog
-from typing import Optional, Dict, Any, List
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+from ...config import settings
 from .redis_store import RedisMemoryStore, redis_store
 from .vector_store import VectorMemoryStore, StyleProfile, Recipe, vector_store
 
 logger = structlog.get_logger()
 
+CONTEXT_TIERS = ("profile", "feedback", "recipes")
+# Memoized contexts kept at most (jobs that never call forget_job age out).
+MAX_MEMOIZED_CONTEXTS = 512
+
 
 class HybridMemoryService:
     """
@@ -21,30 +35,96 @@ class HybridMemoryService:
     def __init__(
         self, 
         redis: RedisMemoryStore = None,
-        vector: VectorMemoryStore = None
+        vector: VectorMemoryStore = None,
+        tier_timeouts: Optional[Dict[str, float]] = None,
+        tier_cooldown: Optional[float] = None,
     ):
         self.redis = redis or redis_store
         self.vector = vector or vector_store
+        default_timeout = settings.memory_tier_timeout_seconds
+        self.tier_timeouts = {tier: default_timeout for tier in CONTEXT_TIERS}
+        self.tier_timeouts.update(tier_timeouts or {})
+        self.tier_cooldown = settings.memory_tier_cooldown_seconds if tier_cooldown is None else tier_cooldown
+        self._skip_until: Dict[str, float] = {}
+        self._contexts: "OrderedDict[Tuple[int, str], Tuple[int, str]]" = OrderedDict()
+        self._inflight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "tier_timeouts": 0, "tier_errors": 0}
     
-    async def get_agent_context(self, user_id: int, job_id: Optional[int] = None) -> str:
+    async def get_agent_context(
+        self,
+        user_id: int,
+        job_id: Optional[int] = None,
+        agent: str = "default",
+    ) -> str:
         """
         Build comprehensive context for agent prompts.
         Combines short-term and long-term memory.
         """
+        if job_id is None:
+            return await self._assemble(user_id)
+        
+        key = (job_id, agent)
+        cached = self._contexts.get(key)
+        if cached is not None and cached[0] == user_id:
+            self._contexts.move_to_end(key)
+            self.stats["hits"] += 1
+            return cached[1]
+        
+        # Concurrent callers for the same job and agent share one fetch
+        # (when they run on the same event loop).
+        loop = asyncio.get_running_loop()
+        pending = self._inflight.get(key)
+        if pending is not None and pending.get_loop() is loop and not pending.done():
+            try:
+                context = await asyncio.shield(pending)
+                self.stats["hits"] += 1
+                return context
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The fetching caller was cancelled; fetch for ourselves.
+        
+        self.stats["misses"] += 1
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            context = await self._assemble(user_id)
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        future.set_result(context)
+        self._contexts[key] = (user_id, context)
+        while len(self._contexts) > MAX_MEMOIZED_CONTEXTS:
+            self._contexts.popitem(last=False)
+        return context
+    
+    async def _assemble(self, user_id: int) -> str:
+        fetchers = {
+            "profile": lambda: self.vector.get_style_profile(user_id),
+            "feedback": lambda: self.redis.get_recent_context(user_id, "feedback", count=3),
+            "recipes": lambda: self.vector.get_user_recipes(user_id, limit=3),
+        }
+        tiers = [tier for tier in CONTEXT_TIERS if self._skip_until.get(tier, 0.0) <= time.monotonic()]
+        results = await asyncio.gather(*(self._fetch_tier(tier, fetchers[tier]) for tier in tiers))
+        fetched = dict(zip(tiers, results))
+        
         context_parts = []
         
-        # 1. Get user style profile from long-term memory
-        profile = await self.vector.get_style_profile(user_id)
+        # 1. User style profile from long-term memory
+        profile = fetched.get("profile")
         if profile:
             context_parts.append(self._format_style_profile(profile))
         
-        # 2. Get recent feedback from short-term memory
-        recent_feedback = await self.redis.get_recent_context(user_id, "feedback", count=3)
+        # 2. Recent feedback from short-term memory
+        recent_feedback = fetched.get("feedback")
         if recent_feedback:
             context_parts.append("**Recent Feedback:**\n" + "\n".join([f"- {f}" for f in recent_feedback]))
         
-        # 3. Get user's top recipes
-        recipes = await self.vector.get_user_recipes(user_id, limit=3)
+        # 3. User's top recipes
+        recipes = fetched.get("recipes")
         if recipes:
             context_parts.append(self._format_recipes(recipes))
         
@@ -53,6 +133,29 @@ class HybridMemoryService:
         
         return "\n\n**MEMORY CONTEXT (User Preferences):**\n" + "\n\n".join(context_parts)
     
+    async def _fetch_tier(self, tier: str, fetch) -> Any:
+        """Fetch one tier under its deadline; None (and a cooldown) if it is slow or broken."""
+        timeout = self.tier_timeouts.get(tier, settings.memory_tier_timeout_seconds)
+        try:
+            return await asyncio.wait_for(fetch(), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.stats["tier_timeouts"] += 1
+            logger.warning("memory_tier_timeout", tier=tier, timeout_seconds=timeout)
+        except Exception as e:
+            self.stats["tier_errors"] += 1
+            logger.warning("memory_tier_failed", tier=tier, error=str(e))
+        self._skip_until[tier] = time.monotonic() + self.tier_cooldown
+        return None
+    
+    def forget_job(self, job_id: int) -> None:
+        """Drop memoized contexts once a job has finished."""
+        for key in [key for key in self._contexts if key[0] == job_id]:
+            del self._contexts[key]
+    
+    def _forget_user(self, user_id: int) -> None:
+        for key in [key for key, (owner, _) in self._contexts.items() if owner == user_id]:
+            del self._contexts[key]
+    
     def _format_style_profile(self, profile: StyleProfile) -> str:
         """Format style profile for prompt injection."""
         parts = [
@@ -77,6 +180,8 @@ class HybridMemoryService:
     async def record_feedback(self, user_id: int, feedback: str) -> None:
         """Record user feedback in short-term memory."""
         await self.redis.add_recent_context(user_id, "feedback", feedback)
+        # The user's next take should see this feedback.
+        self._forget_user(user_id)
         
         # Extract preferences if feedback contains persistent patterns
         if any(kw in feedback.lower() for kw in ["always", "never", "prefer", "hate"]):
@@ -146,6 +251,13 @@ class HybridMemoryService:
         content = prompt + json.dumps(payload, sort_keys=True)
         return hashlib.sha256(content.encode()).hexdigest()
     
+    async def warm(self) -> None:
+        """Open long-term memory before jobs read it under per-tier deadlines."""
+        try:
+            await self.vector.warm()
+        except Exception as e:
+            logger.warning("memory_warm_failed", error=str(e))
+    
     async def close(self):
         """Close all connections."""
         await self.redis.close()
@@ -0,0 +1,217 @@
+"""
+Local Vector Store - SQLite persistence plus an in-process ANN index.
+
+Stand-in for the pgvector store on local runs: same tables and upsert
+semantics, embeddings stored as float32 blobs, similarity search served by
+`IVFFlatIndex` (loaded from SQLite on first use). sqlite3 is blocking, so
+every call runs in a worker thread behind one lock.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import structlog
+
+from .ann_index import IVFFlatIndex
+from .vector_store import Recipe, StyleProfile
+
+logger = structlog.get_logger()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recipes (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    description TEXT,
+    parameters TEXT,
+    success_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    embedding BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_recipes_user ON recipes(user_id);
+CREATE TABLE IF NOT EXISTS style_profiles (
+    user_id INTEGER PRIMARY KEY,
+    pacing_preference TEXT DEFAULT 'medium',
+    color_preference TEXT DEFAULT 'neutral',
+    audio_preference TEXT DEFAULT 'balanced',
+    favorite_transitions TEXT DEFAULT '[]',
+    avoid_patterns TEXT DEFAULT '[]',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+RECIPE_COLUMNS = "id, user_id, name, description, parameters, success_count, created_at"
+
+
+class LocalVectorStore:
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._index: Optional[IVFFlatIndex] = None
+        self._owners: Dict[int, Set[str]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript(SCHEMA)
+            logger.info("local_vector_store_opened", path=self.path)
+        return self._conn
+
+    def _loaded_index(self) -> IVFFlatIndex:
+        if self._index is None:
+            index = IVFFlatIndex(self.dim)
+            rows = self._connect().execute(
+                "SELECT id, user_id, embedding FROM recipes WHERE embedding IS NOT NULL"
+            ).fetchall()
+            if rows:
+                index.add([r["id"] for r in rows], [np.frombuffer(r["embedding"], dtype=np.float32) for r in rows])
+            for r in rows:
+                self._owners.setdefault(r["user_id"], set()).add(r["id"])
+            self._index = index
+        return self._index
+
+    async def _run(self, fn, *args):
+        def locked():
+            with self._lock:
+                return fn(*args)
+        return await asyncio.to_thread(locked)
+
+    # --- recipes --------------------------------------------------------------
+
+    def _save_recipes(self, batch: Sequence[Tuple[Recipe, Optional[List[float]]]]) -> int:
+        conn = self._connect()
+        index = self._loaded_index()
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO recipes (id, user_id, name, description, parameters, success_count, embedding)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    success_count = recipes.success_count + 1,
+                    parameters = excluded.parameters,
+                    embedding = COALESCE(recipes.embedding, excluded.embedding)
+                """,
+                [
+                    (
+                        recipe.id, recipe.user_id, recipe.name, recipe.description,
+                        json.dumps(recipe.parameters), recipe.success_count,
+                        np.asarray(embedding, dtype=np.float32).tobytes() if embedding else None,
+                    )
+                    for recipe, embedding in batch
+                ],
+            )
+        # Like the pgvector upsert, an existing embedding is kept.
+        new: Dict[str, Tuple[Recipe, List[float]]] = {}
+        for recipe, embedding in batch:
+            if embedding and recipe.id not in index and recipe.id not in new:
+                new[recipe.id] = (recipe, embedding)
+        fresh = list(new.values())
+        if fresh:
+            index.add([recipe.id for recipe, _ in fresh], [embedding for _, embedding in fresh])
+            for recipe, _ in fresh:
+                self._owners.setdefault(recipe.user_id, set()).add(recipe.id)
+        return len(batch)
+
+    async def save_recipes(self, batch: Sequence[Tuple[Recipe, Optional[List[float]]]]) -> int:
+        return await self._run(self._save_recipes, batch)
+
+    def _recipes_by_id(self, ids: List[str]) -> Dict[str, Recipe]:
+        placeholders = ",".join("?" for _ in ids)
+        rows = self._connect().execute(
+            f"SELECT {RECIPE_COLUMNS} FROM recipes WHERE id IN ({placeholders})", ids
+        ).fetchall()
+        return {row["id"]: _recipe(row) for row in rows}
+
+    def _find_similar(self, user_id: int, query: List[float], limit: int) -> List[Recipe]:
+        index = self._loaded_index()
+        owned = self._owners.get(user_id)
+        if not owned:
+            return []
+        hits = index.search(query, limit, among=owned)
+        found = self._recipes_by_id([item_id for item_id, _ in hits])
+        return [found[item_id] for item_id, _ in hits if item_id in found]
+
+    async def find_similar_recipes(self, user_id: int, query_embedding: List[float], limit: int = 5) -> List[Recipe]:
+        return await self._run(self._find_similar, user_id, query_embedding, limit)
+
+    def _user_recipes(self, user_id: int, limit: int) -> List[Recipe]:
+        rows = self._connect().execute(
+            f"SELECT {RECIPE_COLUMNS} FROM recipes WHERE user_id = ? ORDER BY success_count DESC LIMIT ?",
+            (user_id, limit),
+        ).fetchall()
+        return [_recipe(row) for row in rows]
+
+    async def get_user_recipes(self, user_id: int, limit: int = 10) -> List[Recipe]:
+        return await self._run(self._user_recipes, user_id, limit)
+
+    # --- style profiles -------------------------------------------------------
+
+    def _style_profile(self, user_id: int) -> Optional[StyleProfile]:
+        row = self._connect().execute("SELECT * FROM style_profiles WHERE user_id = ?", (user_id,)).fetchone()
+        if not row:
+            return None
+        return StyleProfile(
+            user_id=row["user_id"],
+            pacing_preference=row["pacing_preference"],
+            color_preference=row["color_preference"],
+            audio_preference=row["audio_preference"],
+            favorite_transitions=json.loads(row["favorite_transitions"] or "[]"),
+            avoid_patterns=json.loads(row["avoid_patterns"] or "[]"),
+        )
+
+    async def get_style_profile(self, user_id: int) -> Optional[StyleProfile]:
+        return await self._run(self._style_profile, user_id)
+
+    def _update_style_profile(self, profile: StyleProfile) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO style_profiles
+                (user_id, pacing_preference, color_preference, audio_preference,
+                 favorite_transitions, avoid_patterns, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    pacing_preference = excluded.pacing_preference,
+                    color_preference = excluded.color_preference,
+                    audio_preference = excluded.audio_preference,
+                    favorite_transitions = excluded.favorite_transitions,
+                    avoid_patterns = excluded.avoid_patterns,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (profile.user_id, profile.pacing_preference, profile.color_preference, profile.audio_preference,
+                 json.dumps(profile.favorite_transitions), json.dumps(profile.avoid_patterns)),
+            )
+
+    async def update_style_profile(self, profile: StyleProfile) -> None:
+        await self._run(self._update_style_profile, profile)
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._index = None
+        self._owners = {}
+
+    async def close(self) -> None:
+        await self._run(self._close)
+
+
+def _recipe(row: Any) -> Recipe:
+    return Recipe(
+        id=row["id"],
+        user_id=row["user_id"],
+        name=row["name"],
+        description=row["description"],
+        parameters=json.loads(row["parameters"]) if row["parameters"] else {},
+        success_count=row["success_count"],
+        created_at=str(row["created_at"]),
+    )
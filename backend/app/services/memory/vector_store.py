@@ -1,16 +1,31 @@
 """
 Vector Memory Store - Long-term memory using pgvector for semantic search.
 Stores user style profiles, successful patterns (recipes), and preferences.
+
+Similarity search is served by an HNSW or IVFFlat index (VECTOR_INDEX_TYPE)
+that the store creates and keeps sized. Without a pgvector database the
+store falls back to SQLite with an in-process ANN index (local_store.py).
 """
+import asyncio
 import json
 import hashlib
+import re
 import structlog
-from typing import Optional, Any, Dict, List
+from typing import Optional, Any, Dict, List, Sequence, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict
 
+from ...config import settings
+
 logger = structlog.get_logger()
 
+# Rows per IVFFlat list (pgvector's guidance up to ~1M rows); below
+# IVFFLAT_MIN_ROWS the centroids would be meaningless, so no index is built.
+IVFFLAT_ROWS_PER_LIST = 1000
+IVFFLAT_MIN_ROWS = 10000
+# Inserts between index maintenance checks.
+INDEX_CHECK_EVERY = 1000
+
 # pgvector and asyncpg (lazy import)
 try:
     import asyncpg
@@ -61,32 +76,89 @@ class VectorMemoryStore:
     
     EMBEDDING_DIM = 1536  # OpenAI text-embedding-3-small dimension
     
-    def __init__(self, database_url: str = None):
+    def __init__(self, database_url: str = None, local_path: Optional[str] = None, index_type: str = "hnsw"):
         self.database_url = database_url
+        self.local_path = local_path
+        self.index_type = (index_type or "none").lower()
         self._pool: Optional[Any] = None
+        self._pool_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pool_init: Optional[asyncio.Task] = None
+        self._local: Optional[Any] = None
+        self._inserts_since_check = 0
+        self._iterative_scan = False
     
     async def _get_pool(self):
-        """Lazy initialize connection pool."""
+        """
+        Lazy initialize connection pool. Concurrent callers share one setup
+        task, which is shielded: a caller's deadline can cancel its wait but
+        never a half-finished pool or schema setup.
+        """
+        if not self.database_url:
+            return None
         if not ASYNCPG_AVAILABLE:
             logger.warning("asyncpg_not_available", message="asyncpg package not installed")
             return None
         
-        if self._pool is None and self.database_url:
+        loop = asyncio.get_running_loop()
+        if self._pool is not None and self._pool_loop is loop:
+            return self._pool
+        init = self._pool_init
+        # A finished task here failed (success sets the pool for this loop): retry.
+        if init is None or init.get_loop() is not loop or init.done():
+            init = self._pool_init = loop.create_task(self._connect())
+        return await asyncio.shield(init)
+    
+    async def _connect(self):
+        if self._pool is not None:
+            # Pools are bound to the loop that made them (Celery runs one loop per job).
             try:
-                self._pool = await asyncpg.create_pool(self.database_url, min_size=2, max_size=10)
-                await self._init_schema()
-                logger.info("pgvector_connected")
-            except Exception as e:
-                logger.error("pgvector_connection_failed", error=str(e))
-                self._pool = None
-        
-        return self._pool
+                self._pool.terminate()
+            except Exception:
+                pass
+            self._pool = None
+        pool = None
+        try:
+            pool = await asyncpg.create_pool(
+                self.database_url, min_size=2, max_size=10, init=self._configure_connection
+            )
+            await self._init_schema(pool)
+        except Exception as e:
+            logger.error("pgvector_connection_failed", error=str(e))
+            if pool is not None:
+                pool.terminate()
+            return None
+        self._pool, self._pool_loop = pool, asyncio.get_running_loop()
+        logger.info("pgvector_connected")
+        return pool
+    
+    async def warm(self) -> None:
+        """Connect and set up the schema ahead of the first deadline-bound read."""
+        if await self._get_pool() is None:
+            self._local_store()
+    
+    def _local_store(self):
+        """SQLite + in-process ANN store used when no pgvector database is configured."""
+        if self._local is None and self.local_path:
+            from .local_store import LocalVectorStore
+            self._local = LocalVectorStore(self.local_path, self.EMBEDDING_DIM)
+        return self._local
+    
+    async def _configure_connection(self, conn) -> None:
+        """Per-connection search breadth for the ANN index (recall vs latency)."""
+        try:
+            if self.index_type == "hnsw":
+                await conn.execute(f"SET hnsw.ef_search = {int(settings.vector_hnsw_ef_search)}")
+            elif self.index_type == "ivfflat":
+                await conn.execute(f"SET ivfflat.probes = {int(settings.vector_ivfflat_probes)}")
+            # pgvector >= 0.8: keep scanning the index until the user filter
+            # has enough rows, instead of returning fewer than LIMIT.
+            if self._iterative_scan:
+                await conn.execute(f"SET {self.index_type}.iterative_scan = relaxed_order")
+        except Exception as e:
+            logger.warning("vector_search_settings_failed", error=str(e))
     
-    async def _init_schema(self):
+    async def _init_schema(self, pool):
         """Initialize database schema with pgvector extension."""
-        pool = self._pool
-        if not pool:
-            return
         
         async with pool.acquire() as conn:
             # Enable pgvector extension
@@ -104,8 +176,8 @@ class VectorMemoryStore:
                     created_at TIMESTAMP DEFAULT NOW(),
                     embedding vector(1536)
                 );
-                CREATE INDEX IF NOT EXISTS idx_recipes_user ON recipes(user_id);
             """)
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_recipes_user ON recipes(user_id);")
             
             # Style profiles table
             await conn.execute("""
@@ -120,40 +192,108 @@ class VectorMemoryStore:
                 );
             """)
             
-            logger.info("pgvector_schema_initialized")
+            version = await conn.fetchval("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            self._iterative_scan = _version_tuple(version) >= (0, 8)
+            await self._maintain_index(conn)
+            logger.info("pgvector_schema_initialized", pgvector=version)
+        # Connections opened before the version was known lack iterative scans.
+        await pool.expire_connections()
+    
+    async def _maintain_index(self, conn) -> None:
+        """
+        Create the ANN index on recipes.embedding, or rebuild it when it no
+        longer fits the table. HNSW is built once and maintained by Postgres
+        on insert; IVFFlat lists are sized from the row count and rebuilt
+        when the table has grown (or shrunk) by more than 2x since.
+        """
+        if self.index_type not in ("hnsw", "ivfflat"):
+            return
+        name = f"idx_recipes_embedding_{self.index_type}"
+        existing = await conn.fetchval(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = 'recipes' AND indexname = $1", name
+        )
+        if self.index_type == "hnsw":
+            if existing is None:
+                await conn.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON recipes "
+                    f"USING hnsw (embedding vector_l2_ops) WITH (m = 16, ef_construction = 64)"
+                )
+                logger.info("vector_index_created", index=name)
+            return
+        
+        rows = await conn.fetchval("SELECT count(*) FROM recipes WHERE embedding IS NOT NULL")
+        if rows < IVFFLAT_MIN_ROWS:
+            return
+        lists = max(1, rows // IVFFLAT_ROWS_PER_LIST)
+        if existing is not None:
+            match = re.search(r"lists\s*=\s*'?(\d+)", existing)
+            built = int(match.group(1)) if match else 0
+            if built and built * 0.5 <= lists <= built * 2:
+                return
+            await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        await conn.execute(
+            f"CREATE INDEX CONCURRENTLY {name} ON recipes "
+            f"USING ivfflat (embedding vector_l2_ops) WITH (lists = {lists})"
+        )
+        logger.info("vector_index_created", index=name, lists=lists, rows=rows)
+    
+    async def maintain_index(self) -> None:
+        """Re-check the ANN index against the current table size."""
+        pool = await self._get_pool()
+        if not pool:
+            return
+        try:
+            async with pool.acquire() as conn:
+                await self._maintain_index(conn)
+        except Exception as e:
+            logger.error("vector_index_maintenance_failed", error=str(e))
     
     async def save_recipe(self, recipe: Recipe, embedding: Optional[List[float]] = None) -> bool:
         """Save a successful pattern as a reusable recipe."""
+        saved = await self.save_recipes([(recipe, embedding)])
+        if saved:
+            logger.info("recipe_saved", recipe_id=recipe.id, user_id=recipe.user_id)
+        return bool(saved)
+    
+    async def save_recipes(self, batch: Sequence[Tuple[Recipe, Optional[List[float]]]]) -> int:
+        """Upsert many recipes in one round trip; returns how many were written."""
+        if not batch:
+            return 0
         pool = await self._get_pool()
         if not pool:
-            return False
+            local = self._local_store()
+            if not local:
+                return 0
+            try:
+                return await local.save_recipes(batch)
+            except Exception as e:
+                logger.error("recipe_save_failed", error=str(e))
+                return 0
         
         try:
             async with pool.acquire() as conn:
-                if embedding:
-                    await conn.execute("""
+                async with conn.transaction():
+                    await conn.executemany("""
                         INSERT INTO recipes (id, user_id, name, description, parameters, success_count, embedding)
                         VALUES ($1, $2, $3, $4, $5, $6, $7)
                         ON CONFLICT (id) DO UPDATE SET
                             success_count = recipes.success_count + 1,
                             parameters = $5
-                    """, recipe.id, recipe.user_id, recipe.name, recipe.description,
-                        json.dumps(recipe.parameters), recipe.success_count, str(embedding))
-                else:
-                    await conn.execute("""
-                        INSERT INTO recipes (id, user_id, name, description, parameters, success_count)
-                        VALUES ($1, $2, $3, $4, $5, $6)
-                        ON CONFLICT (id) DO UPDATE SET
-                            success_count = recipes.success_count + 1,
-                            parameters = $5
-                    """, recipe.id, recipe.user_id, recipe.name, recipe.description,
-                        json.dumps(recipe.parameters), recipe.success_count)
-                
-                logger.info("recipe_saved", recipe_id=recipe.id, user_id=recipe.user_id)
-                return True
+                    """, [
+                        (recipe.id, recipe.user_id, recipe.name, recipe.description,
+                         json.dumps(recipe.parameters), recipe.success_count,
+                         str(embedding) if embedding else None)
+                        for recipe, embedding in batch
+                    ])
         except Exception as e:
             logger.error("recipe_save_failed", error=str(e))
-            return False
+            return 0
+        
+        self._inserts_since_check += len(batch)
+        if self._inserts_since_check >= INDEX_CHECK_EVERY:
+            self._inserts_since_check = 0
+            await self.maintain_index()
+        return len(batch)
     
     async def find_similar_recipes(
         self, 
@@ -164,17 +304,31 @@ class VectorMemoryStore:
         """Find similar recipes using vector similarity search."""
         pool = await self._get_pool()
         if not pool:
-            return []
+            local = self._local_store()
+            if not local:
+                return []
+            try:
+                return await local.find_similar_recipes(user_id, query_embedding, limit)
+            except Exception as e:
+                logger.error("recipe_search_failed", error=str(e))
+                return []
         
+        query = """
+            SELECT id, user_id, name, description, parameters, success_count, created_at
+            FROM recipes
+            WHERE user_id = $1 AND embedding IS NOT NULL
+            ORDER BY embedding <-> $2
+            LIMIT $3
+        """
         try:
             async with pool.acquire() as conn:
-                rows = await conn.fetch("""
-                    SELECT id, user_id, name, description, parameters, success_count, created_at
-                    FROM recipes
-                    WHERE user_id = $1 AND embedding IS NOT NULL
-                    ORDER BY embedding <-> $2
-                    LIMIT $3
-                """, user_id, str(query_embedding), limit)
+                rows = await conn.fetch(query, user_id, str(query_embedding), limit)
+                if len(rows) < limit and self.index_type in ("hnsw", "ivfflat") and not self._iterative_scan:
+                    # Without iterative scans the index may stop short of the
+                    # user's rows; check exhaustively when it came up short.
+                    async with conn.transaction():
+                        await conn.execute("SET LOCAL enable_indexscan = off")
+                        rows = await conn.fetch(query, user_id, str(query_embedding), limit)
                 
                 return [
                     Recipe(
@@ -196,7 +350,14 @@ class VectorMemoryStore:
         """Get user's most successful recipes."""
         pool = await self._get_pool()
         if not pool:
-            return []
+            local = self._local_store()
+            if not local:
+                return []
+            try:
+                return await local.get_user_recipes(user_id, limit)
+            except Exception as e:
+                logger.error("recipes_get_failed", error=str(e))
+                return []
         
         try:
             async with pool.acquire() as conn:
@@ -228,7 +389,14 @@ class VectorMemoryStore:
         """Get user's style profile."""
         pool = await self._get_pool()
         if not pool:
-            return None
+            local = self._local_store()
+            if not local:
+                return None
+            try:
+                return await local.get_style_profile(user_id)
+            except Exception as e:
+                logger.error("profile_get_failed", error=str(e))
+                return None
         
         try:
             async with pool.acquire() as conn:
@@ -254,7 +422,16 @@ class VectorMemoryStore:
         """Update user's style profile."""
         pool = await self._get_pool()
         if not pool:
-            return False
+            local = self._local_store()
+            if not local:
+                return False
+            try:
+                await local.update_style_profile(profile)
+                logger.info("profile_updated", user_id=profile.user_id, store="local")
+                return True
+            except Exception as e:
+                logger.error("profile_update_failed", error=str(e))
+                return False
         
         try:
             async with pool.acquire() as conn:
@@ -281,10 +458,27 @@ class VectorMemoryStore:
     
     async def close(self):
         """Close connection pool."""
+        if self._pool_init is not None and not self._pool_init.done():
+            self._pool_init.cancel()
+        self._pool_init = None
         if self._pool:
             await self._pool.close()
             self._pool = None
+        if self._local:
+            await self._local.close()
+            self._local = None
+
+
+def _version_tuple(version: Optional[str]) -> Tuple[int, ...]:
+    try:
+        return tuple(int(part) for part in (version or "0").split(".")[:2])
+    except ValueError:
+        return (0,)
 
 
 # Global instance (configured via environment)
-vector_store = VectorMemoryStore()
+vector_store = VectorMemoryStore(
+    settings.vector_database_url,
+    local_path=settings.vector_local_path or None,
+    index_type=settings.vector_index_type,
+)
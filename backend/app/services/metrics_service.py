@@ -28,7 +28,7 @@ class PerformanceTracker:
         total_duration = (time.time() - self.start_time) * 1000
         stage_timeout_counts = self.metadata.get("stage_timeout_counts", {})
         stage_timeout_total = int(self.metadata.get("stage_timeout_total", 0) or 0)
-        return {
+        metrics = {
             "total_duration_ms": round(total_duration, 2),
             "phase_durations": self.phases,
             "timestamp": datetime.utcnow().isoformat(),
@@ -36,6 +36,9 @@ class PerformanceTracker:
             "stage_timeout_total": stage_timeout_total,
             "stage_timeout_counts": stage_timeout_counts,
         }
+        if self.metadata.get("graph_schedule"):
+            metrics["graph_schedule"] = self.metadata["graph_schedule"]
+        return metrics
 
     def _calculate_cost(self) -> Dict[str, float]:
         # Placeholder for actual cost calculation logic
@@ -40,12 +40,13 @@ class ModalService:
             # Modal worker needs a URL to download the file.
             if not source_path.startswith("http"):
                 logger.info("modal_uploading_source", job_id=job_id)
-                source_url = await storage_service.upload_file(source_path, folder="temp_modal")
+                # Content-addressed: re-renders of the same source skip the upload.
+                source_url = await storage_service.upload_source(source_path)
             else:
                 source_url = source_path
                 
             # 2. Lookup Modal Function (support old/new SDK method names)
-            # Note: The function must be deployed with 'modal deploy modal_worker.py'
+            # Note: The function must be deployed with 'modal deploy scripts/modal_worker.py'
             if hasattr(modal.Function, "from_name"):
                 f = modal.Function.from_name("proedit-worker", "render_video_v1")
             else:
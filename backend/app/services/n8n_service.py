@@ -6,6 +6,7 @@ import hmac
 import json
 import logging
 from datetime import datetime, timezone
+from types import SimpleNamespace
 
 import httpx
 
@@ -15,9 +16,23 @@ from ..models import Job
 logger = logging.getLogger(__name__)
 
 
+# Attributes copied off the ORM row when a notification is queued, so the
+# background sender never touches a closed session.
+JOB_EVENT_FIELDS = (
+    "id", "user_id", "status", "progress_message", "output_path", "thumbnail_path",
+    "tier", "platform", "director_plan", "qc_result", "scout_result", "brand_safety_result",
+    "post_settings", "audio_qa", "color_qa", "subtitle_qa",
+)
+NOTIFY_QUEUE_SIZE = 1000
+
+
 class N8NService:
     """Outbound n8n webhook client with timeout, retries, and HMAC signature."""
 
+    def __init__(self):
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+
     def _build_url(self) -> str | None:
         base = (settings.n8n_base_url or "").strip().rstrip("/")
         path = (settings.n8n_job_status_path or "").strip()
@@ -152,5 +167,44 @@ class N8NService:
 
         return False
 
+    def notify_job_status(self, job: Job) -> bool:
+        """
+        Queue a terminal status event for background delivery (retries included)
+        instead of awaiting n8n on the caller's path. Returns False when the
+        queue is full or n8n is not configured.
+        """
+        if not self._build_url() or job.status not in {"complete", "failed"}:
+            return False
+        snapshot = SimpleNamespace(**{name: getattr(job, name, None) for name in JOB_EVENT_FIELDS})
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue(maxsize=NOTIFY_QUEUE_SIZE)
+            self._worker = loop.create_task(self._drain_forever(self._queue))
+        try:
+            self._queue.put_nowait(snapshot)
+        except asyncio.QueueFull:
+            logger.warning("n8n_notify_queue_full", extra={"job_id": snapshot.id})
+            return False
+        return True
+
+    async def _drain_forever(self, queue: asyncio.Queue) -> None:
+        while True:
+            job = await queue.get()
+            try:
+                await self.send_job_status_event(job)
+            except Exception as exc:
+                logger.warning("n8n_notify_failed", extra={"job_id": job.id, "error": str(exc)})
+            finally:
+                queue.task_done()
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Wait for queued notifications (used before a worker's event loop exits)."""
+        if self._queue is None or self._worker is None or self._worker.done():
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("n8n_notify_drain_timeout", extra={"pending": self._queue.qsize()})
+
 
 n8n_service = N8NService()
@@ -0,0 +1,138 @@
+"""
+Principal Cache - Decoded tokens and User snapshots for request auth.
+
+The request pipeline decodes the bearer token once per request (and only
+once per token per TTL), and `get_current_user` serves the User from a
+short-lived snapshot instead of a SELECT plus the monthly-credit check.
+
+Snapshots are handed out as detached User instances built fresh per
+request, so a handler mutating one cannot leak into the cache, and any code
+that locks the row (`with_for_update`) still loads it from the DB. Every
+flushed UPDATE/DELETE of a User in this process (credit changes, admin
+grants, monthly resets) drops that user's snapshot; other processes' writes
+are picked up within the TTL.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import jwt
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from ..config import settings
+from ..models import User
+
+MAX_ENTRIES = 10_000
+USER_COLUMNS = tuple(column.key for column in User.__table__.columns)
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: int
+    email: Optional[str]
+    expires_at: float
+
+
+def _month_key(value) -> Tuple[int, int]:
+    return value.year, value.month
+
+
+class PrincipalCache:
+    def __init__(self, ttl: float = 30.0, max_entries: int = MAX_ENTRIES, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._lock = threading.Lock()
+        # token -> (principal, cached until)
+        self._tokens: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        # user id -> (column values, cached until)
+        self._users: "OrderedDict[int, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.stats = {"token_hits": 0, "token_misses": 0, "user_hits": 0, "user_misses": 0}
+
+    def _put(self, store: OrderedDict, key, value) -> None:
+        with self._lock:
+            store[key] = value
+            store.move_to_end(key)
+            while len(store) > self.max_entries:
+                store.popitem(last=False)
+
+    def _get(self, store: OrderedDict, key):
+        with self._lock:
+            entry = store.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= self.clock():
+                del store[key]
+                return None
+            store.move_to_end(key)
+            return entry[0]
+
+    # --- tokens -------------------------------------------------------------
+
+    def principal(self, token: str) -> Optional[Principal]:
+        """Verified principal for a bearer token, or None if it is invalid."""
+        cached = self._get(self._tokens, token)
+        if cached is not None and cached.expires_at > time.time():
+            self.stats["token_hits"] += 1
+            return cached
+        self.stats["token_misses"] += 1
+        try:
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm])
+            principal = Principal(int(payload["sub"]), payload.get("email"), float(payload.get("exp") or float("inf")))
+        except (jwt.InvalidTokenError, KeyError, TypeError, ValueError):
+            return None
+        # Never outlive the token itself.
+        lifetime = min(self.ttl, principal.expires_at - time.time())
+        if lifetime > 0:
+            self._put(self._tokens, token, (principal, self.clock() + lifetime))
+        return principal
+
+    # --- users --------------------------------------------------------------
+
+    def user(self, user_id: int) -> Optional[User]:
+        """A detached User built from the snapshot, or None on a miss."""
+        values = self._get(self._users, user_id)
+        if values is not None and settings.credits_enabled:
+            reset = values.get("last_credit_reset")
+            # The monthly credit reset must run through the DB path.
+            if reset is None or _month_key(reset) != _month_key(datetime.utcnow().date()):
+                values = None
+        if values is None:
+            self.stats["user_misses"] += 1
+            return None
+        self.stats["user_hits"] += 1
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    def remember_user(self, user: User) -> None:
+        state = inspect(user)
+        loaded = state.dict
+        if state.detached or any(name not in loaded for name in USER_COLUMNS):
+            return
+        values = {name: loaded[name] for name in USER_COLUMNS}
+        self._put(self._users, user.id, (values, self.clock() + self.ttl))
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+
+principal_cache = PrincipalCache(ttl=settings.auth_cache_ttl_seconds)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _drop_cached_user(_mapper, _connection, target: User) -> None:
+    principal_cache.invalidate_user(target.id)
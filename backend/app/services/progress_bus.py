@@ -0,0 +1,256 @@
+"""
+Progress Bus - Pooled publisher for job progress events.
+
+Progress used to open a fresh Redis connection (TCP + TLS for rediss://) per
+event, synchronously, even from async graph nodes. The bus keeps one
+connection pool per process and one async client per event loop, and ships
+events in pipelines (PUBLISH to the job/user channels + SETEX of the latest
+snapshot). Events wait in a bounded buffer that drops the oldest entries, and
+after a failed send the bus backs off for a while, so a Redis outage costs
+at most one timeout per window instead of stalling rendering.
+
+- `publish()` is safe from anywhere: inside a running loop it only enqueues
+  and wakes the loop's sender task; in plain threads (Celery, render
+  callbacks) it sends inline on the pooled sync client.
+- `publish_async()` enqueues and awaits delivery of the buffer.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+import structlog
+
+from ..config import settings
+
+logger = structlog.get_logger()
+
+LATEST_TTL_SECONDS = 3600
+BUFFER_SIZE = 1000
+RETRY_AFTER_SECONDS = 5.0
+SOCKET_TIMEOUT_SECONDS = 2
+
+
+@dataclass
+class ProgressEvent:
+    job_id: int
+    status: str
+    message: str
+    progress: int = 0
+    user_id: Optional[int] = None
+
+    def payload(self) -> str:
+        return json.dumps({
+            "job_id": self.job_id,
+            "status": self.status,
+            "message": self.message,
+            "progress": self.progress,
+        })
+
+
+def _queue_commands(pipe, batch: List[ProgressEvent]) -> None:
+    latest: Dict[int, str] = {}
+    for event in batch:
+        data = event.payload()
+        pipe.publish(f"job:{event.job_id}:progress", data)
+        if event.user_id:
+            pipe.publish(f"user:{event.user_id}:jobs", data)
+        latest[event.job_id] = data
+    # Only the newest snapshot per job needs to land in the latest key.
+    for job_id, data in latest.items():
+        pipe.setex(f"job:{job_id}:latest", LATEST_TTL_SECONDS, data)
+
+
+class ProgressBus:
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        buffer_size: int = BUFFER_SIZE,
+        retry_after: float = RETRY_AFTER_SECONDS,
+    ):
+        self.redis_url = redis_url
+        self.retry_after = retry_after
+        self._buffer: Deque[ProgressEvent] = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._async_client = None
+        self._async_loop = None
+        self._pubsub_client = None
+        self._pubsub_loop = None
+        self._sender: Optional[asyncio.Task] = None
+        self._down_until = 0.0
+        self.stats = {"published": 0, "sent": 0, "dropped": 0, "failures": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.redis_url)
+
+    # --- clients ------------------------------------------------------------
+
+    def sync_client(self):
+        """Client on the process-wide pool (redis-py re-creates the pool after fork)."""
+        import redis
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = redis.ConnectionPool.from_url(
+                    self.redis_url,
+                    decode_responses=True,
+                    socket_timeout=SOCKET_TIMEOUT_SECONDS,
+                    socket_connect_timeout=SOCKET_TIMEOUT_SECONDS,
+                    health_check_interval=30,
+                )
+        return redis.Redis(connection_pool=self._pool)
+
+    def async_client(self):
+        """Pooled asyncio client for the running loop (asyncio clients are loop-bound)."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            import redis.asyncio as aioredis
+
+            self._async_client = aioredis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_timeout=SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=SOCKET_TIMEOUT_SECONDS,
+                health_check_interval=30,
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    def pubsub_client(self):
+        """
+        Asyncio client for long-lived subscriptions: no read timeout, so an
+        idle channel is not an error; health checks keep the socket honest.
+        """
+        loop = asyncio.get_running_loop()
+        if self._pubsub_client is None or self._pubsub_loop is not loop:
+            import redis.asyncio as aioredis
+
+            self._pubsub_client = aioredis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_timeout=None,
+                socket_connect_timeout=SOCKET_TIMEOUT_SECONDS,
+                health_check_interval=30,
+            )
+            self._pubsub_loop = loop
+        return self._pubsub_client
+
+    # --- buffer -------------------------------------------------------------
+
+    def _enqueue(self, event: ProgressEvent) -> None:
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.stats["dropped"] += 1
+            self._buffer.append(event)
+            self.stats["published"] += 1
+
+    def _take(self) -> List[ProgressEvent]:
+        with self._lock:
+            batch = list(self._buffer)
+            self._buffer.clear()
+        return batch
+
+    def _requeue(self, batch: List[ProgressEvent]) -> None:
+        # Failed events go back in front of anything newer; whatever no longer
+        # fits is the oldest and is dropped.
+        with self._lock:
+            room = self._buffer.maxlen - len(self._buffer)
+            keep = batch[-room:] if room > 0 else []
+            self.stats["dropped"] += len(batch) - len(keep)
+            self._buffer.extendleft(reversed(keep))
+
+    def _backing_off(self) -> bool:
+        return time.monotonic() < self._down_until
+
+    def _sent(self, batch: List[ProgressEvent]) -> None:
+        self._down_until = 0.0
+        self.stats["sent"] += len(batch)
+
+    def _failed(self, batch: List[ProgressEvent], exc: Exception) -> None:
+        self._requeue(batch)
+        self.stats["failures"] += 1
+        self._down_until = time.monotonic() + self.retry_after
+        logger.warning("progress_bus_send_failed", events=len(batch), error=str(exc))
+
+    # --- sync front-end -----------------------------------------------------
+
+    def publish(self, job_id: int, status: str, message: str, progress: int = 0, user_id: Optional[int] = None) -> None:
+        """Never blocks a running event loop and never raises."""
+        if not self.enabled:
+            return
+        self._enqueue(ProgressEvent(job_id, status, message, progress, user_id))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()
+            return
+        self._ensure_sender(loop)
+
+    def flush_sync(self) -> int:
+        """Send the buffer over the pooled sync client; returns events sent."""
+        if self._backing_off():
+            return 0
+        batch = self._take()
+        if not batch:
+            return 0
+        try:
+            pipe = self.sync_client().pipeline(transaction=False)
+            _queue_commands(pipe, batch)
+            pipe.execute()
+        except Exception as exc:
+            self._failed(batch, exc)
+            return 0
+        self._sent(batch)
+        return len(batch)
+
+    # --- async front-end ----------------------------------------------------
+
+    async def publish_async(
+        self, job_id: int, status: str, message: str, progress: int = 0, user_id: Optional[int] = None
+    ) -> None:
+        if not self.enabled:
+            return
+        self._enqueue(ProgressEvent(job_id, status, message, progress, user_id))
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Send the buffer over the loop's async client; returns events sent."""
+        if not self.enabled or self._backing_off():
+            return 0
+        batch = self._take()
+        if not batch:
+            return 0
+        try:
+            pipe = self.async_client().pipeline(transaction=False)
+            _queue_commands(pipe, batch)
+            await pipe.execute()
+        except Exception as exc:
+            self._failed(batch, exc)
+            return 0
+        self._sent(batch)
+        return len(batch)
+
+    def _ensure_sender(self, loop: asyncio.AbstractEventLoop) -> None:
+        task = self._sender
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return
+        self._sender = loop.create_task(self._send_loop())
+
+    async def _send_loop(self) -> None:
+        # Yield once so a burst of publish() calls goes out as one pipeline.
+        await asyncio.sleep(0)
+        while self._buffer:
+            if self._backing_off():
+                await asyncio.sleep(max(self._down_until - time.monotonic(), 0.05))
+                continue
+            await self.flush()
+
+
+progress_bus = ProgressBus(settings.redis_url)
@@ -0,0 +1,218 @@
+"""
+Progress Hub - One Redis subscription per process, fanned out to WebSockets.
+
+Every job/user progress socket used to open its own Redis client and pubsub
+and busy-poll it. The hub instead holds a single pattern subscription
+(`job:*:progress`, `user:*:jobs`), started lazily with the first socket, and
+dispatches each message to the sockets on that channel. The subscription
+runs on its own client without a read timeout and polls with `get_message`,
+so a quiet channel never tears it down.
+
+Each socket gets a small bounded queue keyed by job: a burst for the same
+job collapses to its newest state, so a slow client skips intermediate
+progress instead of backing up memory or the reader. A per-socket writer
+task drains the queue; one timer enqueues heartbeats for every socket.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+import structlog
+
+from .progress_bus import ProgressBus, progress_bus
+
+logger = structlog.get_logger()
+
+CHANNEL_PATTERNS = ("job:*:progress", "user:*:jobs")
+HEARTBEAT_SECONDS = 25.0
+MAX_PENDING_PER_SOCKET = 64
+POLL_SECONDS = 1.0
+RECONNECT_SECONDS = 2.0
+TERMINAL_STATUSES = {"complete", "failed"}
+PING = json.dumps({"type": "ping"})
+
+SendFn = Callable[[str], Awaitable[None]]
+
+
+def _describe(data: str, fallback_key: str) -> Tuple[str, bool]:
+    """(coalescing key, is terminal) for a raw progress payload."""
+    try:
+        parsed = json.loads(data)
+    except (TypeError, ValueError):
+        return fallback_key, False
+    if not isinstance(parsed, dict):
+        return fallback_key, False
+    key = parsed.get("job_id")
+    return (str(key) if key is not None else fallback_key), parsed.get("status") in TERMINAL_STATUSES
+
+
+class Subscriber:
+    def __init__(self, channel: str, send: SendFn, close_on_terminal: bool = False, max_pending: int = MAX_PENDING_PER_SOCKET):
+        self.channel = channel
+        self.send = send
+        self.close_on_terminal = close_on_terminal
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[str, Tuple[str, bool]]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self.closed = False
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"sent": 0, "coalesced": 0, "dropped": 0}
+
+    def offer(self, key: str, data: str, terminal: bool = False) -> None:
+        if self.closed:
+            return
+        if key in self._pending:
+            self.stats["coalesced"] += 1
+        elif len(self._pending) >= self.max_pending:
+            self._pending.popitem(last=False)
+            self.stats["dropped"] += 1
+        self._pending[key] = (data, terminal)
+        self._wakeup.set()
+
+    def push(self, data: str) -> None:
+        key, terminal = _describe(data, self.channel)
+        self.offer(key, data, terminal)
+
+    async def run(self) -> None:
+        while not self.closed:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            batch = list(self._pending.values())
+            self._pending.clear()
+            for data, terminal in batch:
+                try:
+                    await self.send(data)
+                except Exception:
+                    # Client went away; the endpoint unsubscribes us.
+                    self.closed = True
+                    return
+                self.stats["sent"] += 1
+                if terminal and self.close_on_terminal:
+                    self.closed = True
+                    return
+
+
+class ProgressHub:
+    def __init__(self, bus: ProgressBus = progress_bus, heartbeat_interval: float = HEARTBEAT_SECONDS):
+        self.bus = bus
+        self.heartbeat_interval = heartbeat_interval
+        self._channels: Dict[str, Set[Subscriber]] = {}
+        self._reader: Optional[asyncio.Task] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self.stats = {"received": 0, "delivered": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.bus.enabled
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._channels.values())
+
+    def subscribe(self, channel: str, send: SendFn, close_on_terminal: bool = False) -> Subscriber:
+        sub = Subscriber(channel, send, close_on_terminal=close_on_terminal)
+        self._channels.setdefault(channel, set()).add(sub)
+        sub.task = asyncio.get_running_loop().create_task(sub.run())
+        self._ensure_running()
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        sub.closed = True
+        if sub.task is not None and not sub.task.done():
+            sub.task.cancel()
+        subs = self._channels.get(sub.channel)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._channels[sub.channel]
+
+    def dispatch(self, channel: str, data: str) -> int:
+        """Hand one message to every socket on the channel; returns how many."""
+        self.stats["received"] += 1
+        subs = self._channels.get(channel)
+        if not subs:
+            return 0
+        key, terminal = _describe(data, channel)
+        for sub in list(subs):
+            sub.offer(key, data, terminal)
+        self.stats["delivered"] += len(subs)
+        return len(subs)
+
+    async def latest(self, job_id: int) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            return await self.bus.async_client().get(f"job:{job_id}:latest")
+        except Exception as exc:
+            logger.warning("progress_hub_latest_failed", job_id=job_id, error=str(exc))
+            return None
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.enabled and (self._reader is None or self._reader.done() or self._reader.get_loop() is not loop):
+            self._reader = loop.create_task(self._read_loop())
+        if self._heartbeat is None or self._heartbeat.done() or self._heartbeat.get_loop() is not loop:
+            self._heartbeat = loop.create_task(self._heartbeat_loop())
+
+    async def _read_loop(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.bus.pubsub_client().pubsub()
+                await pubsub.psubscribe(*CHANNEL_PATTERNS)
+                logger.info("progress_hub_subscribed", patterns=CHANNEL_PATTERNS)
+                while True:
+                    try:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=POLL_SECONDS)
+                    except (asyncio.TimeoutError, TimeoutError):
+                        # A quiet channel is normal; keep the subscription.
+                        continue
+                    if message and message.get("type") == "pmessage" and message.get("data"):
+                        self.dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("progress_hub_reader_failed", error=str(exc))
+                await asyncio.sleep(RECONNECT_SECONDS)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            for subs in list(self._channels.values()):
+                for sub in list(subs):
+                    sub.offer("__ping__", PING)
+
+    async def serve(self, websocket, sub: Subscriber) -> None:
+        """Run until the writer finishes (terminal status, send failure) or the client disconnects."""
+
+        async def _receive() -> None:
+            while True:
+                await websocket.receive_text()
+
+        receiver = asyncio.create_task(_receive())
+        try:
+            await asyncio.wait({sub.task, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            receiver.cancel()
+            self.unsubscribe(sub)
+
+    async def close(self) -> None:
+        for subs in list(self._channels.values()):
+            for sub in list(subs):
+                self.unsubscribe(sub)
+        for task in (self._reader, self._heartbeat):
+            if task is not None and not task.done():
+                task.cancel()
+        self._reader = self._heartbeat = None
+
+
+progress_hub = ProgressHub()
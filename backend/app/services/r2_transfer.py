@@ -0,0 +1,187 @@
+"""
+R2 Transfer Manager - Off-loop multipart transfers with throughput metrics.
+
+boto3's managed transfers stream straight from/to disk and split large
+objects into concurrent multipart parts; they are blocking, so every call
+runs in a worker thread and the event loop stays free. Part size matches
+the local content-hash block size, and source uploads are keyed by content
+hash so retries and re-renders reuse the object already in the bucket.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Optional
+
+import structlog
+
+from .storage import CONTENT_CHUNK_SIZE, ContentHasher, StorageService
+
+logger = structlog.get_logger()
+
+MULTIPART_THRESHOLD = CONTENT_CHUNK_SIZE
+MULTIPART_CHUNK_SIZE = CONTENT_CHUNK_SIZE
+MAX_CONCURRENCY = 8
+HASH_READ_SIZE = 1024 * 1024
+
+
+@dataclass
+class TransferStats:
+    direction: str  # "upload" | "download"
+    key: str
+    bytes: int
+    seconds: float
+    skipped: bool = False  # dedupe hit, nothing transferred
+
+    @property
+    def mbps(self) -> float:
+        if self.skipped or self.seconds <= 0:
+            return 0.0
+        return round(self.bytes * 8 / self.seconds / 1_000_000, 2)
+
+
+@dataclass
+class TransferMetrics:
+    uploads: int = 0
+    downloads: int = 0
+    dedupe_hits: int = 0
+    bytes_uploaded: int = 0
+    bytes_downloaded: int = 0
+    bytes_saved: int = 0
+    seconds: float = 0.0
+    recent: Deque[TransferStats] = field(default_factory=lambda: deque(maxlen=50))
+
+    def record(self, stats: TransferStats) -> None:
+        self.recent.append(stats)
+        if stats.skipped:
+            self.dedupe_hits += 1
+            self.bytes_saved += stats.bytes
+            return
+        self.seconds += stats.seconds
+        if stats.direction == "upload":
+            self.uploads += 1
+            self.bytes_uploaded += stats.bytes
+        else:
+            self.downloads += 1
+            self.bytes_downloaded += stats.bytes
+
+    def snapshot(self) -> Dict[str, Any]:
+        moved = self.bytes_uploaded + self.bytes_downloaded
+        return {
+            "uploads": self.uploads,
+            "downloads": self.downloads,
+            "dedupe_hits": self.dedupe_hits,
+            "bytes_uploaded": self.bytes_uploaded,
+            "bytes_downloaded": self.bytes_downloaded,
+            "bytes_saved": self.bytes_saved,
+            "avg_mbps": round(moved * 8 / self.seconds / 1_000_000, 2) if self.seconds > 0 else 0.0,
+            "recent": [{**asdict(s), "mbps": s.mbps} for s in list(self.recent)[-10:]],
+        }
+
+
+def file_content_hash(path: str | Path) -> str:
+    """Tree hash of a local file (reuses the CAS filename when it already is one)."""
+    known = StorageService.content_hash_from_path(str(path))
+    if known:
+        return known
+    hasher = ContentHasher()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(HASH_READ_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class TransferManager:
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        bucket_factory: Callable[[], Optional[str]],
+        max_concurrency: int = MAX_CONCURRENCY,
+        chunk_size: int = MULTIPART_CHUNK_SIZE,
+    ):
+        self._client_factory = client_factory
+        self._bucket_factory = bucket_factory
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self.metrics = TransferMetrics()
+        self._config = None
+
+    @property
+    def client(self) -> Any:
+        return self._client_factory()
+
+    @property
+    def bucket(self) -> Optional[str]:
+        return self._bucket_factory()
+
+    def _transfer_config(self):
+        if self._config is None:
+            from boto3.s3.transfer import TransferConfig
+
+            self._config = TransferConfig(
+                multipart_threshold=MULTIPART_THRESHOLD,
+                multipart_chunksize=self.chunk_size,
+                max_concurrency=self.max_concurrency,
+                use_threads=True,
+            )
+        return self._config
+
+    async def upload(self, local_path: str | Path, key: str, content_type: Optional[str] = None) -> TransferStats:
+        """Stream a file from disk as a (multipart when large) upload."""
+        path = Path(local_path)
+        size = path.stat().st_size
+        extra = {"ContentType": content_type} if content_type else None
+        started = time.perf_counter()
+        await asyncio.to_thread(
+            self.client.upload_file,
+            str(path),
+            self.bucket,
+            key,
+            ExtraArgs=extra,
+            Config=self._transfer_config(),
+        )
+        stats = TransferStats("upload", key, size, time.perf_counter() - started)
+        self.metrics.record(stats)
+        logger.info("r2_upload_complete", key=key, bytes=size, seconds=round(stats.seconds, 3), mbps=stats.mbps)
+        return stats
+
+    async def download(self, key: str, local_path: str | Path) -> TransferStats:
+        """Ranged, concurrent download straight to disk (temp file + atomic rename)."""
+        path = Path(local_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.part")
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(
+                self.client.download_file,
+                self.bucket,
+                key,
+                str(tmp),
+                Config=self._transfer_config(),
+            )
+            tmp.replace(path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        stats = TransferStats("download", key, path.stat().st_size, time.perf_counter() - started)
+        self.metrics.record(stats)
+        logger.info("r2_download_complete", key=key, bytes=stats.bytes, seconds=round(stats.seconds, 3), mbps=stats.mbps)
+        return stats
+
+    async def head(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=key)
+        except Exception as exc:
+            code = str(getattr(exc, "response", {}).get("Error", {}).get("Code", ""))
+            if code in {"404", "NoSuchKey", "NotFound"}:
+                return None
+            raise
+
+    def record_dedupe_hit(self, key: str, size: int) -> TransferStats:
+        stats = TransferStats("upload", key, size, 0.0, skipped=True)
+        self.metrics.record(stats)
+        logger.info("r2_upload_deduplicated", key=key, bytes=size)
+        return stats
@@ -0,0 +1,290 @@
+"""
+Render Plan - Cut list to FFmpeg command planning.
+
+Shared by the in-process RenderingOrchestrator and the Modal GPU worker so
+both turn an EDL into the same per-scene encodes plus a stream-copy concat.
+Stdlib only: the worker image imports this module without the rest of the
+backend. Encoder selection picks NVDEC/NVENC when the binary and a GPU are
+present and libx264 otherwise.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+XFADE_STYLES = {
+    "dissolve": "fade",
+    "crossfade": "fade",
+    "wipe_left": "wipeleft",
+    "wipe_right": "wiperight",
+    "slide_left": "slideleft",
+    "slide_right": "slideright",
+}
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """Video encoder plus the decode flags that go with it."""
+    name: str  # "h264_nvenc" | "libx264"
+    input_args: tuple = ()
+    gpu: bool = False
+
+    def video_args(self, crf: int, preset: str) -> List[str]:
+        if self.gpu:
+            # NVENC has no CRF; constant-quality VBR with -cq is the equivalent knob.
+            return ["-c:v", self.name, "-preset", "p4", "-rc", "vbr", "-cq", str(crf), "-b:v", "0"]
+        return ["-c:v", self.name, "-preset", preset, "-crf", str(crf)]
+
+
+CPU_ENCODER = EncoderProfile("libx264")
+GPU_ENCODER = EncoderProfile("h264_nvenc", input_args=("-hwaccel", "cuda"), gpu=True)
+
+
+def _gpu_present() -> bool:
+    return os.path.exists("/dev/nvidia0") or shutil.which("nvidia-smi") is not None
+
+
+def detect_encoder(ffmpeg_path: str = "ffmpeg", prefer_gpu: bool = True) -> EncoderProfile:
+    """NVENC when the FFmpeg build has it and a GPU is visible, libx264 otherwise."""
+    if not prefer_gpu or not _gpu_present():
+        return CPU_ENCODER
+    try:
+        probe = subprocess.run(
+            [ffmpeg_path, "-hide_banner", "-encoders"],
+            capture_output=True,
+            text=True,
+            timeout=15,
+        )
+    except Exception:
+        return CPU_ENCODER
+    return GPU_ENCODER if "h264_nvenc" in (probe.stdout or "") else CPU_ENCODER
+
+
+@dataclass
+class ScenePlan:
+    """One cut resolved to input seek + trim windows (J/L cuts extend audio only)."""
+    index: int
+    source_path: str
+    start: float
+    duration: float
+    speed: float = 1.0
+    audio_leadin: float = 0.0
+    audio_leadout: float = 0.0
+    keyframes: Optional[List[Dict[str, Any]]] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def audio_start(self) -> float:
+        return max(0.0, self.start - self.audio_leadin)
+
+    @property
+    def audio_duration(self) -> float:
+        return self.duration + (self.start - self.audio_start) + self.audio_leadout
+
+    @property
+    def output_duration(self) -> float:
+        return self.duration / self.speed
+
+
+def plan_scenes(
+    cuts: Sequence[Dict[str, Any]],
+    source_path: str,
+    source_duration: Optional[float] = None,
+) -> List[ScenePlan]:
+    """Validate and normalise an EDL; empty or out-of-range cuts are dropped."""
+    scenes: List[ScenePlan] = []
+    for i, cut in enumerate(cuts):
+        start = float(cut.get("start", 0) or 0)
+        end = float(cut.get("end", 0) or 0)
+        if source_duration is not None:
+            if start >= source_duration:
+                continue
+            end = min(end, source_duration)
+        if end - start <= 0:
+            continue
+        speed = float(cut.get("speed", 1.0) or 1.0)
+        if speed <= 0:
+            speed = 1.0
+        keyframes = cut.get("keyframes")
+        scenes.append(ScenePlan(
+            index=i,
+            source_path=str(cut.get("source_path") or source_path),
+            start=start,
+            duration=end - start,
+            speed=speed,
+            audio_leadin=float(cut.get("audio_leadin", 0.0) or 0.0),
+            audio_leadout=float(cut.get("audio_leadout", 0.0) or 0.0),
+            keyframes=keyframes if isinstance(keyframes, list) else None,
+        ))
+    return scenes
+
+
+def atempo_chain(speed: float) -> List[str]:
+    """Build FFmpeg atempo filters while respecting per-filter [0.5,2.0] constraints."""
+    s = max(0.25, min(speed, 4.0))
+    chain = []
+    while s > 2.0:
+        chain.append("atempo=2.0")
+        s /= 2.0
+    while s < 0.5:
+        chain.append("atempo=0.5")
+        s *= 2.0
+    chain.append(f"atempo={s:.4f}")
+    return chain
+
+
+def keyframed_zoom_filter(keyframes: Optional[List[Dict[str, Any]]]) -> Optional[str]:
+    if not keyframes:
+        return None
+    zoom_kf = [k for k in keyframes if (k.get("property") or "").lower() == "zoom"]
+    if len(zoom_kf) < 2:
+        return None
+    z0 = float(zoom_kf[0].get("value", 1.0))
+    z1 = float(zoom_kf[-1].get("value", z0))
+    if abs(z1 - z0) < 0.01:
+        return None
+    # Lightweight keyframe approximation using gradual zoom.
+    step = (z1 - z0) / 240.0
+    return f"zoompan=z='if(lte(on,1),{z0:.4f},min(max(zoom+({step:.6f}),{min(z0,z1):.4f}),{max(z0,z1):.4f}))':d=1:s=1280x720"
+
+
+def build_scene_command(
+    ffmpeg_path: str,
+    scene: ScenePlan,
+    out_path: str,
+    encoder: EncoderProfile = CPU_ENCODER,
+    vf_filters: Optional[str] = None,
+    af_filters: Optional[str] = None,
+    crf: int = 23,
+    preset: str = "veryfast",
+    overlay_filter: Optional[str] = None,
+    fps: Optional[int] = None,
+) -> List[str]:
+    """
+    Encode one scene. Input seeking (-ss before -i) skips straight to the
+    earliest needed timestamp instead of decoding from zero; the trims are
+    then relative to that seek point.
+    """
+    seek = scene.audio_start
+    v_offset = scene.start - seek
+
+    cmd = [ffmpeg_path, "-y", *encoder.input_args]
+    if seek > 0:
+        cmd += ["-ss", f"{seek:.3f}"]
+    cmd += [
+        "-i", os.path.abspath(scene.source_path),
+        *encoder.video_args(crf, preset),
+        "-c:a", "aac", "-b:a", "128k",
+        "-avoid_negative_ts", "make_zero",
+    ]
+
+    vf_chain: List[str] = [f"trim=start={v_offset:.3f}:duration={scene.duration:.3f},setpts=PTS-STARTPTS"]
+    af_chain: List[str] = [f"atrim=start=0:duration={scene.audio_duration:.3f},asetpts=PTS-STARTPTS"]
+
+    if abs(scene.speed - 1.0) > 0.01:
+        vf_chain.append(f"setpts={1 / scene.speed}*PTS")
+        af_chain.extend(atempo_chain(scene.speed))
+
+    zoom_kf = keyframed_zoom_filter(scene.keyframes)
+    if zoom_kf:
+        vf_chain.append(zoom_kf)
+    if vf_filters:
+        vf_chain.append(vf_filters)
+    if overlay_filter:
+        vf_chain.append(overlay_filter)
+    if af_filters:
+        af_chain.append(af_filters)
+
+    cmd += ["-vf", ",".join(vf_chain), "-af", ",".join(af_chain)]
+    if fps:
+        cmd += ["-r", str(fps)]
+    cmd.append(os.path.abspath(out_path))
+    return cmd
+
+
+def write_concat_list(scene_files: Sequence[Path], list_path: Path) -> Path:
+    with open(list_path, "w") as f:
+        for scene in scene_files:
+            # FFmpeg concat list needs escaped paths
+            abs_p = str(Path(scene).absolute()).replace("\\", "/")
+            f.write(f"file '{abs_p}'\n")
+    return list_path
+
+
+def build_concat_command(ffmpeg_path: str, list_path: Path, out_path: str) -> List[str]:
+    """Stream-copy concat of identically encoded parts, faststart for delivery."""
+    return [
+        ffmpeg_path, "-y",
+        "-f", "concat", "-safe", "0",
+        "-i", str(list_path),
+        "-c", "copy",
+        "-movflags", "+faststart",
+        out_path,
+    ]
+
+
+def build_transition_command(
+    ffmpeg_path: str,
+    scene_files: Sequence[Path],
+    out_path: str,
+    scene_durations: Sequence[float],
+    transition_style: str,
+    transition_duration: float,
+    encoder: EncoderProfile = CPU_ENCODER,
+) -> List[str]:
+    xfade_style = XFADE_STYLES.get((transition_style or "").lower(), "fade")
+    d = clamp_transition(transition_duration)
+
+    cmd = [ffmpeg_path, "-y"]
+    for part in scene_files:
+        cmd.extend(["-i", str(Path(part).absolute())])
+
+    if not scene_durations or len(scene_durations) != len(scene_files):
+        scene_durations = [2.0] * len(scene_files)
+
+    filter_parts: List[str] = []
+    v_prev = "[0:v]"
+    a_prev = "[0:a]"
+    elapsed = float(scene_durations[0])
+    for i in range(1, len(scene_files)):
+        v_out = f"v{i}"
+        a_out = f"a{i}"
+        offset = max(0.0, elapsed - d)
+        filter_parts.append(
+            f"{v_prev}[{i}:v]xfade=transition={xfade_style}:duration={d:.3f}:offset={offset:.3f}[{v_out}]"
+        )
+        filter_parts.append(f"{a_prev}[{i}:a]acrossfade=d={d:.3f}:c1=tri:c2=tri[{a_out}]")
+        v_prev = f"[{v_out}]"
+        a_prev = f"[{a_out}]"
+        elapsed += float(scene_durations[i]) - d
+
+    cmd.extend([
+        "-filter_complex", ";".join(filter_parts),
+        "-map", v_prev,
+        "-map", a_prev,
+        *encoder.video_args(22, "medium"),
+        "-c:a", "aac",
+        "-b:a", "160k",
+        "-movflags", "+faststart",
+        out_path,
+    ])
+    return cmd
+
+
+def uses_transitions(transition_style: Optional[str], scene_count: int) -> bool:
+    return bool(transition_style) and transition_style.lower() not in {"cut", "none"} and scene_count > 1
+
+
+def clamp_transition(transition_duration: Optional[float]) -> float:
+    return max(0.08, min(float(transition_duration or 0.25), 1.0))
+
+
+def transition_overlap(transition_style: Optional[str], transition_duration: Optional[float], scene_count: int) -> float:
+    """Seconds each scene after the first starts before the previous one ends (0 for hard cuts)."""
+    if not uses_transitions(transition_style, scene_count):
+        return 0.0
+    return clamp_transition(transition_duration)
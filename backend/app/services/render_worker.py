@@ -0,0 +1,194 @@
+"""
+Render Worker - Subprocess-only cut list renderer used by the Modal worker.
+
+Fetches the source through a pluggable storage backend, renders every cut
+with the shared render plan (NVDEC/NVENC when available, libx264 otherwise),
+stream-copies the parts together and stores the result. No frame ever
+passes through Python, and the storage seam lets the whole pipeline run
+locally on CPU against a directory.
+"""
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol
+
+import structlog
+
+from .render_plan import (
+    CPU_ENCODER,
+    EncoderProfile,
+    ScenePlan,
+    build_concat_command,
+    build_scene_command,
+    detect_encoder,
+    plan_scenes,
+    write_concat_list,
+)
+
+logger = structlog.get_logger()
+
+SCENE_TIMEOUT_SECONDS = 600
+# Data-centre GPUs have no NVENC session cap, but two encodes already
+# saturate a T4's single encoder engine.
+GPU_SCENE_WORKERS = 2
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d\d):(\d\d(?:\.\d+)?)")
+
+
+class RenderStorage(Protocol):
+    def fetch(self, source_url: str, dest: Path) -> None: ...
+
+    def store(self, local_path: Path, key: str) -> None: ...
+
+
+class LocalDirStorage:
+    """Directory-backed storage for local runs and tests; keys are relative paths."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def fetch(self, source_url: str, dest: Path) -> None:
+        src = Path(source_url)
+        if not src.is_absolute():
+            src = self.root / source_url
+        shutil.copyfile(src, dest)
+
+    def store(self, local_path: Path, key: str) -> None:
+        target = self.root / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(local_path, target)
+
+
+class RenderError(RuntimeError):
+    pass
+
+
+def probe_duration(path: Path, ffmpeg_path: str = "ffmpeg") -> float:
+    """Container duration in seconds via ffprobe, or `ffmpeg -i` when ffprobe is absent."""
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe:
+        probe = subprocess.run(
+            [ffprobe, "-v", "error", "-show_entries", "format=duration", "-of", "default=nk=1:nw=1", str(path)],
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+        raw = (probe.stdout or "").strip()
+    else:
+        probe = subprocess.run([ffmpeg_path, "-hide_banner", "-i", str(path)], capture_output=True, text=True, timeout=30)
+        match = _DURATION_RE.search(probe.stderr or "")
+        raw = str(int(match[1]) * 3600 + int(match[2]) * 60 + float(match[3])) if match else ""
+    try:
+        duration = float(raw)
+    except ValueError:
+        duration = 0.0
+    if duration <= 0:
+        raise RenderError(f"Could not read a valid duration from {path.name}: {raw!r}")
+    return duration
+
+
+def _run(cmd: List[str], timeout: float = SCENE_TIMEOUT_SECONDS) -> None:
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout)
+    if proc.returncode != 0:
+        raise RenderError(proc.stderr.decode(errors="replace")[-500:])
+
+
+def render_cut_list(
+    source: Path,
+    scenes: List[ScenePlan],
+    output: Path,
+    work_dir: Path,
+    encoder: EncoderProfile,
+    ffmpeg_path: str = "ffmpeg",
+    fps: Optional[int] = None,
+    crf: int = 18,
+    vf_filters: Optional[str] = None,
+    af_filters: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> None:
+    """Encode each scene in parallel subprocesses, then concat with stream copy."""
+    preset = "medium"
+    parts = [work_dir / f"part_{scene.index:04d}.mp4" for scene in scenes]
+    commands = [
+        build_scene_command(
+            ffmpeg_path,
+            replace(scene, source_path=str(source)),
+            str(part),
+            encoder=encoder,
+            vf_filters=vf_filters,
+            af_filters=af_filters,
+            crf=crf,
+            preset=preset,
+            fps=fps,
+        )
+        for scene, part in zip(scenes, parts)
+    ]
+    workers = max_workers or (GPU_SCENE_WORKERS if encoder.gpu else max(1, (os.cpu_count() or 2) // 2))
+    with ThreadPoolExecutor(max_workers=min(workers, len(commands))) as pool:
+        list(pool.map(_run, commands))
+
+    if len(parts) == 1:
+        # Single part already has the right encode; just faststart it.
+        _run([ffmpeg_path, "-y", "-i", str(parts[0]), "-c", "copy", "-movflags", "+faststart", str(output)])
+        return
+    list_path = write_concat_list(parts, work_dir / "concat.txt")
+    _run(build_concat_command(ffmpeg_path, list_path, str(output)))
+
+
+def run_render_job(
+    storage: RenderStorage,
+    job_id: int,
+    source_url: str,
+    cuts: List[Dict[str, Any]],
+    output_key: str,
+    fps: Optional[int] = 24,
+    crf: int = 18,
+    vf_filters: Optional[str] = None,
+    af_filters: Optional[str] = None,
+    ffmpeg_path: str = "ffmpeg",
+    encoder: Optional[EncoderProfile] = None,
+    max_workers: Optional[int] = None,
+) -> str:
+    """Fetch, render and store one job. Returns the output key."""
+    encoder = encoder or detect_encoder(ffmpeg_path)
+    with tempfile.TemporaryDirectory(prefix=f"render-{job_id}-") as tmp:
+        work_dir = Path(tmp)
+        source = work_dir / "source.mp4"
+        storage.fetch(source_url, source)
+        duration = probe_duration(source, ffmpeg_path)
+
+        # No usable cuts renders the whole source, as the MoviePy path did.
+        scenes = plan_scenes(cuts, str(source), source_duration=duration) or plan_scenes(
+            [{"start": 0, "end": duration}], str(source)
+        )
+        logger.info("render_worker_start", job_id=job_id, scenes=len(scenes), encoder=encoder.name)
+
+        output = work_dir / "output.mp4"
+        render_args = dict(
+            ffmpeg_path=ffmpeg_path,
+            fps=fps,
+            crf=crf,
+            vf_filters=vf_filters,
+            af_filters=af_filters,
+            max_workers=max_workers,
+        )
+        try:
+            render_cut_list(source, scenes, output, work_dir, encoder, **render_args)
+        except RenderError as exc:
+            if not encoder.gpu:
+                raise
+            # Keeps jobs completing when NVENC/NVDEC is present but unusable.
+            logger.warning("render_worker_gpu_fallback", job_id=job_id, error=str(exc)[-200:])
+            encoder = CPU_ENCODER
+            render_cut_list(source, scenes, output, work_dir, encoder, **render_args)
+
+        storage.store(output, output_key)
+        logger.info("render_worker_done", job_id=job_id, output_key=output_key, encoder=encoder.name)
+    return output_key
@@ -6,7 +6,20 @@ from typing import List, Dict, Any
 import structlog
 from ..config import settings
 from .concurrency import limits
+from .file_registry import file_registry
 from .workflow_engine import publish_progress
+from .ass_overlays import AssTrack, build_ass_filter, write_scene_tracks
+from .render_plan import (
+    ScenePlan,
+    build_concat_command,
+    build_scene_command,
+    build_transition_command,
+    detect_encoder,
+    plan_scenes,
+    transition_overlap,
+    uses_transitions,
+    write_concat_list,
+)
 
 logger = structlog.get_logger()
 
@@ -20,6 +33,7 @@ class RenderingOrchestrator:
         self.output_root = Path(settings.storage_root) / "outputs"
         self.output_root.mkdir(parents=True, exist_ok=True)
         self.ffmpeg_path = self._resolve_ffmpeg()
+        self.encoder = detect_encoder(self.ffmpeg_path, prefer_gpu=settings.render_prefer_gpu)
 
     def _resolve_ffmpeg(self) -> str:
         ext = ".exe" if os.name == 'nt' else ""
@@ -55,9 +69,11 @@ class RenderingOrchestrator:
         user_id: int | None = None,
         transition_style: str = "cut",
         transition_duration: float = 0.25,
+        overlay_track: AssTrack | None = None,
     ) -> bool:
         """
         Renders scenes in parallel and merge them.
+        `overlay_track` is clipped per scene and burned in with one libass filter.
         """
         if not cuts:
             logger.warning("render_no_cuts", job_id=job_id)
@@ -65,36 +81,32 @@ class RenderingOrchestrator:
 
         temp_dir = self.output_root / f"job-{job_id}-parts"
         temp_dir.mkdir(parents=True, exist_ok=True)
+        # Registered so a crashed render's parts are still collected by GC.
+        await file_registry.track(temp_dir, "part", job_id=job_id)
         
         try:
             # 1. Prepare scene tasks
+            scenes = plan_scenes(cuts, source_path)
+            overlap = transition_overlap(transition_style, transition_duration, len(scenes))
+            scene_tracks = write_scene_tracks(overlay_track, cuts, temp_dir, overlap) if overlay_track else {}
             tasks = []
             scene_files = []
             scene_durations = []
-            
-            for i, cut in enumerate(cuts):
-                start = float(cut.get("start", 0))
-                end = float(cut.get("end", 0))
-                duration = end - start
-                
-                if duration <= 0: continue
-                
-                part_path = temp_dir / f"part_{i:04d}.mp4"
+
+            for scene in scenes:
+                part_path = temp_dir / f"part_{scene.index:04d}.mp4"
                 scene_files.append(part_path)
-                speed = float(cut.get("speed", 1.0) or 1.0)
-                if speed <= 0:
-                    speed = 1.0
-                scene_durations.append(duration / speed)
+                scene_durations.append(scene.output_duration)
+                overlay_path = scene_tracks.get(scene.index)
                 tasks.append(self._render_scene(
-                    job_id, str(cut.get("source_path") or source_path), start, duration, str(part_path),
+                    job_id,
+                    scene,
+                    str(part_path),
                     vf_filters=vf_filters,
                     af_filters=af_filters,
                     crf=crf,
                     preset=preset,
-                    speed=speed,
-                    keyframes=cut.get("keyframes") if isinstance(cut.get("keyframes"), list) else None,
-                    audio_leadin=float(cut.get("audio_leadin", 0.0) or 0.0),
-                    audio_leadout=float(cut.get("audio_leadout", 0.0) or 0.0),
+                    overlay_filter=build_ass_filter(overlay_path) if overlay_path else None,
                 ))
 
             if not tasks:
@@ -134,71 +146,33 @@ class RenderingOrchestrator:
             import shutil
             if temp_dir.exists():
                 shutil.rmtree(temp_dir)
+            await file_registry.forget(temp_dir)
 
     async def _render_scene(
-        self, 
-        job_id: int, 
-        source_path: str, 
-        start: float, 
-        duration: float, 
+        self,
+        job_id: int,
+        scene: ScenePlan,
         out_path: str,
         vf_filters: str | None = None,
         af_filters: str | None = None,
         crf: int = 23,
         preset: str = "veryfast",
-        speed: float = 1.0,
-        keyframes: list[dict] | None = None,
-        audio_leadin: float = 0.0,
-        audio_leadout: float = 0.0,
+        overlay_filter: str | None = None,
     ):
         """Renders a single scene with a semaphore."""
-        # Convert to absolute paths to avoid FFmpeg CWD issues
-        abs_src = os.path.abspath(source_path)
-        abs_out = os.path.abspath(out_path)
-        
         async with limits.scene_render_semaphore:
-            # For J/L cuts, we need separate trim control for video and audio.
-            # Video: [start, start+duration]
-            # Audio: [start-leadin, start+duration+leadout]
-            
-            v_start = start
-            v_dur = duration
-            a_start = max(0.0, start - audio_leadin)
-            a_dur = duration + (start - a_start) + audio_leadout
-            
-            cmd = [
-                self.ffmpeg_path, "-y",
-                "-i", abs_src,
-                "-c:v", "libx264", "-preset", preset, "-crf", str(crf),
-                "-c:a", "aac", "-b:a", "128k",
-                "-avoid_negative_ts", "make_zero",
-            ]
-
-            vf_chain: list[str] = [f"trim=start={v_start}:duration={v_dur},setpts=PTS-STARTPTS"]
-            af_chain: list[str] = [f"atrim=start={a_start}:duration={a_dur},asetpts=PTS-STARTPTS"]
-
-            if speed and abs(speed - 1.0) > 0.01:
-                # Note: PTOFFSET adjustment might be needed for speed + J/L cuts, 
-                # but for V1 we keep it simple.
-                vf_chain.append(f"setpts={1/speed}*PTS")
-                af_chain.extend(self._atempo_chain(speed))
-
-            zoom_kf = self._keyframed_zoom_filter(keyframes)
-            if zoom_kf:
-                vf_chain.append(zoom_kf)
-
-            if vf_filters:
-                vf_chain.append(vf_filters)
-            if af_filters:
-                af_chain.append(af_filters)
+            cmd = build_scene_command(
+                self.ffmpeg_path,
+                scene,
+                out_path,
+                encoder=self.encoder,
+                vf_filters=vf_filters,
+                af_filters=af_filters,
+                crf=crf,
+                preset=preset,
+                overlay_filter=overlay_filter,
+            )
 
-            if vf_chain:
-                cmd += ["-vf", ",".join(vf_chain)]
-            if af_chain:
-                cmd += ["-af", ",".join(af_chain)]
-                
-            cmd.append(abs_out)
-            
             proc = await asyncio.create_subprocess_exec(
                 *cmd, 
                 stdout=asyncio.subprocess.PIPE, 
@@ -212,35 +186,6 @@ class RenderingOrchestrator:
                 logger.error("ffmpeg_scene_failed", job_id=job_id, command=" ".join(cmd), error=err_msg)
                 raise Exception(f"FFmpeg scene render failed: {err_msg}")
 
-    @staticmethod
-    def _atempo_chain(speed: float) -> list[str]:
-        """Build FFmpeg atempo filters while respecting per-filter [0.5,2.0] constraints."""
-        s = max(0.25, min(speed, 4.0))
-        chain = []
-        while s > 2.0:
-            chain.append("atempo=2.0")
-            s /= 2.0
-        while s < 0.5:
-            chain.append("atempo=0.5")
-            s *= 2.0
-        chain.append(f"atempo={s:.4f}")
-        return chain
-
-    @staticmethod
-    def _keyframed_zoom_filter(keyframes: list[dict] | None) -> str | None:
-        if not keyframes:
-            return None
-        zoom_kf = [k for k in keyframes if (k.get("property") or "").lower() == "zoom"]
-        if len(zoom_kf) < 2:
-            return None
-        z0 = float(zoom_kf[0].get("value", 1.0))
-        z1 = float(zoom_kf[-1].get("value", z0))
-        if abs(z1 - z0) < 0.01:
-            return None
-        # Lightweight keyframe approximation using gradual zoom.
-        step = (z1 - z0) / 240.0
-        return f"zoompan=z='if(lte(on,1),{z0:.4f},min(max(zoom+({step:.6f}),{min(z0,z1):.4f}),{max(z0,z1):.4f}))':d=1:s=1280x720"
-
     async def _concatenate_scenes(
         self,
         job_id: int,
@@ -251,7 +196,7 @@ class RenderingOrchestrator:
         transition_duration: float = 0.25,
     ) -> bool:
         """Merges scenes using the concat demuxer."""
-        if transition_style and transition_style.lower() not in {"cut", "none"} and len(scene_files) > 1:
+        if uses_transitions(transition_style, len(scene_files)):
             return await self._concatenate_with_transitions(
                 scene_files=scene_files,
                 out_path=out_path,
@@ -260,23 +205,10 @@ class RenderingOrchestrator:
                 transition_duration=transition_duration,
             )
 
-        list_path = self.output_root / f"job-{job_id}-list.txt"
-        
-        # Create concat list
-        with open(list_path, "w") as f:
-            for scene in scene_files:
-                # FFmpeg concat list needs escaped paths
-                abs_p = str(scene.absolute()).replace("\\", "/")
-                f.write(f"file '{abs_p}'\n")
+        list_path = write_concat_list(scene_files, self.output_root / f"job-{job_id}-list.txt")
 
         try:
-            cmd = [
-                self.ffmpeg_path, "-y",
-                "-f", "concat", "-safe", "0",
-                "-i", str(list_path),
-                "-c", "copy",
-                out_path
-            ]
+            cmd = build_concat_command(self.ffmpeg_path, list_path, out_path)
             
             proc = await asyncio.create_subprocess_exec(
                 *cmd,
@@ -298,50 +230,15 @@ class RenderingOrchestrator:
         transition_style: str,
         transition_duration: float,
     ) -> bool:
-        xfade_style = {
-            "dissolve": "fade",
-            "crossfade": "fade",
-            "wipe_left": "wipeleft",
-            "wipe_right": "wiperight",
-            "slide_left": "slideleft",
-            "slide_right": "slideright",
-        }.get((transition_style or "").lower(), "fade")
-        d = max(0.08, min(float(transition_duration or 0.25), 1.0))
-
-        cmd = [self.ffmpeg_path, "-y"]
-        for part in scene_files:
-            cmd.extend(["-i", str(part.absolute())])
-
-        if not scene_durations or len(scene_durations) != len(scene_files):
-            scene_durations = [2.0] * len(scene_files)
-
-        filter_parts: list[str] = []
-        v_prev = "[0:v]"
-        a_prev = "[0:a]"
-        elapsed = float(scene_durations[0])
-        for i in range(1, len(scene_files)):
-            v_out = f"v{i}"
-            a_out = f"a{i}"
-            offset = max(0.0, elapsed - d)
-            filter_parts.append(
-                f"{v_prev}[{i}:v]xfade=transition={xfade_style}:duration={d:.3f}:offset={offset:.3f}[{v_out}]"
-            )
-            filter_parts.append(f"{a_prev}[{i}:a]acrossfade=d={d:.3f}:c1=tri:c2=tri[{a_out}]")
-            v_prev = f"[{v_out}]"
-            a_prev = f"[{a_out}]"
-            elapsed += float(scene_durations[i]) - d
-
-        cmd.extend([
-            "-filter_complex", ";".join(filter_parts),
-            "-map", v_prev,
-            "-map", a_prev,
-            "-c:v", "libx264",
-            "-preset", "medium",
-            "-crf", "22",
-            "-c:a", "aac",
-            "-b:a", "160k",
+        cmd = build_transition_command(
+            self.ffmpeg_path,
+            scene_files,
             out_path,
-        ])
+            scene_durations,
+            transition_style,
+            transition_duration,
+            encoder=self.encoder,
+        )
 
         proc = await asyncio.create_subprocess_exec(
             *cmd,
@@ -0,0 +1,17 @@
+"""Stock package - provider search, query/clip caches and pre-transcoded stock footage."""
+from .asset_cache import StockAssetCache
+from .providers import FakeStockProvider, PexelsProvider, PixabayProvider, StockAsset, StockProvider
+from .service import ClipProfile, StockAssetError, StockAssetService, stock_asset_service
+
+__all__ = [
+    "ClipProfile",
+    "FakeStockProvider",
+    "PexelsProvider",
+    "PixabayProvider",
+    "StockAsset",
+    "StockAssetCache",
+    "StockAssetError",
+    "StockAssetService",
+    "StockProvider",
+    "stock_asset_service",
+]
@@ -0,0 +1,275 @@
+"""
+Stock Asset Cache - query results with a TTL, clips stored by content hash.
+
+One SQLite index under the cache root, shared by every process on the host:
+- `queries`: provider + normalised query + limit -> asset list, until expiry.
+- `clips`: source URL -> sha256 of the downloaded bytes. Files live at
+  clips/<aa>/<sha256><ext>, so the same clip reached through two URLs (or
+  two providers) is stored once.
+- `renditions`: sha256 + render profile -> pre-transcoded file.
+Every hit stamps the clip's `used_at`; `evict` drops the least recently used
+clips, with their renditions, until the cache fits its byte budget.
+sqlite3 is blocking, so every call runs in a worker thread behind one lock.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import structlog
+
+logger = structlog.get_logger()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queries (
+    key TEXT PRIMARY KEY,
+    results TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS clips (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    used_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_clips_sha ON clips(sha256);
+CREATE TABLE IF NOT EXISTS renditions (
+    sha256 TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (sha256, profile)
+);
+"""
+
+# Columns added after the first release; indexes created before them are upgraded in place.
+UPGRADES = (
+    ("clips", "used_at", "ALTER TABLE clips ADD COLUMN used_at REAL"),
+    ("renditions", "size", "ALTER TABLE renditions ADD COLUMN size INTEGER NOT NULL DEFAULT 0"),
+)
+
+
+def query_key(provider: str, query: str, limit: int) -> str:
+    return f"{provider}|{' '.join(query.lower().split())}|{limit}"
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StockAssetCache:
+    def __init__(self, root: str | Path, clock: Callable[[], float] = time.time):
+        self.root = Path(root)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.root / "index.db"), check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript(SCHEMA)
+            self._upgrade(self._conn)
+        return self._conn
+
+    @staticmethod
+    def _upgrade(conn: sqlite3.Connection) -> None:
+        for table, column, ddl in UPGRADES:
+            columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column in columns:
+                continue
+            with conn:
+                conn.execute(ddl)
+                if table == "renditions":
+                    for row in conn.execute("SELECT sha256, profile, path FROM renditions").fetchall():
+                        path = Path(row["path"])
+                        size = path.stat().st_size if path.exists() else 0
+                        conn.execute(
+                            "UPDATE renditions SET size = ? WHERE sha256 = ? AND profile = ?",
+                            (size, row["sha256"], row["profile"]),
+                        )
+
+    def _touch(self, conn: sqlite3.Connection, sha256: str) -> None:
+        with conn:
+            conn.execute("UPDATE clips SET used_at = ? WHERE sha256 = ?", (self.clock(), sha256))
+
+    async def _run(self, fn, *args):
+        def locked():
+            with self._lock:
+                return fn(*args)
+        return await asyncio.to_thread(locked)
+
+    # --- query results --------------------------------------------------------
+
+    def _get_query(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        row = self._connect().execute("SELECT results, expires_at FROM queries WHERE key = ?", (key,)).fetchone()
+        if row is None or row["expires_at"] <= self.clock():
+            return None
+        return json.loads(row["results"])
+
+    async def get_query(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        return await self._run(self._get_query, key)
+
+    def _put_query(self, key: str, results: List[Dict[str, Any]], ttl: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO queries (key, results, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(results), self.clock() + ttl),
+            )
+
+    async def put_query(self, key: str, results: List[Dict[str, Any]], ttl: float) -> None:
+        await self._run(self._put_query, key, results, ttl)
+
+    def _purge_expired(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM queries WHERE expires_at <= ?", (self.clock(),)).rowcount
+
+    async def purge_expired(self) -> int:
+        return await self._run(self._purge_expired)
+
+    # --- clips ----------------------------------------------------------------
+
+    def clip_path(self, sha256: str, suffix: str = ".mp4") -> Path:
+        return self.root / "clips" / sha256[:2] / f"{sha256}{suffix}"
+
+    def _clip_for_url(self, url: str) -> Optional[Path]:
+        conn = self._connect()
+        row = conn.execute("SELECT sha256, path FROM clips WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        path = Path(row["path"])
+        if not path.exists():
+            return None
+        self._touch(conn, row["sha256"])
+        return path
+
+    async def clip_for_url(self, url: str) -> Optional[Path]:
+        return await self._run(self._clip_for_url, url)
+
+    def _store_clip(self, url: str, tmp_path: Path, suffix: str) -> Path:
+        sha = file_sha256(tmp_path)
+        target = self.clip_path(sha, suffix)
+        if target.exists():
+            tmp_path.unlink(missing_ok=True)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, target)
+        now = self.clock()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO clips (url, sha256, path, size, fetched_at, used_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, sha, str(target), target.stat().st_size, now, now),
+            )
+        return target
+
+    async def store_clip(self, url: str, tmp_path: Path, suffix: str = ".mp4") -> Path:
+        """Move a finished download into the content-addressed store (deduplicated by hash)."""
+        return await self._run(self._store_clip, url, tmp_path, suffix)
+
+    # --- renditions -----------------------------------------------------------
+
+    def rendition_path(self, clip: Path, profile_key: str) -> Path:
+        return self.root / "renditions" / profile_key / clip.name
+
+    def _rendition(self, clip: Path, profile_key: str) -> Optional[Path]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT path FROM renditions WHERE sha256 = ? AND profile = ?", (clip.stem, profile_key)
+        ).fetchone()
+        if row is None:
+            return None
+        path = Path(row["path"])
+        if not path.exists():
+            return None
+        self._touch(conn, clip.stem)
+        return path
+
+    async def rendition(self, clip: Path, profile_key: str) -> Optional[Path]:
+        return await self._run(self._rendition, clip, profile_key)
+
+    def _store_rendition(self, clip: Path, profile_key: str, path: Path) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO renditions (sha256, profile, path, size) VALUES (?, ?, ?, ?)",
+                (clip.stem, profile_key, str(path), path.stat().st_size),
+            )
+
+    async def store_rendition(self, clip: Path, profile_key: str, path: Path) -> None:
+        await self._run(self._store_rendition, clip, profile_key, path)
+
+    # --- eviction -------------------------------------------------------------
+
+    def _usage(self, conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+        """sha256 -> files on disk, their total size and the clip's last use."""
+        usage: Dict[str, Dict[str, Any]] = {}
+        rows = conn.execute("SELECT sha256, path, size, COALESCE(used_at, fetched_at) AS used_at FROM clips")
+        for row in rows.fetchall():
+            entry = usage.setdefault(row["sha256"], {"paths": set(), "size": 0, "used_at": 0.0})
+            if row["path"] not in entry["paths"]:
+                entry["paths"].add(row["path"])
+                entry["size"] += row["size"]
+            entry["used_at"] = max(entry["used_at"], row["used_at"])
+        for row in conn.execute("SELECT sha256, path, size FROM renditions").fetchall():
+            # Renditions whose clip row is gone count as never used, so they go first.
+            entry = usage.setdefault(row["sha256"], {"paths": set(), "size": 0, "used_at": 0.0})
+            entry["paths"].add(row["path"])
+            entry["size"] += row["size"]
+        return usage
+
+    def _evict(self, max_bytes: int, keep: Optional[str]) -> int:
+        conn = self._connect()
+        usage = self._usage(conn)
+        total = sum(entry["size"] for entry in usage.values())
+        evicted = 0
+        for sha, entry in sorted(usage.items(), key=lambda item: item[1]["used_at"]):
+            if total <= max_bytes:
+                break
+            if sha == keep:
+                continue
+            self._remove_files(entry["paths"])
+            with conn:
+                conn.execute("DELETE FROM clips WHERE sha256 = ?", (sha,))
+                conn.execute("DELETE FROM renditions WHERE sha256 = ?", (sha,))
+            total -= entry["size"]
+            evicted += 1
+        if evicted:
+            logger.info("stock_cache_evicted", clips=evicted, remaining_bytes=total, max_bytes=max_bytes)
+        return evicted
+
+    @staticmethod
+    def _remove_files(paths: Set[str]) -> None:
+        for path in paths:
+            try:
+                Path(path).unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning("stock_cache_remove_failed", path=path, error=str(e))
+
+    async def evict(self, max_bytes: int, keep: Optional[str] = None) -> int:
+        """
+        Drop least recently used clips and their renditions until the cache is
+        within `max_bytes`. `keep` (a clip's sha256) is never evicted. Returns
+        the number of clips removed.
+        """
+        return await self._run(self._evict, max_bytes, keep)
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def close(self) -> None:
+        await self._run(self._close)
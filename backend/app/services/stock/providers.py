@@ -0,0 +1,181 @@
+"""
+Stock providers - Pexels, Pixabay and an offline fake behind one interface.
+
+A provider turns a query into `StockAsset`s and downloads an asset's file.
+Providers never raise on search: a failed request logs and returns None so
+the caller can tell "no hits" (cacheable) from "provider down" (not).
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import structlog
+
+logger = structlog.get_logger()
+
+# Prefer the smallest rendition that still covers the 720p render.
+TARGET_HEIGHT = 720
+DOWNLOAD_CHUNK_BYTES = 1 << 20
+
+
+@dataclass
+class StockAsset:
+    provider: str
+    asset_id: str
+    url: str
+    preview_url: Optional[str] = None
+    width: int = 0
+    height: int = 0
+    duration: Optional[float] = None
+    tags: List[str] = field(default_factory=list)
+    relevance_score: float = 0.5
+    local_path: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StockAsset":
+        return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+
+
+def pick_rendition(files: List[Dict[str, Any]], url_key: str = "link") -> Optional[Dict[str, Any]]:
+    """Smallest file at least TARGET_HEIGHT tall, else the tallest one available."""
+    usable = [f for f in files if isinstance(f, dict) and f.get(url_key) and f.get("height")]
+    if not usable:
+        return None
+    covering = [f for f in usable if int(f["height"]) >= TARGET_HEIGHT]
+    if covering:
+        return min(covering, key=lambda f: int(f["height"]))
+    return max(usable, key=lambda f: int(f["height"]))
+
+
+class StockProvider:
+    name = "base"
+    relevance = 0.5
+
+    async def search(self, client: httpx.AsyncClient, query: str, limit: int) -> Optional[List[StockAsset]]:
+        raise NotImplementedError
+
+    async def download(self, client: httpx.AsyncClient, asset: StockAsset, dest: Path) -> None:
+        async with client.stream("GET", asset.url, follow_redirects=True) as resp:
+            resp.raise_for_status()
+            with open(dest, "wb") as f:
+                async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                    f.write(chunk)
+
+
+class PexelsProvider(StockProvider):
+    name = "pexels"
+    relevance = 0.9
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    async def search(self, client: httpx.AsyncClient, query: str, limit: int) -> Optional[List[StockAsset]]:
+        try:
+            resp = await client.get(
+                "https://api.pexels.com/videos/search",
+                params={"query": query, "per_page": limit},
+                headers={"Authorization": self.api_key},
+            )
+            resp.raise_for_status()
+            assets = []
+            for v in resp.json().get("videos", []):
+                chosen = pick_rendition(v.get("video_files") or [])
+                if not chosen:
+                    continue
+                assets.append(StockAsset(
+                    provider=self.name,
+                    asset_id=str(v.get("id")),
+                    url=chosen["link"],
+                    preview_url=v.get("image"),
+                    width=int(chosen.get("width") or v.get("width") or 0),
+                    height=int(chosen.get("height") or v.get("height") or 0),
+                    duration=v.get("duration"),
+                    tags=[query],
+                    relevance_score=self.relevance,
+                ))
+            return assets
+        except Exception as e:
+            logger.error("pexels_search_failed", query=query, error=str(e))
+            return None
+
+
+class PixabayProvider(StockProvider):
+    name = "pixabay"
+    relevance = 0.8
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    async def search(self, client: httpx.AsyncClient, query: str, limit: int) -> Optional[List[StockAsset]]:
+        try:
+            resp = await client.get(
+                "https://pixabay.com/api/videos/",
+                # Pixabay rejects per_page below 3.
+                params={"key": self.api_key, "q": query, "per_page": max(3, limit)},
+            )
+            resp.raise_for_status()
+            assets = []
+            for v in resp.json().get("hits", [])[:limit]:
+                chosen = pick_rendition(list((v.get("videos") or {}).values()), url_key="url")
+                if not chosen:
+                    continue
+                assets.append(StockAsset(
+                    provider=self.name,
+                    asset_id=str(v.get("id")),
+                    url=chosen["url"],
+                    preview_url=v.get("userImageURL"),
+                    width=int(chosen.get("width") or 0),
+                    height=int(chosen.get("height") or 0),
+                    duration=v.get("duration"),
+                    tags=[query],
+                    relevance_score=self.relevance,
+                ))
+            return assets
+        except Exception as e:
+            logger.error("pixabay_search_failed", query=query, error=str(e))
+            return None
+
+
+class FakeStockProvider(StockProvider):
+    """Deterministic offline provider: fake assets, fake file bytes, recorded calls."""
+    name = "fake"
+    relevance = 0.7
+
+    def __init__(self, delay: float = 0.0, fail_queries: Optional[set] = None):
+        self.delay = delay
+        self.fail_queries = fail_queries or set()
+        self.searches: List[str] = []
+        self.downloads: List[str] = []
+
+    async def search(self, client: httpx.AsyncClient, query: str, limit: int) -> Optional[List[StockAsset]]:
+        self.searches.append(query)
+        await asyncio.sleep(self.delay)
+        if query in self.fail_queries:
+            return None
+        slug = hashlib.sha1(query.encode()).hexdigest()[:8]
+        return [
+            StockAsset(
+                provider=self.name,
+                asset_id=f"{slug}-{i}",
+                url=f"fake://{self.name}/{slug}/{i}.mp4",
+                width=1280,
+                height=720,
+                duration=8.0,
+                tags=[query],
+                relevance_score=self.relevance,
+            )
+            for i in range(limit)
+        ]
+
+    async def download(self, client: httpx.AsyncClient, asset: StockAsset, dest: Path) -> None:
+        self.downloads.append(asset.url)
+        await asyncio.sleep(self.delay)
+        dest.write_bytes(f"fake clip {asset.asset_id}".encode())
@@ -0,0 +1,349 @@
+"""
+Stock Asset Service - concurrent provider search over cached results and clips.
+
+Every (query, provider) pair of a search runs concurrently through one HTTP
+client, with at most `stock_search_concurrency` requests in flight. Results
+are cached per provider and query for `stock_query_ttl_seconds`. Failed
+requests are not cached, so they are retried on the next search.
+Chosen assets are downloaded once into the content-addressed clip cache and
+pre-transcoded to the job's render profile, so a render never fetches a
+remote URL or rescales stock footage scene by scene. The clip cache is kept
+under `stock_cache_max_bytes` by evicting least recently used clips.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Union
+from urllib.parse import urlparse
+from uuid import uuid4
+
+import httpx
+import structlog
+
+from ...config import settings
+from ..ffmpeg_runner import FFmpegRunner, ffmpeg_runner
+from ..deliverables import render_size
+from ..render_plan import CPU_ENCODER
+from .asset_cache import StockAssetCache, query_key
+from .providers import FakeStockProvider, PexelsProvider, PixabayProvider, StockAsset, StockProvider
+
+logger = structlog.get_logger()
+
+SEARCH_TIMEOUT_SECONDS = 10.0
+DOWNLOAD_TIMEOUT_SECONDS = 120.0
+TRANSCODE_TIMEOUT_SECONDS = 300.0
+SILENT_AUDIO = "anullsrc=channel_layout=stereo:sample_rate=48000"
+
+AssetLike = Union[StockAsset, Dict[str, Any]]
+
+
+class StockAssetError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class ClipProfile:
+    """Render profile stock clips are pre-transcoded to (matches the 720p scene renders)."""
+    width: int = 1280
+    height: int = 720
+    fps: int = 24
+    crf: int = 20
+    preset: str = "veryfast"
+
+    @classmethod
+    def for_render(cls, aspect_ratio: Optional[str] = None, platform: Optional[str] = None) -> "ClipProfile":
+        """Profile matching the master frame of a job with this ratio/platform."""
+        width, height = render_size(aspect_ratio, platform)
+        return cls(width=width, height=height)
+
+    @property
+    def key(self) -> str:
+        return f"{self.width}x{self.height}p{self.fps}-crf{self.crf}-sa"
+
+
+def build_transcode_command(ffmpeg_bin: str, src: Path, dst: Path, profile: ClipProfile) -> List[str]:
+    """
+    Fill-crop to the profile's frame at a constant frame rate. The clip's own
+    audio is replaced by silence so a stock scene has the same streams as the
+    source's scenes and still stream-copies into the concat.
+    """
+    w, h = profile.width, profile.height
+    return [
+        ffmpeg_bin, "-y", "-hide_banner",
+        "-i", str(src),
+        "-f", "lavfi", "-i", SILENT_AUDIO,
+        "-map", "0:v:0", "-map", "1:a:0", "-shortest",
+        "-vf", f"scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h},setsar=1,fps={profile.fps}",
+        *CPU_ENCODER.video_args(profile.crf, profile.preset),
+        "-c:a", "aac", "-b:a", "128k",
+        "-pix_fmt", "yuv420p",
+        "-movflags", "+faststart",
+        str(dst),
+    ]
+
+
+def default_providers() -> List[StockProvider]:
+    providers: List[StockProvider] = []
+    if settings.pexels_api_key:
+        providers.append(PexelsProvider(settings.pexels_api_key))
+    if settings.pixabay_api_key:
+        providers.append(PixabayProvider(settings.pixabay_api_key))
+    if settings.stock_fake_provider:
+        providers.append(FakeStockProvider())
+    return providers
+
+
+class StockAssetService:
+    def __init__(
+        self,
+        providers: Optional[Sequence[StockProvider]] = None,
+        cache: Optional[StockAssetCache] = None,
+        concurrency: Optional[int] = None,
+        query_ttl: Optional[float] = None,
+        transcode_concurrency: Optional[int] = None,
+        max_cache_bytes: Optional[int] = None,
+        runner: Optional[FFmpegRunner] = None,
+        ffmpeg_bin: str = "ffmpeg",
+        client_factory: Optional[Callable[[float], httpx.AsyncClient]] = None,
+    ):
+        self.providers = list(providers) if providers is not None else default_providers()
+        self.cache = cache or StockAssetCache(settings.stock_cache_root)
+        self.concurrency = max(1, concurrency or settings.stock_search_concurrency)
+        self.query_ttl = query_ttl if query_ttl is not None else settings.stock_query_ttl_seconds
+        self.runner = runner or ffmpeg_runner
+        self.ffmpeg_bin = ffmpeg_bin
+        self._client_factory = client_factory or (lambda timeout: httpx.AsyncClient(timeout=timeout))
+        self.transcode_concurrency = max(1, transcode_concurrency or settings.stock_transcode_concurrency)
+        self.max_cache_bytes = max_cache_bytes if max_cache_bytes is not None else settings.stock_cache_max_bytes
+        # Loop-bound state: each Celery job runs its own event loop (asyncio.run),
+        # so the semaphore and futures are recreated when the loop changes.
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._transcode_slots: Optional[asyncio.Semaphore] = None
+        # Downloads and transcodes in flight, shared by concurrent callers.
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Background prefetches, held so they are not garbage collected mid-run.
+        self._background: Set[asyncio.Task] = set()
+        self.stats = {
+            "query_hits": 0, "query_misses": 0, "provider_errors": 0,
+            "clip_hits": 0, "downloads": 0, "rendition_hits": 0, "transcodes": 0, "evictions": 0,
+        }
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._transcode_slots = asyncio.Semaphore(self.transcode_concurrency)
+            self._inflight = {}
+            self._background = set()
+
+    def _provider(self, name: str) -> StockProvider:
+        for provider in self.providers:
+            if provider.name == name:
+                return provider
+        return StockProvider()  # plain HTTP download
+
+    # --- search ---------------------------------------------------------------
+
+    async def search(self, queries: Iterable[str], limit_per_query: int = 2) -> List[Dict[str, Any]]:
+        """Assets for every query from every provider, in query then provider order, deduplicated by URL."""
+        unique = [q for q in dict.fromkeys((q or "").strip() for q in queries) if q]
+        pairs = [(query, provider) for query in unique for provider in self.providers]
+        if not pairs:
+            return []
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._client_factory(SEARCH_TIMEOUT_SECONDS) as client:
+            batches = await asyncio.gather(*(
+                self._search_one(client, semaphore, query, provider, limit_per_query)
+                for query, provider in pairs
+            ))
+        results: List[Dict[str, Any]] = []
+        seen = set()
+        for batch in batches:
+            for asset in batch:
+                if asset["url"] not in seen:
+                    seen.add(asset["url"])
+                    results.append(asset)
+        return results
+
+    async def _search_one(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        query: str,
+        provider: StockProvider,
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        key = query_key(provider.name, query, limit)
+        try:
+            cached = await self.cache.get_query(key)
+        except Exception as e:
+            logger.warning("stock_query_cache_read_failed", error=str(e))
+            cached = None
+        if cached is not None:
+            self.stats["query_hits"] += 1
+            return cached
+        self.stats["query_misses"] += 1
+        async with semaphore:
+            assets = await provider.search(client, query, limit)
+        if assets is None:
+            self.stats["provider_errors"] += 1
+            return []
+        found = [asset.to_dict() for asset in assets]
+        try:
+            await self.cache.put_query(key, found, self.query_ttl)
+        except Exception as e:
+            logger.warning("stock_query_cache_write_failed", error=str(e))
+        return found
+
+    # --- clips ----------------------------------------------------------------
+
+    async def _shared(self, key: str, factory) -> Path:
+        """Run `factory()` once per key; concurrent callers await the same result."""
+        self._bind_loop()
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def fetch(self, asset: AssetLike) -> Path:
+        """Local copy of an asset's clip, downloaded at most once per URL."""
+        asset = asset if isinstance(asset, StockAsset) else StockAsset.from_dict(asset)
+        cached = await self.cache.clip_for_url(asset.url)
+        if cached is not None:
+            self.stats["clip_hits"] += 1
+            return cached
+        return await self._shared(f"clip:{asset.url}", lambda: self._download(asset))
+
+    async def _download(self, asset: StockAsset) -> Path:
+        tmp_dir = self.cache.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp = tmp_dir / f"{uuid4().hex}.part"
+        suffix = Path(urlparse(asset.url).path).suffix.lower() or ".mp4"
+        try:
+            async with self._client_factory(DOWNLOAD_TIMEOUT_SECONDS) as client:
+                await self._provider(asset.provider).download(client, asset, tmp)
+            self.stats["downloads"] += 1
+            path = await self.cache.store_clip(asset.url, tmp, suffix)
+        except Exception as e:
+            tmp.unlink(missing_ok=True)
+            raise StockAssetError(f"download failed for {asset.url}: {e}") from e
+        logger.info("stock_clip_cached", provider=asset.provider, url=asset.url, path=str(path))
+        await self._trim(keep=path)
+        return path
+
+    async def _trim(self, keep: Path) -> None:
+        """Evict least recently used clips over the size limit; `keep` was just stored."""
+        if self.max_cache_bytes <= 0:
+            return
+        try:
+            evicted = await self.cache.evict(self.max_cache_bytes, keep=keep.stem)
+        except Exception as e:
+            logger.warning("stock_cache_evict_failed", error=str(e))
+            return
+        if evicted:
+            self.stats["evictions"] += evicted
+
+    async def prepare(self, asset: AssetLike, profile: ClipProfile = ClipProfile()) -> Path:
+        """The asset's clip transcoded to `profile`, reused across jobs and URLs."""
+        clip = await self.fetch(asset)
+        existing = await self.cache.rendition(clip, profile.key)
+        if existing is not None:
+            self.stats["rendition_hits"] += 1
+            return existing
+        return await self._shared(f"rendition:{clip.stem}:{profile.key}", lambda: self._transcode(clip, profile))
+
+    async def _transcode(self, clip: Path, profile: ClipProfile) -> Path:
+        target = self.cache.rendition_path(clip, profile.key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.stem}.{uuid4().hex[:8]}{target.suffix}")
+        self._bind_loop()
+        async with self._transcode_slots:
+            run = await self.runner.run(
+                build_transcode_command(self.ffmpeg_bin, clip, tmp, profile), timeout=TRANSCODE_TIMEOUT_SECONDS
+            )
+        if not run.success or not tmp.exists():
+            tmp.unlink(missing_ok=True)
+            raise StockAssetError(f"transcode failed for {clip.name}: {(run.error or '')[-300:]}")
+        os.replace(tmp, target)
+        await self.cache.store_rendition(clip, profile.key, target)
+        self.stats["transcodes"] += 1
+        await self._trim(keep=clip)
+        return target
+
+    async def _prepare_quietly(self, asset: AssetLike, profile: ClipProfile) -> Optional[Path]:
+        try:
+            return await self.prepare(asset, profile)
+        except Exception as e:
+            url = asset.get("url") if isinstance(asset, dict) else asset.url
+            logger.warning("stock_prepare_failed", url=url, error=str(e))
+            return None
+
+    async def prepare_many(
+        self,
+        assets: Sequence[Dict[str, Any]],
+        profile: ClipProfile = ClipProfile(),
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Copies of `assets` with `local_path` set for every clip ready within
+        `timeout`. Unfinished clips keep preparing in the background and are
+        served from the cache next time.
+        """
+        tasks = [asyncio.ensure_future(self._prepare_quietly(asset, profile)) for asset in assets]
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        prepared = []
+        for asset, task in zip(assets, tasks):
+            path = task.result() if task.done() else None
+            prepared.append({**asset, "local_path": str(path) if path else None})
+        return prepared
+
+    async def resolve_cuts(
+        self,
+        cuts: Sequence[Dict[str, Any]],
+        assets: Sequence[Dict[str, Any]],
+        profile: ClipProfile = ClipProfile(),
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Point every cut that names a scouted asset (`stock_url`) at that clip's
+        rendition for `profile`; a prefetch still in flight is awaited, not
+        repeated. Stock cuts whose clip is unknown or not ready within
+        `timeout` are dropped so the render never fetches a remote URL.
+        """
+        scouted = {asset.get("url"): asset for asset in assets if asset.get("url")}
+        wanted = list(dict.fromkeys(c["stock_url"] for c in cuts if c.get("stock_url") in scouted))
+        prepared = await self.prepare_many([scouted[url] for url in wanted], profile, timeout=timeout)
+        paths = {asset["url"]: asset["local_path"] for asset in prepared if asset["local_path"]}
+        resolved = []
+        for cut in cuts:
+            url = cut.get("stock_url")
+            if not url:
+                resolved.append(dict(cut))
+            elif url in paths:
+                resolved.append({**cut, "source_path": paths[url]})
+            else:
+                logger.warning("stock_cut_dropped", url=url)
+        return resolved
+
+    def prefetch(self, assets: Sequence[Dict[str, Any]], profile: ClipProfile = ClipProfile()) -> Optional[asyncio.Task]:
+        """
+        Download and transcode `assets` in the background without blocking the
+        caller. The task lives on the current loop, so it warms the cache for
+        the rest of the job and for later jobs.
+        """
+        if not assets:
+            return None
+        self._bind_loop()
+        task = asyncio.create_task(self.prepare_many(assets, profile))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+
+stock_asset_service = StockAssetService()
@@ -1,24 +1,107 @@
+import hashlib
+import os
+import re
 from pathlib import Path
 from uuid import uuid4
 from fastapi import UploadFile
 from ..config import settings
 
+# Fixed block size of the content hash; chunked upload sessions use the same
+# size so a chunk's sha256 is also a leaf of the tree hash.
+CONTENT_CHUNK_SIZE = 8 * 1024 * 1024
+
+_HEX_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+class ContentHasher:
+    """
+    Streaming tree hash: sha256 over the concatenated sha256 digests of each
+    CONTENT_CHUNK_SIZE block. Chunks uploaded out of order can be combined
+    from their recorded digests without re-reading the assembled file.
+    """
+
+    def __init__(self) -> None:
+        self.digests: list[str] = []
+        self.size = 0
+        self._block = hashlib.sha256()
+        self._filled = 0
+
+    def update(self, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            take = min(len(view), CONTENT_CHUNK_SIZE - self._filled)
+            self._block.update(view[:take])
+            self._filled += take
+            self.size += take
+            view = view[take:]
+            if self._filled == CONTENT_CHUNK_SIZE:
+                self.digests.append(self._block.hexdigest())
+                self._block = hashlib.sha256()
+                self._filled = 0
+
+    def hexdigest(self) -> str:
+        digests = list(self.digests)
+        if self._filled:
+            digests.append(self._block.hexdigest())
+        return self.combine(digests)
+
+    @staticmethod
+    def combine(chunk_digests: list[str]) -> str:
+        return hashlib.sha256(b"".join(bytes.fromhex(d) for d in chunk_digests)).hexdigest()
+
 
 class StorageService:
     def __init__(self) -> None:
         self.root = Path(settings.storage_root)
         self.upload_dir = self.root / "uploads"
         self.output_dir = self.root / "outputs"
+        self.partial_dir = self.upload_dir / "partial"
+        self.cas_dir = self.upload_dir / "cas"
         self.upload_dir.mkdir(parents=True, exist_ok=True)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        self.cas_dir.mkdir(parents=True, exist_ok=True)
+
+    def cas_path(self, content_hash: str, ext: str = ".mp4") -> Path:
+        return self.cas_dir / content_hash[:2] / f"{content_hash}{ext}"
+
+    def adopt(self, tmp_path: Path, content_hash: str, ext: str = ".mp4") -> tuple[str, bool]:
+        """
+        Move a fully written temp file into content-addressed storage.
+        Returns (path, deduplicated); a duplicate keeps the stored copy and
+        drops the temp file.
+        """
+        target = self.cas_path(content_hash, ext)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target.exists():
+            tmp_path.unlink(missing_ok=True)
+            os.utime(target)  # keep it clear of age-based local cleanup
+            return str(target), True
+        os.replace(tmp_path, target)
+        return str(target), False
+
+    @staticmethod
+    def content_hash_from_path(path: str | None) -> str | None:
+        """Recover the content hash from a CAS path (None for legacy/remote paths)."""
+        if not path or str(path).startswith("http"):
+            return None
+        stem = Path(path).stem
+        return stem if _HEX_DIGEST.fullmatch(stem) else None
 
     async def save_upload(self, file: UploadFile) -> str:
         ext = Path(file.filename or "video.mp4").suffix or ".mp4"
-        target = self.upload_dir / f"{uuid4()}{ext}"
-        with target.open("wb") as handle:
-            while chunk := await file.read(1024 * 1024):
-                handle.write(chunk)
-        return str(target)
+        tmp = self.partial_dir / f"{uuid4()}.tmp"
+        hasher = ContentHasher()
+        try:
+            with tmp.open("wb") as handle:
+                while chunk := await file.read(1024 * 1024):
+                    hasher.update(chunk)
+                    handle.write(chunk)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        path, _ = self.adopt(tmp, hasher.hexdigest(), ext.lower())
+        return path
 
 
 storage_service = StorageService()
@@ -0,0 +1,186 @@
+"""
+Storage Ledger - Database mirror of the R2 bucket.
+
+Every upload/delete made through StorageService is recorded here together
+with per-bucket running totals, so usage checks read one row and retention
+cleanup walks only the expired slice of the age index. A periodic
+reconciliation streams the bucket listing page by page and diffs it against
+the ledger to absorb out-of-band changes.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import delete, func, select, update
+
+from ..db import SessionLocal
+from ..models import StorageObject, StorageUsageTotal
+
+logger = structlog.get_logger()
+
+# (key, size, last_modified) as reported by list_objects_v2
+ListedObject = Tuple[str, int, datetime]
+
+
+def folder_of(key: str) -> str:
+    return key.rsplit("/", 1)[0] if "/" in key else ""
+
+
+class StorageLedger:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    async def _bump_totals(self, session, bucket: str, delta_bytes: int, delta_files: int) -> None:
+        # Atomic in-SQL increment keeps concurrent writers from losing updates.
+        result = await session.execute(
+            update(StorageUsageTotal)
+            .where(StorageUsageTotal.bucket == bucket)
+            .values(
+                bytes=StorageUsageTotal.bytes + delta_bytes,
+                files=StorageUsageTotal.files + delta_files,
+                updated_at=datetime.utcnow(),
+            )
+        )
+        if not result.rowcount:
+            session.add(StorageUsageTotal(bucket=bucket, bytes=max(0, delta_bytes), files=max(0, delta_files)))
+
+    async def record_upload(
+        self,
+        bucket: str,
+        key: str,
+        size: int,
+        content_type: Optional[str] = None,
+    ) -> None:
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            existing = await session.get(StorageObject, (bucket, key))
+            if existing:
+                delta_bytes, delta_files = size - existing.size, 0
+                existing.size = size
+                existing.content_type = content_type
+                existing.created_at = now
+                existing.last_seen_at = now
+            else:
+                delta_bytes, delta_files = size, 1
+                session.add(StorageObject(
+                    bucket=bucket,
+                    key=key,
+                    folder=folder_of(key),
+                    size=size,
+                    content_type=content_type,
+                    created_at=now,
+                    last_seen_at=now,
+                ))
+            await self._bump_totals(session, bucket, delta_bytes, delta_files)
+            await session.commit()
+
+    async def record_delete(self, bucket: str, keys: Iterable[str]) -> int:
+        keys = list(keys)
+        if not keys:
+            return 0
+        async with self.session_factory() as session:
+            row = (await session.execute(
+                select(func.count(), func.coalesce(func.sum(StorageObject.size), 0))
+                .where(StorageObject.bucket == bucket, StorageObject.key.in_(keys))
+            )).one()
+            count, size = int(row[0] or 0), int(row[1] or 0)
+            if count:
+                await session.execute(
+                    delete(StorageObject).where(StorageObject.bucket == bucket, StorageObject.key.in_(keys))
+                )
+                await self._bump_totals(session, bucket, -size, -count)
+            await session.commit()
+        return count
+
+    async def get(self, bucket: str, key: str) -> Optional[StorageObject]:
+        async with self.session_factory() as session:
+            return await session.get(StorageObject, (bucket, key))
+
+    async def usage(self, bucket: str) -> Dict[str, Any]:
+        async with self.session_factory() as session:
+            totals = await session.get(StorageUsageTotal, bucket)
+        if not totals:
+            return {"bytes": 0, "files": 0, "reconciled_at": None}
+        return {
+            "bytes": max(0, int(totals.bytes or 0)),
+            "files": max(0, int(totals.files or 0)),
+            "reconciled_at": totals.reconciled_at.isoformat() if totals.reconciled_at else None,
+        }
+
+    async def expired_keys(self, bucket: str, cutoff: datetime, limit: int = 1000) -> List[str]:
+        """Oldest keys created before `cutoff` (range scan on the age index)."""
+        async with self.session_factory() as session:
+            rows = await session.execute(
+                select(StorageObject.key)
+                .where(StorageObject.bucket == bucket, StorageObject.created_at < cutoff)
+                .order_by(StorageObject.created_at)
+                .limit(limit)
+            )
+            return list(rows.scalars().all())
+
+    async def reconcile_page(self, bucket: str, listed: List[ListedObject], run_started: datetime) -> int:
+        """Apply one listing page: add unknown keys, fix sizes, mark seen. Returns rows changed."""
+        if not listed:
+            return 0
+        changed = 0
+        async with self.session_factory() as session:
+            rows = await session.execute(
+                select(StorageObject).where(
+                    StorageObject.bucket == bucket,
+                    StorageObject.key.in_([key for key, _, _ in listed]),
+                )
+            )
+            known = {obj.key: obj for obj in rows.scalars().all()}
+            for key, size, last_modified in listed:
+                obj = known.get(key)
+                if obj is None:
+                    session.add(StorageObject(
+                        bucket=bucket,
+                        key=key,
+                        folder=folder_of(key),
+                        size=size,
+                        created_at=last_modified,
+                        last_seen_at=run_started,
+                    ))
+                    changed += 1
+                    continue
+                if obj.size != size:
+                    obj.size = size
+                    changed += 1
+                obj.last_seen_at = run_started
+            await session.commit()
+        return changed
+
+    async def finish_reconcile(self, bucket: str, run_started: datetime) -> Dict[str, int]:
+        """Drop rows the listing no longer has and rebuild totals from the ledger."""
+        async with self.session_factory() as session:
+            removed = await session.execute(
+                delete(StorageObject).where(
+                    StorageObject.bucket == bucket,
+                    StorageObject.last_seen_at < run_started,
+                )
+            )
+            row = (await session.execute(
+                select(func.count(), func.coalesce(func.sum(StorageObject.size), 0))
+                .where(StorageObject.bucket == bucket)
+            )).one()
+            files, total_bytes = int(row[0] or 0), int(row[1] or 0)
+            totals = await session.get(StorageUsageTotal, bucket)
+            if totals is None:
+                totals = StorageUsageTotal(bucket=bucket)
+            totals.bytes = total_bytes
+            totals.files = files
+            totals.reconciled_at = datetime.utcnow()
+            session.add(totals)
+            await session.commit()
+        return {"removed": int(removed.rowcount or 0), "files": files, "bytes": total_bytes}
+
+    async def last_reconciled(self, bucket: str) -> Optional[datetime]:
+        async with self.session_factory() as session:
+            totals = await session.get(StorageUsageTotal, bucket)
+            return totals.reconciled_at if totals else None
+
+
+storage_ledger = StorageLedger()
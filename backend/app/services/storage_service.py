@@ -3,13 +3,17 @@ Cloudflare R2 Storage Service with Free Tier Limits
 - 10GB storage cap
 - Auto-cleanup of old files
 - Per-file size limit (100MB)
+- Usage and retention read from the object ledger (see storage_ledger)
 """
+import asyncio
 import boto3
 from botocore.config import Config
 from pathlib import Path
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from ..config import settings
+from .r2_transfer import TransferManager, file_content_hash
+from .storage_ledger import storage_ledger
 
 
 # Free tier limits
@@ -43,52 +47,38 @@ class StorageService:
         else:
             self.s3_client = None
             print("[Storage] Local filesystem (R2 not configured)")
+        self.transfers = TransferManager(
+            client_factory=lambda: self.s3_client,
+            bucket_factory=lambda: getattr(self, "bucket", None),
+        )
     
-    def get_storage_usage(self) -> dict:
-        """Get current storage usage in bytes and file count with 5-min caching."""
+    async def get_storage_usage(self) -> dict:
+        """Current storage usage from the object ledger's running totals (one row read)."""
         if not self.use_r2 or not self.s3_client:
             return {"bytes": 0, "files": 0, "percent": 0}
-            
-        # 5-minute cache
-        import time
-        now = time.time()
-        if hasattr(self, "_cached_usage") and hasattr(self, "_last_usage_check"):
-            if now - self._last_usage_check < 300:  # 5 minutes
-                return self._cached_usage
-        
-        total_bytes = 0
-        file_count = 0
-        
+
         try:
-            paginator = self.s3_client.get_paginator('list_objects_v2')
-            for page in paginator.paginate(Bucket=self.bucket):
-                for obj in page.get('Contents', []):
-                    total_bytes += obj['Size']
-                    file_count += 1
+            totals = await storage_ledger.usage(self.bucket)
         except Exception as e:
             print(f"[Storage] Error getting usage: {e}")
-            
-        usage = {
+            totals = {"bytes": 0, "files": 0, "reconciled_at": None}
+
+        total_bytes = totals["bytes"]
+        return {
             "bytes": total_bytes,
-            "files": file_count,
+            "files": totals["files"],
             "percent": round((total_bytes / MAX_STORAGE_BYTES) * 100, 1),
             "limit_gb": MAX_STORAGE_BYTES / (1024**3),
             "used_gb": round(total_bytes / (1024**3), 2),
-            "cached": False,
+            "reconciled_at": totals["reconciled_at"],
         }
-        
-        self._cached_usage = usage.copy()
-        self._cached_usage["cached"] = True
-        self._last_usage_check = now
-        
-        return usage
     
-    def cleanup_old_files(self, force: bool = False) -> int:
+    async def cleanup_old_files(self, force: bool = False) -> int:
         """Delete files older than retention period. Returns count deleted."""
         if not self.use_r2 or not self.s3_client:
             return 0
         
-        usage = self.get_storage_usage()
+        usage = await self.get_storage_usage()
         should_cleanup = force or (usage["percent"] >= CLEANUP_THRESHOLD * 100)
         
         if not should_cleanup:
@@ -98,31 +88,82 @@ class StorageService:
         
         deleted_count = 0
         cutoff_date = datetime.utcnow() - timedelta(days=FILE_RETENTION_DAYS)
-        files_to_delete = []
         
         try:
-            paginator = self.s3_client.get_paginator('list_objects_v2')
-            for page in paginator.paginate(Bucket=self.bucket):
-                for obj in page.get('Contents', []):
-                    if obj['LastModified'].replace(tzinfo=None) < cutoff_date:
-                        files_to_delete.append({'Key': obj['Key']})
+            # Walk only the expired slice of the ledger's age index, 1000 keys
+            # at a time (S3 delete_objects limit).
+            while True:
+                keys = await storage_ledger.expired_keys(self.bucket, cutoff_date, limit=1000)
+                if not keys:
+                    break
+                response = await asyncio.to_thread(
+                    self.s3_client.delete_objects,
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": key} for key in keys]},
+                )
+                failed = {err.get("Key") for err in (response or {}).get("Errors", [])}
+                removed = [key for key in keys if key not in failed]
+                await storage_ledger.record_delete(self.bucket, removed)
+                deleted_count += len(removed)
+                if failed:
+                    print(f"[Storage] Cleanup could not delete {len(failed)} objects")
+                    break
             
-            if files_to_delete:
-                # Delete in batches of 1000 (S3 limit)
-                for i in range(0, len(files_to_delete), 1000):
-                    batch = files_to_delete[i:i+1000]
-                    self.s3_client.delete_objects(
-                        Bucket=self.bucket,
-                        Delete={'Objects': batch}
-                    )
-                    deleted_count += len(batch)
-                
+            if deleted_count:
                 print(f"[Storage] Deleted {deleted_count} old files")
         except Exception as e:
             print(f"[Storage] Cleanup error: {e}")
         
         return deleted_count
+
+    async def reconcile_ledger(self) -> dict:
+        """
+        Background diff of the bucket listing against the ledger. Pages are
+        listed off-loop and applied one at a time, so memory stays bounded.
+        """
+        if not self.use_r2 or not self.s3_client:
+            return {"pages": 0, "changed": 0, "removed": 0}
+
+        run_started = datetime.utcnow()
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        pages = iter(paginator.paginate(Bucket=self.bucket))
+        page_count = 0
+        changed = 0
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                break
+            listed = [
+                (obj["Key"], int(obj["Size"]), _naive_utc(obj["LastModified"]))
+                for obj in page.get("Contents", [])
+            ]
+            changed += await storage_ledger.reconcile_page(self.bucket, listed, run_started)
+            page_count += 1
+
+        summary = await storage_ledger.finish_reconcile(self.bucket, run_started)
+        result = {"pages": page_count, "changed": changed, **summary}
+        print(f"[Storage] Ledger reconciled: {result}")
+        return result
     
+    async def _ensure_capacity(self, file_size: int) -> None:
+        usage = await self.get_storage_usage()
+        if usage["bytes"] + file_size > MAX_STORAGE_BYTES:
+            await self.cleanup_old_files(force=True)
+            # Re-check after cleanup
+            usage = await self.get_storage_usage()
+            if usage["bytes"] + file_size > MAX_STORAGE_BYTES:
+                raise ValueError("Storage limit reached (10GB). Try again later.")
+
+    def _object_url(self, key: str) -> str:
+        # Public URL or presigned URL
+        if settings.r2_public_url:
+            return f"{settings.r2_public_url}/{key}"
+        return self.s3_client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=604800,  # 7 days
+        )
+
     async def upload_file(self, local_path: str, folder: str = "uploads") -> str:
         """Upload a file to R2 with size limits."""
         path = Path(local_path)
@@ -137,46 +178,73 @@ class StorageService:
             raise ValueError(f"File too large: {file_size / (1024**2):.1f}MB. Max: 100MB")
         
         if self.use_r2 and self.s3_client:
-            # Check storage capacity and cleanup if needed
-            usage = self.get_storage_usage()
-            if usage["bytes"] + file_size > MAX_STORAGE_BYTES:
-                self.cleanup_old_files(force=True)
-                # Re-check after cleanup
-                usage = self.get_storage_usage()
-                if usage["bytes"] + file_size > MAX_STORAGE_BYTES:
-                    raise ValueError("Storage limit reached (10GB). Try again later.")
+            await self._ensure_capacity(file_size)
             
             # Generate unique key
             unique_id = uuid.uuid4().hex[:8]
             key = f"{folder}/{unique_id}-{path.name}"
             content_type = self._get_content_type(path.suffix)
             
-            with open(path, "rb") as f:
-                self.s3_client.upload_fileobj(
-                    f, self.bucket, key,
-                    ExtraArgs={"ContentType": content_type}
-                )
-            
-            # Return public URL or presigned URL
-            if settings.r2_public_url:
-                return f"{settings.r2_public_url}/{key}"
-            return self.s3_client.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": self.bucket, "Key": key},
-                ExpiresIn=604800,  # 7 days
-            )
+            await self.transfers.upload(path, key, content_type)
+            await storage_ledger.record_upload(self.bucket, key, file_size, content_type)
+            return self._object_url(key)
         else:
             return str(path)
+
+    async def upload_source(self, local_path: str, folder: str = "sources") -> str:
+        """
+        Upload a render source keyed by content hash. Retries, QC iterations
+        and re-renders of the same source reuse the existing object once a
+        HEAD request confirms it is still in the bucket.
+        """
+        path = Path(local_path)
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {local_path}")
+        if not (self.use_r2 and self.s3_client):
+            return str(path)
+
+        file_size = path.stat().st_size
+        if file_size > MAX_FILE_SIZE_BYTES:
+            raise ValueError(f"File too large: {file_size / (1024**2):.1f}MB. Max: 100MB")
+
+        content_hash = await asyncio.to_thread(file_content_hash, path)
+        key = f"{folder}/{content_hash}{path.suffix.lower() or '.mp4'}"
+        content_type = self._get_content_type(path.suffix)
+
+        # The ledger can outlive its object (lifecycle rules, manual deletes,
+        # a reconcile not yet run), so only a HEAD hit skips the upload.
+        if await self.transfers.head(key) is not None:
+            self.transfers.record_dedupe_hit(key, file_size)
+        else:
+            if await storage_ledger.get(self.bucket, key) is not None:
+                # Drop the stale row first so the capacity check stops counting it.
+                await storage_ledger.record_delete(self.bucket, [key])
+            await self._ensure_capacity(file_size)
+            await self.transfers.upload(path, key, content_type)
+        # Refreshes the ledger age on reuse so retention keeps active sources.
+        await storage_ledger.record_upload(self.bucket, key, file_size, content_type)
+        return self._object_url(key)
+
+    async def download_file(self, key: str, local_path: str) -> str:
+        """Concurrent ranged download of an R2 object to a local path."""
+        if not (self.use_r2 and self.s3_client):
+            raise RuntimeError("R2 not configured")
+        await self.transfers.download(key, local_path)
+        return local_path
     
     async def delete_file(self, key: str) -> bool:
         """Delete a single file from R2."""
         if self.use_r2 and self.s3_client:
             try:
-                self.s3_client.delete_object(Bucket=self.bucket, Key=key)
+                await asyncio.to_thread(self.s3_client.delete_object, Bucket=self.bucket, Key=key)
+                await storage_ledger.record_delete(self.bucket, [key])
                 return True
             except Exception as e:
                 print(f"[Storage] Delete error: {e}")
         return False
+
+    def get_transfer_metrics(self) -> dict:
+        return self.transfers.metrics.snapshot()
     
     def _get_content_type(self, suffix: str) -> str:
         """Map file extension to MIME type."""
@@ -192,5 +260,11 @@ class StorageService:
         return types.get(suffix.lower(), "application/octet-stream")
 
 
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 # Singleton
 storage_service = StorageService()
@@ -0,0 +1,374 @@
+"""
+Thumbnail Engine - One decode pass for thumbnail candidates and scrub sprites.
+
+A single FFmpeg process (keyframes-only or on a proxy) fans the decoded video
+out to N candidate JPEGs, a tiny grayscale copy of each candidate for NumPy
+scoring, and tiled sprite sheets with a WebVTT index for hover scrubbing.
+Keyframes-only candidates are the first keyframe of each slot, each used
+once, and every candidate is timestamped from its frame's pts.
+"""
+import json
+import math
+import shutil
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+from .ffmpeg_runner import FFmpegRunner, ffmpeg_runner, run_blocking
+from .media_analysis import media_analyzer
+
+logger = structlog.get_logger()
+
+# Size of the grayscale frames used for scoring.
+ANALYSIS_SIZE = (160, 90)
+# Sources longer than this decode keyframes only unless a proxy is given.
+KEYFRAME_ONLY_MIN_DURATION = 120.0
+MANIFEST_NAME = "manifest.json"
+# Per-candidate pts written by the metadata filter.
+CANDIDATE_PTS_NAME = "candidates.pts"
+
+
+@dataclass
+class ThumbnailCandidate:
+    """One extracted frame with its heuristic scores (0-1, score 0-10)."""
+    index: int
+    timestamp: float
+    path: str
+    sharpness: float = 0.0
+    exposure: float = 0.0
+    center_energy: float = 0.0
+    score: float = 0.0
+
+
+@dataclass
+class ThumbnailSet:
+    """Candidates plus scrubbing sprite sheets for one video."""
+    video_path: str
+    duration: float
+    candidates: List[ThumbnailCandidate] = field(default_factory=list)
+    sprite_paths: List[str] = field(default_factory=list)
+    vtt_path: Optional[str] = None
+    tile: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def best(self) -> Optional[ThumbnailCandidate]:
+        return max(self.candidates, key=lambda c: c.score, default=None)
+
+    def choose(self, timestamp: Optional[float] = None) -> Optional[ThumbnailCandidate]:
+        """Nearest candidate to `timestamp`, or the top-scored one when absent."""
+        if timestamp is None or not self.candidates:
+            return self.best
+        try:
+            target = float(timestamp)
+        except (TypeError, ValueError):
+            return self.best
+        return min(self.candidates, key=lambda c: abs(c.timestamp - target))
+
+    def agent_candidates(self) -> List[Dict[str, Any]]:
+        """Compact view for the THUMB agent prompt."""
+        return [
+            {
+                "timestamp": c.timestamp,
+                "score": c.score,
+                "sharpness": c.sharpness,
+                "exposure": c.exposure,
+                "center_energy": c.center_energy,
+            }
+            for c in sorted(self.candidates, key=lambda c: c.score, reverse=True)
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def score_frames(frames: Any) -> List[Dict[str, float]]:
+    """
+    Cheap per-frame heuristics on an (N, H, W) uint8 grayscale stack:
+    - sharpness: variance of the 4-neighbour Laplacian
+    - exposure: closeness of mean luma to mid-grey, penalised by clipping
+    - center_energy: gradient energy in the central region relative to the frame
+      (a subject-in-the-middle proxy that needs no face detector)
+    """
+    import numpy as np
+
+    stack = np.asarray(frames, dtype=np.float32) / 255.0
+    if stack.ndim == 2:
+        stack = stack[None, ...]
+    scores: List[Dict[str, float]] = []
+    for frame in stack:
+        lap = (
+            4 * frame[1:-1, 1:-1]
+            - frame[:-2, 1:-1] - frame[2:, 1:-1]
+            - frame[1:-1, :-2] - frame[1:-1, 2:]
+        )
+        sharpness = 1.0 - math.exp(-float(lap.var()) / 0.004)
+
+        mean = float(frame.mean())
+        clipped = float((frame < 0.02).mean() + (frame > 0.98).mean())
+        exposure = max(0.0, 1.0 - abs(mean - 0.45) / 0.45) * (1.0 - min(1.0, clipped * 2.0))
+
+        grad = np.abs(np.diff(frame, axis=0))[:, :-1] + np.abs(np.diff(frame, axis=1))[:-1, :]
+        h, w = grad.shape
+        center = grad[h // 4: 3 * h // 4, w // 4: 3 * w // 4]
+        ratio = float(center.mean()) / (float(grad.mean()) + 1e-6)
+        center_energy = min(1.0, max(0.0, ratio - 0.5) / 1.5)
+
+        score = 10.0 * (0.45 * sharpness + 0.35 * exposure + 0.20 * center_energy)
+        if mean < 0.06 or mean > 0.94:
+            score *= 0.2  # black/white flash frames
+        scores.append({
+            "sharpness": round(sharpness, 3),
+            "exposure": round(exposure, 3),
+            "center_energy": round(center_energy, 3),
+            "score": round(score, 2),
+        })
+    return scores
+
+
+def read_candidate_pts(path: Path) -> List[float]:
+    """`pts_time` of each frame in a metadata=mode=print log, in output order."""
+    if not path.exists():
+        return []
+    times: List[float] = []
+    for line in path.read_text(encoding="utf-8", errors="ignore").splitlines():
+        _, sep, value = line.rpartition("pts_time:")
+        if not sep:
+            continue
+        try:
+            times.append(float(value.split()[0]))
+        except (IndexError, ValueError):
+            continue
+    return times
+
+
+def build_scrub_vtt(
+    sprite_names: List[str],
+    frame_count: int,
+    interval: float,
+    duration: float,
+    tile_width: int,
+    tile_height: int,
+    cols: int,
+    rows: int,
+) -> str:
+    """WebVTT index mapping each interval to its cell in a sprite sheet."""
+    def _ts(seconds: float) -> str:
+        ms = int(round(seconds * 1000))
+        h, ms = divmod(ms, 3_600_000)
+        m, ms = divmod(ms, 60_000)
+        s, ms = divmod(ms, 1000)
+        return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
+
+    per_sheet = cols * rows
+    lines = ["WEBVTT", ""]
+    for f in range(frame_count):
+        sheet = f // per_sheet
+        if sheet >= len(sprite_names):
+            break
+        start = f * interval
+        if start >= duration:
+            break
+        end = min((f + 1) * interval, duration)
+        cell = f % per_sheet
+        x, y = (cell % cols) * tile_width, (cell // cols) * tile_height
+        lines.append(f"{_ts(start)} --> {_ts(end)}")
+        lines.append(f"{sprite_names[sheet]}#xywh={x},{y},{tile_width},{tile_height}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+class ThumbnailEngine:
+    """
+    Extracts scored thumbnail candidates and scrub sprites in a single pass.
+    """
+
+    def __init__(
+        self,
+        runner: Optional[FFmpegRunner] = None,
+        candidate_count: int = 12,
+        candidate_width: int = 1280,
+        tile_size: tuple[int, int] = (160, 90),
+        tile_grid: tuple[int, int] = (10, 10),
+        max_sprite_frames: int = 200,
+    ):
+        self.runner = runner or ffmpeg_runner
+        self.candidate_count = candidate_count
+        self.candidate_width = candidate_width
+        self.tile_size = tile_size
+        self.tile_grid = tile_grid
+        self.max_sprite_frames = max_sprite_frames
+
+    def build_command(
+        self,
+        ffmpeg_bin: str,
+        video_path: str,
+        out_dir: Path,
+        duration: float,
+        count: int,
+        keyframes_only: bool,
+    ) -> tuple[List[str], float, float]:
+        """Return (cmd, candidate_interval, sprite_interval)."""
+        cand_interval = max(duration / max(count, 1), 0.04)
+        sprite_interval = max(1.0, duration / self.max_sprite_frames)
+        tw, th = self.tile_size
+        cols, rows = self.tile_grid
+        aw, ah = ANALYSIS_SIZE
+
+        if keyframes_only:
+            # fps would repeat the last keyframe to fill every slot; take each keyframe
+            # at most once instead, at least one interval after the previous pick.
+            pick = f"select='isnan(prev_selected_t)+gte(t-prev_selected_t,{cand_interval:.6f})'"
+        else:
+            pick = f"fps=fps=1/{cand_interval:.6f}:round=near"
+        pts_file = str((out_dir / CANDIDATE_PTS_NAME).absolute()).replace("\\", "/").replace(":", "\\:")
+
+        graph = ";".join([
+            "[0:v]split=2[c][s]",
+            f"[c]{pick},metadata=mode=add:key=candidate:value=1,"
+            f"metadata=mode=print:file='{pts_file}',"
+            f"scale={self.candidate_width}:-2,split=2[cj][cr]",
+            f"[cr]scale={aw}:{ah},format=gray[raw]",
+            f"[s]fps=fps=1/{sprite_interval:.6f}:round=near,"
+            f"scale={tw}:{th}:force_original_aspect_ratio=decrease,"
+            f"pad={tw}:{th}:(ow-iw)/2:(oh-ih)/2,tile={cols}x{rows}[sp]",
+        ])
+
+        cmd = [ffmpeg_bin, "-y", "-hide_banner"]
+        if keyframes_only:
+            cmd += ["-skip_frame", "nokey"]
+        cmd += [
+            "-i", video_path,
+            "-filter_complex", graph,
+            "-map", "[cj]", "-fps_mode", "passthrough", "-frames:v", str(count), "-q:v", "2",
+            str(out_dir / "cand_%03d.jpg"),
+            "-map", "[raw]", "-fps_mode", "passthrough", "-frames:v", str(count), "-f", "rawvideo",
+            str(out_dir / "candidates.gray"),
+            "-map", "[sp]", "-q:v", "4", str(out_dir / "sprite_%03d.jpg"),
+        ]
+        return cmd, cand_interval, sprite_interval
+
+    async def extract(
+        self,
+        video_path: str,
+        out_dir: str | Path,
+        duration: Optional[float] = None,
+        count: Optional[int] = None,
+        proxy_path: Optional[str] = None,
+        keyframes_only: Optional[bool] = None,
+        timeout: float = 300.0,
+    ) -> Optional[ThumbnailSet]:
+        """
+        Decode `video_path` (or its `proxy_path`) once and write candidates,
+        sprites, `scrub.vtt` and `manifest.json` into `out_dir`.
+        """
+        count = count or self.candidate_count
+        out = Path(out_dir)
+        if out.exists():
+            shutil.rmtree(out)
+        out.mkdir(parents=True, exist_ok=True)
+
+        decode_path = proxy_path if proxy_path and Path(proxy_path).exists() else video_path
+        if not duration:
+            metadata = await media_analyzer.get_metadata(decode_path)
+            duration = metadata.duration if metadata else 0.0
+        if not duration or duration <= 0:
+            logger.warning("thumbnail_engine_no_duration", path=video_path)
+            return None
+        if keyframes_only is None:
+            keyframes_only = decode_path == video_path and duration >= KEYFRAME_ONLY_MIN_DURATION
+
+        cmd, cand_interval, sprite_interval = self.build_command(
+            media_analyzer.ffmpeg, decode_path, out, duration, count, keyframes_only
+        )
+        run = await self.runner.run(cmd, duration=duration, timeout=timeout)
+        if not run.success:
+            logger.error("thumbnail_engine_failed", path=video_path, error=(run.error or "")[-500:])
+            return None
+
+        candidate_files = sorted(out.glob("cand_*.jpg"))
+        timestamps = read_candidate_pts(out / CANDIDATE_PTS_NAME)
+        if len(timestamps) < len(candidate_files):
+            timestamps = [i * cand_interval for i in range(len(candidate_files))]
+        # Frame slot of each kept candidate; a repeated frame is dropped before scoring.
+        kept: List[int] = []
+        for i, path in enumerate(candidate_files):
+            if kept and round(timestamps[i], 3) == round(timestamps[kept[-1]], 3):
+                path.unlink()
+                continue
+            kept.append(i)
+        candidates = [
+            ThumbnailCandidate(index=n, timestamp=round(timestamps[i], 3), path=str(candidate_files[i]))
+            for n, i in enumerate(kept)
+        ]
+        raw_path = out / "candidates.gray"
+        if candidates and raw_path.exists():
+            import numpy as np
+
+            aw, ah = ANALYSIS_SIZE
+            frames = np.fromfile(raw_path, dtype=np.uint8)
+            usable = min(len(frames) // (aw * ah), len(candidate_files))
+            frames = frames[: usable * aw * ah].reshape(usable, ah, aw)
+            frames = frames[[i for i in kept if i < usable]]
+            for cand, scores in zip(candidates, score_frames(frames)):
+                cand.sharpness = scores["sharpness"]
+                cand.exposure = scores["exposure"]
+                cand.center_energy = scores["center_energy"]
+                cand.score = scores["score"]
+            raw_path.unlink()
+        (out / CANDIDATE_PTS_NAME).unlink(missing_ok=True)
+
+        sprite_files = sorted(out.glob("sprite_*.jpg"))
+        tw, th = self.tile_size
+        cols, rows = self.tile_grid
+        sprite_frames = int(math.ceil(duration / sprite_interval))
+        vtt_path = out / "scrub.vtt"
+        vtt_path.write_text(
+            build_scrub_vtt([p.name for p in sprite_files], sprite_frames, sprite_interval, duration, tw, th, cols, rows),
+            encoding="utf-8",
+        )
+
+        result = ThumbnailSet(
+            video_path=video_path,
+            duration=round(duration, 3),
+            candidates=candidates,
+            sprite_paths=[str(p) for p in sprite_files],
+            vtt_path=str(vtt_path),
+            tile={"width": tw, "height": th, "cols": cols, "rows": rows, "interval": round(sprite_interval, 3)},
+        )
+        (out / MANIFEST_NAME).write_text(json.dumps(result.to_dict()), encoding="utf-8")
+        logger.info(
+            "thumbnail_engine_complete",
+            path=video_path,
+            candidates=len(candidates),
+            sprites=len(sprite_files),
+            keyframes_only=keyframes_only,
+            elapsed=run.elapsed_seconds,
+        )
+        return result
+
+    def extract_sync(self, video_path: str, out_dir: str | Path, **kwargs: Any) -> Optional[ThumbnailSet]:
+        """Blocking variant of extract() for Celery workers."""
+        return run_blocking(self.extract(video_path, out_dir, **kwargs))
+
+    @staticmethod
+    def load_manifest(out_dir: str | Path) -> Optional[Dict[str, Any]]:
+        path = Path(out_dir) / MANIFEST_NAME
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def promote(candidate: ThumbnailCandidate, thumb_path: str | Path) -> str:
+        """Copy the chosen candidate to the job's canonical thumbnail path."""
+        Path(thumb_path).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(candidate.path, thumb_path)
+        return str(thumb_path)
+
+
+# Global engine instance
+thumbnail_engine = ThumbnailEngine()
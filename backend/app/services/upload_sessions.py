@@ -0,0 +1,311 @@
+"""
+Upload Sessions - Resumable chunked uploads into content-addressed storage.
+
+Clients open a session, PUT fixed-size chunks (in any order, in parallel)
+and query which chunks are still missing after a dropped connection. Each
+chunk is hashed while it streams to its offset in a preallocated part file,
+so completing the session only combines the recorded digests and renames
+the file into CAS; duplicate sources are stored once and keep their cached
+media analysis.
+"""
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from uuid import uuid4
+
+import structlog
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..db import SessionLocal
+from ..models import SourceAsset, UploadChunk, UploadSession
+from .file_registry import file_registry
+from .storage import CONTENT_CHUNK_SIZE, ContentHasher, StorageService, storage_service
+
+logger = structlog.get_logger()
+
+ALLOWED_UPLOAD_MIME_TYPES = {"video/mp4", "video/quicktime", "video/x-msvideo", "video/webm"}
+
+
+class UploadSessionError(Exception):
+    """Client-facing upload protocol error carrying an HTTP status code."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class UploadProgress:
+    received: list[int]
+    missing: list[int]
+    next_offset: int
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+
+def total_chunks(total_size: int, chunk_size: int) -> int:
+    return max(1, -(-total_size // chunk_size))
+
+
+def expected_chunk_size(upload: UploadSession, index: int) -> int:
+    start = index * upload.chunk_size
+    return max(0, min(upload.chunk_size, upload.total_size - start))
+
+
+class UploadSessionService:
+    def __init__(self, storage: StorageService | None = None, chunk_size: int = CONTENT_CHUNK_SIZE):
+        self.storage = storage or storage_service
+        self.chunk_size = chunk_size
+
+    def part_path(self, upload_id: str) -> Path:
+        return self.storage.partial_dir / f"{upload_id}.part"
+
+    async def create(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        filename: str,
+        content_type: str,
+        total_size: int,
+    ) -> UploadSession:
+        if content_type not in ALLOWED_UPLOAD_MIME_TYPES:
+            raise UploadSessionError(400, "Invalid file type. Only video files are allowed.")
+        if total_size <= 0:
+            raise UploadSessionError(400, "total_size must be positive.")
+        if total_size > settings.upload_max_bytes:
+            limit_mb = settings.upload_max_bytes // (1024 * 1024)
+            raise UploadSessionError(413, f"File too large. Maximum size is {limit_mb}MB.")
+
+        upload = UploadSession(
+            id=str(uuid4()),
+            user_id=user_id,
+            filename=Path(filename or "video.mp4").name[:255],
+            content_type=content_type,
+            total_size=total_size,
+            chunk_size=self.chunk_size,
+            status="open",
+            expires_at=datetime.utcnow() + timedelta(hours=settings.upload_session_ttl_hours),
+        )
+        # Preallocate so chunks can land at their offsets in any order.
+        with self.part_path(upload.id).open("wb") as handle:
+            handle.truncate(total_size)
+        session.add(upload)
+        await session.commit()
+        logger.info("upload_session_created", upload_id=upload.id, user_id=user_id, total_size=total_size)
+        return upload
+
+    async def get(self, session: AsyncSession, upload_id: str, user_id: int) -> UploadSession:
+        upload = await session.scalar(
+            select(UploadSession).where(UploadSession.id == upload_id, UploadSession.user_id == user_id)
+        )
+        if not upload:
+            raise UploadSessionError(404, "Upload session not found")
+        if upload.status == "open" and upload.expires_at < datetime.utcnow():
+            raise UploadSessionError(410, "Upload session expired")
+        if upload.status == "expired":
+            raise UploadSessionError(410, "Upload session expired")
+        return upload
+
+    async def progress(self, session: AsyncSession, upload: UploadSession) -> UploadProgress:
+        rows = await session.execute(
+            select(UploadChunk.chunk_index).where(UploadChunk.upload_id == upload.id)
+        )
+        received = sorted({int(i) for i in rows.scalars().all()})
+        count = total_chunks(upload.total_size, upload.chunk_size)
+        if upload.status == "complete":
+            return UploadProgress(received=list(range(count)), missing=[], next_offset=upload.total_size)
+        have = set(received)
+        missing = [i for i in range(count) if i not in have]
+        next_offset = missing[0] * upload.chunk_size if missing else upload.total_size
+        return UploadProgress(received=received, missing=missing, next_offset=next_offset)
+
+    async def write_chunk(
+        self,
+        session: AsyncSession,
+        upload: UploadSession,
+        index: int,
+        body: AsyncIterator[bytes],
+        expected_sha256: Optional[str] = None,
+    ) -> UploadChunk:
+        """Stream one chunk into its slot of the part file, hashing as it goes."""
+        if upload.status != "open":
+            raise UploadSessionError(409, "Upload session is already complete")
+        expected = expected_chunk_size(upload, index)
+        if index < 0 or expected <= 0:
+            raise UploadSessionError(416, f"Chunk index {index} is out of range")
+
+        digest = hashlib.sha256()
+        written = 0
+        with self.part_path(upload.id).open("r+b") as handle:
+            handle.seek(index * upload.chunk_size)
+            async for piece in body:
+                if not piece:
+                    continue
+                written += len(piece)
+                if written > expected:
+                    raise UploadSessionError(413, f"Chunk {index} exceeds {expected} bytes")
+                digest.update(piece)
+                handle.write(piece)
+        if written != expected:
+            raise UploadSessionError(400, f"Chunk {index} is {written} bytes, expected {expected}")
+
+        sha = digest.hexdigest()
+        if expected_sha256 and expected_sha256.strip().lower() != sha:
+            raise UploadSessionError(422, f"Chunk {index} checksum mismatch")
+
+        # The unique (upload_id, chunk_index) constraint makes parallel and
+        # retried PUTs converge on one row; the last completed write wins.
+        chunk = await session.scalar(
+            select(UploadChunk).where(UploadChunk.upload_id == upload.id, UploadChunk.chunk_index == index)
+        )
+        if chunk is None:
+            chunk = UploadChunk(upload_id=upload.id, chunk_index=index, sha256=sha, size=written)
+            session.add(chunk)
+            try:
+                await session.commit()
+                return chunk
+            except IntegrityError:
+                await session.rollback()
+                chunk = await session.scalar(
+                    select(UploadChunk).where(UploadChunk.upload_id == upload.id, UploadChunk.chunk_index == index)
+                )
+                if chunk is None:
+                    raise
+        chunk.sha256 = sha
+        chunk.size = written
+        session.add(chunk)
+        await session.commit()
+        return chunk
+
+    async def complete(self, session: AsyncSession, upload: UploadSession) -> tuple[SourceAsset, bool]:
+        """
+        Finalize a fully received session into CAS.
+        Returns (asset, deduplicated). Idempotent for already completed sessions.
+        """
+        if upload.status == "complete" and upload.content_hash:
+            asset = await session.get(SourceAsset, upload.content_hash)
+            if asset:
+                return asset, True
+
+        rows = await session.execute(
+            select(UploadChunk).where(UploadChunk.upload_id == upload.id).order_by(UploadChunk.chunk_index)
+        )
+        chunks = list(rows.scalars().all())
+        count = total_chunks(upload.total_size, upload.chunk_size)
+        if [c.chunk_index for c in chunks] != list(range(count)):
+            raise UploadSessionError(409, "Upload is missing chunks")
+
+        # Combine the recorded digests; the assembled file is never re-read.
+        content_hash = ContentHasher.combine([c.sha256 for c in chunks])
+        ext = (Path(upload.filename).suffix or ".mp4").lower()
+        path, deduplicated = self.storage.adopt(self.part_path(upload.id), content_hash, ext)
+        asset = await self._track_asset(session, content_hash, path, upload.total_size, upload.content_type)
+
+        upload.status = "complete"
+        upload.content_hash = content_hash
+        upload.source_path = asset.path
+        session.add(upload)
+        await session.execute(delete(UploadChunk).where(UploadChunk.upload_id == upload.id))
+        await session.commit()
+        logger.info(
+            "upload_session_completed",
+            upload_id=upload.id,
+            content_hash=content_hash,
+            deduplicated=deduplicated,
+        )
+        return asset, deduplicated
+
+    async def register_source(
+        self,
+        session: AsyncSession,
+        source_path: str,
+        content_type: Optional[str] = None,
+    ) -> Optional[SourceAsset]:
+        """Track a CAS file written by the single-request upload path."""
+        content_hash = self.storage.content_hash_from_path(source_path)
+        if not content_hash:
+            return None
+        try:
+            size = Path(source_path).stat().st_size
+        except OSError:
+            return None
+        asset = await self._track_asset(session, content_hash, source_path, size, content_type)
+        await session.commit()
+        return asset
+
+    async def cached_analysis(self, session: AsyncSession, source_path: Optional[str]) -> Optional[dict]:
+        """Media intelligence from an earlier job on the same content, if any."""
+        content_hash = self.storage.content_hash_from_path(source_path)
+        if not content_hash:
+            return None
+        asset = await session.get(SourceAsset, content_hash)
+        intel = asset.media_intelligence if asset else None
+        return intel if intel and intel.get("visual") else None
+
+    async def remember_analysis(self, session: AsyncSession, source_path: Optional[str], intel: Optional[dict]) -> None:
+        """Cache a completed analysis on the source asset (caller commits)."""
+        if not intel or not intel.get("visual"):
+            return
+        content_hash = self.storage.content_hash_from_path(source_path)
+        if not content_hash:
+            return
+        asset = await session.get(SourceAsset, content_hash)
+        if asset and not asset.media_intelligence:
+            asset.media_intelligence = intel
+            session.add(asset)
+
+    async def _track_asset(
+        self,
+        session: AsyncSession,
+        content_hash: str,
+        path: str,
+        size: int,
+        content_type: Optional[str],
+    ) -> SourceAsset:
+        asset = await session.get(SourceAsset, content_hash)
+        if asset is None:
+            asset = SourceAsset(
+                content_hash=content_hash,
+                path=path,
+                size=size,
+                content_type=content_type,
+            )
+        elif not Path(asset.path).exists():
+            asset.path = path
+        asset.last_used_at = datetime.utcnow()
+        session.add(asset)
+        # Ages out unless a job pins it, so abandoned uploads do not pile up.
+        await file_registry.track_unclaimed(session, asset.path)
+        await session.flush()
+        return asset
+
+    async def purge_expired(self) -> int:
+        """Drop open sessions past their expiry along with their part files."""
+        now = datetime.utcnow()
+        async with SessionLocal() as session:
+            rows = await session.execute(
+                select(UploadSession).where(UploadSession.status == "open", UploadSession.expires_at < now)
+            )
+            expired = list(rows.scalars().all())
+            for upload in expired:
+                self.part_path(upload.id).unlink(missing_ok=True)
+                await session.execute(delete(UploadChunk).where(UploadChunk.upload_id == upload.id))
+                upload.status = "expired"
+                session.add(upload)
+            await session.commit()
+        if expired:
+            logger.info("upload_sessions_purged", count=len(expired))
+        return len(expired)
+
+
+upload_session_service = UploadSessionService()
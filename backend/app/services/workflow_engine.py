@@ -1,6 +1,5 @@
 import asyncio
 import asyncio.subprocess
-import json
 import subprocess
 import shutil
 import os
@@ -20,14 +19,18 @@ from ..agents import (
 from ..agents.base import parse_json_response, parse_json_safe, normalize_agent_result
 from .memory.hybrid_memory import hybrid_memory
 from .concurrency import limits
+from .file_registry import file_registry
+from .job_progress import JobProgressPipeline, StatusUpdate
 from .metrics_service import metrics_service
 from .n8n_service import n8n_service
-from .stock_scout_service import stock_scout_service
+from .progress_bus import progress_bus
 from .post_production_depth import build_audio_post_filter, build_subtitle_filter
+from .color_compiler import color_compiler
 from .openclaw_service import openclaw_service
+from .thumbnail_engine import thumbnail_engine
+from .upload_sessions import upload_session_service
+from .media_delivery import media_delivery
 
-# Redis for progress publishing (optional)
-REDIS_URL = os.getenv("REDIS_URL")
 logger = structlog.get_logger()
 
 
@@ -98,30 +101,7 @@ def detect_gpu_encoder() -> str:
 
 def publish_progress(job_id: int, status: str, message: str, progress: int = 0, user_id: int | None = None):
     """Publish progress to Redis for WebSocket streaming (if available)."""
-    if not REDIS_URL:
-        return
-    try:
-        import redis
-        # Handle SSL for Upstash (rediss://)
-        r = redis.from_url(REDIS_URL, decode_responses=True, socket_timeout=2, socket_connect_timeout=2)
-        data = json.dumps({
-            "job_id": job_id,
-            "status": status,
-            "message": message,
-            "progress": progress
-        })
-        # Publish to job channel (legacy)
-        r.publish(f"job:{job_id}:progress", data)
-        r.setex(f"job:{job_id}:latest", 3600, data)
-        
-        # Publish to user channel (new)
-        if user_id:
-            r.publish(f"user:{user_id}:jobs", data)
-    except Exception as e:
-        print(f"[Redis] Progress publish error: {e}")
-
-
-
+    progress_bus.publish(job_id, status, message, progress, user_id=user_id)
 
 
 def _coerce_duration(value: object, fallback: float = 30.0) -> float:
@@ -197,12 +177,22 @@ async def process_job(job_id: int, source_path: str, pacing: str = "medium", moo
     """
     Master Workflow Router
     """
-    if mood == "clawdbot" or mood == "ai_creative":
-        await process_job_clawdbot(job_id, source_path, pacing, mood, ratio, platform, brand_safety)
-    elif tier == "pro":
-        await process_job_pro(job_id, source_path, pacing, mood, ratio, platform, brand_safety)
-    else:
-        await process_job_standard(job_id, source_path, pacing, mood, ratio, platform, brand_safety)
+    try:
+        # Pool/schema setup must not count against the memory tiers' deadlines.
+        await hybrid_memory.warm()
+        if mood == "clawdbot" or mood == "ai_creative":
+            await process_job_clawdbot(job_id, source_path, pacing, mood, ratio, platform, brand_safety)
+        elif tier == "pro":
+            await process_job_pro(job_id, source_path, pacing, mood, ratio, platform, brand_safety)
+        else:
+            await process_job_standard(job_id, source_path, pacing, mood, ratio, platform, brand_safety)
+    finally:
+        hybrid_memory.forget_job(job_id)
+        # Celery runs each job in its own event loop: settle buffered writes
+        # and queued notifications before that loop goes away.
+        await job_progress.flush()
+        await progress_bus.flush()
+        await n8n_service.drain()
 
 
 async def process_job_standard(job_id: int, source_path: str, pacing: str = "medium", mood: str = "professional", ratio: str = "16:9", platform: str = "youtube", brand_safety: str = "standard"):
@@ -236,7 +226,7 @@ async def process_job_standard(job_id: int, source_path: str, pacing: str = "med
         tracker.start_phase("analysis")
         await update_status(job_id, "processing", "[FRAME] Analyzing keyframes...")
         publish_progress(job_id, "processing", "Analyzing video keyframes...", 10, user_id=user_id)
-        memory_context = await hybrid_memory.get_agent_context(user_id)
+        memory_context = await hybrid_memory.get_agent_context(user_id, job_id=job_id, agent="director")
         
         # Holy Grail: Use client-provided intelligence if available
         if media_intelligence and media_intelligence.get("visual", {}).get("scenes"):
@@ -321,6 +311,7 @@ async def process_job_standard(job_id: int, source_path: str, pacing: str = "med
                     with open(srt_tmp, "w", encoding="utf-8") as f:
                         f.write(srt_content)
                     srt_path = srt_tmp
+                    await file_registry.track(srt_tmp, "srt", job_id=job_id)
             except Exception as se:
                 print(f"[Workflow] Subtitle generation failed: {se}")
 
@@ -344,6 +335,7 @@ async def process_job_standard(job_id: int, source_path: str, pacing: str = "med
             output_filename = f"job-{job_id}-take{attempt}.mp4"
             output_abs = Path(settings.storage_root) / "outputs" / output_filename
             output_abs.parent.mkdir(parents=True, exist_ok=True)
+            await file_registry.track(output_abs, "take", job_id=job_id)
             
             # Build FFmpeg filter chain
             vf_filters = ["scale=1280:720:force_original_aspect_ratio=decrease", "pad=1280:720:(ow-iw)/2:(oh-ih)/2"]
@@ -422,7 +414,7 @@ async def process_job_standard(job_id: int, source_path: str, pacing: str = "med
                     source_path=source_path,
                     cuts=cuts,
                     output_path=str(output_abs),
-                    vf_filters=",".join(vf_filters) if vf_filters else None,
+                    vf_filters=",".join(color_compiler.compile_filters(vf_filters)) if vf_filters else None,
                     af_filters=build_audio_post_filter(
                         {"ducking_segments": []},
                         platform=platform,
@@ -462,35 +454,43 @@ async def process_job_standard(job_id: int, source_path: str, pacing: str = "med
         await update_status(job_id, "processing", "[THUMB] Generating thumbnail...")
         publish_progress(job_id, "processing", "Generating thumbnail & metadata...", 90, user_id=user_id)
         
-        # Parallel post-production
-        thumb_task = thumbnail_agent.run({"source_path": source_path, "mood": mood})
-        meta_task = metadata_agent.run({"plan": director_plan})
-        
-        post_results = await asyncio.gather(thumb_task, meta_task, return_exceptions=True)
+        # Final output
+        final_rel_path = f"storage/outputs/job-{job_id}.mp4"
+        final_abs_path = Path(settings.storage_root) / "outputs" / f"job-{job_id}.mp4"
+        take_path = Path(settings.storage_root) / "outputs" / f"job-{job_id}-take{attempt}.mp4"
+        if take_path.exists():
+            shutil.move(take_path, final_abs_path)
+            # The final path is pinned as the job's output on delivery.
+            await file_registry.forget(take_path)
+        if final_abs_path.exists():
+            await media_delivery.finalize_output(final_abs_path)
+
+        # Metadata runs while one decode pass extracts scored thumbnail candidates + scrub sprites
+        meta_task = asyncio.create_task(metadata_agent.run({"plan": director_plan}))
+        thumb_video = final_abs_path if final_abs_path.exists() else src
+        thumbs_dir = Path(settings.storage_root) / "outputs" / f"job-{job_id}-thumbs"
+        thumb_set = await thumbnail_engine.extract(str(thumb_video), thumbs_dir)
+        if thumbs_dir.exists():
+            await file_registry.track(thumbs_dir, "thumbnail", job_id=job_id)
+
+        thumb_payload = {"source_path": source_path, "mood": mood}
+        if thumb_set and thumb_set.candidates:
+            thumb_payload["candidate_frames"] = thumb_set.agent_candidates()
+        post_results = await asyncio.gather(thumbnail_agent.run(thumb_payload), meta_task, return_exceptions=True)
         
         thumb_data = parse_json_safe(post_results[0].get("raw_response", "{}")) if isinstance(post_results[0], dict) else {}
         meta_data = parse_json_safe(post_results[1].get("raw_response", "{}")) if isinstance(post_results[1], dict) else {}
         
-        # Extract thumbnail
+        # Promote the agent's pick (or the top-scored candidate) without another ffmpeg call
         final_thumb_rel_path = None
-        if thumb_data.get("best_timestamp"):
-            ffmpeg_bin = _resolve_tool_path("ffmpeg")
+        chosen = thumb_set.choose(thumb_data.get("best_timestamp")) if thumb_set else None
+        if chosen:
             thumb_path = Path(settings.storage_root) / "outputs" / f"job-{job_id}-thumb.jpg"
-            thumb_cmd = [ffmpeg_bin, "-y", "-ss", str(thumb_data["best_timestamp"]), "-i", str(src), "-vframes", "1", "-q:v", "2", str(thumb_path)]
-            thumb_proc = await asyncio.create_subprocess_exec(*thumb_cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-            await thumb_proc.communicate()
-            if thumb_path.exists():
-                final_thumb_rel_path = f"storage/outputs/job-{job_id}-thumb.jpg"
+            thumbnail_engine.promote(chosen, thumb_path)
+            final_thumb_rel_path = f"storage/outputs/job-{job_id}-thumb.jpg"
         
         # Post-Production Logic Removed (Subtitles handled in Phase 3.5/4)
 
-        # Final output
-        final_rel_path = f"storage/outputs/job-{job_id}.mp4"
-        final_abs_path = Path(settings.storage_root) / "outputs" / f"job-{job_id}.mp4"
-        take_path = Path(settings.storage_root) / "outputs" / f"job-{job_id}-take{attempt}.mp4"
-        if take_path.exists():
-            shutil.move(take_path, final_abs_path)
-        
         # Completion
         completion_msg = "Your video is ready!"
         if meta_data.get("title"):
@@ -502,6 +502,8 @@ async def process_job_standard(job_id: int, source_path: str, pacing: str = "med
         await update_status(job_id, "complete", completion_msg, final_rel_path, final_thumb_rel_path, performance_metrics=performance_metrics)
         publish_progress(job_id, "complete", completion_msg, 100, user_id=user_id)
         print(f"[Workflow] Job {job_id} complete!")
+        if final_abs_path.exists():
+            await media_delivery.package_if_enabled(final_abs_path)
 
     except Exception as e:
         print(f"[Workflow v3] Job {job_id} failed: {e}")
@@ -511,6 +513,49 @@ async def process_job_standard(job_id: int, source_path: str, pacing: str = "med
         publish_progress(job_id, "failed", f"Processing failed: {str(e)[:100]}", 0, user_id=user_id)
 
 
+NODE_PROGRESS = {
+    "media_intelligence": {"msg": "Analyzing Media Content...", "p": 10},
+    "director": {"msg": "Director Planning...", "p": 15},
+    "platform": {"msg": "Platform Adaptation...", "p": 20},
+    "brand_safety": {"msg": "Guardian: Brand Safety Check...", "p": 25},
+    "ab_test": {"msg": "Variant: A/B Test Optimization...", "p": 35},
+    "cutter": {"msg": "AI Smart Cutting...", "p": 50},
+    "scout": {"msg": "Scouting Real Footage...", "p": 60},
+    "audio": {"msg": "Audio Mastery...", "p": 65},
+    "visuals": {"msg": "Visual Enhancement...", "p": 80},
+    "hook": {"msg": "Optimizing Hook...", "p": 82},
+    "validator": {"msg": "Quality Review...", "p": 85},
+    "qc_gate": {"msg": "Final Producer Check...", "p": 90},
+    "iteration_control": {"msg": "Refining Content...", "p": 92},
+    "compiler": {"msg": "Final Rendering...", "p": 95},
+}
+
+
+async def _graph_resume_point(graph_app, config: dict) -> tuple:
+    """
+    Return the nodes an interrupted run of this job still has to execute.
+
+    Empty means start fresh; a finished or unreadable checkpoint thread is
+    discarded so the job reruns from the beginning.
+    """
+    try:
+        snapshot = await graph_app.aget_state(config)
+        if snapshot.next:
+            return tuple(snapshot.next)
+        if snapshot.values:
+            await graph_app.checkpointer.adelete_thread(config["configurable"]["thread_id"])
+    except Exception as e:
+        logger.warning("graph_checkpoint_lookup_failed", thread_id=config["configurable"]["thread_id"], error=str(e))
+    return ()
+
+
+async def _discard_graph_checkpoints(graph_app, job_id: int) -> None:
+    try:
+        await graph_app.checkpointer.adelete_thread(str(job_id))
+    except Exception as e:
+        logger.warning("graph_checkpoint_cleanup_failed", job_id=job_id, error=str(e))
+
+
 async def process_job_pro(job_id: int, source_path: str, pacing: str = "medium", mood: str = "professional", ratio: str = "16:9", platform: str = "youtube", brand_safety: str = "standard"):
     """
     [v4.0] Hollywood Pipeline (Pro Tier) - LangGraph + MoviePy
@@ -532,11 +577,20 @@ async def process_job_pro(job_id: int, source_path: str, pacing: str = "medium",
         post_settings = copy.deepcopy(job.post_settings) if job.post_settings else {}
         await session.commit()
 
-    publish_progress(job_id, "processing", "Initializing Hollywood Pipeline (LangGraph)...", 5, user_id=user_id)
-
     try:
         from ..graph.workflow import app as graph_app
-        
+
+        config = {"configurable": {"thread_id": str(job_id)}}
+        use_dataflow = settings.graph_scheduler == "dataflow"
+        resume_nodes = () if use_dataflow else await _graph_resume_point(graph_app, config)
+        if resume_nodes:
+            info = min((NODE_PROGRESS.get(n, {"msg": f"Stage: {n}", "p": 50}) for n in resume_nodes), key=lambda i: i["p"])
+            msg = f"Resuming Hollywood Pipeline: {info['msg']}"
+            await update_status(job_id, "processing", f"[AI] {msg}")
+            publish_progress(job_id, "processing", msg, info["p"], user_id=user_id)
+        else:
+            publish_progress(job_id, "processing", "Initializing Hollywood Pipeline (LangGraph)...", 5, user_id=user_id)
+
         # Initial State
         initial_state = {
             "job_id": job_id,
@@ -573,9 +627,16 @@ async def process_job_pro(job_id: int, source_path: str, pacing: str = "medium",
         # Run Graph
         tracker.start_phase("graph_execution")
         print("[Graph] Streaming workflow (with checkpointing)...")
-        config = {"configurable": {"thread_id": str(job_id)}}
         final_state: dict = {}
-        async for event in graph_app.astream(initial_state, config=config):
+        schedule_run = None
+        if use_dataflow:
+            from ..graph.workflow import start_dataflow
+            schedule_run = start_dataflow(initial_state)
+            events = schedule_run.stream()
+        else:
+            events = graph_app.astream(None if resume_nodes else initial_state, config=config)
+        progress_high = 0
+        async for event in events:
             for node_name, state in event.items():
                 # astream yields partial updates; merge to preserve prior keys like output_path
                 if isinstance(state, dict):
@@ -583,39 +644,32 @@ async def process_job_pro(job_id: int, source_path: str, pacing: str = "medium",
                 else:
                     final_state = state
                 
-                # Create a human-readable status message and percentage from node name
-                node_to_info = {
-                    "media_intelligence": {"msg": "Analyzing Media Content...", "p": 10},
-                    "director": {"msg": "Director Planning...", "p": 15},
-                    "platform": {"msg": "Platform Adaptation...", "p": 20},
-                    "brand_safety": {"msg": "Guardian: Brand Safety Check...", "p": 25},
-                    "ab_test": {"msg": "Variant: A/B Test Optimization...", "p": 35},
-                    "cutter": {"msg": "AI Smart Cutting...", "p": 50},
-                    "scout": {"msg": "Scouting Real Footage...", "p": 60},
-                    "audio": {"msg": "Audio Mastery...", "p": 65},
-                    "visuals": {"msg": "Visual Enhancement...", "p": 80},
-                    "hook": {"msg": "Optimizing Hook...", "p": 82},
-                    "validator": {"msg": "Quality Review...", "p": 85},
-                    "qc_gate": {"msg": "Final Producer Check...", "p": 90},
-                    "iteration_control": {"msg": "Refining Content...", "p": 92},
-                    "compiler": {"msg": "Final Rendering...", "p": 95},
-                }
-                
-                info = node_to_info.get(node_name, {"msg": f"Stage: {node_name}", "p": 50})
+                info = NODE_PROGRESS.get(node_name, {"msg": f"Stage: {node_name}", "p": 50})
                 msg = info["msg"]
-                progress_p = info["p"]
+                # Nodes can finish out of pipeline order; never move the bar backwards.
+                progress_high = progress_p = max(progress_high, info["p"])
                 
                 # Update DB and Publish
                 await update_status(job_id, "processing", f"[AI] {msg}")
                 publish_progress(job_id, "processing", msg, progress_p, user_id=user_id)
-        # 1. Finalize State
+        # 1. Finalize State (a resumed run only streams the remaining nodes)
         tracker.end_phase("graph_execution")
+        if schedule_run is not None:
+            final_state = dict(schedule_run.state)
+            tracker.metadata["graph_schedule"] = schedule_run.report()
+        else:
+            try:
+                final_state = {**(await graph_app.aget_state(config)).values, **final_state}
+            except Exception as e:
+                logger.warning("graph_state_read_failed", job_id=job_id, error=str(e))
         output_rel_path = final_state.get("output_path")
         graph_errors = final_state.get("errors") or []
         if graph_errors and not output_rel_path:
             raise Exception(f"Graph Errors: {graph_errors}")
         if not output_rel_path:
             raise Exception("No output path returned from Graph.")
+        if not str(output_rel_path).startswith("http") and Path(output_rel_path).exists():
+            await media_delivery.finalize_output(output_rel_path)
             
         # Success
         tracker.end_phase("total_workflow")
@@ -655,6 +709,10 @@ async def process_job_pro(job_id: int, source_path: str, pacing: str = "medium",
         )
         publish_progress(job_id, "complete", completion_msg, 100, user_id=user_id)
         print(f"[Workflow v4] Job {job_id} complete!")
+        if schedule_run is None:
+            await _discard_graph_checkpoints(graph_app, job_id)
+        if not str(output_rel_path).startswith("http") and Path(output_rel_path).exists():
+            await media_delivery.package_if_enabled(output_rel_path)
 
     except Exception as e:
         print(f"[Workflow v4] Job {job_id} failed: {e}")
@@ -664,6 +722,59 @@ async def process_job_pro(job_id: int, source_path: str, pacing: str = "medium",
         publish_progress(job_id, "failed", f"Processing failed: {str(e)[:100]}", 0, user_id=user_id)
 
 
+PAYLOAD_FIELDS = (
+    "media_intelligence", "qc_result", "director_plan", "brand_safety_result", "ab_test_result",
+    "audio_qa", "color_qa", "subtitle_qa", "scout_result", "performance_metrics",
+)
+
+
+async def _persist_status_updates(updates: list[StatusUpdate]) -> None:
+    """Apply coalesced status updates for any number of jobs in one transaction."""
+    delivered: list[tuple[int, str, str]] = []
+    notify: list[Job] = []
+    async with SessionLocal() as session:
+        for update in updates:
+            job = await session.get(Job, update.job_id)
+            if not job or job.cancel_requested:
+                continue
+            job.status = update.status
+            job.progress_message = update.message
+            fields = update.fields
+            if fields.get("output_path"):
+                job.output_path = fields["output_path"]
+                delivered.append((job.id, fields["output_path"], "output"))
+            if fields.get("thumbnail_path"):
+                job.thumbnail_path = fields["thumbnail_path"]
+                delivered.append((job.id, fields["thumbnail_path"], "thumbnail"))
+
+            # Update Phase 5 fields if provided
+            for name in PAYLOAD_FIELDS:
+                if name in fields:
+                    setattr(job, name, fields[name])
+            if "media_intelligence" in fields:
+                await upload_session_service.remember_analysis(session, job.source_path, fields["media_intelligence"])
+            if update.status in {"complete", "failed"}:
+                notify.append(job)
+
+        await session.commit()
+    # Delivered files are pinned; everything else the job wrote ages out.
+    for job_id, path, kind in delivered:
+        if not str(path).startswith("http"):
+            await file_registry.track(path, kind, job_id=job_id)
+    for job in notify:
+        try:
+            n8n_service.notify_job_status(job)
+        except Exception as exc:
+            print(f"[n8n] webhook notify failed for job {job.id}: {exc}")
+
+
+job_progress = JobProgressPipeline(
+    _persist_status_updates,
+    bus=progress_bus,
+    flush_interval=settings.progress_flush_interval_seconds,
+)
+
+
 async def update_status(
     job_id: int, 
     status: str, 
@@ -681,46 +792,31 @@ async def update_status(
     scout_result: dict | None = None,
     performance_metrics: dict | None = None
 ):
-    async with SessionLocal() as session:
-        job = await session.get(Job, job_id)
-        if job:
-            if job.cancel_requested:
-                return
-            job.status = status
-            job.progress_message = message
-            if output_path:
-                job.output_path = output_path
-            if thumbnail_path:
-                job.thumbnail_path = thumbnail_path
-                
-            # Update Phase 5 fields if provided
-            if media_intelligence is not None:
-                job.media_intelligence = media_intelligence
-            if qc_result is not None:
-                job.qc_result = qc_result
-            if director_plan is not None:
-                job.director_plan = director_plan
-            if brand_safety_result is not None:
-                job.brand_safety_result = brand_safety_result
-            if ab_test_result is not None:
-                job.ab_test_result = ab_test_result
-            if audio_qa is not None:
-                job.audio_qa = audio_qa
-            if color_qa is not None:
-                job.color_qa = color_qa
-            if subtitle_qa is not None:
-                job.subtitle_qa = subtitle_qa
-            if scout_result is not None:
-                job.scout_result = scout_result
-            if performance_metrics is not None:
-                job.performance_metrics = performance_metrics
-                
-            await session.commit()
-            if status in {"complete", "failed"}:
-                try:
-                    await n8n_service.send_job_status_event(job)
-                except Exception as exc:
-                    print(f"[n8n] webhook notify failed for job {job_id}: {exc}")
+    """
+    Record a status message. Transitions and result payloads are written
+    through; repeated progress messages are coalesced by `job_progress`.
+    """
+    fields = {
+        name: value
+        for name, value in {
+            "output_path": output_path,
+            "thumbnail_path": thumbnail_path,
+            "media_intelligence": media_intelligence,
+            "qc_result": qc_result,
+            "director_plan": director_plan,
+            "brand_safety_result": brand_safety_result,
+            "ab_test_result": ab_test_result,
+            "audio_qa": audio_qa,
+            "color_qa": color_qa,
+            "subtitle_qa": subtitle_qa,
+            "scout_result": scout_result,
+            "performance_metrics": performance_metrics,
+        }.items()
+        if value is not None
+    }
+    await job_progress.record(job_id, status, message, fields)
+
+
 async def render_orchestrated_job(job_id: int, cuts: list, vf_filters: str | None = None, af_filters: str | None = None):
     """
     Directly renders a job using provided technical parameters, bypassing AI agents.
@@ -764,6 +860,7 @@ async def render_orchestrated_job(job_id: int, cuts: list, vf_filters: str | Non
             final_rel_path = f"storage/outputs/{output_filename}"
             await update_status(job_id, "complete", "Orchestrated Edit Ready!", final_rel_path)
             publish_progress(job_id, "complete", "Orchestrated Edit Ready!", 100, user_id=user_id)
+            await media_delivery.package_if_enabled(output_abs)
         else:
             raise Exception("Rendering failed.")
             
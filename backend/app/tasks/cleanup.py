@@ -1,10 +1,11 @@
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from pathlib import Path
-from sqlalchemy import select, update
+from sqlalchemy import update
 
+from ..services.file_registry import file_registry
 from ..services.storage_service import storage_service
+from ..services.upload_sessions import upload_session_service
 from ..config import settings
 from ..db import SessionLocal
 from ..models import Job
@@ -16,53 +17,16 @@ LAST_CLEANUP_STATUS: dict = {
     "deleted_local": 0,
     "deleted_r2": 0,
     "stalled_jobs": 0,
+    "expired_uploads": 0,
 }
 
-LOCAL_RETENTION_DAYS = 7
-
 
 async def cleanup_local_files() -> int:
-    root = Path(settings.storage_root)
-    upload_dir = root / "uploads"
-    output_dir = root / "outputs"
-
-    if not root.exists():
-        return 0
-
-    async with SessionLocal() as session:
-        result = await session.execute(select(Job.source_path, Job.output_path, Job.thumbnail_path))
-        rows = result.all()
-
-    referenced: set[str] = set()
-    for source_path, output_path, thumbnail_path in rows:
-        for path in [source_path, output_path, thumbnail_path]:
-            if not path or str(path).startswith("http"):
-                continue
-            candidate = Path(path)
-            if not candidate.is_absolute():
-                candidate = (Path(".") / candidate).resolve()
-            referenced.add(str(candidate))
-
-    cutoff = datetime.utcnow() - timedelta(days=LOCAL_RETENTION_DAYS)
-    deleted = 0
-
-    for directory in [upload_dir, output_dir]:
-        if not directory.exists():
-            continue
-        for file_path in directory.glob("**/*"):
-            if not file_path.is_file():
-                continue
-            if str(file_path.resolve()) in referenced:
-                continue
-            try:
-                mtime = datetime.utcfromtimestamp(file_path.stat().st_mtime)
-                if mtime < cutoff:
-                    file_path.unlink(missing_ok=True)
-                    deleted += 1
-            except Exception as e:
-                logger.error("cleanup_local_error", path=str(file_path), error=str(e))
-
-    return deleted
+    """Delete due local artifacts from the file registry's expiry index (no tree walk)."""
+    # First run after the registry shipped: import what is already on disk once.
+    await file_registry.ensure_backfilled(settings.storage_root)
+    result = await file_registry.collect()
+    return result.deleted
 
 
 async def run_cleanup_task():
@@ -72,17 +36,18 @@ async def run_cleanup_task():
     """
     logger.info("Starting storage cleanup task...")
     try:
-        # Run synchronous boto3 cleanup in a thread executor to avoid blocking the loop
-        loop = asyncio.get_running_loop()
-        deleted_r2 = await loop.run_in_executor(None, storage_service.cleanup_old_files)
+        # Ledger-driven: only expired objects are touched, deletes run off-loop
+        deleted_r2 = await storage_service.cleanup_old_files()
         deleted_local = await cleanup_local_files()
         stalled = await mark_stalled_jobs()
+        expired_uploads = await upload_session_service.purge_expired()
         LAST_CLEANUP_STATUS.update(
             {
                 "last_run": datetime.utcnow().isoformat(),
                 "deleted_local": deleted_local,
                 "deleted_r2": deleted_r2,
                 "stalled_jobs": stalled,
+                "expired_uploads": expired_uploads,
             }
         )
         logger.info(
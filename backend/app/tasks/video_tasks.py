@@ -4,39 +4,13 @@ Wrapper around workflow engine for background execution
 """
 import asyncio
 import os
-import json
 
-from ..config import settings
-
-# Redis for progress pub/sub
-REDIS_URL = settings.redis_url
-
-
-def get_redis():
-    """Get Redis client for progress updates with SSL support."""
-    if not REDIS_URL:
-        return None
-    import redis
-    # decode_responses for cleaner string handling
-    return redis.from_url(REDIS_URL, decode_responses=True)
+from ..services.progress_bus import progress_bus
 
 
 def publish_progress(job_id: int, status: str, message: str, progress: int = 0):
     """Publish job progress to Redis for WebSocket streaming."""
-    try:
-        r = get_redis()
-        if not r:
-            return
-        data = json.dumps({
-            "job_id": job_id,
-            "status": status,
-            "message": message,
-            "progress": progress
-        })
-        r.publish(f"job:{job_id}:progress", data)
-        r.setex(f"job:{job_id}:latest", 3600, data)
-    except Exception as e:
-        print(f"[Redis] Publish error: {e}")
+    progress_bus.publish(job_id, status, message, progress)
 
 
 # Lazy import Celery to avoid import errors when Redis is not configured
@@ -0,0 +1,90 @@
+"""
+Planning Executor - one long-lived event loop per worker process.
+
+Planning graphs are async end to end (agent calls, `asyncio.gather` fan-out),
+so running each one with a blocking `invoke` inside its own Celery process
+wastes the process on network waits. The executor hosts a single loop on a
+daemon thread and Celery tasks submit graphs to it, blocking only their own
+(cheap) thread while dozens of graphs interleave on the loop.
+
+Concurrency is bounded by `limits.max_concurrent_plans` admitted graphs and,
+inside them, by the per-loop LLM budget (`limits.llm_budget`). To plan many
+jobs per box, run the planning queue with a thread pool, e.g.
+
+    celery -A app.celery_app worker -Q planning --pool threads --concurrency 32
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+from typing import Any, Awaitable, Optional
+
+import structlog
+
+from ..services.concurrency import limits
+
+logger = structlog.get_logger()
+
+
+class PlanningExecutor:
+    def __init__(self, max_concurrent: Optional[int] = None):
+        self.max_concurrent = max(1, max_concurrent or limits.max_concurrent_plans)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.active = 0
+        self.peak = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # A forked child inherits the attribute but not the thread.
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="planning-executor", daemon=True)
+                thread.start()
+                self._loop, self._thread, self._pid = loop, thread, os.getpid()
+                self._slots = None
+                logger.info("planning_executor_started", pid=self._pid, max_concurrent=self.max_concurrent)
+            return self._loop
+
+    async def _admit(self, coro: Awaitable[Any]) -> Any:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        async with self._slots:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                return await coro
+            finally:
+                self.active -= 1
+
+    def submit(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+        """Schedule a coroutine on the executor loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(self._admit(coro), self._ensure_loop())
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the executor loop and block the calling thread for its result."""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = self._slots = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not loop.is_running():
+            loop.close()
+
+
+planning_executor = PlanningExecutor()
@@ -10,11 +10,31 @@ from typing import Dict, Any, Optional
 from ..celery_app import celery_app
 from ..graph.workflow import app as langgraph_app
 from ..agents.artifacts import ArtifactStore, EditPlan
+from ..services.memory.hybrid_memory import hybrid_memory
+from ..services.job_scheduler import TIER_PRIORITIES
+from .planning_executor import planning_executor
 
 logger = structlog.get_logger()
 celery_logger = get_task_logger(__name__)
 
 
+async def _plan(job_id: int, initial_state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the planning graph for one job, resuming an interrupted attempt.
+    Checkpoints are dropped once the plan is complete.
+    """
+    config = {"configurable": {"thread_id": f"plan-{job_id}"}}
+    snapshot = await langgraph_app.aget_state(config)
+    if not snapshot.next and snapshot.values:
+        await langgraph_app.checkpointer.adelete_thread(f"plan-{job_id}")
+    try:
+        final_state = await langgraph_app.ainvoke(None if snapshot.next else initial_state, config=config)
+    finally:
+        hybrid_memory.forget_job(job_id)
+    await langgraph_app.checkpointer.adelete_thread(f"plan-{job_id}")
+    return final_state
+
+
 @celery_app.task(
     name="planning.run_full_planning",
     bind=True,
@@ -52,8 +72,8 @@ def run_full_planning(
             "retry_count": 0,
         }
         
-        # Run LangGraph workflow
-        final_state = langgraph_app.invoke(initial_state)
+        # Run LangGraph workflow on the shared planning loop
+        final_state = planning_executor.run(_plan(job_id, initial_state))
         
         # Check for QC approval
         qc_result = final_state.get("qc_result", {})
@@ -126,13 +146,13 @@ def run_partial_planning(
             return {"success": False, "error": f"Unknown stage: {stage}"}
         
         # This would need the appropriate prompt for each stage
-        result = run_agent_with_schema(
+        result = planning_executor.run(run_agent_with_schema(
             system_prompt="",  # Would need stage-specific prompt
             payload=payload,
             schema=schema,
             agent_name=stage,
             job_id=job_id
-        )
+        ))
         
         return {
             "success": True,
@@ -156,10 +176,4 @@ def get_tier_priority(tier: str) -> int:
     Get Celery task priority based on subscription tier.
     Higher number = higher priority.
     """
-    priorities = {
-        "enterprise": 9,
-        "pro": 7,
-        "standard": 5,
-        "free": 3,
-    }
-    return priorities.get(tier, 5)
+    return TIER_PRIORITIES.get(tier, 5)
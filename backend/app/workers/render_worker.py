@@ -12,12 +12,18 @@ import time
 from ..celery_app import celery_app
 from ..services.timeline_dsl import Timeline, from_graph_state
 from ..services.ffmpeg_compiler import FFmpegCompiler
+from ..services.workflow_engine import publish_progress
 from ..services.gpu_capabilities import gpu_detector
+from ..services.job_scheduler import TIER_PRIORITIES
+from ..services.thumbnail_engine import thumbnail_engine
 from ..agents.artifacts import ArtifactStore
 
 logger = structlog.get_logger()
 celery_logger = get_task_logger(__name__)
 
+# Minimum percentage change between published render progress events
+RENDER_PROGRESS_STEP = 5.0
+
 
 @celery_app.task(
     name="render.execute_render",
@@ -70,8 +76,22 @@ def execute_render(
         gpu_caps = gpu_detector.get_capabilities()
         compiler = FFmpegCompiler()
         
-        # Compile and execute
-        result = compiler.execute(timeline, output_path)
+        # Compile and execute (blocking here is fine: we own the worker process)
+        last_reported = {"percent": -RENDER_PROGRESS_STEP}
+
+        def report_progress(snapshot: Dict[str, Any]) -> None:
+            percent = snapshot.get("percent")
+            if percent is None or percent - last_reported["percent"] < RENDER_PROGRESS_STEP:
+                return
+            last_reported["percent"] = percent
+            publish_progress(
+                job_id,
+                "processing",
+                f"Rendering... {percent:.0f}%",
+                70 + int(percent * 0.25),
+            )
+
+        result = compiler.execute_sync(timeline, output_path, on_progress=report_progress)
         
         render_time = time.time() - start_time
         
@@ -123,38 +143,36 @@ def generate_thumbnail(
     job_id: int,
     video_path: str,
     output_path: str,
-    timestamp: float = 5.0
+    timestamp: Optional[float] = None
 ) -> Dict[str, Any]:
     """
-    Generate thumbnail from rendered video.
+    Generate thumbnail candidates and scrub sprites from rendered video in one
+    decode pass, then promote the candidate nearest `timestamp` (or the
+    best-scored one) to `output_path`.
     """
-    import subprocess
-    
     celery_logger.info(f"Generating thumbnail for job {job_id}")
     
     try:
-        cmd = [
-            "ffmpeg", "-y",
-            "-ss", str(timestamp),
-            "-i", video_path,
-            "-vframes", "1",
-            "-q:v", "2",
-            output_path
-        ]
+        thumbs_dir = Path(output_path).parent / f"job-{job_id}-thumbs"
+        thumb_set = thumbnail_engine.extract_sync(video_path, thumbs_dir)
+        chosen = thumb_set.choose(timestamp) if thumb_set else None
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-        
-        if result.returncode == 0:
+        if chosen:
+            thumbnail_engine.promote(chosen, output_path)
             return {
                 "success": True,
                 "job_id": job_id,
-                "thumbnail_path": output_path
+                "thumbnail_path": output_path,
+                "timestamp": chosen.timestamp,
+                "score": chosen.score,
+                "candidates": thumb_set.agent_candidates(),
+                "scrub_vtt_path": thumb_set.vtt_path,
             }
         else:
             return {
                 "success": False,
                 "job_id": job_id,
-                "error": result.stderr
+                "error": "Thumbnail extraction produced no candidates"
             }
             
     except Exception as e:
@@ -225,13 +243,7 @@ def get_render_priority(tier: str, is_priority: bool = False) -> int:
     """
     Get render priority based on tier and urgency.
     """
-    base_priorities = {
-        "enterprise": 9,
-        "pro": 7,
-        "standard": 5,
-        "free": 3,
-    }
-    priority = base_priorities.get(tier, 5)
+    priority = TIER_PRIORITIES.get(tier, 5)
     
     if is_priority:
         priority = min(10, priority + 2)
@@ -0,0 +1,76 @@
+"""
+Benchmark: a grading chain as separate filters vs the same chain baked into one LUT.
+
+Compiles the chain with services/color_compiler.py, then renders a synthetic
+clip (lavfi testsrc2) through both versions with ffmpeg and reports
+wall time and the PSNR between the two outputs.
+
+Usage (from backend/):
+    python scripts/benchmark_color_compiler.py --seconds 10 --size 1920x1080
+"""
+import argparse
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+
+import structlog
+
+from app.services.color_compiler import ColorCompiler
+
+DEFAULT_CHAIN = (
+    "eq=contrast=1.08:brightness=0.02:saturation=1.12,"
+    "curves=preset=cross_process,"
+    "colorbalance=rs=.1:bs=-.05:rh=0.05,"
+    "hue=h=8:s=1.05"
+)
+
+
+def render(source: list, vf: str, output: str) -> float:
+    started = time.perf_counter()
+    subprocess.run(
+        ["ffmpeg", "-y", "-v", "error", *source, "-vf", vf, "-c:v", "rawvideo", "-f", "nut", output],
+        check=True,
+    )
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chain", default=DEFAULT_CHAIN)
+    parser.add_argument("--seconds", type=int, default=5)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--lut-size", type=int, default=33)
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+    if not shutil.which("ffmpeg"):
+        sys.exit("ffmpeg not found on PATH")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        compiled = ColorCompiler(cache_dir=tmp, lut_size=args.lut_size).compile([args.chain], strict=True)
+        baked_vf = ",".join(compiled.filters)
+        source = ["-f", "lavfi", "-i", f"testsrc2=size={args.size}:rate=30:duration={args.seconds}"]
+        original = render(source, args.chain, os.path.join(tmp, "original.nut"))
+        baked = render(source, baked_vf, os.path.join(tmp, "baked.nut"))
+        diff = subprocess.run(
+            ["ffmpeg", "-v", "info", "-i", os.path.join(tmp, "original.nut"), "-i", os.path.join(tmp, "baked.nut"),
+             "-lavfi", "psnr", "-f", "null", "-"],
+            capture_output=True, text=True,
+        )
+
+    print(f"filters folded: {compiled.folded} -> {len(compiled.filters)}")
+    print(f"original chain: {original:.2f}s")
+    print(f"baked LUT:      {baked:.2f}s ({original / baked:.2f}x)")
+    psnr = [line for line in diff.stderr.splitlines() if "PSNR" in line]
+    print(psnr[-1] if psnr else "psnr unavailable")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark: per-word drawtext chain vs. one generated ASS track.
+
+Renders the same synthetic talk (lavfi testsrc, highlighted words every
+--word-gap seconds, lower third, subtitles) to the null muxer with both
+overlay strategies and prints wall-clock times.
+
+Usage (from backend/):
+    python scripts/benchmark_overlays.py --duration 60 --runs 3
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.ass_overlays import build_ass_filter, build_overlay_track
+from app.services.post_production_depth import (
+    build_kinetic_highlight_filters,
+    build_lower_third_filter,
+    build_subtitle_filter,
+)
+
+BASE_VF = "scale=1280:720:force_original_aspect_ratio=decrease,pad=1280:720:(ow-iw)/2:(oh-ih)/2"
+
+
+def _resolve_ffmpeg() -> str:
+    found = shutil.which("ffmpeg")
+    if found:
+        return found
+    try:
+        import imageio_ffmpeg
+
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
+def _synthetic_talk(duration: float, word_gap: float) -> tuple[list[dict], str]:
+    words: list[dict] = []
+    srt_blocks: list[str] = []
+    t = 0.0
+    i = 0
+    while t + word_gap <= duration:
+        words.append({"word": f"WORD{i}", "start": round(t, 3), "end": round(t + word_gap * 0.8, 3), "should_highlight": True})
+        t += word_gap
+        i += 1
+    for n, start in enumerate(range(0, int(duration), 3), start=1):
+        end = min(start + 2.5, duration)
+        srt_blocks.append(
+            f"{n}\n00:{start // 60:02d}:{start % 60:02d},000 --> "
+            f"00:{int(end) // 60:02d}:{int(end) % 60:02d},500\nSubtitle line {n}\n"
+        )
+    return words, "\n".join(srt_blocks)
+
+
+def _run(ffmpeg: str, duration: float, vf: str) -> float:
+    cmd = [
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=duration={duration}:size=1920x1080:rate=30",
+        "-vf", vf,
+        "-f", "null", "-",
+    ]
+    started = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-800:])
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--word-gap", type=float, default=0.6)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    ffmpeg = _resolve_ffmpeg()
+    words, srt_text = _synthetic_talk(args.duration, args.word_gap)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        srt_path = Path(tmp) / "talk.srt"
+        srt_path.write_text(srt_text, encoding="utf-8")
+
+        drawtext_chain = [
+            BASE_VF,
+            *build_kinetic_highlight_filters(words, "#FFFF00"),
+            build_subtitle_filter(str(srt_path), "youtube"),
+            *build_lower_third_filter("Jane Doe", "Benchmark Speaker"),
+        ]
+        track = build_overlay_track(
+            word_timings=words,
+            title="Jane Doe",
+            subtitle="Benchmark Speaker",
+            srt_text=srt_text,
+        )
+        ass_path = Path(tmp) / "talk.ass"
+        ass_path.write_text(track.for_scene(0.0, args.duration).to_ass(), encoding="utf-8")
+
+        variants = {
+            f"drawtext ({len(drawtext_chain) - 1} overlay filters)": ",".join(drawtext_chain),
+            "ass (1 overlay filter)": f"{BASE_VF},{build_ass_filter(str(ass_path))}",
+        }
+
+        print(f"Synthetic talk: {args.duration:.0f}s, {len(words)} highlighted words, ffmpeg={ffmpeg}")
+        medians: dict[str, float] = {}
+        for label, vf in variants.items():
+            times = [_run(ffmpeg, args.duration, vf) for _ in range(args.runs)]
+            medians[label] = statistics.median(times)
+            print(f"  {label:<36} median {medians[label]:7.2f}s  runs={[round(t, 2) for t in times]}")
+
+        legacy, ass = medians.values()
+        print(f"Speed-up: {legacy / ass:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
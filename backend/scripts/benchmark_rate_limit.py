@@ -0,0 +1,86 @@
+"""
+Benchmark: per-request overhead of the rate limiter.
+
+Compares the previous list-of-timestamps limiter (one global asyncio.Lock,
+list rebuilt per check) with the sharded local sliding-window limiter and,
+when --redis-url is given, the Redis GCRA script. Each run spreads checks
+over --keys identities with --concurrency concurrent callers and prints the
+mean cost per check.
+
+Usage (from backend/):
+    python scripts/benchmark_rate_limit.py --checks 50000 --keys 1000
+    python scripts/benchmark_rate_limit.py --redis-url redis://localhost:6379/0
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+from app.middleware.rate_limit import LocalRateLimiter, RateLimiter
+
+
+class LegacyRateLimiter:
+    """The limiter this module replaced, kept here as the baseline."""
+
+    def __init__(self):
+        self._requests = defaultdict(list)
+        self._lock = asyncio.Lock()
+
+    async def is_rate_limited(self, key, max_requests, window_seconds):
+        async with self._lock:
+            now = datetime.utcnow()
+            window_start = now - timedelta(seconds=window_seconds)
+            self._requests[key] = [ts for ts in self._requests[key] if ts > window_start]
+            current = len(self._requests[key])
+            if current >= max_requests:
+                return True, 0
+            self._requests[key].append(now)
+            return False, max_requests - current - 1
+
+
+async def _drive(check, checks: int, keys: int, concurrency: int, limit: int, window: int) -> float:
+    per_worker = checks // concurrency
+
+    async def worker(offset: int) -> None:
+        for i in range(per_worker):
+            await check(f"user:{(offset + i) % keys}:/api/agents", limit, window)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(w * 7919) for w in range(concurrency)))
+    return (time.perf_counter() - started) / (per_worker * concurrency)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=50_000)
+    parser.add_argument("--keys", type=int, default=1_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    legacy = LegacyRateLimiter()
+    local = LocalRateLimiter()
+
+    async def local_check(key, limit, window):
+        return local.check(key, limit, window)
+
+    runs = [("legacy list + global lock", legacy.is_rate_limited), ("local sliding window", local_check)]
+    if args.redis_url:
+        runs.append(("redis gcra", RateLimiter(args.redis_url).check))
+
+    print(f"{args.checks} checks, {args.keys} keys, limit {args.limit}/{args.window}s, concurrency {args.concurrency}")
+    for name, check in runs:
+        per_check = await _drive(check, args.checks, args.keys, args.concurrency, args.limit, args.window)
+        print(f"  {name:<28} {per_check * 1e6:8.1f} us/check")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
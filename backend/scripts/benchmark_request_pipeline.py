@@ -0,0 +1,79 @@
+"""
+Load test: in-process throughput of the HTTP middleware stack and auth path.
+
+Drives the ASGI app directly (httpx ASGITransport, in-memory SQLite) so the
+numbers isolate middleware + dependency overhead from network and server
+settings. Measures an unauthenticated route and an authenticated one
+(token decode, user lookup, monthly-credit check).
+
+Usage (from backend/):
+    python scripts/benchmark_request_pipeline.py --requests 3000 --concurrency 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+os.environ.setdefault("ENVIRONMENT", "testing")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import structlog
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db import Base, get_session
+from app.main import app
+
+
+async def _hammer(client: AsyncClient, path: str, headers: dict, total: int, concurrency: int) -> float:
+    per_worker = total // concurrency
+
+    async def worker() -> None:
+        for _ in range(per_worker):
+            res = await client.get(path, headers=headers)
+            res.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return per_worker * concurrency / (time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    # Request logging is part of the stack but its I/O would dominate.
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_session():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        res = await client.post("/api/auth/signup", json={"email": "bench@example.com", "password": "SecurePassword123"})
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        await _hammer(client, "/api/auth/me", headers, args.concurrency * 4, args.concurrency)  # warm-up
+        health = await _hammer(client, "/health", {}, args.requests, args.concurrency)
+        me = await _hammer(client, "/api/auth/me", headers, args.requests, args.concurrency)
+
+    await engine.dispose()
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(f"  GET /health        {health:8.0f} req/s")
+    print(f"  GET /api/auth/me   {me:8.0f} req/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,44 @@
+"""
+Benchmark: recall and latency of the local ANN index on synthetic embeddings.
+
+Builds an IVFFlat index (services/memory/ann_index.py) over clustered random
+vectors and compares each query against an exact scan of the same data.
+
+Usage (from backend/):
+    python scripts/benchmark_vector_index.py --size 50000 --dim 1536 --nprobe 4 8 16
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+
+import structlog
+
+from app.services.memory.ann_index import benchmark
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+
+    print(f"{'nprobe':>6} {'recall@k':>9} {'scanned':>8} {'ann ms':>8} {'exact ms':>9} {'build ms':>9}")
+    for nprobe in args.nprobe:
+        r = benchmark(size=args.size, dim=args.dim, queries=args.queries, k=args.k, nprobe=nprobe)
+        print(
+            f"{nprobe:>6} {r.recall:>9.3f} {r.scanned_fraction:>8.1%} "
+            f"{r.ann_ms:>8.2f} {r.exact_ms:>9.2f} {r.build_ms:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
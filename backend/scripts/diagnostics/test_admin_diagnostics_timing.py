@@ -43,11 +43,11 @@ async def test_timings():
     except Exception as e:
         print(f"LLM Health FAILED ({time.perf_counter() - start:.2f}s): {e}")
 
-    # 4. Storage Usage (Sync)
+    # 4. Storage Usage (Async)
     start = time.perf_counter()
     print("Checking Storage Usage...")
     try:
-        res = storage_service.get_storage_usage()
+        res = await storage_service.get_storage_usage()
         print(f"Storage OK ({time.perf_counter() - start:.2f}s)")
     except Exception as e:
         print(f"Storage FAILED ({time.perf_counter() - start:.2f}s): {e}")
@@ -15,9 +15,7 @@ async def test_storage_usage():
             print(f"Endpoint: https://{settings.r2_account_id}.r2.cloudflarestorage.com")
         
         print("Calling get_storage_usage()...")
-        # Since it's a sync call in the service, we'll try to run it with a timeout if it was async, 
-        # but since it's sync, it will just block.
-        usage = storage_service.get_storage_usage()
+        usage = await asyncio.wait_for(storage_service.get_storage_usage(), timeout=30)
         print(f"Usage: {usage}")
         print(f"Time taken: {time.perf_counter() - start:.2f}s")
     except Exception as e:
@@ -17,7 +17,7 @@ async def test_admin_health():
         print("Celery diagnostics OK")
         
         print("Testing storage usage...")
-        storage = storage_service.get_storage_usage()
+        storage = await storage_service.get_storage_usage()
         print("Storage usage OK")
         
         print("Testing integration health (no probe)...")
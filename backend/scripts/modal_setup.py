@@ -60,7 +60,7 @@ def setup_modal():
 
     # 4. Deploy the worker
     print("Deploying worker to Modal cloud...")
-    deploy_cmd = ["modal", "deploy", "modal_worker.py"]
+    deploy_cmd = ["modal", "deploy", "scripts/modal_worker.py"]
     if run_cmd(deploy_cmd):
         print("\n[SUCCESS] Modal Worker is live!")
         print("Your backend will now automatically offload Pro rendering to GPU.")
@@ -6,7 +6,7 @@ from pathlib import Path
 # Add backend to path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from app.services.stock_scout_service import stock_scout_service
+from app.services.stock import stock_asset_service
 from app.agents import scout_agent
 from app.config import settings
 
@@ -28,7 +28,7 @@ async def test_scout():
     # 2. Test Service Logic (Mock/Real API search)
     print("\n[Service] Searching Pexels/Pixabay...")
     # Even without keys, it should handle it gracefully
-    assets = await stock_scout_service.search(scout_resp.search_queries[:2])
+    assets = await stock_asset_service.search(scout_resp.search_queries[:2])
     
     if assets:
         print(f" ✅ Found {len(assets)} assets!")
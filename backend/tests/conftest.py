@@ -16,6 +16,7 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, Asyn
 from app.db import Base, get_session
 from app.main import app
 from app.middleware.rate_limit import rate_limiter
+from app.services.principal_cache import principal_cache
 
 # Use in-memory SQLite for tests
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -60,5 +61,7 @@ async def client(session) -> AsyncGenerator[AsyncClient, None]:
 @pytest.fixture(autouse=True)
 async def reset_rate_limiter() -> AsyncGenerator[None, None]:
     await rate_limiter.reset()
+    principal_cache.clear()
     yield
     await rate_limiter.reset()
+    principal_cache.clear()
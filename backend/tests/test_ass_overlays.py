@@ -0,0 +1,100 @@
+from app.services.ass_overlays import (
+    ass_color,
+    ass_timestamp,
+    build_ass_filter,
+    build_overlay_track,
+    parse_srt_events,
+    write_scene_tracks,
+)
+
+SRT = """1
+00:00:01,000 --> 00:00:03,500
+Hello {world}
+
+2
+00:00:09,000 --> 00:00:11,000
+Second line
+"""
+
+WORDS = [
+    {"word": "AMAZING", "start": 1.5, "end": 2.2, "should_highlight": True},
+    {"word": "results", "start": 2.2, "end": 2.8, "should_highlight": False},
+    {"word": "LATER", "start": 10.0, "end": 10.5, "should_highlight": True},
+]
+
+
+def test_color_and_timestamp_formats():
+    assert ass_color("#00FF00") == "&H0000FF00"
+    assert ass_color("#112233", alpha=0.8) == "&H33332211"
+    assert ass_timestamp(3725.456) == "1:02:05.46"
+
+
+def test_parse_srt_events():
+    events = parse_srt_events(SRT)
+    assert events[0] == (1.0, 3.5, "Hello {world}")
+    assert len(events) == 2
+
+
+def test_overlay_track_replaces_drawtext_chain():
+    track = build_overlay_track(
+        word_timings=WORDS,
+        highlight_color="#00FF00",
+        title="Jane Doe",
+        subtitle="Founder",
+        srt_text=SRT,
+        platform="tiktok",
+    )
+    doc = track.to_ass()
+    styles = {e.style for e in track.events}
+
+    assert styles == {"Subtitle", "Kinetic", "LowerTitle", "LowerSub"}
+    assert sum(e.style == "Kinetic" for e in track.events) == 2
+    assert "PlayResY: 720" in doc
+    assert "Hello (world)" in doc
+    assert "drawtext" not in doc
+
+
+def test_for_scene_clips_and_rebases_events():
+    track = build_overlay_track(word_timings=WORDS, title="Jane Doe", srt_text=SRT)
+
+    # Part covering source 9..12s, placed 4s into the edit at 2x speed.
+    scene = track.for_scene(9.0, 3.0, output_offset=4.0, speed=2.0)
+    by_style = {e.style: e for e in scene.events}
+
+    assert set(by_style) == {"Subtitle", "Kinetic", "LowerTitle"}
+    assert by_style["Kinetic"].start == 0.5
+    assert by_style["Kinetic"].end == 0.75
+    assert by_style["Subtitle"].start == 0.0
+    assert by_style["Subtitle"].end == 1.0
+    # Lower third is output-timed: 4..5.5s of the edit -> 0..1.5s of this part,
+    # with its slide-in anchored 4s before the part started.
+    assert by_style["LowerTitle"].end == 1.5
+    assert "-4000,-3500" in by_style["LowerTitle"].tags
+
+    assert not track.for_scene(30.0, 2.0, output_offset=20.0)
+
+
+def test_write_scene_tracks_skips_empty_parts(tmp_path):
+    track = build_overlay_track(word_timings=WORDS)
+    cuts = [{"start": 1.0, "end": 3.0}, {"start": 5.0, "end": 6.0}, {"start": 9.5, "end": 11.0}]
+
+    paths = write_scene_tracks(track, cuts, tmp_path)
+
+    assert sorted(paths) == [0, 2]
+    assert "AMAZING" in (tmp_path / "part_0000.ass").read_text(encoding="utf-8")
+    assert build_ass_filter(paths[2]).startswith("subtitles='")
+
+
+def test_tracks_follow_the_render_frame_and_transition_overlap(tmp_path):
+    track = build_overlay_track(title="Jane Doe", play_res=(720, 1280))
+    doc = track.to_ass()
+    assert "PlayResX: 720" in doc and "PlayResY: 1280" in doc
+    assert r"\move(-720,1172,40,1172" in track.events[0].tags
+
+    # 0.5s crossfades: the third part starts 5.0s into the edit, not 6.0s,
+    # so it still shows the last half second of the lower third.
+    cuts = [{"start": 0.0, "end": 3.0}, {"start": 10.0, "end": 13.0}, {"start": 20.0, "end": 23.0}]
+    assert sorted(write_scene_tracks(track, cuts, tmp_path / "cut")) == [0, 1]
+    paths = write_scene_tracks(track, cuts, tmp_path / "xfade", transition_overlap=0.5)
+    assert sorted(paths) == [0, 1, 2]
+    assert "0:00:00.00,0:00:00.50" in (tmp_path / "xfade" / "part_0002.ass").read_text(encoding="utf-8")
@@ -0,0 +1,160 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from app.services.autoscaler import (
+    AutoscalePolicy,
+    AutoscalerController,
+    CapacityPlan,
+    LoadSample,
+    load_trace,
+    pool_deltas,
+)
+from app.services.concurrency import ResizableSemaphore
+
+TRACE = Path(__file__).parent / "fixtures" / "autoscaler_trace.jsonl"
+BASELINE = CapacityPlan(pool_size=1, render_slots=1, analysis_slots=1, scene_parallel=1)
+
+
+def controller(**kwargs) -> AutoscalerController:
+    return AutoscalerController(AutoscalePolicy(min_pool=1, max_pool=4), initial=BASELINE, **kwargs)
+
+
+def sample(t, queue_depth=0, cpu=30.0, memory=6000.0, **kwargs) -> LoadSample:
+    return LoadSample(
+        timestamp=float(t),
+        queue_depth=queue_depth,
+        cpu_percent=cpu,
+        memory_available_mb=memory,
+        cpu_count=8,
+        stage_seconds={"planning": 60.0, "rendering": 120.0},
+        **kwargs,
+    )
+
+
+def test_backlog_scales_pool_up_after_consecutive_samples():
+    scaler = controller()
+    first = scaler.step(sample(0, queue_depth=20))
+    assert first.desired.pool_size == 4
+    assert scaler.current.pool_size == 1  # a single sample is not enough
+
+    scaler.step(sample(15, queue_depth=20))
+    assert scaler.current.pool_size == 4
+
+
+def test_replay_of_recorded_trace_does_not_flap():
+    scaler = controller()
+    decisions = scaler.replay(load_trace(TRACE))
+    pool = [d.plan.pool_size for d in decisions]
+
+    assert max(pool) == 4                  # burst reached the ceiling
+    assert pool[-1] < max(pool)            # and the long idle stretch scaled back
+    changes = [i for i in range(1, len(pool)) if pool[i] != pool[i - 1]]
+    # The noisy plateau (queue alternating 4/20) must not cause oscillation.
+    assert len(changes) <= 4
+    for a, b in zip(changes, changes[1:]):
+        if (pool[a] > pool[a - 1]) != (pool[b] > pool[b - 1]):
+            assert decisions[b].timestamp - decisions[a].timestamp >= scaler.policy.down_cooldown_seconds
+
+
+def test_memory_pressure_caps_render_slots_and_holds_pool():
+    scaler = controller()
+    for t in range(0, 60, 15):
+        scaler.step(sample(t, queue_depth=30, memory=1800.0))
+
+    assert scaler.current.render_slots == 1
+    assert scaler.current.analysis_slots == 1
+    assert scaler.current.pool_size == 1
+
+
+def test_dry_run_records_plans_without_calling_actuators():
+    calls = []
+    scaler = controller(dry_run=True, actuators=[lambda previous, plan: calls.append(plan)])
+    for t in range(0, 60, 15):
+        scaler.step(sample(t, queue_depth=20))
+
+    assert scaler.current.pool_size == 4
+    assert calls == []
+    assert not any(d.applied for d in scaler.decisions)
+
+    scaler.dry_run = False
+    scaler.replay([sample(t, queue_depth=0) for t in range(100, 1000, 15)])
+    assert calls == []  # replay never applies
+    assert scaler.dry_run is False
+
+
+def test_applied_plan_resizes_semaphores():
+    render = ResizableSemaphore(1)
+
+    def actuator(previous, plan):
+        render.resize(plan.render_slots)
+
+    scaler = controller(dry_run=False, actuators=[actuator])
+    scaler.step(sample(0, queue_depth=5, memory=8000.0))
+    scaler.step(sample(15, queue_depth=5, memory=8000.0))
+
+    assert scaler.current.render_slots == 2
+    assert render.limit == 2
+    assert scaler.decisions[-1].applied
+
+
+def test_pool_resize_targets_each_worker_from_its_observed_size():
+    sizes = {"celery@b": 1, "celery@a": 3}
+    assert pool_deltas(sizes, 6) == {"celery@b": 2}
+    assert pool_deltas(sizes, 5) == {"celery@b": 1}   # a keeps 3, b grows to 2
+    assert pool_deltas(sizes, 1) == {"celery@a": -2}  # never below one process per worker
+    assert pool_deltas({}, 4) == {}
+
+
+def test_observed_pool_size_replaces_the_assumed_one():
+    running = {"pool": 3}  # workers started with --concurrency=3, not the policy minimum
+    calls = []
+
+    def actuator(previous, plan):
+        calls.append((previous.pool_size, plan.pool_size))
+        running["pool"] = plan.pool_size
+
+    scaler = controller(dry_run=False, actuators=[actuator])
+    scaler.step(sample(0, queue_depth=0, pool_size=running["pool"]))
+    assert scaler.current.pool_size == 3 and calls == []
+
+    for t in range(15, 400, 15):
+        scaler.step(sample(t, queue_depth=0, pool_size=running["pool"]))
+    assert [c for c in calls if c[0] != c[1]] == [(3, 1)]
+
+
+@pytest.mark.asyncio
+async def test_resizable_semaphore_admits_waiters_on_grow_and_drains_on_shrink():
+    semaphore = ResizableSemaphore(1)
+    await semaphore.acquire()
+    waiter = asyncio.create_task(semaphore.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    semaphore.resize(2)
+    await asyncio.wait_for(waiter, 1.0)
+    assert semaphore.in_use == 2
+
+    semaphore.resize(1)  # holders keep their slots; new acquirers wait
+    blocked = asyncio.create_task(semaphore.acquire())
+    semaphore.release()
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+    semaphore.release()
+    await asyncio.wait_for(blocked, 1.0)
+    assert semaphore.in_use == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_passes_wakeup_on():
+    semaphore = ResizableSemaphore(1)
+    await semaphore.acquire()
+    first = asyncio.create_task(semaphore.acquire())
+    second = asyncio.create_task(semaphore.acquire())
+    await asyncio.sleep(0)
+
+    semaphore.release()
+    first.cancel()
+    await asyncio.wait_for(second, 1.0)
+    assert semaphore.in_use == 1
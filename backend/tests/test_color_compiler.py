@@ -0,0 +1,181 @@
+import shutil
+import subprocess
+import time
+
+import numpy as np
+import pytest
+
+from app.services.color_compiler import (
+    ColorCompileError,
+    ColorCompiler,
+    CubeLUT,
+    compose,
+    lattice,
+    parse_color_op,
+    read_cube,
+    split_filters,
+    write_cube,
+)
+
+GRADE = (
+    "eq=contrast=1.08:brightness=0.02:saturation=1.12,"
+    "curves=preset=cross_process,"
+    "colorbalance=rs=.1:bs=-.05:rh=0.05,"
+    "hue=h=8:s=1.05"
+)
+
+
+def synthetic_frame(height=180, width=320, seed=0) -> np.ndarray:
+    """Gradients, flat patches and noise: smooth ramps plus saturated corners."""
+    y, x = np.mgrid[0:height, 0:width]
+    ramp = np.stack([x / (width - 1), y / (height - 1), 1 - x / (width - 1)], axis=-1)
+    noise = np.random.default_rng(seed).random((height, width, 3))
+    frame = np.where((x < width // 2)[..., None], ramp, noise)
+    frame[:20, :20] = [1.0, 0.0, 0.0]
+    frame[-20:, -20:] = [0.05, 0.05, 0.05]
+    return frame
+
+
+def reference(chain: str):
+    return compose(parse_color_op(f)[0] for f in split_filters(chain))
+
+
+def test_baked_lut_matches_the_filter_chain_on_synthetic_frames(tmp_path):
+    compiled = ColorCompiler(cache_dir=tmp_path, lut_size=33).compile([GRADE])
+    assert compiled.folded == 4 and len(compiled.filters) == 1
+    assert compiled.filters[0].startswith("lut3d=file=") and compiled.filters[0].endswith(":interp=trilinear")
+
+    frame = synthetic_frame()
+    baked = read_cube(compiled.luts[0]).apply(frame)
+    error = np.abs(baked - reference(GRADE)(frame)) * 255
+
+    assert error.max() <= 4.0
+    assert error.mean() <= 0.5
+
+
+def ffmpeg_render(frame: np.ndarray, chain: str) -> np.ndarray:
+    """Run `chain` the way renders do: decoded to limited-range yuv420p first."""
+    height, width, _ = frame.shape
+    raw = (np.clip(frame, 0.0, 1.0) * 255).round().astype(np.uint8).tobytes()
+    out = subprocess.run(
+        [
+            "ffmpeg", "-v", "error", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-i", "-",
+            "-vf", f"format=yuv420p,{chain},format=rgb24", "-f", "rawvideo", "-pix_fmt", "rgb24", "-",
+        ],
+        input=raw, capture_output=True, check=True,
+    ).stdout
+    return np.frombuffer(out, np.uint8).reshape(height, width, 3).astype(np.float64)
+
+
+def psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = float(np.mean((a - b) ** 2))
+    return float("inf") if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_baked_lut_tracks_ffmpeg_output_of_the_filter_chain(tmp_path):
+    # The float model above only checks lattice interpolation; this compares real renders.
+    compiled = ColorCompiler(cache_dir=tmp_path, lut_size=33).compile([GRADE])
+    frame = synthetic_frame()
+
+    graded = ffmpeg_render(frame, GRADE)
+    baked = ffmpeg_render(frame, ",".join(compiled.filters))
+
+    # Measured ~34 dB: close, but not yet the visually lossless (~40 dB) needed
+    # before color_lut_compiler can default on.
+    assert psnr(graded, baked) >= 32.0
+
+
+def test_unfoldable_filters_pass_through_in_order_and_split_runs(tmp_path):
+    compiler = ColorCompiler(cache_dir=tmp_path, lut_size=9)
+    expression_hue = "hue='if(between(H,20,45),H,S*0.93)'"
+
+    compiled = compiler.compile([
+        "scale=1280:720:force_original_aspect_ratio=decrease",
+        "eq=contrast=1.1,curves=preset=lighter",
+        expression_hue,
+        "eq=saturation=1.2",
+        "drawtext=text='a\\,b':x=10",
+    ])
+
+    assert compiled.filters[0] == "scale=1280:720:force_original_aspect_ratio=decrease"
+    assert compiled.filters[1].startswith("lut3d=")
+    assert compiled.filters[2:] == [expression_hue, "eq=saturation=1.2", "drawtext=text='a\\,b':x=10"]
+    assert compiled.folded == 2  # a lone eq is cheaper left as-is than as an RGB LUT
+
+    with pytest.raises(ColorCompileError):
+        compiler.compile(["eq=contrast=1.1", expression_hue], strict=True)
+
+
+def test_point_wise_models_match_known_values():
+    grey = np.array([[0.2, 0.5, 0.8]])
+
+    desaturated = reference("eq=saturation=0")(grey)
+    assert np.allclose(desaturated, desaturated[0, 0], atol=1e-6)
+    assert np.allclose(reference("curves=preset=negative")(grey), 1 - grey, atol=1e-6)
+    swapped = reference("colorchannelmixer=rr=0:rb=1:bb=0:br=1")(grey)
+    assert np.allclose(swapped, [[0.8, 0.5, 0.2]])
+    assert np.allclose(reference("hue=h=0:s=1")(grey), grey, atol=1e-3)
+    # The spline passes through its key points; channels outside them are clamped.
+    assert reference("curves=m='0/0 0.4/0.5 1/1'")(np.array([[0.4, 0.0, 1.0]])) == pytest.approx(np.array([[0.5, 0.0, 1.0]]))
+
+
+def test_existing_cube_files_are_folded_with_their_neighbours(tmp_path):
+    size = 5
+    warm = lattice(size).copy()
+    warm[..., 0] = warm[..., 0] * 0.9 + 0.1
+    cube = tmp_path / "C:warm.cube"
+    write_cube(cube, CubeLUT(size, warm))
+    escaped = str(cube).replace(":", "\\:")
+
+    compiled = ColorCompiler(cache_dir=tmp_path / "luts", lut_size=33).compile([f"lut3d={escaped},eq=contrast=1.2"])
+
+    assert compiled.folded == 2
+    frame = synthetic_frame(60, 80)
+    expected = reference("eq=contrast=1.2")(frame * [0.9, 1, 1] + [0.1, 0, 0])
+    assert np.abs(read_cube(compiled.luts[0]).apply(frame) - expected).max() * 255 <= 3.0
+
+
+def test_cube_roundtrip_keeps_the_table(tmp_path):
+    table = np.random.default_rng(1).random((4, 4, 4, 3))
+    write_cube(tmp_path / "t.cube", CubeLUT(4, table))
+
+    loaded = read_cube(tmp_path / "t.cube")
+
+    assert loaded.size == 4
+    assert np.allclose(loaded.table, table, atol=1e-6)
+    corners = lattice(4).reshape(-1, 3)
+    assert np.allclose(loaded.apply(corners), table.reshape(-1, 3), atol=1e-6)
+
+
+def test_compiled_chain_is_cached_by_content(tmp_path):
+    compiler = ColorCompiler(cache_dir=tmp_path, lut_size=33)
+    first = compiler.compile([GRADE])
+    mtime = (tmp_path / first.luts[0]).stat().st_mtime_ns
+
+    started = time.perf_counter()
+    second = compiler.compile([GRADE])
+    warm = time.perf_counter() - started
+
+    assert second.filters == first.filters
+    assert (tmp_path / first.luts[0]).stat().st_mtime_ns == mtime
+    assert warm < 0.05
+    assert compiler.compile([GRADE.replace("1.08", "1.09")]).luts != first.luts
+
+
+def test_one_lookup_beats_evaluating_a_long_chain():
+    chain = ",".join([GRADE, "curves=preset=vintage", "colorchannelmixer=rr=0.9:rg=0.1", "eq=gamma=1.1", "colorbalance=gm=0.05"])
+    ops = reference(chain)
+    grid = lattice(33)
+    lut = CubeLUT(33, ops(grid.reshape(-1, 3)).reshape(grid.shape))
+    frame = synthetic_frame(256, 256)
+
+    def best_of(fn, runs=5):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            fn(frame)
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    assert best_of(lut.apply) < best_of(ops)
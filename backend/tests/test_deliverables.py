@@ -0,0 +1,236 @@
+import asyncio
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import deliverables as deliverables_module
+from app.services.deliverables import (
+    DeliverableRenderer,
+    aspect_size,
+    build_bundle_command,
+    plan_bundle,
+)
+
+AB_TEST_RESULT = {
+    "variants": [
+        {"id": "A", "type": "hook", "content": {"description": "cold open", "start": 42.0, "end": 45.0}},
+        {"id": "B", "type": "opening", "content": {"cuts": [{"start": 10, "end": 12.5}]}},
+        {"id": "C", "type": "title", "content": {"text": "No timing"}},
+        {"id": "D", "type": "hook", "content": {"description": "no window"}},
+    ],
+    "rankings": ["A", "B", "C", "D"],
+    "rationale": "",
+}
+
+
+def test_aspect_sizes_keep_the_short_side_at_720():
+    assert aspect_size("16:9") == (1280, 720)
+    assert aspect_size("9:16") == (720, 1280)
+    assert aspect_size("1:1") == (720, 720)
+    assert aspect_size("4:5") == (720, 900)
+    with pytest.raises(ValueError):
+        aspect_size("wide")
+
+
+def test_bundle_plan_covers_platforms_preview_and_timed_hook_variants():
+    bundle = plan_bundle(["tiktok", "youtube", "tiktok"], "src.mp4", AB_TEST_RESULT)
+
+    assert [d.name for d in bundle] == ["tiktok", "youtube", "preview", "tiktok-hook-A", "tiktok-hook-B"]
+    tiktok, youtube, preview, hook_a, hook_b = bundle
+    assert (tiktok.width, tiktok.height, tiktok.video_kbps) == (720, 1280, 4000)
+    assert (youtube.width, youtube.height) == (1280, 720)
+    assert preview.max_duration == 30.0 and preview.height == 360
+    assert (hook_a.width, hook_a.height) == (720, 1280)
+    assert (hook_a.hook.start, hook_a.hook.duration) == (42.0, 3.0)
+    assert hook_b.hook.duration == 2.5
+
+    assert [d.name for d in plan_bundle(["youtube"], "src.mp4", AB_TEST_RESULT, preview=False, hook_variants=False)] == ["youtube"]
+    square = plan_bundle(["tiktok"], "src.mp4", aspect_ratios={"tiktok": "1:1"})[0]
+    assert (square.width, square.height) == (720, 720)
+
+
+def test_bundle_is_one_process_with_a_single_decode_of_the_master(tmp_path: Path):
+    bundle = plan_bundle(["tiktok", "youtube"], "src.mp4", AB_TEST_RESULT)
+    cmd = build_bundle_command("ffmpeg", "master.mp4", bundle, tmp_path, has_audio=True, fps=30, hook_vf="eq=contrast=1.1")
+
+    inputs = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"]
+    assert inputs[0] == "master.mp4"
+    assert inputs[1:] == [str(Path("src.mp4").absolute())] * 2  # only the hook windows
+    assert cmd[:5] == ["ffmpeg", "-y", "-hide_banner", "-i", "master.mp4"]
+    assert "-ss" in cmd and cmd[cmd.index("-ss") + 1] == "42.000" and cmd[cmd.index("-ss") + 3] == "3.000"
+
+    graph = cmd[cmd.index("-filter_complex") + 1].split(";")
+    assert graph[0] == "[0:v]split=5[s0][s1][s2][s3][s4]"
+    assert graph[1] == "[0:a]asplit=5[as0][as1][as2][as3][as4]"
+    assert "[s0]scale=720:1280:force_original_aspect_ratio=increase,crop=720:1280,setsar=1[v0]" in graph
+    assert "[s2]scale=-2:360[v2]" in graph
+    assert any(g.startswith("[s3]trim=start=3.000,setpts=PTS-STARTPTS") for g in graph)
+    assert any(g.startswith("[1:v]eq=contrast=1.1,scale=720:1280") for g in graph)
+    assert "[h3][ha3][b3][ba3]concat=n=2:v=1:a=1[v3][a3]" in graph
+
+    outputs = [arg for arg in cmd if arg.endswith(".mp4") and arg.startswith(str(tmp_path))]
+    assert [Path(o).name for o in outputs] == [d.filename for d in bundle]
+    preview_out = cmd.index(str(tmp_path / "preview.mp4"))
+    assert cmd[preview_out - 4:preview_out - 2] == ["-t", "30.000"]
+    assert cmd.count("-b:v") == 4  # platforms and hooks are bitrate-targeted, the preview is CRF
+
+
+def test_hook_source_without_audio_gets_silence(tmp_path: Path):
+    bundle = plan_bundle(["youtube"], "src.mp4", AB_TEST_RESULT, preview=False)
+    bundle[1].hook.has_audio = False
+    cmd = build_bundle_command("ffmpeg", "master.mp4", bundle, tmp_path, has_audio=True)
+    graph = cmd[cmd.index("-filter_complex") + 1].split(";")
+
+    assert "[1:a]" not in ";".join(graph)
+    assert "anullsrc=channel_layout=stereo:sample_rate=48000,atrim=duration=3.000,asetpts=PTS-STARTPTS[ha1]" in graph
+    assert "[2:a]aformat=sample_rates=48000:channel_layouts=stereo[ha2]" in graph
+
+
+def test_silent_master_builds_video_only_branches(tmp_path: Path):
+    bundle = plan_bundle(["youtube"], "src.mp4", AB_TEST_RESULT)
+    cmd = build_bundle_command("ffmpeg", "master.mp4", bundle, tmp_path, has_audio=False)
+    graph = cmd[cmd.index("-filter_complex") + 1]
+
+    assert "asplit" not in graph and "-c:a" not in cmd
+    assert "[h2][b2]concat=n=2:v=1:a=0[v2]" in graph
+
+
+class FakeRunner:
+    def __init__(self, succeed=True):
+        self.succeed = succeed
+        self.commands = []
+
+    async def run(self, cmd, duration=None, timeout=None):
+        self.commands.append(cmd)
+        if self.succeed:
+            for arg in cmd:
+                if arg.endswith(".mp4") and ".tmp-" in arg:
+                    Path(arg).write_bytes(b"mp4")
+        return SimpleNamespace(success=self.succeed, elapsed_seconds=1.5, error=None if self.succeed else "boom")
+
+
+@pytest.fixture
+def bundle_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(deliverables_module.settings, "storage_root", str(tmp_path))
+    metadata = SimpleNamespace(duration=60.0, fps=30.0, has_audio=True)
+    silent = SimpleNamespace(duration=60.0, fps=30.0, has_audio=False)
+
+    async def get_metadata(path):
+        return silent if Path(path).name.startswith("silent") else metadata
+
+    async def track(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(deliverables_module.media_analyzer, "get_metadata", get_metadata)
+    monkeypatch.setattr(deliverables_module.file_registry, "track", track)
+    master = tmp_path / "master.mp4"
+    master.write_bytes(b"master")
+    source = tmp_path / "src.mp4"
+    source.write_bytes(b"source")
+    return master, source
+
+
+@pytest.mark.asyncio
+async def test_render_bundle_writes_every_output_and_a_manifest(bundle_env):
+    master, source = bundle_env
+    runner = FakeRunner()
+    renderer = DeliverableRenderer(runner=runner)
+    bundle = plan_bundle(["tiktok"], str(source), AB_TEST_RESULT)
+    bundle.extend(plan_bundle(["youtube"], str(master.parent / "missing.mp4"), AB_TEST_RESULT, preview=False)[1:])
+
+    manifest = await renderer.render_bundle(7, master, bundle)
+
+    assert len(runner.commands) == 1
+    out_dir = renderer.bundle_dir(7)
+    names = [d["name"] for d in manifest["deliverables"]]
+    assert names == ["tiktok", "preview", "tiktok-hook-A", "tiktok-hook-B"]
+    assert manifest["skipped"] == ["youtube-hook-A", "youtube-hook-B"]  # hook source is gone
+    assert all((out_dir / f"{name}.mp4").exists() for name in names)
+    assert renderer.load_manifest(7) == json.loads((out_dir / "bundle.json").read_text())
+    assert not list(out_dir.parent.glob("*.tmp-*"))
+
+
+@pytest.mark.asyncio
+async def test_render_probes_hook_sources_for_audio(bundle_env):
+    master, _ = bundle_env
+    silent_source = master.parent / "silent-src.mp4"
+    silent_source.write_bytes(b"source")
+    runner = FakeRunner()
+    renderer = DeliverableRenderer(runner=runner)
+
+    manifest = await renderer.render_bundle(9, master, plan_bundle(["tiktok"], str(silent_source), AB_TEST_RESULT, preview=False))
+
+    graph = runner.commands[0][runner.commands[0].index("-filter_complex") + 1]
+    assert "anullsrc" in graph and "[1:a]" not in graph and "[2:a]" not in graph
+    assert [d["hook"]["has_audio"] for d in manifest["deliverables"][1:]] == [False, False]
+
+
+@pytest.mark.asyncio
+async def test_background_render_is_held_and_its_failure_logged(bundle_env, monkeypatch):
+    master, source = bundle_env
+    renderer = DeliverableRenderer(runner=FakeRunner())
+    errors = []
+    monkeypatch.setattr(deliverables_module.logger, "error", lambda event, **kw: errors.append((event, kw)))
+
+    async def boom(*args, **kwargs):
+        raise RuntimeError("probe crashed")
+
+    monkeypatch.setattr(deliverables_module.media_analyzer, "get_metadata", boom)
+    task = renderer.start(10, master, plan_bundle(["youtube"], str(source)))
+    assert renderer.start(10, master, []) is task and renderer.is_rendering(10)
+    await asyncio.wait({task})
+    await asyncio.sleep(0)
+
+    assert not renderer.is_rendering(10)
+    assert errors == [("deliverables_render_crashed", {"job_id": 10, "error": "probe crashed"})]
+
+
+@pytest.mark.asyncio
+async def test_failed_render_leaves_the_previous_bundle_in_place(bundle_env):
+    master, source = bundle_env
+    renderer = DeliverableRenderer(runner=FakeRunner())
+    await renderer.render_bundle(8, master, plan_bundle(["youtube"], str(source)))
+
+    renderer.runner = FakeRunner(succeed=False)
+    assert await renderer.render_bundle(8, master, plan_bundle(["tiktok"], str(source))) is None
+
+    assert [d["name"] for d in renderer.load_manifest(8)["deliverables"]] == ["youtube", "preview"]
+    assert not list(renderer.bundle_dir(8).parent.glob("*.tmp-*"))
+
+
+async def test_bundle_request_plans_from_the_job_and_renders_in_background(client, session, tmp_path, monkeypatch):
+    from sqlalchemy import select
+
+    from app.models import Job, User
+    from app.routers import jobs as jobs_router
+
+    calls = []
+
+    async def fake_render(job_id, master_path, bundle, hook_vf=None):
+        calls.append((job_id, master_path, [d.name for d in bundle], hook_vf))
+
+    monkeypatch.setattr(jobs_router.deliverable_renderer, "render_bundle", fake_render)
+    res = await client.post("/api/auth/signup", json={"email": "bundle@example.com", "password": "SecurePassword123"})
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    user = await session.scalar(select(User).where(User.email == "bundle@example.com"))
+    output = tmp_path / "job-out.mp4"
+    output.write_bytes(b"mp4")
+    job = Job(
+        user_id=user.id, source_path="src.mp4", output_path=str(output), status="complete",
+        platform="tiktok", ratio="9:16", ab_test_result=AB_TEST_RESULT,
+        color_qa={"grade_filters": ["eq=contrast=1.1"]},
+    )
+    session.add(job)
+    await session.commit()
+
+    res = await client.post(f"/api/jobs/{job.id}/deliverables", json={}, headers=headers)
+    assert res.status_code == 202
+    assert res.json()["deliverables"] == ["tiktok", "preview", "tiktok-hook-A", "tiktok-hook-B"]
+
+    res = await client.post(f"/api/jobs/{job.id}/deliverables", json={"platforms": ["myspace"]}, headers=headers)
+    assert res.status_code == 422
+
+    await asyncio.sleep(0)
+    assert calls == [(job.id, str(output), ["tiktok", "preview", "tiktok-hook-A", "tiktok-hook-B"], "eq=contrast=1.1")]
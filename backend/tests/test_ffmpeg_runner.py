@@ -0,0 +1,83 @@
+import asyncio
+import sys
+import textwrap
+
+import pytest
+
+from app.services.ffmpeg_runner import FFmpegRunner, parse_progress_block, with_progress_args
+
+
+def _script(body: str) -> list[str]:
+    return [sys.executable, "-c", textwrap.dedent(body)]
+
+
+FAKE_PROGRESS = """
+import sys, time
+for i in range(1, 4):
+    sys.stdout.write(f"frame={i * 24}\\nfps=24.0\\nout_time_us={i * 1000000}\\nspeed=2.0x\\nprogress=continue\\n")
+    sys.stdout.flush()
+    for n in range(50):
+        sys.stderr.write(f"noise line {i}-{n}\\n")
+    time.sleep(0.01)
+sys.stdout.write("out_time_us=4000000\\nprogress=end\\n")
+"""
+
+
+def test_with_progress_args_only_touches_ffmpeg():
+    assert with_progress_args(["ffmpeg", "-i", "in.mp4", "out.mp4"])[:4] == [
+        "ffmpeg", "-progress", "pipe:1", "-nostats"
+    ]
+    assert with_progress_args(["python", "-c", "pass"]) == ["python", "-c", "pass"]
+    already = ["ffmpeg", "-progress", "pipe:2", "-i", "x"]
+    assert with_progress_args(already) == already
+
+
+def test_parse_progress_block_percent():
+    snap = parse_progress_block({"out_time_us": "2500000", "speed": "1.5x", "progress": "continue"}, duration=10)
+    assert snap["out_time"] == 2.5
+    assert snap["speed"] == 1.5
+    assert snap["percent"] == 25.0
+    assert parse_progress_block({"progress": "end"}, duration=10)["percent"] == 100.0
+
+
+@pytest.mark.asyncio
+async def test_run_streams_progress_and_bounds_stderr():
+    snapshots = []
+    runner = FFmpegRunner(stderr_tail_lines=10)
+
+    result = await runner.run(_script(FAKE_PROGRESS), duration=4.0, on_progress=snapshots.append)
+
+    assert result.success
+    assert [s["percent"] for s in snapshots] == [25.0, 50.0, 75.0, 100.0]
+    assert snapshots[-1]["done"] is True
+    assert len(result.stderr_tail.splitlines()) == 10
+    assert result.stderr_tail.splitlines()[-1] == "noise line 3-49"
+
+
+@pytest.mark.asyncio
+async def test_run_kills_process_on_timeout():
+    runner = FFmpegRunner(kill_grace_seconds=1.0)
+
+    result = await runner.run(_script("import time; time.sleep(30)"), timeout=0.2)
+
+    assert result.timed_out
+    assert not result.success
+    assert result.returncode is not None
+    assert result.elapsed_seconds < 5
+
+
+@pytest.mark.asyncio
+async def test_run_honours_cancel_event():
+    runner = FFmpegRunner(kill_grace_seconds=1.0)
+    cancel = asyncio.Event()
+    asyncio.get_running_loop().call_later(0.1, cancel.set)
+
+    result = await runner.run(_script("import time; time.sleep(30)"), cancel_event=cancel)
+
+    assert result.cancelled
+    assert result.error == "FFmpeg execution cancelled"
+
+
+def test_run_sync_from_plain_thread():
+    result = FFmpegRunner().run_sync(_script("print('ok')"))
+    assert result.success
@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import StoredFile
+from app.services.file_registry import FileRegistry, normalize_path
+
+PAST = timedelta(seconds=-1)
+
+
+@pytest.fixture
+def registry(test_engine):
+    return FileRegistry(async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False))
+
+
+def _write(path: Path, size: int = 10) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return path
+
+
+async def test_collect_deletes_only_due_entries_in_batches(registry: FileRegistry, tmp_path: Path):
+    source = _write(tmp_path / "uploads" / "src.mp4")
+    takes = [_write(tmp_path / "outputs" / f"job-1-take{i}.mp4", 100) for i in range(5)]
+    parts = tmp_path / "outputs" / "job-1-parts"
+    _write(parts / "part_0000.mp4", 50)
+    fresh_srt = _write(tmp_path / "outputs" / "job-1.srt")
+
+    await registry.track(source, "upload", job_id=1)
+    for take in takes:
+        await registry.track(take, "take", job_id=1, ttl=PAST)
+    await registry.track(parts, "part", job_id=1, ttl=PAST)
+    await registry.track(fresh_srt, "srt", job_id=1)
+
+    first = await registry.collect(batch_size=2, max_batches=1)
+    assert (first.deleted, first.batches) == (2, 1)
+
+    rest = await registry.collect(batch_size=2)
+    assert rest.deleted == 4
+    assert rest.freed_bytes == 3 * 100 + 50
+    assert not any(take.exists() for take in takes)
+    assert not parts.exists()
+    assert source.exists() and fresh_srt.exists()
+    assert await registry.due() == []
+
+
+async def test_unclaimed_uploads_expire_unless_a_job_pins_them(registry: FileRegistry, tmp_path: Path, session: AsyncSession):
+    abandoned = _write(tmp_path / "uploads" / "cas" / "ab" / "abandoned.mp4")
+    claimed = _write(tmp_path / "uploads" / "cas" / "cd" / "claimed.mp4")
+    for path in (abandoned, claimed):
+        await registry.track_unclaimed(session, path)
+    await session.commit()
+
+    await registry.track(claimed, "upload", job_id=3)
+    # Uploading the same content again must not unpin the job's source.
+    await registry.track_unclaimed(session, claimed)
+    await session.commit()
+
+    rows = {row.path: row for row in (await session.execute(select(StoredFile))).scalars()}
+    for row in rows.values():
+        await session.refresh(row)
+    assert rows[normalize_path(abandoned)].expires_at is not None
+    assert rows[normalize_path(abandoned)].job_id is None
+    assert rows[normalize_path(claimed)].expires_at is None
+    assert rows[normalize_path(claimed)].job_id == 3
+
+
+async def test_retry_release_unpins_outputs_until_repinned(registry: FileRegistry, tmp_path: Path, session: AsyncSession):
+    output = _write(tmp_path / "outputs" / "job-2.mp4")
+    await registry.track(output, "output", job_id=2)
+
+    assert await registry.release_job(session, 2) == 1
+    await session.commit()
+    row = await session.get(StoredFile, normalize_path(output))
+    await session.refresh(row)
+    assert row.expires_at is not None
+
+    await registry.track(output, "output", job_id=2)
+    await session.refresh(row)
+    assert row.expires_at is None
+
+
+async def test_expire_stale_makes_old_parts_due(registry: FileRegistry, tmp_path: Path):
+    parts = tmp_path / "outputs" / "job-3-parts"
+    _write(parts / "part_0000.mp4")
+    await registry.track(parts, "part", job_id=3)
+    assert normalize_path(parts) not in await registry.due()
+
+    assert await registry.expire_stale(("part",), datetime.utcnow() + timedelta(minutes=1)) == 1
+    result = await registry.collect()
+    assert result.deleted >= 1
+    assert not parts.exists()
+
+
+async def test_backfill_runs_once_per_tree_even_with_entries(registry: FileRegistry, tmp_path: Path):
+    tracked = _write(tmp_path / "outputs" / "job-4-take1.mp4")
+    await registry.track(tracked, "take", job_id=4)
+    thumbs = tmp_path / "outputs" / "job-4-thumbs"
+    _write(thumbs / "sprite_000.jpg")
+    await registry.track(thumbs, "thumbnail", job_id=4)
+    legacy = _write(tmp_path / "outputs" / "old.mp4")
+
+    assert await registry.ensure_backfilled(tmp_path) == 1
+    assert normalize_path(legacy) in await registry.due(datetime.utcnow() + timedelta(days=365))
+    assert await registry.ensure_backfilled(tmp_path) == 0
+
+
+async def test_cleanup_sweeps_untracked_scratch_by_mtime(registry: FileRegistry, tmp_path: Path, monkeypatch):
+    import os
+
+    from app.services import cleanup_service as cleanup_module
+
+    monkeypatch.setattr(cleanup_module, "file_registry", registry)
+    stale_tmp = _write(tmp_path / "temp" / "stale.bin")
+    stale_parts = tmp_path / "outputs" / "job-5-parts"
+    _write(stale_parts / "part_0000.mp4")
+    fresh_tmp = _write(tmp_path / "temp" / "fresh.bin")
+    delivered = _write(tmp_path / "outputs" / "job-5.mp4")
+    old = datetime.utcnow().timestamp() - 48 * 3600
+    for path in (stale_tmp, stale_parts, delivered):
+        os.utime(path, (old, old))
+
+    freed = await cleanup_module.CleanupService(str(tmp_path)).run_cleanup(max_age_hours=12)
+
+    assert freed >= 20
+    assert not stale_tmp.exists() and not stale_parts.exists()
+    assert fresh_tmp.exists() and delivered.exists()
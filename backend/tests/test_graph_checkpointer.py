@@ -0,0 +1,92 @@
+import operator
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.graph import END, StateGraph
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.graph.checkpointer import SqlCheckpointSaver
+from app.models import GraphCheckpoint
+from app.services.workflow_engine import _graph_resume_point
+
+# LangGraph writes checkpoints from background tasks; keep them on the loop
+# that owns the shared in-memory test connection.
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+class _State(TypedDict, total=False):
+    job_id: int
+    log: Annotated[list, operator.add]
+    output_path: str
+
+
+def _graph(saver, calls: dict, fail_once: set):
+    def node(name):
+        def run(state: _State) -> dict:
+            calls[name] = calls.get(name, 0) + 1
+            if name in fail_once:
+                fail_once.discard(name)
+                raise RuntimeError(f"{name} crashed")
+            update = {"log": [name]}
+            if name == "compiler":
+                update["output_path"] = f"out/{state['job_id']}.mp4"
+            return update
+        return run
+
+    graph = StateGraph(_State)
+    for name in ("director", "cutter", "compiler"):
+        graph.add_node(name, node(name))
+    graph.set_entry_point("director")
+    graph.add_edge("director", "cutter")
+    graph.add_edge("cutter", "compiler")
+    graph.add_edge("compiler", END)
+    return graph.compile(checkpointer=saver)
+
+
+@pytest.fixture
+def saver(test_engine):
+    return SqlCheckpointSaver(async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False))
+
+
+async def test_failed_run_resumes_after_last_completed_node(saver):
+    calls: dict = {}
+    app = _graph(saver, calls, fail_once={"compiler"})
+    config = {"configurable": {"thread_id": "9101"}}
+
+    with pytest.raises(RuntimeError):
+        async for _ in app.astream({"job_id": 9101, "log": []}, config=config):
+            pass
+    assert await _graph_resume_point(app, config) == ("compiler",)
+
+    # A fresh graph object (new worker process) picks the job up from the database.
+    app = _graph(saver, calls, fail_once=set())
+    async for _ in app.astream(None, config=config):
+        pass
+    state = (await app.aget_state(config)).values
+    assert state["log"] == ["director", "cutter", "compiler"]
+    assert state["output_path"] == "out/9101.mp4"
+    assert calls == {"director": 1, "cutter": 1, "compiler": 2}
+
+    # Finished threads are discarded, so the next run starts from scratch.
+    assert await _graph_resume_point(app, config) == ()
+    assert await saver.aget_tuple(config) is None
+
+
+async def test_checkpoints_are_pruned_and_compressed(saver, test_engine):
+    app = _graph(saver, {}, fail_once=set())
+    config = {"configurable": {"thread_id": "9102"}}
+    async for _ in app.astream({"job_id": 9102, "log": ["x" * 5000]}, config=config):
+        pass
+
+    async with async_sessionmaker(test_engine, class_=AsyncSession)() as session:
+        rows = (await session.execute(
+            select(func.count(), func.max(func.length(GraphCheckpoint.payload)))
+            .where(GraphCheckpoint.thread_id == "9102")
+        )).one()
+    assert rows[0] == 2
+    assert rows[1] < 2000
+
+    history = [item async for item in saver.alist(config)]
+    assert len(history) == 2
+    assert history[0].parent_config["configurable"]["checkpoint_id"] == history[1].config["configurable"]["checkpoint_id"]
@@ -0,0 +1,103 @@
+import asyncio
+
+from app.graph.scheduler import DataflowScheduler, NodeSpec
+from app.graph.workflow import dataflow_specs
+
+
+def _node(log: list, delay: float, update):
+    async def run(state):
+        log.append(("start", run.name))
+        await asyncio.sleep(delay)
+        log.append(("end", run.name))
+        return update(state) if callable(update) else update
+    return run
+
+
+def _specs(log, qc_scores):
+    def named(name, delay, update):
+        fn = _node(log, delay, update)
+        fn.name = name
+        return fn
+
+    def qc(state):
+        return {"qc_result": {"score": qc_scores.pop(0)}}
+
+    def iterate(state):
+        return {"revision_prompt": "tighten", "should_revise": True}
+
+    return [
+        NodeSpec("director", named("director", 0.02, lambda s: {"director_plan": {"v": s.get("revision_prompt") or "v1"}}),
+                 writes=("director_plan",), optional=("revision_prompt",)),
+        NodeSpec("analysis", named("analysis", 0.08, {"media_intelligence": {"scenes": 3}}), writes=("media_intelligence",)),
+        NodeSpec("platform", named("platform", 0.06, {"platform_result": {"ok": True}}), reads=("director_plan",), writes=("platform_result",)),
+        NodeSpec("cutter", named("cutter", 0.02, lambda s: {"cuts": [s["director_plan"]["v"]]}),
+                 reads=("director_plan", "media_intelligence"), writes=("cuts",)),
+        NodeSpec("qc_gate", named("qc_gate", 0.01, qc), reads=("cuts", "platform_result"), writes=("qc_result",)),
+        NodeSpec("iteration_control", named("iteration_control", 0.0, iterate), reads=("qc_result",),
+                 writes=("revision_prompt", "should_revise"), gated=True),
+        NodeSpec("compiler", named("compiler", 0.01, lambda s: {"output_path": f"out-{s['cuts'][0]}.mp4"}),
+                 reads=("cuts",), writes=("output_path",), gated=True),
+        NodeSpec("scout", named("scout", 0.01, lambda s: {"scout_result": s["director_plan"]["v"]}),
+                 reads=("director_plan",), writes=("scout_result",), gated=True, speculative=True),
+    ]
+
+
+def _routes():
+    return {
+        "qc_gate": lambda s: ("compiler", "scout") if s["qc_result"]["score"] >= 7 else ("iteration_control",) if s["qc_result"]["score"] > 0 else (),
+        "iteration_control": lambda s: () if s.get("should_revise") else ("compiler", "scout"),
+    }
+
+
+async def _drain(run):
+    return [name for event in [e async for e in run.stream()] for name in event]
+
+
+async def test_nodes_start_when_inputs_exist_and_report_critical_path():
+    log = []
+    run = DataflowScheduler(_specs(log, [9]), routes=_routes()).start({"job_id": 1})
+    committed = await _drain(run)
+
+    # director and analysis start together; platform does not wait for analysis.
+    assert log[:2] == [("start", "director"), ("start", "analysis")]
+    assert log.index(("start", "platform")) < log.index(("end", "analysis"))
+    assert run.state["output_path"] == "out-v1.mp4"
+    assert run.state["scout_result"] == "v1"
+    assert committed.index("scout") > committed.index("qc_gate")
+
+    report = run.report()
+    assert report["critical_path"] == ["analysis", "cutter", "qc_gate", "compiler"]
+    assert report["nodes"]["analysis"]["critical"] and not report["nodes"]["platform"]["critical"]
+    assert report["wall_ms"] < 200
+
+
+async def test_speculative_result_is_dropped_when_not_needed():
+    log = []
+    run = DataflowScheduler(_specs(log, [0]), routes=_routes()).start({"job_id": 2})
+    committed = await _drain(run)
+
+    assert ("end", "scout") in log  # ran speculatively while qc inputs were computed
+    assert "scout" not in committed and "compiler" not in committed
+    assert "scout_result" not in run.state
+    assert run.report()["dropped"] == {"scout": 1}
+
+
+async def test_revision_invalidates_stale_results_and_reruns_downstream():
+    log = []
+    run = DataflowScheduler(_specs(log, [4, 9]), routes=_routes()).start({"job_id": 3})
+    await _drain(run)
+
+    assert run.state["director_plan"] == {"v": "tighten"}
+    assert run.state["output_path"] == "out-tighten.mp4"
+    assert run.state["scout_result"] == "tighten"  # the v1 speculation was discarded
+    assert run.runs["director"] == 2 and run.runs["cutter"] == 2 and run.runs["qc_gate"] == 2
+    assert run.runs["analysis"] == 1
+    assert run.report()["dropped"]["scout"] >= 1
+
+
+def test_pipeline_declarations_are_closed():
+    specs = dataflow_specs()
+    produced = {key for spec in specs for key in spec.writes}
+    for spec in specs:
+        assert set(spec.reads) <= produced, spec.name
+    assert {s.name for s in specs if s.speculative} == {"scout", "ab_test"}
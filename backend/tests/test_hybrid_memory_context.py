@@ -0,0 +1,174 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.memory.hybrid_memory import HybridMemoryService
+from app.services.memory.vector_store import Recipe, StyleProfile
+
+
+class FakeVector:
+    def __init__(self, delay=0.0, profile_delay=None):
+        self.delay = delay
+        self.profile_delay = delay if profile_delay is None else profile_delay
+        self.calls = 0
+
+    async def get_style_profile(self, user_id):
+        self.calls += 1
+        await asyncio.sleep(self.profile_delay)
+        return StyleProfile(user_id=user_id, pacing_preference="fast")
+
+    async def get_user_recipes(self, user_id, limit=10):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return [Recipe(id="r1", user_id=user_id, name="Punchy intro", description="cold open", parameters={})]
+
+    async def update_style_profile(self, profile):
+        return True
+
+
+class FakeRedis:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.feedback = []
+
+    async def get_recent_context(self, user_id, context_type, count=5):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self.feedback[:count]
+
+    async def add_recent_context(self, user_id, context_type, content, max_items=10):
+        self.feedback.insert(0, content)
+        return True
+
+
+def service(redis=None, vector=None, timeout=0.5, cooldown=30.0):
+    return HybridMemoryService(
+        redis=redis or FakeRedis(),
+        vector=vector or FakeVector(),
+        tier_timeouts={"profile": timeout, "feedback": timeout, "recipes": timeout},
+        tier_cooldown=cooldown,
+    )
+
+
+@pytest.mark.asyncio
+async def test_tiers_are_fetched_concurrently():
+    memory = service(redis=FakeRedis(delay=0.1), vector=FakeVector(delay=0.1))
+
+    started = time.perf_counter()
+    context = await memory.get_agent_context(1)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.2  # one round trip, not three
+    assert "Pacing: fast" in context and "Punchy intro" in context
+
+
+@pytest.mark.asyncio
+async def test_slow_tier_is_dropped_at_its_deadline_and_skipped_during_cooldown():
+    vector = FakeVector(profile_delay=1.0)
+    memory = service(vector=vector, timeout=0.05)
+
+    started = time.perf_counter()
+    context = await memory.get_agent_context(1)
+    assert time.perf_counter() - started < 0.5
+    assert "Punchy intro" in context and "Style Profile" not in context
+    assert memory.stats["tier_timeouts"] == 1
+
+    calls = vector.calls
+    await memory.get_agent_context(1)
+    assert vector.calls == calls + 1  # recipes only; the profile tier is cooling down
+
+
+@pytest.mark.asyncio
+async def test_failing_tier_degrades_to_partial_context():
+    memory = service(redis=FakeRedis(fail=True))
+
+    context = await memory.get_agent_context(1)
+
+    assert "Pacing: fast" in context and "Recent Feedback" not in context
+    assert memory.stats["tier_errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_context_is_memoized_per_job_and_agent_until_the_job_ends():
+    vector, redis = FakeVector(), FakeRedis()
+    memory = service(redis=redis, vector=vector)
+
+    first = await memory.get_agent_context(1, job_id=10, agent="director")
+    assert await memory.get_agent_context(1, job_id=10, agent="director") == first
+    assert (vector.calls, redis.calls) == (2, 1)
+
+    await memory.get_agent_context(1, job_id=10, agent="cutter")
+    assert redis.calls == 2
+
+    memory.forget_job(10)
+    await memory.get_agent_context(1, job_id=10, agent="director")
+    assert redis.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_new_feedback_invalidates_the_users_memoized_context():
+    memory = service()
+    await memory.get_agent_context(1, job_id=10, agent="director")
+
+    await memory.record_feedback(1, "Cuts feel too slow")
+    context = await memory.get_agent_context(1, job_id=10, agent="director")
+
+    assert "Cuts feel too slow" in context
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_fetch():
+    redis = FakeRedis(delay=0.05)
+    memory = service(redis=redis)
+
+    contexts = await asyncio.gather(*(memory.get_agent_context(1, job_id=5, agent="director") for _ in range(5)))
+
+    assert len(set(contexts)) == 1
+    assert redis.calls == 1
+    assert memory.stats["misses"] == 1
+
+
+async def test_concurrent_tiers_share_one_pool_setup_that_survives_deadlines(monkeypatch):
+    import importlib
+
+    from app.services.memory.vector_store import VectorMemoryStore
+
+    # The package re-exports the `vector_store` instance under the module's name.
+    vector_module = importlib.import_module("app.services.memory.vector_store")
+
+    created = []
+
+    class FakePool:
+        def terminate(self):
+            pass
+
+    async def create_pool(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        created.append(FakePool())
+        return created[-1]
+
+    schema_runs = []
+
+    async def init_schema(self, pool):
+        await asyncio.sleep(0.05)
+        schema_runs.append(pool)
+
+    monkeypatch.setattr(vector_module, "ASYNCPG_AVAILABLE", True)
+    monkeypatch.setattr(vector_module, "asyncpg", type("asyncpg", (), {"create_pool": staticmethod(create_pool)}))
+    monkeypatch.setattr(VectorMemoryStore, "_init_schema", init_schema)
+    store = VectorMemoryStore(database_url="postgresql://memory")
+
+    # Deadline-bound callers give up mid-setup; the setup itself carries on.
+    for _ in range(3):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(store._get_pool(), timeout=0.01)
+    pools = await asyncio.gather(*(store._get_pool() for _ in range(5)))
+
+    assert len(created) == 1 and len(schema_runs) == 1
+    assert all(pool is created[0] for pool in pools)
+    assert await store._get_pool() is created[0]
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+from httpx import AsyncClient
+
+from app.models import Job, JobStatus
+
+
+async def _signup(client: AsyncClient, email: str) -> tuple[dict, int]:
+    res = await client.post("/api/auth/signup", json={"email": email, "password": "SecurePassword123"})
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    me = await client.get("/api/auth/me", headers=headers)
+    return headers, me.json()["id"]
+
+
+async def test_list_pages_by_cursor_without_payloads(client: AsyncClient, session):
+    headers, user_id = await _signup(client, "lister@example.com")
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    # Two jobs share a timestamp so the id tiebreaker is exercised.
+    stamps = [base, base + timedelta(minutes=1), base + timedelta(minutes=1), base + timedelta(minutes=2), base + timedelta(minutes=3)]
+    for i, created_at in enumerate(stamps):
+        session.add(Job(
+            user_id=user_id,
+            source_path=f"uploads/list-{i}.mp4",
+            status=JobStatus.queued,  # stays out of completed-job reports sharing this DB
+            theme="professional",
+            progress_message="Done",
+            created_at=created_at,
+            director_plan={"scenes": list(range(100))},
+        ))
+    await session.commit()
+
+    seen: list[int] = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        res = await client.get("/api/jobs", params=params, headers=headers)
+        assert res.status_code == 200
+        page = res.json()
+        assert all("director_plan" not in job for job in page)
+        seen.extend(job["id"] for job in page)
+        pages += 1
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 5
+    created = [(j["created_at"], j["id"]) for j in (await client.get("/api/jobs", params={"limit": 10}, headers=headers)).json()]
+    assert created == sorted(created, reverse=True)
+
+
+async def test_details_loads_requested_payloads_only(client: AsyncClient, session):
+    headers, user_id = await _signup(client, "details@example.com")
+    other_headers, _ = await _signup(client, "details-other@example.com")
+    job = Job(
+        user_id=user_id,
+        source_path="uploads/details.mp4",
+        status=JobStatus.queued,
+        theme="professional",
+        progress_message="Done",
+        qc_result={"approved": True},
+        director_plan={"scenes": []},
+    )
+    session.add(job)
+    await session.commit()
+
+    res = await client.get(f"/api/jobs/{job.id}/details", params={"fields": "qc_result"}, headers=headers)
+    assert res.status_code == 200
+    assert res.json() == {"id": job.id, "qc_result": {"approved": True}}
+
+    assert (await client.get(f"/api/jobs/{job.id}/details", params={"fields": "source_path"}, headers=headers)).status_code == 400
+    assert (await client.get(f"/api/jobs/{job.id}/details", headers=other_headers)).status_code == 404
+    assert (await client.get("/api/jobs", params={"cursor": "not-a-cursor"}, headers=headers)).status_code == 400
@@ -0,0 +1,112 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.config import settings
+from app.services.job_progress import JobProgressPipeline, StatusUpdate
+from app.services.n8n_service import N8NService
+
+
+class RecordingPersist:
+    def __init__(self):
+        self.batches: list[list[StatusUpdate]] = []
+
+    async def __call__(self, updates):
+        self.batches.append(list(updates))
+
+
+async def test_progress_chatter_is_coalesced_and_transitions_write_through():
+    persist = RecordingPersist()
+    pipeline = JobProgressPipeline(persist, flush_interval=60)
+
+    await pipeline.record(1, "processing", "Starting")
+    await pipeline.record(2, "processing", "Starting")
+    assert [len(b) for b in persist.batches] == [1, 1]
+
+    for step in range(5):
+        await pipeline.record(1, "processing", f"Rendering scene {step}")
+        await pipeline.record(2, "processing", f"Analyzing {step}")
+    assert len(persist.batches) == 2
+    assert (await pipeline.latest(1))["message"] == "Rendering scene 4"
+
+    assert await pipeline.flush() == 2
+    last = persist.batches[-1]
+    assert {(u.job_id, u.message) for u in last} == {(1, "Rendering scene 4"), (2, "Analyzing 4")}
+
+    await pipeline.record(1, "processing", "Still rendering")
+    await pipeline.record(1, "complete", "Done", {"output_path": "outputs/job-1.mp4"})
+    final = persist.batches[-1]
+    assert [(u.status, u.fields) for u in final] == [("complete", {"output_path": "outputs/job-1.mp4"})]
+    # The buffered message was superseded by the terminal write.
+    assert await pipeline.flush() == 0
+    assert pipeline.stats["coalesced"] == 8
+
+
+async def test_failed_flush_keeps_updates_for_the_next_tick():
+    calls = {"n": 0}
+
+    async def flaky(updates):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise RuntimeError("db down")
+
+    pipeline = JobProgressPipeline(flaky, flush_interval=60)
+    await pipeline.record(7, "processing", "a")
+    await pipeline.record(7, "processing", "b")
+    assert await pipeline.flush() == 0
+    assert await pipeline.flush() == 1
+
+
+async def test_flush_racing_a_terminal_write_cannot_overwrite_it():
+    persisted: dict[int, tuple[str, str]] = {}
+    flush_started = asyncio.Event()
+
+    async def slow_persist(updates):
+        if updates[0].status == "processing":
+            flush_started.set()
+            await asyncio.sleep(0.05)
+        for update in updates:
+            persisted[update.job_id] = (update.status, update.message)
+
+    pipeline = JobProgressPipeline(slow_persist, flush_interval=60)
+    await pipeline.record(3, "processing", "Starting")
+    await pipeline.record(3, "processing", "Rendering scene 9")
+
+    flushing = asyncio.create_task(pipeline.flush())
+    await flush_started.wait()
+    await pipeline.record(3, "complete", "Done")
+    await flushing
+    assert persisted[3] == ("complete", "Done")
+
+    # A batch taken before the terminal write but persisted after it is dropped.
+    await pipeline.record(4, "processing", "Starting")
+    await pipeline.record(4, "processing", "Encoding")
+    batch = list(pipeline._pending.values())
+    pipeline._pending.clear()
+    await pipeline.record(4, "failed", "Boom")
+    assert await pipeline._write(batch) == 0
+    assert persisted[4] == ("failed", "Boom")
+
+
+async def test_background_flusher_writes_buffered_messages():
+    persist = RecordingPersist()
+    pipeline = JobProgressPipeline(persist, flush_interval=0.01)
+    await pipeline.record(3, "processing", "one")
+    await pipeline.record(3, "processing", "two")
+    await asyncio.sleep(0.1)
+    assert persist.batches[-1][0].message == "two"
+
+
+async def test_n8n_notifications_are_queued_off_the_status_path(monkeypatch):
+    monkeypatch.setattr(settings, "n8n_base_url", "http://127.0.0.1:5678", raising=False)
+    service = N8NService()
+    sent = []
+
+    async def fake_send(job):
+        sent.append((job.id, job.status))
+
+    monkeypatch.setattr(service, "send_job_status_event", fake_send)
+    job = SimpleNamespace(id=9, user_id=1, status="complete", progress_message="Done", output_path=None, thumbnail_path=None)
+    service.notify_job_status(job)
+    job.status = "failed"  # later mutation must not leak into the queued event
+    await service.drain(timeout=1)
+    assert sent == [(9, "complete")]
@@ -0,0 +1,236 @@
+import heapq
+from collections import defaultdict, deque
+
+import pytest
+
+from app.services.job_scheduler import FairShareQueue, JobScheduler, QueuedJob, broker_priority
+
+JOB_SECONDS = 60.0
+WORKERS = 2
+
+
+class InMemoryBroker:
+    """Redis-transport stand-in: one FIFO per priority step, lowest number first."""
+
+    def __init__(self):
+        self.lists = defaultdict(deque)
+
+    def publish(self, job: QueuedJob, priority: int) -> None:
+        self.lists[priority].append(job)
+
+    def consume(self):
+        for priority in sorted(self.lists):
+            if self.lists[priority]:
+                return self.lists[priority].popleft()
+        return None
+
+    def depth(self) -> int:
+        return sum(len(q) for q in self.lists.values())
+
+
+async def simulate(arrivals, fair_share: bool):
+    """Discrete-event run; returns {job_id: wait seconds} and the arrival metadata."""
+    now = [0.0]
+    broker = InMemoryBroker()
+
+    async def dispatch(job):
+        broker.publish(job, broker_priority(job.tier))
+        return f"task-{job.job_id}"
+
+    scheduler = JobScheduler(dispatch=dispatch, max_in_flight=WORKERS, clock=lambda: now[0])
+    events, seq = [], 0
+    for at, job in arrivals:
+        heapq.heappush(events, (at, seq, "arrive", job))
+        seq += 1
+    free, arrived_at, waits = WORKERS, {}, {}
+
+    while events:
+        now[0], _, kind, job = heapq.heappop(events)
+        if kind == "arrive":
+            arrived_at[job.job_id] = now[0]
+            if fair_share:
+                await scheduler.submit(job)
+            else:
+                broker.publish(job, 4)  # today: one FIFO queue, default priority
+        else:
+            free += 1
+            scheduler.release(job.job_id)
+            await scheduler.pump()
+        while free and broker.depth():
+            started = broker.consume()
+            free -= 1
+            waits[started.job_id] = now[0] - arrived_at[started.job_id]
+            seq += 1
+            heapq.heappush(events, (now[0] + JOB_SECONDS, seq, "done", started))
+    return waits, scheduler
+
+
+def _p95(values):
+    values = sorted(values)
+    return values[int(0.95 * (len(values) - 1))]
+
+
+def _workload():
+    arrivals = [(0.0, QueuedJob(job_id=i, user_id=1, tier="standard")) for i in range(50)]  # bulk uploader
+    for minute in range(1, 13):  # a dozen other users trickle in while the batch is queued
+        tier = "pro" if minute % 2 else "free"
+        arrivals.append((minute * 60.0, QueuedJob(job_id=100 + minute, user_id=100 + minute, tier=tier)))
+    return arrivals
+
+
+def test_drr_shares_slots_by_tier_weight():
+    queue = FairShareQueue()
+    for i in range(8):
+        queue.push(QueuedJob(job_id=i, user_id=1, tier="free"))
+        queue.push(QueuedJob(job_id=100 + i, user_id=2, tier="pro"))
+    order = [queue.pop().user_id for _ in range(8)]
+    assert order == [1, 2, 2, 2, 1, 2, 2, 2]
+
+    assert queue.remove(3) and 3 not in queue
+    assert len(queue) == 7
+
+
+async def test_bulk_uploader_no_longer_starves_other_users():
+    arrivals = _workload()
+    light = {job.job_id: job for _, job in arrivals if job.user_id != 1}
+
+    fifo, _ = await simulate(arrivals, fair_share=False)
+    fair, scheduler = await simulate(arrivals, fair_share=True)
+
+    fifo_p95 = _p95([fifo[j] for j in light])
+    fair_p95 = _p95([fair[j] for j in light])
+    assert fifo_p95 > 20 * JOB_SECONDS  # stuck behind the 50-video batch
+    assert fair_p95 <= 3 * JOB_SECONDS
+    # Everyone is still served, including the bulk user's whole batch.
+    assert len(fair) == len(arrivals)
+    # Pro users ride ahead of free users who arrived at the same time.
+    pro = [fair[j.job_id] for j in light.values() if j.tier == "pro"]
+    free = [fair[j.job_id] for j in light.values() if j.tier == "free"]
+    assert sum(pro) / len(pro) <= sum(free) / len(free)
+
+    metrics = scheduler.metrics()
+    assert metrics["waiting"] == 0 and metrics["in_flight"] == 0
+    assert metrics["admission_wait_p95_seconds"] > 0
+
+
+async def test_failed_dispatch_is_raised_for_submitter_and_requeued_otherwise():
+    failing = {2, 4}
+
+    async def flaky(job):
+        if job.job_id in failing:
+            raise ConnectionError("broker down")
+        return f"task-{job.job_id}"
+
+    scheduler = JobScheduler(dispatch=flaky, max_in_flight=2)
+    assert await scheduler.submit(QueuedJob(job_id=1, user_id=1, tier="pro")) == "task-1"
+    with pytest.raises(ConnectionError):
+        await scheduler.submit(QueuedJob(job_id=2, user_id=2, tier="pro"))
+    assert 2 not in scheduler.waiting  # left to the caller's in-process fallback
+
+    scheduler.max_in_flight = 1
+    assert await scheduler.submit(QueuedJob(job_id=4, user_id=4, tier="pro")) is None
+    scheduler.release(1)
+    failing.clear()
+    # A background pump that fails keeps the job at the head of its queue.
+    failing.add(4)
+    assert await scheduler.pump() == {}
+    assert 4 in scheduler.waiting
+    failing.clear()
+    assert await scheduler.pump() == {4: "task-4"}
+
+
+async def test_replicas_recovering_the_same_jobs_dispatch_each_once(test_engine, monkeypatch):
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    from app.models import Job, JobStatus
+    from app.services import job_scheduler as scheduler_module
+    from app.services.job_scheduler import DISPATCHED_PREFIX, WAITING_MESSAGE, DatabaseClaims
+
+    factory = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(scheduler_module, "SessionLocal", factory)
+    async with factory() as session:
+        jobs = [
+            Job(user_id=900 + i, source_path=f"src-{i}.mp4", status=JobStatus.queued, tier="pro", progress_message=WAITING_MESSAGE)
+            for i in range(6)
+        ]
+        session.add_all(jobs)
+        await session.commit()
+        ids = {job.id for job in jobs}
+
+    dispatched = []
+    down = {"broken": True}
+
+    async def dispatch(job):
+        if job.job_id in ids:
+            if down["broken"]:
+                down["broken"] = False
+                raise ConnectionError("broker down")
+            dispatched.append(job.job_id)
+        return f"task-{job.job_id}"
+
+    replicas = [
+        JobScheduler(dispatch=dispatch, max_in_flight=100, claims=DatabaseClaims(), on_admit=scheduler_module._mark_dispatched)
+        for _ in range(2)
+    ]
+    for replica in replicas:
+        assert await replica.recover() >= len(ids)
+    await replicas[0].pump()  # first dispatch fails; its claim is handed back
+    await replicas[1].pump()
+    await replicas[0].pump()
+
+    assert sorted(dispatched) == sorted(ids)
+    async with factory() as session:
+        for job_id in ids:
+            assert (await session.get(Job, job_id)).progress_message.startswith(DISPATCHED_PREFIX)
+
+
+async def test_in_flight_cap_is_shared_by_replicas_and_survives_restarts(tmp_path, monkeypatch):
+    from datetime import datetime, timedelta
+
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.db import Base
+    from app.models import Job, JobStatus
+    from app.services import job_scheduler as scheduler_module
+    from app.services.job_scheduler import CLAIMED_MESSAGE, WAITING_MESSAGE, DatabaseClaims
+
+    # Slots are counted across the whole jobs table, so this test gets a database of its own.
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'scheduler.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(scheduler_module, "SessionLocal", factory)
+    async with factory() as session:
+        running = Job(user_id=950, source_path="running.mp4", status=JobStatus.processing, tier="pro")
+        # Claimed by a pump that was cancelled mid-dispatch long ago.
+        orphaned = Job(
+            user_id=951, source_path="orphan.mp4", status=JobStatus.queued, tier="pro",
+            progress_message=CLAIMED_MESSAGE, updated_at=datetime.utcnow() - timedelta(hours=1),
+        )
+        waiting = [
+            Job(user_id=960 + i, source_path=f"wait-{i}.mp4", status=JobStatus.queued, tier="pro", progress_message=WAITING_MESSAGE)
+            for i in range(4)
+        ]
+        session.add_all([running, orphaned, *waiting])
+        await session.commit()
+
+    dispatched = []
+
+    async def dispatch(job):
+        dispatched.append(job.job_id)
+        return f"task-{job.job_id}"
+
+    replicas = [
+        JobScheduler(dispatch=dispatch, max_in_flight=3, claims=DatabaseClaims(), on_admit=scheduler_module._mark_dispatched)
+        for _ in range(2)
+    ]
+    for replica in replicas:
+        await replica.tick()  # first tick recovers: resets the orphaned claim, counts the running job
+
+    assert running.id in replicas[0].in_flight and running.id in replicas[1].in_flight
+    # One slot is taken by the running job; two replicas together admit only two more.
+    assert len(dispatched) == 2 and orphaned.id in dispatched
+    await replicas[0].pump()
+    await replicas[1].pump()
+    assert len(dispatched) == 2
+    await engine.dispose()
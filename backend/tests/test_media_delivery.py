@@ -0,0 +1,93 @@
+import struct
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.models import Job, User
+from app.services.media_delivery import (
+    HlsVariant,
+    build_hls_command,
+    is_faststart,
+    parse_range,
+    select_ladder,
+)
+
+
+def _box(kind: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def test_is_faststart_reads_top_level_box_order(tmp_path: Path):
+    fast = tmp_path / "fast.mp4"
+    fast.write_bytes(_box(b"ftyp", b"isom") + _box(b"moov", b"x" * 16) + _box(b"mdat", b"y" * 64))
+    slow = tmp_path / "slow.mp4"
+    slow.write_bytes(_box(b"ftyp", b"isom") + _box(b"mdat", b"y" * 64) + _box(b"moov", b"x" * 16))
+    junk = tmp_path / "junk.mp4"
+    junk.write_bytes(b"\x00\x00\x00\x02abcd")
+
+    assert is_faststart(fast) is True
+    assert is_faststart(slow) is False
+    assert is_faststart(junk) is None
+
+
+def test_parse_range_forms():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    with pytest.raises(HTTPException) as exc:
+        parse_range("bytes=100-", 100)
+    assert exc.value.status_code == 416
+
+
+def test_hls_ladder_is_one_decode_cmaf_package(tmp_path: Path):
+    assert [v.height for v in select_ladder(720, [1080, 720, 480])] == [720, 480]
+    assert [v.height for v in select_ladder(360, [1080, 720, 480])] == [360]
+
+    cmd = build_hls_command(
+        "ffmpeg", "in.mp4", tmp_path, [HlsVariant(720, 2800), HlsVariant(480, 1200)], has_audio=True, fps=30
+    )
+    assert cmd.count("-i") == 1
+    assert cmd[cmd.index("-filter_complex") + 1].startswith("[0:v]split=2[s0][s1]")
+    assert cmd[cmd.index("-hls_segment_type") + 1] == "fmp4"
+    assert cmd[cmd.index("-var_stream_map") + 1] == "v:0,a:0 v:1,a:1"
+    assert cmd[cmd.index("-g") + 1] == "60"
+
+    silent = build_hls_command("ffmpeg", "in.mp4", tmp_path, [HlsVariant(480, 1200)], has_audio=False)
+    assert "0:a:0" not in silent
+    assert silent[silent.index("-var_stream_map") + 1] == "v:0"
+
+
+async def test_download_serves_byte_ranges(client: AsyncClient, session, tmp_path: Path):
+    res = await client.post("/api/auth/signup", json={"email": "ranges@example.com", "password": "SecurePassword123"})
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    user = await session.scalar(select(User).where(User.email == "ranges@example.com"))
+
+    output = tmp_path / "job-out.mp4"
+    output.write_bytes(bytes(range(256)) * 4)
+    job = Job(user_id=user.id, source_path="in.mp4", output_path=str(output), status="complete")
+    session.add(job)
+    await session.commit()
+
+    res = await client.get(f"/api/jobs/{job.id}/download", headers={**headers, "Range": "bytes=10-19"})
+    assert res.status_code == 206
+    assert res.content == bytes(range(10, 20))
+    assert res.headers["content-range"] == "bytes 10-19/1024"
+    etag = res.headers["etag"]
+
+    res = await client.get(f"/api/jobs/{job.id}/download", headers={**headers, "Range": "bytes=-4", "If-Range": etag})
+    assert res.status_code == 206
+    assert res.content == bytes(range(252, 256))
+
+    # Stale validator: the whole (changed) file is sent instead of a range.
+    res = await client.get(f"/api/jobs/{job.id}/download", headers={**headers, "Range": "bytes=0-3", "If-Range": '"stale"'})
+    assert res.status_code == 200
+    assert len(res.content) == 1024
+
+    res = await client.get(f"/api/jobs/{job.id}/download", headers={**headers, "Range": "bytes=4096-"})
+    assert res.status_code == 416
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.concurrency import LLMBudget
+from app.workers import planning_worker
+from app.workers.planning_executor import PlanningExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = PlanningExecutor(max_concurrent=6)
+    yield executor
+    executor.shutdown()
+
+
+def test_many_blocking_callers_share_one_loop_within_llm_budget(executor):
+    budget = LLMBudget(3)
+    seen = {"llm_peak": 0, "loops": set()}
+
+    async def plan(i: int) -> int:
+        seen["loops"].add(id(asyncio.get_running_loop()))
+        for _ in range(2):  # two agent calls per graph
+            async with budget.slot():
+                seen["llm_peak"] = max(seen["llm_peak"], budget.in_flight())
+                await asyncio.sleep(0.02)
+        return i
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=24) as pool:
+        results = list(pool.map(lambda i: executor.run(plan(i)), range(24)))
+    elapsed = time.perf_counter() - started
+
+    assert results == list(range(24))
+    assert len(seen["loops"]) == 1
+    assert executor.peak == 6
+    assert seen["llm_peak"] == 3
+    # 48 calls of 20ms through a budget of 3 ~ 0.32s; serial would be ~0.96s.
+    assert elapsed < 0.8
+
+
+def test_run_propagates_errors_and_timeouts(executor):
+    async def boom():
+        raise ValueError("bad plan")
+
+    with pytest.raises(ValueError):
+        executor.run(boom())
+    with pytest.raises(TimeoutError):
+        executor.run(asyncio.sleep(1), timeout=0.05)
+    assert executor.run(asyncio.sleep(0, result="ok")) == "ok"
+
+
+def test_full_planning_awaits_graph_on_executor_loop(monkeypatch):
+    calls = []
+    main_thread = threading.current_thread()
+
+    async def aget_state(config):
+        return SimpleNamespace(next=(), values={})
+
+    async def ainvoke(state, config=None):
+        calls.append((state["job_id"], config["configurable"]["thread_id"], threading.current_thread() is main_thread))
+        return {**state, "qc_result": {"approved": False, "verdict": "needs work", "score": 4}}
+
+    async def adelete_thread(thread_id):
+        calls.append(("deleted", thread_id))
+
+    fake_graph = SimpleNamespace(aget_state=aget_state, ainvoke=ainvoke, checkpointer=SimpleNamespace(adelete_thread=adelete_thread))
+    monkeypatch.setattr(planning_worker, "langgraph_app", fake_graph)
+
+    result = planning_worker.run_full_planning.run(77, "src.mp4", {"pacing": "fast"}, "pro")
+
+    assert result == {"success": False, "job_id": 77, "stage": "qc_gate", "error": "needs work", "qc_score": 4}
+    assert calls == [(77, "plan-77", False), ("deleted", "plan-77")]
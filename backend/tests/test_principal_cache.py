@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import jwt
+from httpx import AsyncClient
+
+from app.config import settings
+from app.models import User
+from app.services.principal_cache import PrincipalCache, principal_cache
+
+
+def _token(user_id: int, expires_in: timedelta) -> str:
+    payload = {"sub": str(user_id), "email": "p@example.com", "exp": datetime.utcnow() + expires_in}
+    return jwt.encode(payload, settings.secret_key, algorithm=settings.jwt_algorithm)
+
+
+def test_tokens_are_decoded_once_and_never_outlive_expiry():
+    cache = PrincipalCache(ttl=60)
+    token = _token(7, timedelta(hours=1))
+    assert cache.principal(token).user_id == 7
+    assert cache.principal(token).user_id == 7
+    assert (cache.stats["token_misses"], cache.stats["token_hits"]) == (1, 1)
+
+    assert cache.principal("not-a-token") is None
+    assert cache.principal(_token(7, timedelta(seconds=-5))) is None
+
+
+async def test_user_snapshot_is_reused_and_invalidated_on_update(client: AsyncClient, session):
+    res = await client.post("/api/auth/signup", json={"email": "cached@example.com", "password": "SecurePassword123"})
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+    first = await client.get("/api/auth/me", headers=headers)
+    hits = principal_cache.stats["user_hits"]
+    second = await client.get("/api/auth/me", headers=headers)
+    assert first.json() == second.json()
+    assert principal_cache.stats["user_hits"] == hits + 1
+
+    user = await session.get(User, first.json()["id"])
+    user.credits = 42
+    user.is_admin = True
+    await session.commit()
+
+    me = (await client.get("/api/auth/me", headers=headers)).json()
+    assert (me["credits"], me["is_admin"]) == (42, True)
+
+
+async def test_pipeline_sets_headers_once_per_response(client: AsyncClient):
+    res = await client.get("/health", headers={"X-Request-ID": "req-123"})
+    assert res.headers["X-Request-ID"] == "req-123"
+    assert res.headers["X-Frame-Options"] == "DENY"
+    assert res.headers["Cross-Origin-Resource-Policy"] == "cross-origin"
+    assert res.headers["X-Response-Time"].endswith("ms")
+    assert "X-RateLimit-Limit" not in res.headers
+
+    limited = await client.post("/api/auth/login", json={"email": "nobody@example.com", "password": "x"})
+    assert limited.headers["X-RateLimit-Limit"] == "10"
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+from app.services.progress_bus import ProgressBus
+
+
+class FakePipeline:
+    def __init__(self, owner):
+        self.owner = owner
+        self.commands = []
+
+    def publish(self, channel, data):
+        self.commands.append(("publish", channel, json.loads(data)["message"]))
+
+    def setex(self, key, ttl, data):
+        self.commands.append(("setex", key, json.loads(data)["message"]))
+
+    def _run(self):
+        if self.owner.down:
+            raise ConnectionError("redis down")
+        self.owner.executed.append(self.commands)
+        return [1] * len(self.commands)
+
+
+class FakeSyncPipeline(FakePipeline):
+    def execute(self):
+        return self._run()
+
+
+class FakeAsyncPipeline(FakePipeline):
+    async def execute(self):
+        return self._run()
+
+
+class FakeRedis:
+    def __init__(self, pipeline_cls):
+        self.pipeline_cls = pipeline_cls
+        self.executed = []
+        self.down = False
+
+    def pipeline(self, transaction=True):
+        return self.pipeline_cls(self)
+
+
+def _bus(monkeypatch, **kwargs):
+    bus = ProgressBus("redis://fake:6379/0", **kwargs)
+    sync_redis = FakeRedis(FakeSyncPipeline)
+    async_redis = FakeRedis(FakeAsyncPipeline)
+    monkeypatch.setattr(bus, "sync_client", lambda: sync_redis)
+    monkeypatch.setattr(bus, "async_client", lambda: async_redis)
+    return bus, sync_redis, async_redis
+
+
+def test_sync_publish_pipelines_channels_and_latest(monkeypatch):
+    bus, sync_redis, _ = _bus(monkeypatch)
+    bus.publish(5, "processing", "Rendering", 40, user_id=2)
+    assert sync_redis.executed == [[
+        ("publish", "job:5:progress", "Rendering"),
+        ("publish", "user:2:jobs", "Rendering"),
+        ("setex", "job:5:latest", "Rendering"),
+    ]]
+
+
+async def test_publish_inside_loop_enqueues_and_batches(monkeypatch):
+    bus, sync_redis, async_redis = _bus(monkeypatch)
+    for step in range(3):
+        bus.publish(1, "processing", f"step {step}", step)
+    assert async_redis.executed == [] and sync_redis.executed == []
+
+    await asyncio.sleep(0.01)
+    assert len(async_redis.executed) == 1
+    batch = async_redis.executed[0]
+    assert [c for c in batch if c[0] == "publish"] == [("publish", "job:1:progress", f"step {i}") for i in range(3)]
+    assert [c for c in batch if c[0] == "setex"] == [("setex", "job:1:latest", "step 2")]
+
+
+async def test_outage_drops_oldest_and_backs_off(monkeypatch):
+    bus, _, async_redis = _bus(monkeypatch, buffer_size=3, retry_after=60)
+    async_redis.down = True
+    await bus.publish_async(1, "processing", "m0")
+    assert bus.stats["failures"] == 1
+
+    for i in range(1, 5):
+        await bus.publish_async(1, "processing", f"m{i}")
+    # Backing off: no further attempts while the buffer keeps the newest three.
+    assert bus.stats["failures"] == 1
+    assert bus.stats["dropped"] == 2
+
+    async_redis.down = False
+    bus._down_until = 0.0
+    assert await bus.flush() == 3
+    assert [c[2] for c in async_redis.executed[0] if c[0] == "publish"] == ["m2", "m3", "m4"]
+
+
+def test_disabled_bus_is_a_no_op():
+    bus = ProgressBus(None)
+    bus.publish(1, "processing", "ignored")
+    assert bus.stats["published"] == 0
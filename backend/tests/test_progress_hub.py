@@ -0,0 +1,160 @@
+import asyncio
+import json
+import time
+
+from app.services.progress_hub import PING, ProgressHub
+
+
+def _event(job_id: int, step: int, status: str = "processing") -> str:
+    return json.dumps({"job_id": job_id, "status": status, "message": f"step {step}", "progress": step})
+
+
+class FakePubSub:
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+        self.patterns = ()
+
+    async def psubscribe(self, *patterns):
+        self.patterns = patterns
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=None):
+        try:
+            # Buffered messages come back without waiting, as from a real socket.
+            message = self.queue.get_nowait() if not self.queue.empty() else await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if isinstance(message, BaseException):
+            raise message
+        return message
+
+    async def aclose(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.pubsubs = []
+
+    def pubsub(self):
+        pubsub = FakePubSub(self.queue)
+        self.pubsubs.append(pubsub)
+        return pubsub
+
+    async def get(self, key):
+        return None
+
+
+class FakeBus:
+    enabled = True
+
+    def __init__(self):
+        self.redis = FakeRedis()
+
+    def async_client(self):
+        return self.redis
+
+    def pubsub_client(self):
+        return self.redis
+
+
+class Socket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received: list[str] = []
+
+    async def send_text(self, data: str) -> None:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received.append(data)
+
+
+async def test_many_sockets_share_one_subscription_and_see_latest_state():
+    bus = FakeBus()
+    hub = ProgressHub(bus=bus, heartbeat_interval=3600)
+    jobs, sockets_per_job, burst = 100, 20, 50
+
+    sockets = {}
+    for job_id in range(jobs):
+        for _ in range(sockets_per_job):
+            sock = Socket()
+            hub.subscribe(f"job:{job_id}:progress", sock.send_text)
+            sockets.setdefault(job_id, []).append(sock)
+    await asyncio.sleep(0)
+    assert len(bus.redis.pubsubs) == 1
+    assert set(bus.redis.pubsubs[0].patterns) == {"job:*:progress", "user:*:jobs"}
+
+    started = time.perf_counter()
+    for step in range(burst):
+        for job_id in range(jobs):
+            await bus.redis.queue.put({
+                "type": "pmessage",
+                "channel": f"job:{job_id}:progress",
+                "data": _event(job_id, step),
+            })
+    while not bus.redis.queue.empty():
+        await asyncio.sleep(0)
+    for _ in range(5):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+
+    total_sent = 0
+    for job_id, socks in sockets.items():
+        for sock in socks:
+            assert json.loads(sock.received[-1])["message"] == f"step {burst - 1}"
+            total_sent += len(sock.received)
+    assert hub.stats["received"] == jobs * burst
+    # Bursts coalesce per socket instead of delivering every intermediate step.
+    assert total_sent < jobs * sockets_per_job * burst
+    assert elapsed < 10
+    await hub.close()
+    assert hub.subscriber_count == 0
+
+
+async def test_slow_client_only_sees_newest_state_and_terminal_closes():
+    hub = ProgressHub(bus=FakeBus(), heartbeat_interval=3600)
+    slow = Socket(delay=0.05)
+    fast = Socket()
+    slow_sub = hub.subscribe("job:7:progress", slow.send_text, close_on_terminal=True)
+    hub.subscribe("job:7:progress", fast.send_text, close_on_terminal=True)
+
+    hub.dispatch("job:7:progress", _event(7, 0))
+    await asyncio.sleep(0.01)  # slow socket is now mid-send
+    for step in range(1, 100):
+        hub.dispatch("job:7:progress", _event(7, step))
+    hub.dispatch("job:7:progress", _event(7, 100, status="complete"))
+    await asyncio.wait_for(slow_sub.task, timeout=2)
+
+    assert [json.loads(m)["progress"] for m in slow.received] == [0, 100]
+    assert slow_sub.stats["coalesced"] == 99
+    assert slow_sub.closed
+    await hub.close()
+
+
+async def test_single_timer_heartbeats_every_socket():
+    hub = ProgressHub(bus=FakeBus(), heartbeat_interval=0.01)
+    sockets = [Socket() for _ in range(50)]
+    for i, sock in enumerate(sockets):
+        hub.subscribe(f"user:{i}:jobs", sock.send_text)
+    await asyncio.sleep(0.05)
+    assert all(PING in sock.received for sock in sockets)
+    await hub.close()
+
+
+async def test_idle_read_timeout_keeps_the_subscription(monkeypatch):
+    from app.services import progress_hub as hub_module
+
+    monkeypatch.setattr(hub_module, "POLL_SECONDS", 0.01)
+    bus = FakeBus()
+    hub = ProgressHub(bus=bus, heartbeat_interval=3600)
+    sock = Socket()
+    hub.subscribe("job:9:progress", sock.send_text)
+    await asyncio.sleep(0.05)  # several idle polls
+    await bus.redis.queue.put(TimeoutError("Timeout reading from socket"))
+    await bus.redis.queue.put({"type": "pmessage", "channel": "job:9:progress", "data": _event(9, 1)})
+    for _ in range(10):
+        await asyncio.sleep(0.01)
+
+    assert len(bus.redis.pubsubs) == 1
+    assert [json.loads(m)["progress"] for m in sock.received] == [1]
+    await hub.close()
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.services import storage_service as storage_module
+from app.services.r2_transfer import MULTIPART_CHUNK_SIZE, file_content_hash
+from app.services.storage_ledger import StorageLedger
+from app.services.storage_service import StorageService
+
+
+class NotFound(Exception):
+    response = {"Error": {"Code": "404"}}
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+        self.uploads: list[tuple[str, object]] = []
+
+    def upload_file(self, filename, bucket, key, ExtraArgs=None, Config=None):
+        time.sleep(0.2)  # blocking network call
+        self.uploads.append((key, Config))
+        self.objects[key] = Path(filename).read_bytes()
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise NotFound()
+        return {"ContentLength": len(self.objects[Key])}
+
+    def generate_presigned_url(self, op, Params, ExpiresIn):
+        return f"https://r2.test/{Params['Key']}"
+
+
+@pytest.fixture
+def r2(test_engine, monkeypatch, request):
+    monkeypatch.setattr(
+        storage_module,
+        "storage_ledger",
+        StorageLedger(async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)),
+    )
+    service = StorageService()
+    service.use_r2 = True
+    service.s3_client = FakeS3()
+    service.bucket = f"transfer-{request.node.name}"
+    return service
+
+
+async def test_source_upload_is_off_loop_and_deduplicated(r2: StorageService, tmp_path: Path):
+    source = tmp_path / "take.MP4"
+    source.write_bytes(b"frame-data" * 1000)
+
+    ticks = 0
+
+    async def heartbeat():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    beat = asyncio.create_task(heartbeat())
+    first = await r2.upload_source(str(source))
+    beat.cancel()
+    assert ticks >= 5  # the loop kept running during the blocking upload
+
+    second = await r2.upload_source(str(source))
+    assert first == second == f"https://r2.test/sources/{file_content_hash(source)}.mp4"
+    assert len(r2.s3_client.uploads) == 1
+    assert r2.s3_client.uploads[0][1].multipart_chunksize == MULTIPART_CHUNK_SIZE
+
+    metrics = r2.get_transfer_metrics()
+    assert metrics["uploads"] == 1
+    assert metrics["dedupe_hits"] == 1
+    assert metrics["bytes_saved"] == source.stat().st_size
+    usage = await r2.get_storage_usage()
+    assert usage["files"] == 1
+
+
+async def test_existing_remote_object_is_reused_without_ledger_row(r2: StorageService, tmp_path: Path):
+    source = tmp_path / "clip.mp4"
+    source.write_bytes(b"abc" * 100)
+    key = f"sources/{file_content_hash(source)}.mp4"
+    r2.s3_client.objects[key] = source.read_bytes()
+
+    await r2.upload_source(str(source))
+
+    assert r2.s3_client.uploads == []
+    assert (await r2.get_storage_usage())["bytes"] == source.stat().st_size
+
+
+async def test_ledger_row_without_object_is_uploaded_again(r2: StorageService, tmp_path: Path):
+    source = tmp_path / "take.mp4"
+    source.write_bytes(b"xyz" * 200)
+    await r2.upload_source(str(source))
+    r2.s3_client.objects.clear()  # expired by a bucket lifecycle rule; the ledger never heard
+
+    url = await r2.upload_source(str(source))
+
+    key = f"sources/{file_content_hash(source)}.mp4"
+    assert url == f"https://r2.test/{key}" and key in r2.s3_client.objects
+    assert len(r2.s3_client.uploads) == 2
+    assert r2.get_transfer_metrics()["dedupe_hits"] == 0
+    usage = await r2.get_storage_usage()
+    assert usage["files"] == 1 and usage["bytes"] == source.stat().st_size
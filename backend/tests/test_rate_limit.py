@@ -0,0 +1,82 @@
+import threading
+
+from httpx import AsyncClient
+
+from app.middleware.rate_limit import LocalRateLimiter, RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_sliding_window_weights_previous_window():
+    clock = FakeClock(1000.0)  # start of a 10s window
+    limiter = LocalRateLimiter(clock=clock)
+    results = [limiter.check("k", 5, 10) for _ in range(6)]
+    assert [r.limited for r in results] == [False] * 5 + [True]
+    assert [r.remaining for r in results[:5]] == [4, 3, 2, 1, 0]
+
+    # Half-way through the next window half of the previous five still count.
+    clock.now = 1015.0
+    allowed = 0
+    while not limiter.check("k", 5, 10).limited:
+        allowed += 1
+    assert allowed == 3
+
+    clock.now = 1030.0
+    assert not limiter.check("k", 5, 10).limited
+
+
+def test_idle_keys_are_evicted_and_shards_are_bounded():
+    clock = FakeClock(0.0)
+    limiter = LocalRateLimiter(shards=2, max_keys_per_shard=50, clock=clock)
+    for i in range(80):
+        limiter.check(f"idle:{i}", 5, 60)
+    assert limiter.size == 80
+
+    clock.now = 180.0  # two full windows later
+    limiter.check("fresh:a", 5, 60)
+    limiter.check("fresh:b", 5, 60)
+    assert limiter.size <= 2 + 50
+
+    for i in range(500):
+        limiter.check(f"burst:{i}", 5, 60)
+    assert limiter.size <= 2 * 50
+
+
+def test_sharded_counters_are_exact_under_threads():
+    limiter = LocalRateLimiter(clock=FakeClock(0.0))
+    allowed = []
+
+    def worker():
+        allowed.append(sum(not limiter.check("shared", 200, 60).limited for _ in range(100)))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(allowed) == 200
+
+
+async def test_unreachable_redis_falls_back_to_local_and_backs_off():
+    limiter = RateLimiter("redis://127.0.0.1:1/0")
+    first = await limiter.check("ip:1:/api/auth/login", 2, 60)
+    assert not first.limited
+    assert limiter._redis_down_until > 0
+    assert (await limiter.check("ip:1:/api/auth/login", 2, 60)).remaining == 0
+    assert (await limiter.check("ip:1:/api/auth/login", 2, 60)).limited
+
+
+async def test_middleware_returns_429_with_retry_after(client: AsyncClient):
+    statuses = []
+    for i in range(6):
+        res = await client.post("/api/auth/signup", json={"email": f"rl{i}@example.com", "password": "SecurePassword123"})
+        statuses.append(res.status_code)
+    assert statuses == [200] * 5 + [429]
+    assert res.json()["detail"]["error_code"] == "rate_limited"
+    assert int(res.headers["Retry-After"]) >= 1
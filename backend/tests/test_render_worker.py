@@ -0,0 +1,88 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from app.services.render_plan import (
+    CPU_ENCODER,
+    GPU_ENCODER,
+    build_scene_command,
+    detect_encoder,
+    plan_scenes,
+)
+from app.services.render_worker import LocalDirStorage, probe_duration, run_render_job
+
+
+def _ffmpeg() -> str:
+    imageio_ffmpeg = pytest.importorskip("imageio_ffmpeg")
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def test_plan_drops_empty_and_out_of_range_cuts():
+    scenes = plan_scenes(
+        [
+            {"start": 0, "end": 2},
+            {"start": 3, "end": 3},
+            {"start": 4, "end": 12, "speed": 2},
+            {"start": 20, "end": 25},
+        ],
+        "/media/src.mp4",
+        source_duration=10,
+    )
+    assert [(s.index, s.start, s.duration, s.output_duration) for s in scenes] == [
+        (0, 0.0, 2.0, 2.0),
+        (2, 4.0, 6.0, 3.0),
+    ]
+
+
+def test_scene_command_seeks_input_and_keeps_jl_audio_window():
+    scene = plan_scenes([{"start": 10, "end": 12, "audio_leadin": 0.5, "audio_leadout": 0.25}], "/media/src.mp4")[0]
+    cmd = build_scene_command("ffmpeg", scene, "/tmp/part.mp4", encoder=GPU_ENCODER, crf=20)
+
+    assert cmd[cmd.index("-ss") + 1] == "9.500"
+    assert cmd.index("-hwaccel") < cmd.index("-i")
+    assert cmd[cmd.index("-c:v") + 1] == "h264_nvenc"
+    assert cmd[cmd.index("-cq") + 1] == "20"
+    assert cmd[cmd.index("-vf") + 1].startswith("trim=start=0.500:duration=2.000")
+    assert cmd[cmd.index("-af") + 1].startswith("atrim=start=0:duration=2.750")
+
+    cpu = build_scene_command("ffmpeg", scene, "/tmp/part.mp4", encoder=CPU_ENCODER, crf=20)
+    assert "-hwaccel" not in cpu
+    assert cpu[cpu.index("-crf") + 1] == "20"
+
+
+def test_detect_encoder_without_gpu_uses_libx264(monkeypatch):
+    monkeypatch.setattr("app.services.render_plan._gpu_present", lambda: False)
+    assert detect_encoder("ffmpeg") is CPU_ENCODER
+
+
+def test_render_job_runs_on_cpu_with_local_storage(tmp_path: Path):
+    ffmpeg = _ffmpeg()
+    storage_root = tmp_path / "bucket"
+    (storage_root / "sources").mkdir(parents=True)
+    source = storage_root / "sources" / "clip.mp4"
+    subprocess.run(
+        [
+            ffmpeg, "-y", "-f", "lavfi", "-i", "testsrc=duration=4:size=160x120:rate=24",
+            "-f", "lavfi", "-i", "sine=frequency=440:duration=4",
+            "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", str(source),
+        ],
+        check=True,
+        capture_output=True,
+    )
+
+    key = run_render_job(
+        LocalDirStorage(storage_root),
+        job_id=7,
+        source_url="sources/clip.mp4",
+        cuts=[{"start": 0, "end": 1}, {"start": 2, "end": 3.5}, {"start": 9, "end": 10}],
+        output_key="outputs/job-7-pro.mp4",
+        crf=30,
+        ffmpeg_path=ffmpeg,
+        encoder=CPU_ENCODER,
+        max_workers=2,
+    )
+
+    output = storage_root / key
+    assert output.exists()
+    assert probe_duration(output, ffmpeg) == pytest.approx(2.5, abs=0.15)
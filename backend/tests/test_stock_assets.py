@@ -0,0 +1,261 @@
+import asyncio
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services.stock import ClipProfile, FakeStockProvider, PexelsProvider, StockAssetCache, StockAssetService
+
+
+class CountingProvider(FakeStockProvider):
+    """Tracks requests in flight across every provider sharing `counter`."""
+
+    def __init__(self, name, counter, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self.counter = counter
+
+    async def search(self, client, query, limit):
+        self.counter["active"] += 1
+        self.counter["peak"] = max(self.counter["peak"], self.counter["active"])
+        try:
+            return await super().search(client, query, limit)
+        finally:
+            self.counter["active"] -= 1
+
+
+class FakeRunner:
+    def __init__(self):
+        self.commands = []
+
+    async def run(self, cmd, timeout=None, duration=None):
+        self.commands.append(cmd)
+        Path(cmd[-1]).write_bytes(b"transcoded " + Path(cmd[cmd.index("-i") + 1]).read_bytes())
+        return SimpleNamespace(success=True, error=None)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def service(tmp_path, providers, clock=None, **kwargs):
+    cache = StockAssetCache(tmp_path / "stock", clock=clock or time.time)
+    return StockAssetService(providers=providers, cache=cache, runner=kwargs.pop("runner", FakeRunner()), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_queries_fan_out_concurrently_within_the_bound(tmp_path):
+    counter = {"active": 0, "peak": 0}
+    a, b = CountingProvider("a", counter, delay=0.1), CountingProvider("b", counter, delay=0.1)
+    stock = service(tmp_path, [a, b], concurrency=4)
+
+    started = time.perf_counter()
+    assets = await stock.search(["city skyline", "ocean", "forest", "desert"], limit_per_query=2)
+    elapsed = time.perf_counter() - started
+
+    assert len(assets) == 16
+    assert elapsed < 0.5  # 8 requests of 0.1s, four at a time; serial would take 0.8s
+    assert counter["peak"] == 4
+    # Query order first, then provider order.
+    assert [(x["tags"][0], x["provider"]) for x in assets[:4]] == [
+        ("city skyline", "a"), ("city skyline", "a"), ("city skyline", "b"), ("city skyline", "b"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_query_results_are_cached_until_the_ttl_and_failures_are_not(tmp_path):
+    clock = Clock()
+    provider = FakeStockProvider(fail_queries={"broken"})
+    stock = service(tmp_path, [provider], clock=clock, query_ttl=60)
+
+    first = await stock.search(["City  Skyline", "broken"])
+    again = await stock.search(["city skyline", "broken"])
+    assert again == first
+    assert provider.searches == ["City  Skyline", "broken", "broken"]
+    assert stock.stats["query_hits"] == 1 and stock.stats["provider_errors"] == 2
+
+    clock.now += 61
+    await stock.search(["city skyline"])
+    assert provider.searches[-1] == "city skyline"
+    assert await stock.cache.purge_expired() == 0
+
+
+@pytest.mark.asyncio
+async def test_clips_are_content_addressed_and_downloaded_once(tmp_path):
+    provider = FakeStockProvider(delay=0.05)
+    stock = service(tmp_path, [provider])
+    asset = (await stock.search(["ocean"], limit_per_query=1))[0]
+    mirror = {**asset, "url": "fake://mirror/ocean.mp4"}  # same bytes, different URL
+
+    paths = await asyncio.gather(*(stock.fetch(asset) for _ in range(3)))
+    assert len(set(paths)) == 1 and provider.downloads == [asset["url"]]
+
+    assert await stock.fetch(mirror) == paths[0]
+    assert await stock.fetch(asset) == paths[0]
+    assert provider.downloads == [asset["url"], mirror["url"]]
+    assert stock.stats["clip_hits"] == 1
+    assert len(list((tmp_path / "stock" / "clips").rglob("*.mp4"))) == 1
+    assert not list((tmp_path / "stock" / "tmp").iterdir())
+
+
+@pytest.mark.asyncio
+async def test_prepare_transcodes_once_per_clip_and_profile(tmp_path):
+    runner = FakeRunner()
+    stock = service(tmp_path, [FakeStockProvider()], runner=runner)
+    asset = (await stock.search(["forest"], limit_per_query=1))[0]
+    vertical = ClipProfile(width=720, height=1280, fps=30)
+
+    first = await stock.prepare(asset)
+    assert await stock.prepare(asset) == first
+    assert len(runner.commands) == 1
+    vf = runner.commands[0][runner.commands[0].index("-vf") + 1]
+    assert vf == "scale=1280:720:force_original_aspect_ratio=increase,crop=1280:720,setsar=1,fps=24"
+    assert runner.commands[0][runner.commands[0].index("-map") + 1] == "0:v:0"  # source audio replaced by silence
+
+    other = await stock.prepare(asset, vertical)
+    assert other != first and other.parent.name == vertical.key
+    assert len(runner.commands) == 2 and stock.stats["rendition_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_prepare_many_returns_what_is_ready_and_keeps_warming(tmp_path):
+    slow = FakeStockProvider(delay=0.3)
+    stock = service(tmp_path, [slow])
+    assets = await stock.search(["desert"], limit_per_query=2)
+
+    prepared = await stock.prepare_many(assets, timeout=0.05)
+    assert [a["local_path"] for a in prepared] == [None, None]
+    assert prepared[0]["url"] == assets[0]["url"]
+
+    await asyncio.sleep(0.5)
+    ready = await stock.prepare_many(assets, timeout=1.0)
+    assert all(a["local_path"] and Path(a["local_path"]).exists() for a in ready)
+    assert len(slow.downloads) == 2
+
+
+@pytest.mark.asyncio
+async def test_prefetch_runs_in_the_background(tmp_path):
+    slow = FakeStockProvider(delay=0.2)
+    stock = service(tmp_path, [slow])
+    assets = await stock.search(["canyon"], limit_per_query=2)
+
+    started = time.perf_counter()
+    task = stock.prefetch(assets)
+    assert time.perf_counter() - started < 0.05
+    assert task in stock._background
+
+    await task
+    assert task not in stock._background
+    ready = await stock.prepare_many(assets, timeout=0.5)
+    assert all(a["local_path"] for a in ready) and len(slow.downloads) == 2
+
+
+@pytest.mark.asyncio
+async def test_stock_cuts_render_from_the_prefetched_rendition_for_the_job(tmp_path):
+    runner = FakeRunner()
+    slow = FakeStockProvider(delay=0.1)
+    stock = service(tmp_path, [slow], runner=runner)
+    assets = await stock.search(["surf"], limit_per_query=2)
+    vertical = ClipProfile.for_render("9:16", "youtube")
+    assert (vertical.width, vertical.height) == (720, 1280)
+    square = ClipProfile.for_render(None, "instagram")  # no ratio: the platform's
+    assert (square.width, square.height) == (720, 720)
+
+    prefetch = stock.prefetch(assets[:1], vertical)
+    cuts = [
+        {"start": 0.0, "end": 2.0},
+        {"start": 1.0, "end": 3.0, "stock_url": assets[0]["url"]},
+        {"start": 0.0, "end": 1.0, "stock_url": "https://elsewhere.example/unscouted.mp4"},
+    ]
+    resolved = await stock.resolve_cuts(cuts, assets, vertical, timeout=1.0)
+    await prefetch
+
+    assert len(resolved) == 2 and "source_path" not in resolved[0]
+    assert Path(resolved[1]["source_path"]).parent.name == vertical.key
+    # The render waited on the prefetch's transcode instead of starting its own.
+    assert len(runner.commands) == 1 and len(slow.downloads) == 1
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_rendition_carries_a_silent_track_for_the_scene_concat(tmp_path):
+    from app.services.stock.service import build_transcode_command
+
+    src, dst = tmp_path / "clip.mp4", tmp_path / "rendition.mp4"
+    subprocess.run(["ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", "testsrc=s=320x240:d=1", str(src)], check=True)
+    subprocess.run(build_transcode_command("ffmpeg", src, dst, ClipProfile.for_render("1:1")), check=True, capture_output=True)
+
+    probe = subprocess.run(["ffmpeg", "-hide_banner", "-i", str(dst)], capture_output=True, text=True).stderr
+    assert "720x720" in probe and "Audio: aac" in probe
+
+
+def test_transcode_slots_follow_the_event_loop(tmp_path):
+    stock = service(tmp_path, [FakeStockProvider()])
+
+    async def job(query):
+        asset = (await stock.search([query], limit_per_query=1))[0]
+        await stock.prepare(asset)
+        return stock._transcode_slots
+
+    # Each Celery job runs its own loop; a semaphore bound to the first must not leak into the second.
+    first = asyncio.run(job("glacier"))
+    second = asyncio.run(job("volcano"))
+    assert first is not second and stock.stats["transcodes"] == 2
+
+
+def cache_bytes(root):
+    return sum(f.stat().st_size for d in ("clips", "renditions") for f in (root / d).rglob("*") if f.is_file())
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used_clips_past_the_limit(tmp_path):
+    clock = Clock()
+    provider = FakeStockProvider()
+    stock = service(tmp_path, [provider], clock=clock)
+    a, b, c = [(await stock.search([q], limit_per_query=1))[0] for q in ("alps", "bay", "cove")]
+
+    first = await stock.prepare(a)
+    clock.now += 1
+    await stock.prepare(b)
+    clock.now += 1
+    assert await stock.prepare(a) == first  # rendition hit refreshes a
+    stock.max_cache_bytes = cache_bytes(tmp_path / "stock") + 8
+
+    clock.now += 1
+    await stock.prepare(c)
+    assert stock.stats["evictions"] == 1
+    assert first.exists() and cache_bytes(tmp_path / "stock") <= stock.max_cache_bytes
+    assert await stock.cache.clip_for_url(b["url"]) is None
+
+    await stock.fetch(b)
+    assert provider.downloads == [a["url"], b["url"], c["url"], b["url"]]
+
+
+@pytest.mark.asyncio
+async def test_pexels_picks_the_smallest_rendition_covering_720p():
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.params["query"] == "city skyline"
+        assert request.headers["Authorization"] == "key"
+        return httpx.Response(200, json={"videos": [{
+            "id": 1, "image": "thumb.jpg", "width": 3840, "height": 2160, "duration": 12,
+            "video_files": [
+                {"link": "sd.mp4", "width": 640, "height": 360},
+                {"link": "uhd.mp4", "width": 3840, "height": 2160},
+                {"link": "hd.mp4", "width": 1280, "height": 720},
+            ],
+        }]})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        assets = await PexelsProvider("key").search(client, "city skyline", 2)
+
+    assert [(a.url, a.height, a.duration) for a in assets] == [("hd.mp4", 720, 12)]
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(500))) as client:
+        assert await PexelsProvider("key").search(client, "city skyline", 2) is None
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.services.storage_ledger import StorageLedger
+
+BUCKET = "ledger-test"
+
+
+@pytest.fixture
+def ledger(test_engine):
+    return StorageLedger(async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False))
+
+
+async def test_running_totals_follow_uploads_and_deletes(ledger: StorageLedger):
+    await ledger.record_upload(BUCKET, "uploads/a.mp4", 100, "video/mp4")
+    await ledger.record_upload(BUCKET, "uploads/b.mp4", 50)
+    await ledger.record_upload(BUCKET, "uploads/a.mp4", 120)  # overwrite adjusts bytes only
+
+    usage = await ledger.usage(BUCKET)
+    assert (usage["bytes"], usage["files"]) == (170, 2)
+
+    assert await ledger.record_delete(BUCKET, ["uploads/b.mp4", "uploads/missing.mp4"]) == 1
+    usage = await ledger.usage(BUCKET)
+    assert (usage["bytes"], usage["files"]) == (120, 1)
+
+
+async def test_expired_keys_use_age_order(ledger: StorageLedger):
+    bucket = f"{BUCKET}-age"
+    old = datetime.utcnow() - timedelta(days=10)
+    run = datetime.utcnow()
+    await ledger.reconcile_page(
+        bucket,
+        [("outputs/new.mp4", 5, run), ("outputs/old2.mp4", 5, old + timedelta(hours=1)), ("outputs/old1.mp4", 5, old)],
+        run,
+    )
+
+    cutoff = datetime.utcnow() - timedelta(days=7)
+    assert await ledger.expired_keys(bucket, cutoff) == ["outputs/old1.mp4", "outputs/old2.mp4"]
+    assert await ledger.expired_keys(bucket, cutoff, limit=1) == ["outputs/old1.mp4"]
+
+
+async def test_reconcile_diffs_listing_against_ledger(ledger: StorageLedger):
+    bucket = f"{BUCKET}-diff"
+    await ledger.record_upload(bucket, "uploads/kept.mp4", 10)
+    await ledger.record_upload(bucket, "uploads/gone.mp4", 20)
+
+    run = datetime.utcnow() + timedelta(seconds=1)
+    listed_at = datetime.utcnow()
+    changed = await ledger.reconcile_page(
+        bucket,
+        [("uploads/kept.mp4", 15, listed_at), ("temp_modal/out-of-band.mp4", 7, listed_at)],
+        run,
+    )
+    summary = await ledger.finish_reconcile(bucket, run)
+
+    assert changed == 2  # size fix + new key
+    assert summary == {"removed": 1, "files": 2, "bytes": 22}
+    usage = await ledger.usage(bucket)
+    assert (usage["bytes"], usage["files"]) == (22, 2)
+    assert usage["reconciled_at"] is not None
@@ -0,0 +1,114 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.services.thumbnail_engine import (
+    ThumbnailCandidate,
+    ThumbnailEngine,
+    ThumbnailSet,
+    build_scrub_vtt,
+    score_frames,
+)
+
+
+def _frames():
+    rng = np.random.default_rng(7)
+    black = np.full((90, 160), 3, dtype=np.uint8)
+    flat_grey = np.full((90, 160), 115, dtype=np.uint8)
+    textured = np.full((90, 160), 110, dtype=np.uint8)
+    # Detailed subject in the middle of a mid-grey frame.
+    textured[25:65, 45:115] = rng.integers(40, 220, size=(40, 70), dtype=np.uint8)
+    return np.stack([black, flat_grey, textured])
+
+
+def test_score_frames_prefers_sharp_centered_subject():
+    black, flat, textured = score_frames(_frames())
+
+    assert textured["score"] > flat["score"] > black["score"]
+    assert textured["sharpness"] > 0.5
+    assert textured["center_energy"] > 0.5
+    assert flat["exposure"] > 0.9
+    assert black["exposure"] < 0.2
+
+
+def test_build_scrub_vtt_maps_cells_across_sheets():
+    vtt = build_scrub_vtt(
+        ["sprite_001.jpg", "sprite_002.jpg"],
+        frame_count=6,
+        interval=2.0,
+        duration=11.0,
+        tile_width=160,
+        tile_height=90,
+        cols=2,
+        rows=2,
+    )
+    lines = vtt.splitlines()
+
+    assert lines[0] == "WEBVTT"
+    assert "00:00:00.000 --> 00:00:02.000" in lines
+    assert "sprite_001.jpg#xywh=160,90,160,90" in lines
+    assert "sprite_002.jpg#xywh=160,0,160,90" in lines
+    assert lines[-1] == "sprite_002.jpg#xywh=160,0,160,90"
+    assert "00:00:10.000 --> 00:00:11.000" in lines
+
+
+def test_build_command_decodes_once_with_all_outputs(tmp_path: Path):
+    engine = ThumbnailEngine(candidate_count=8)
+    cmd, cand_interval, sprite_interval = engine.build_command(
+        "ffmpeg", "in.mp4", tmp_path, duration=400.0, count=8, keyframes_only=True
+    )
+
+    assert cmd.count("-i") == 1
+    assert cmd[cmd.index("-skip_frame") + 1] == "nokey"
+    assert cand_interval == 50.0
+    assert sprite_interval == 2.0
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert "tile=10x10" in graph and "format=gray" in graph
+    assert any(arg.endswith("cand_%03d.jpg") for arg in cmd)
+    assert any(arg.endswith("sprite_%03d.jpg") for arg in cmd)
+    # Keyframe candidates are picked, not resampled, so no keyframe is repeated.
+    candidate_branch = graph.split(";")[1]
+    assert "select=" in candidate_branch and "fps=" not in candidate_branch
+    assert cmd.count("passthrough") == 2
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+async def test_keyframe_candidates_are_unique_and_timestamped_from_pts(tmp_path: Path, monkeypatch):
+    from app.services.media_analysis import media_analyzer
+
+    monkeypatch.setattr(media_analyzer, "ffmpeg", shutil.which("ffmpeg"))
+    src = tmp_path / "gop5s.mp4"
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", "testsrc=s=320x240:r=25:d=20",
+         "-g", "125", "-keyint_min", "125", "-sc_threshold", "0", str(src)],
+        check=True,
+    )
+
+    # Twelve slots over 20s, but only four keyframes (one every 5s) to pick from.
+    thumbs = await ThumbnailEngine(candidate_count=12).extract(
+        str(src), tmp_path / "thumbs", duration=20.0, keyframes_only=True
+    )
+
+    assert [c.timestamp for c in thumbs.candidates] == [0.0, 5.0, 10.0, 15.0]
+    assert len(list((tmp_path / "thumbs").glob("cand_*.jpg"))) == 4
+    assert all(c.sharpness > 0 for c in thumbs.candidates)
+
+
+def test_choose_uses_agent_timestamp_or_best_score():
+    thumbs = ThumbnailSet(
+        video_path="out.mp4",
+        duration=30.0,
+        candidates=[
+            ThumbnailCandidate(index=0, timestamp=0.0, path="a.jpg", score=2.0),
+            ThumbnailCandidate(index=1, timestamp=10.0, path="b.jpg", score=8.5),
+            ThumbnailCandidate(index=2, timestamp=20.0, path="c.jpg", score=6.0),
+        ],
+    )
+
+    assert thumbs.choose(None).path == "b.jpg"
+    assert thumbs.choose(18.2).path == "c.jpg"
+    assert thumbs.choose("not-a-number").path == "b.jpg"
+    assert thumbs.agent_candidates()[0]["timestamp"] == 10.0
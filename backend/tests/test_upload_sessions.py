@@ -0,0 +1,137 @@
+import hashlib
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.config import settings
+from app.models import SourceAsset
+from app.services import storage as storage_module
+from app.services.storage import ContentHasher, StorageService
+from app.services.upload_sessions import UploadSessionService
+
+PAYLOAD = b"0123456789abcdefghij-tail"  # 25 bytes -> 7 chunks of 4
+
+
+def test_streaming_tree_hash_matches_combined_chunk_digests(monkeypatch):
+    monkeypatch.setattr(storage_module, "CONTENT_CHUNK_SIZE", 4)
+    hasher = ContentHasher()
+    for piece in (PAYLOAD[:3], PAYLOAD[3:11], PAYLOAD[11:]):
+        hasher.update(piece)
+
+    leaves = [hashlib.sha256(PAYLOAD[i:i + 4]).hexdigest() for i in range(0, len(PAYLOAD), 4)]
+    assert hasher.size == len(PAYLOAD)
+    assert hasher.hexdigest() == ContentHasher.combine(leaves)
+
+
+@pytest.fixture
+def upload_service(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "storage_root", str(tmp_path))
+    service = UploadSessionService(storage=StorageService(), chunk_size=4)
+    monkeypatch.setattr("app.routers.jobs.upload_session_service", service)
+    return service
+
+
+async def _auth_headers(client: AsyncClient, email: str) -> dict:
+    res = await client.post("/api/auth/signup", json={"email": email, "password": "SecurePassword123"})
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+async def _upload(client: AsyncClient, headers: dict, order: list[int]) -> dict:
+    res = await client.post(
+        "/api/jobs/uploads",
+        headers=headers,
+        json={"filename": "clip.MP4", "content_type": "video/mp4", "total_size": len(PAYLOAD)},
+    )
+    assert res.status_code == 200, res.text
+    upload_id = res.json()["upload_id"]
+    for index in order:
+        chunk = PAYLOAD[index * 4:(index + 1) * 4]
+        res = await client.put(
+            f"/api/jobs/uploads/{upload_id}/chunks/{index}",
+            headers={**headers, "X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest()},
+            content=chunk,
+        )
+        assert res.status_code == 200, res.text
+    return (await client.get(f"/api/jobs/uploads/{upload_id}", headers=headers)).json()
+
+
+async def test_chunked_upload_resumes_and_dedupes_sources(client: AsyncClient, session, upload_service):
+    headers = await _auth_headers(client, "chunked@example.com")
+
+    with patch("app.routers.jobs.enqueue_job", new_callable=AsyncMock):
+        # Connection "drops" after chunks 0, 3 and 6 arrived out of order.
+        state = await _upload(client, headers, [3, 0, 6])
+        assert state["total_chunks"] == 7
+        assert state["received_chunks"] == [0, 3, 6]
+        assert state["missing_chunks"] == [1, 2, 4, 5]
+        assert state["next_offset"] == 4
+        upload_id = state["upload_id"]
+
+        res = await client.post(f"/api/jobs/uploads/{upload_id}/complete", headers=headers)
+        assert res.status_code == 409
+
+        bad = await client.put(
+            f"/api/jobs/uploads/{upload_id}/chunks/1",
+            headers={**headers, "X-Chunk-SHA256": "0" * 64},
+            content=PAYLOAD[4:8],
+        )
+        assert bad.status_code == 422
+
+        for index in state["missing_chunks"]:
+            res = await client.put(
+                f"/api/jobs/uploads/{upload_id}/chunks/{index}",
+                headers=headers,
+                content=PAYLOAD[index * 4:(index + 1) * 4],
+            )
+            assert res.status_code == 200, res.text
+
+        res = await client.post(f"/api/jobs/uploads/{upload_id}/complete", headers=headers)
+        assert res.status_code == 200, res.text
+        first_job = res.json()
+        assert first_job["media_intelligence"] is None
+
+        stored = sorted((Path(settings.storage_root) / "uploads" / "cas").glob("*/*.mp4"))
+        assert len(stored) == 1
+        assert stored[0].read_bytes() == PAYLOAD
+        assert not list((Path(settings.storage_root) / "uploads" / "partial").glob("*.part"))
+
+        # Analysis finished for the first job; it is cached on the source asset.
+        asset = await session.get(SourceAsset, stored[0].stem)
+        await upload_service.remember_analysis(session, str(stored[0]), {"visual": {"scenes": [1]}})
+        await session.commit()
+
+        # Identical re-upload is stored once and reuses the cached analysis.
+        state = await _upload(client, headers, list(range(7)))
+        res = await client.post(f"/api/jobs/uploads/{state['upload_id']}/complete", headers=headers)
+        assert res.status_code == 200, res.text
+        assert res.json()["media_intelligence"] == {"visual": {"scenes": [1]}}
+
+        await session.refresh(asset)
+        assert asset.last_used_at >= asset.created_at
+        assert sorted((Path(settings.storage_root) / "uploads" / "cas").glob("*/*.mp4")) == stored
+
+
+async def test_chunk_validation(client: AsyncClient, upload_service):
+    headers = await _auth_headers(client, "chunkcheck@example.com")
+    res = await client.post(
+        "/api/jobs/uploads",
+        headers=headers,
+        json={"filename": "clip.mp4", "content_type": "video/mp4", "total_size": 10},
+    )
+    upload_id = res.json()["upload_id"]
+
+    assert (await client.put(f"/api/jobs/uploads/{upload_id}/chunks/3", headers=headers, content=b"xx")).status_code == 416
+    assert (await client.put(f"/api/jobs/uploads/{upload_id}/chunks/2", headers=headers, content=b"x")).status_code == 400
+    assert (await client.put(f"/api/jobs/uploads/{upload_id}/chunks/0", headers=headers, content=b"toolong")).status_code == 413
+
+    other = await _auth_headers(client, "intruder@example.com")
+    assert (await client.get(f"/api/jobs/uploads/{upload_id}", headers=other)).status_code == 404
+
+    res = await client.post(
+        "/api/jobs/uploads",
+        headers=headers,
+        json={"filename": "notes.txt", "content_type": "text/plain", "total_size": 10},
+    )
+    assert res.status_code == 400
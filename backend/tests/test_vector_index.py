@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+from app.services.memory.ann_index import IVFFlatIndex, benchmark, synthetic_embeddings
+from app.services.memory.vector_store import Recipe, StyleProfile, VectorMemoryStore
+
+DIM = VectorMemoryStore.EMBEDDING_DIM
+
+
+def test_ivf_recall_and_scan_fraction_on_synthetic_embeddings():
+    result = benchmark(size=4000, dim=64, queries=40, k=10, nprobe=8)
+
+    assert result.recall >= 0.95
+    assert result.scanned_fraction <= 0.35
+
+
+def test_filtered_search_widens_probes_until_enough_matches():
+    data = synthetic_embeddings(3000, 32, seed=1)
+    index = IVFFlatIndex(32, nprobe=1)
+    index.add([str(i) for i in range(len(data))], data)
+    among = {str(i) for i in range(0, 3000, 200)}  # 15 rows spread over many lists
+
+    hits = index.search(data[7], 5, among=among)
+
+    assert len(hits) == 5
+    assert {item_id for item_id, _ in hits} <= among
+    expected = sorted(among, key=lambda i: float(((data[int(i)] - data[7]) ** 2).sum()))[:5]
+    assert [item_id for item_id, _ in hits] == expected
+
+
+def test_single_and_batched_inserts_build_the_same_index():
+    data = synthetic_embeddings(1500, 16, seed=2)
+    ids = [str(i) for i in range(len(data))]
+    batched, single = IVFFlatIndex(16), IVFFlatIndex(16)
+    batched.add(ids, data)
+    for item_id, vector in zip(ids, data):
+        single.add([item_id], [vector])
+
+    for q in data[:20]:
+        assert [i for i, _ in batched.exact_search(q, 5)] == [i for i, _ in single.exact_search(q, 5)]
+    assert len(batched) == len(single) == 1500
+
+
+def test_replace_and_remove_keep_one_live_row_per_id():
+    index = IVFFlatIndex(4, min_train_size=8)
+    index.add(["a", "b"], [[0, 0, 0, 0], [5, 5, 5, 5]])
+    index.add(["a"], [[9, 9, 9, 9]])
+
+    assert len(index) == 2
+    assert index.search([9, 9, 9, 9], 1)[0][0] == "a"
+    assert index.remove("a")
+    assert [i for i, _ in index.search([9, 9, 9, 9], 5)] == ["b"]
+
+
+def _vector(rng) -> list:
+    return rng.normal(size=DIM).astype(np.float32).tolist()
+
+
+@pytest.mark.asyncio
+async def test_local_store_batches_searches_per_user_and_reloads(tmp_path):
+    path = str(tmp_path / "vectors.db")
+    rng = np.random.default_rng(3)
+    store = VectorMemoryStore(local_path=path)
+    vectors = {f"r{i}": _vector(rng) for i in range(40)}
+    batch = [
+        (Recipe(id=rid, user_id=1 if i % 2 else 2, name=rid, description="", parameters={"i": i}), vec)
+        for i, (rid, vec) in enumerate(vectors.items())
+    ]
+
+    assert await store.save_recipes(batch) == 40
+    found = await store.find_similar_recipes(1, vectors["r5"], limit=3)
+    assert found[0].id == "r5"
+    assert all(r.user_id == 1 for r in found)
+
+    # Upsert keeps the original embedding and bumps the success count.
+    assert await store.save_recipe(batch[5][0], _vector(rng))
+    top = await store.get_user_recipes(1, limit=1)
+    assert top[0].id == "r5" and top[0].success_count == 1
+
+    await store.update_style_profile(StyleProfile(user_id=1, pacing_preference="fast", favorite_transitions=["whip"]))
+    await store.close()
+
+    reopened = VectorMemoryStore(local_path=path)
+    assert (await reopened.find_similar_recipes(1, vectors["r5"], limit=1))[0].id == "r5"
+    profile = await reopened.get_style_profile(1)
+    assert profile.pacing_preference == "fast" and profile.favorite_transitions == ["whip"]
+    await reopened.close()
+
+
+class FakeConn:
+    def __init__(self, rows: int, indexdef=None):
+        self.rows = rows
+        self.indexdef = indexdef
+        self.executed = []
+
+    async def fetchval(self, query, *args):
+        return self.indexdef if "pg_indexes" in query else self.rows
+
+    async def execute(self, query):
+        self.executed.append(" ".join(query.split()))
+
+
+@pytest.mark.asyncio
+async def test_ivfflat_index_is_sized_from_rows_and_rebuilt_after_growth():
+    store = VectorMemoryStore("postgresql://unused", index_type="ivfflat")
+
+    small = FakeConn(rows=500)
+    await store._maintain_index(small)
+    assert small.executed == []  # too few rows for meaningful centroids
+
+    fresh = FakeConn(rows=40000)
+    await store._maintain_index(fresh)
+    assert fresh.executed == [
+        "CREATE INDEX CONCURRENTLY idx_recipes_embedding_ivfflat ON recipes "
+        "USING ivfflat (embedding vector_l2_ops) WITH (lists = 40)"
+    ]
+
+    fitting = FakeConn(rows=60000, indexdef="CREATE INDEX ... USING ivfflat (embedding vector_l2_ops) WITH (lists='40')")
+    await store._maintain_index(fitting)
+    assert fitting.executed == []
+
+    grown = FakeConn(rows=200000, indexdef="CREATE INDEX ... USING ivfflat (embedding vector_l2_ops) WITH (lists='40')")
+    await store._maintain_index(grown)
+    assert grown.executed[0].startswith("DROP INDEX CONCURRENTLY")
+    assert grown.executed[1].endswith("WITH (lists = 200)")
+
+
+@pytest.mark.asyncio
+async def test_hnsw_index_created_once():
+    store = VectorMemoryStore("postgresql://unused", index_type="hnsw")
+    missing = FakeConn(rows=0)
+    await store._maintain_index(missing)
+    assert "USING hnsw (embedding vector_l2_ops)" in missing.executed[0]
+
+    present = FakeConn(rows=0, indexdef="CREATE INDEX idx_recipes_embedding_hnsw ...")
+    await store._maintain_index(present)
+    assert present.executed == []